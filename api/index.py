@@ -9,6 +9,10 @@ import os
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Serverless mode: lazy feature imports, no background sync threads and
+# read-through lookups instead of downloading every table on cold start
+os.environ.setdefault('ATTENDANCE_SERVING_MODE', 'serverless')
+
 # Import the Flask app from web_app
 from web_app import app
 
@@ -25,6 +25,10 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score
 
+from app.core.assistant_backend import AssistantReply, StubModel, get_assistant_backend
+from app.core.attendance_anomalies import get_anomaly_scorer
+from app.core.attendance_forecaster import get_attendance_forecaster
+
 class AdvancedAIManager:
     """Advanced AI Manager"""
     
@@ -364,33 +368,68 @@ class AdvancedAIManager:
             self.logger.error(f"❌ Failed in prediction: {e}")
             return {"error": f"Failed in prediction: {str(e)}"}
     
-    def get_smart_assistant_response(self, user_query: str) -> str:
-        """Get response from smart assistant"""
+    def forecast_attendance(self, db_manager, days_ahead: int = 7, level: str = 'employee',
+                            limit: Optional[int] = None) -> Dict[str, Any]:
+        """Per-employee or per-department forecasts: expected arrival, absence probability, overtime
+        
+        All models are fitted together from the shared attendance rollup and cached per data version;
+        closing a day only adds that day's statistics.
+        """
         try:
-            if not self.gemini_model:
-                return "Sorry, the smart assistant service is not available at the moment"
-            
-            # Setup context
-            context = f"""
-            You are a smart assistant for an attendance management system. 
-            You can help users with:
-            - Analyzing attendance data
-            - Understanding patterns and trends
-            - Providing recommendations to improve productivity
-            - Answering questions about the system
-            
-            IMPORTANT: Always respond in English language only.
+            forecaster = get_attendance_forecaster(db_manager)
+            forecast = forecaster.forecast(days_ahead, level)
+            if not forecast.keys:
+                return {"error": "Insufficient data for prediction"}
             
-            Question: {user_query}
-            """
+            self.logger.info(f"✅ Forecast {len(forecast.keys)} {level}(s) for {days_ahead} working days")
+            return {
+                "level": level,
+                "data_version": forecast.version,
+                "dates": list(forecast.dates),
+                "forecasts": forecast.records(limit)
+            }
             
-            # Get response
-            response = self.gemini_model.generate_content(context)
+        except Exception as e:
+            self.logger.error(f"❌ Failed in {level} forecast: {e}")
+            return {"error": f"Failed in prediction: {str(e)}"}
+    
+    def score_attendance_anomalies(self, db_manager, day: Optional[str] = None, limit: int = 100,
+                                   audit_store=None) -> Dict[str, Any]:
+        """Rank a whole day's suspicious punches (impossible travel, unusual hour, shared device, IP burst)
+        
+        Scores every punch of the day in one vectorized pass against cached per-employee baselines
+        and stores the ranked result for the day.
+        """
+        try:
+            if audit_store is None:
+                from app.utils.audit_logger import audit_logger
+                audit_store = audit_logger.store
+            scorer = get_anomaly_scorer(db_manager, audit_store)
+            summary = scorer.run_job(day, limit)
+            self.logger.info(f"✅ Scored {summary['punches']} punches, {summary['anomalies']} anomalies")
+            return summary
             
-            if response and hasattr(response, 'text'):
-                return response.text
-            else:
-                return "Sorry, I couldn't get an appropriate response"
+        except Exception as e:
+            self.logger.error(f"❌ Failed in anomaly scoring: {e}")
+            return {"error": f"Failed in anomaly scoring: {str(e)}"}
+    
+    def assistant_backend(self, db_manager=None):
+        """Shared assistant layer: compact data context, cached responses, hit metrics
+        
+        Set "assistant": {"provider": "stub"} in ai_config.json to answer with the local model (no network).
+        """
+        if self.config.get("assistant", {}).get("provider") == "stub":
+            return get_assistant_backend(db_manager, StubModel())
+        return get_assistant_backend(db_manager, self.gemini_model)
+    
+    def ask_smart_assistant(self, user_query: str, db_manager=None) -> AssistantReply:
+        """Answer with the source (memory/disk cache or model) and timing; blocking, call off the GUI thread"""
+        return self.assistant_backend(db_manager).ask(user_query)
+    
+    def get_smart_assistant_response(self, user_query: str, db_manager=None) -> str:
+        """Get response from smart assistant"""
+        try:
+            return self.ask_smart_assistant(user_query, db_manager).text
                 
         except Exception as e:
             self.logger.error(f"❌ Failed to get smart assistant response: {e}")
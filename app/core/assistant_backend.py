@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Smart Assistant Backend
+طبقة المساعد الذكي بين الواجهة والنموذج:
+- سياق مضغوط من التجميعات المخزنة (يومي/أيام الأسبوع/الساعات) بدلاً من السجلات الخام، يُبنى مرة لكل إصدار بيانات
+- ذاكرة للإجابات مفتاحها (السؤال بعد التطبيع + بصمة السياق + هوية النموذج): LRU في الذاكرة
+  ومحفوظة في ملف SQLite مستقل (assistant_cache.db، المسار من ASSISTANT_CACHE_DB) لا في قاعدة الحضور
+  فأسئلة الأزرار السريعة المتكررة لا تصل للنموذج ما لم تتغير البيانات أو يتغير النموذج
+- سؤالان متطابقان في نفس الوقت ينتظران استدعاءً واحداً للنموذج
+- عدادات الإصابة (ذاكرة/قرص/نموذج) ومتوسط زمن النموذج
+- StubModel: نموذج محلي بدون شبكة (للتجربة والقياس) بنفس واجهة generate_content
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.database.attendance_aggregates import WEEKDAYS, AttendanceAggregates, get_attendance_aggregator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv('ASSISTANT_CACHE_DB', 'assistant_cache.db')
+PROMPT_VERSION = 1                  # يُرفع عند تغيير نص التعليمات: يُبطل الإجابات المحفوظة
+CONTEXT_RECENT_DAYS = 14
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_PERSISTED_ENTRIES = 2000
+UNAVAILABLE_RESPONSE = "Sorry, the smart assistant service is not available at the moment"
+EMPTY_RESPONSE = "Sorry, I couldn't get an appropriate response"
+
+_INSTRUCTIONS = """You are a smart assistant for an attendance management system.
+You can help users with:
+- Analyzing attendance data
+- Understanding patterns and trends
+- Providing recommendations to improve productivity
+- Answering questions about the system
+
+IMPORTANT: Always respond in English language only.
+Base any statement about the data on the summary below; say so when it is not enough."""
+
+
+def normalize_question(question: str) -> str:
+    """صيغة موحدة للسؤال: حالة الأحرف والمسافات وعلامات الترقيم (بما فيها ؟ و ، العربية) لا تغيّر المفتاح"""
+    text = unicodedata.normalize('NFKC', question or '').casefold()
+    text = re.sub(r"[^\w\s]", ' ', text)
+    return ' '.join(text.split())
+
+
+def build_context(aggregates: AttendanceAggregates, recent_days: int = CONTEXT_RECENT_DAYS) -> str:
+    """ملخص البيانات للنموذج: بضعة أسطر ثابتة الحجم مهما كان عدد السجلات"""
+    if not aggregates.total_records:
+        return "Attendance data summary: no attendance records yet."
+    stats = aggregates.daily_stats()
+    lines = [
+        "Attendance data summary:",
+        f"- records: {aggregates.total_records}, employees: {aggregates.unique_employees}, "
+        f"days: {stats['days']} ({aggregates.first_date} to {aggregates.last_date})",
+        f"- records per day: mean {stats['mean']:.1f}, std {stats['std']:.1f}, "
+        f"min {stats['min']} ({stats['min_date']}), max {stats['max']} ({stats['max_date']})",
+        "- by weekday: " + ', '.join(f"{day[:3]} {count}" for day, count in zip(WEEKDAYS, aggregates.weekday)),
+        "- by hour: " + ', '.join(f"{hour:02d}h {count}" for hour, count in aggregates.hour_distribution().items()),
+        f"- mean punch hour: {aggregates.mean_hour():.1f}",
+    ]
+    recent = aggregates.daily[-recent_days:]
+    if recent:
+        lines.append(f"- last {len(recent)} days: " + ', '.join(f"{day[:10]} {count}" for day, count in recent))
+    return '\n'.join(lines)
+
+
+def build_prompt(question: str, context: str) -> str:
+    return f"{_INSTRUCTIONS}\n\n{context}\n\nQuestion: {question}"
+
+
+@dataclass(frozen=True)
+class AssistantReply:
+    text: str
+    source: str             # 'memory' | 'disk' | 'model' | 'shared' | 'unavailable' | 'error'
+    elapsed_ms: float
+
+    @property
+    def cached(self) -> bool:
+        return self.source in ('memory', 'disk', 'shared')
+
+
+def model_identity(model) -> str:
+    """المزود/النموذج ضمن مفتاح الذاكرة: إجابات StubModel لا تُقدَّم بعد التحويل إلى Gemini"""
+    return f"{type(model).__module__}.{type(model).__name__}:{getattr(model, 'model_name', '')}"
+
+
+class StubModel:
+    """نموذج محلي حتمي بنفس واجهة gemini (generate_content(prompt).text) بدون شبكة"""
+
+    model_name = 'stub'
+
+    @dataclass(frozen=True)
+    class Response:
+        text: str
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> 'StubModel.Response':
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        question = prompt.rsplit("Question:", 1)[-1].strip()
+        summary = next((line for line in prompt.splitlines() if line.startswith("- records:")), "- no data")
+        return self.Response(f"[local model] {question}\nBased on {summary[2:]}.")
+
+
+class ResponseCache:
+    """LRU في الذاكرة أمام جدول SQLite (db_path=None: ذاكرة فقط)"""
+
+    def __init__(self, db_path: Optional[str] = None, capacity: int = DEFAULT_MEMORY_ENTRIES,
+                 persisted_capacity: int = DEFAULT_PERSISTED_ENTRIES):
+        self.db_path = db_path
+        self.capacity = capacity
+        self.persisted_capacity = persisted_capacity
+        self._memory: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    @staticmethod
+    def ensure_schema(cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS assistant_response_cache (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                context_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_assistant_cache_last_used "
+                       "ON assistant_response_cache(last_used)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._schema_ready:
+            self.ensure_schema(conn.cursor())
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+    def get(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        """(الإجابة، المصدر 'memory' أو 'disk')؛ (None, None) إن لم توجد"""
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                return response, 'memory'
+        if not self.db_path:
+            return None, None
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT response FROM assistant_response_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None, None
+                conn.execute("UPDATE assistant_response_cache SET hits = hits + 1, last_used = ? WHERE key = ?",
+                             (time.time(), key))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Assistant cache not readable: {e}")
+            return None, None
+        self._remember(key, row[0])
+        return row[0], 'disk'
+
+    def put(self, key: str, question: str, context_hash: str, response: str):
+        self._remember(key, response)
+        if not self.db_path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("INSERT OR REPLACE INTO assistant_response_cache "
+                             "(key, question, context_hash, response, last_used) VALUES (?, ?, ?, ?, ?)",
+                             (key, question, context_hash, response, time.time()))
+                # الأقدم استخداماً يُحذف بعد persisted_capacity
+                conn.execute("DELETE FROM assistant_response_cache WHERE key IN (SELECT key FROM "
+                             "assistant_response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                             (self.persisted_capacity,))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Assistant cache not writable: {e}")
+
+    def _remember(self, key: str, response: str):
+        with self._lock:
+            self._memory[key] = response
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.capacity:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM assistant_response_cache")
+                conn.commit()
+            finally:
+                conn.close()
+
+
+class AssistantBackend:
+    """ask() متزامن وآمن بين الخيوط؛ الواجهة تستدعيه من خيط خلفي (AnalyticsRunner)"""
+
+    def __init__(self, model=None, aggregator=None, cache: Optional[ResponseCache] = None):
+        self.model = model
+        self.aggregator = aggregator
+        # ملف مستقل مثل audit_log.db / biometric_security.db: قاعدة الحضور قد تُحذف عند الخروج
+        self.cache = cache if cache is not None else ResponseCache(DEFAULT_DB_PATH)
+        self._context: Tuple[Any, str, str] = (None, '', '')     # (إصدار البيانات، السياق، بصمته)
+        self._context_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats = {'requests': 0, 'memory': 0, 'disk': 0, 'shared': 0, 'model': 0, 'errors': 0}
+        self._model_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+    def context(self) -> Tuple[str, str]:
+        """(السياق المضغوط، بصمته) للإصدار الحالي من البيانات"""
+        aggregates = self.aggregator.aggregates() if self.aggregator is not None else None
+        version = aggregates.version if aggregates is not None else None
+        with self._context_lock:
+            if version is not None and self._context[0] == version:
+                return self._context[1], self._context[2]
+        context = build_context(aggregates) if aggregates is not None else "Attendance data summary: not connected."
+        context_hash = hashlib.sha256(f"{PROMPT_VERSION}\n{context}".encode('utf-8')).hexdigest()[:16]
+        with self._context_lock:
+            self._context = (version, context, context_hash)
+        return context, context_hash
+
+    @staticmethod
+    def cache_key(question: str, context_hash: str, model_id: str = '') -> str:
+        return hashlib.sha256(
+            f"{normalize_question(question)}\n{context_hash}\n{model_id}".encode('utf-8')).hexdigest()
+
+    def ask(self, question: str) -> AssistantReply:
+        started = time.perf_counter()
+        self._count('requests')
+        model = self.model      # قد يُستبدل من get_assistant_backend أثناء السؤال
+        if model is None:
+            return AssistantReply(UNAVAILABLE_RESPONSE, 'unavailable', 0.0)
+
+        context, context_hash = self.context()
+        key = self.cache_key(question, context_hash, model_identity(model))
+        response, source = self.cache.get(key)
+        if response is not None:
+            self._count(source)
+            return AssistantReply(response, source, (time.perf_counter() - started) * 1000)
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            # نفس السؤال قيد التنفيذ (ضغطتان على نفس الزر): انتظار نفس الإجابة
+            text, source = future.result()
+            self._count('shared' if source == 'model' else source)
+            return AssistantReply(text, 'shared' if source == 'model' else source,
+                                  (time.perf_counter() - started) * 1000)
+
+        try:
+            text, source = self._generate(model, question, context, context_hash, key)
+        except BaseException as e:
+            future.set_result((f"Sorry, an error occurred: {e}", 'error'))
+            raise
+        else:
+            future.set_result((text, source))
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        return AssistantReply(text, source, (time.perf_counter() - started) * 1000)
+
+    def _generate(self, model, question: str, context: str, context_hash: str, key: str) -> Tuple[str, str]:
+        model_started = time.perf_counter()
+        try:
+            response = model.generate_content(build_prompt(question, context))
+        except Exception as e:
+            logger.error(f"❌ Failed to get smart assistant response: {e}")
+            self._count('errors')
+            return f"Sorry, an error occurred: {str(e)}", 'error'
+        with self._stats_lock:
+            self._stats['model'] += 1
+            self._model_seconds += time.perf_counter() - model_started
+        text = getattr(response, 'text', None) if response else None
+        if not text:
+            return EMPTY_RESPONSE, 'error'
+        self.cache.put(key, normalize_question(question), context_hash, text)
+        return text, 'model'
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            model_seconds = self._model_seconds
+        hits = stats['memory'] + stats['disk'] + stats['shared']
+        answered = hits + stats['model']
+        stats.update({
+            'hits': hits,
+            'hit_rate': hits / answered if answered else 0.0,
+            'avg_model_ms': model_seconds * 1000 / stats['model'] if stats['model'] else 0.0,
+        })
+        return stats
+
+
+# طبقة واحدة لكل قاعدة بيانات: شاشة المساعد والتحليلات تشاركان الذاكرة والعدادات
+_backends: Dict[Any, AssistantBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_assistant_backend(db_manager=None, model=None) -> AssistantBackend:
+    aggregator = get_attendance_aggregator(db_manager) if db_manager is not None else None
+    with _backends_lock:
+        backend = _backends.get(id(aggregator))
+        if backend is None:
+            backend = _backends[id(aggregator)] = AssistantBackend(model, aggregator)
+        elif model is not None:
+            backend.model = model
+        return backend
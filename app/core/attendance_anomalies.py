@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Attendance Anomaly Scoring
+تقييم بصمات يوم كامل دفعة واحدة بحثاً عن الحالات المشبوهة:
+- انتقال مستحيل بين موقعين معتمدين متتاليين (المسافة بين حدود النطاقين ÷ الزمن > السرعة القصوى)
+- وقت غير معتاد مقارنة بسجل الموظف نفسه لنفس نوع البصمة
+- رمز جهاز واحد استخدمه أكثر من موظف في نفس اليوم
+- دفعة كثيفة من عنوان IP واحد خلال نافذة قصيرة
+كل الخصائص تُحسب على مصفوفات NumPy لكل بصمات اليوم. خط الأساس لكل موظف جدول صغير
+(موظف، نوع البصمة) بمجاميع كافية يُضاف إليه كل يوم مغلق، ويُعاد بناؤه إن عُدّل يوم سبق حسابه.
+عنوان IP ورمز الجهاز يُقرآن من أحداث checkin_success في سجل التدقيق (بصمات الأكشاك و ZK بدونهما).
+
+التشغيل كمهمة مجدولة:
+    python -m app.core.attendance_anomalies --db attendance.db --audit-db audit_log.db
+    python -m app.core.attendance_anomalies --day 2024-05-01 --output anomalies.json
+    python -m app.core.attendance_anomalies --daily-at 23:30
+قياس الأداء: python deploy/benchmark_analytics.py anomalies
+"""
+
+import argparse
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date as date_type, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.database.attendance_aggregates import AttendanceAggregator, get_attendance_aggregator
+
+logger = logging.getLogger(__name__)
+
+PUNCH_TYPES = ('Check-In', 'Check-Out')
+FEATURES = ('impossible_travel', 'shared_device', 'unusual_hour', 'ip_burst')
+AUDIT_MATCH_SECONDS = 120   # حدث التدقيق يُسجَّل بعد إدخال البصمة بلحظات
+
+
+@dataclass
+class AnomalyConfig:
+    max_speed_kmh: float = 120.0
+    unusual_z: float = 3.0              # عدد الانحرافات المعيارية عن متوسط الموظف
+    min_std_minutes: float = 15.0       # حد أدنى للانحراف: موظف منضبط جداً لا يُبلَّغ عنه لدقائق
+    min_history: int = 5                # أقل من ذلك: لا خط أساس للموظف
+    burst_window_seconds: int = 300
+    burst_threshold: int = 20           # بصمات من IP واحد داخل النافذة
+    trusted_ips: Tuple[str, ...] = ()   # عناوين الشبكة الداخلية/الأكشاك
+    weights: Dict[str, float] = field(default_factory=lambda: {
+        'impossible_travel': 3.0, 'shared_device': 2.0, 'unusual_hour': 1.0, 'ip_burst': 1.0})
+
+
+@dataclass
+class DayPunches:
+    """بصمات يوم واحد كأعمدة بنفس الطول"""
+    day: str
+    punch_id: np.ndarray        # int64
+    employee_id: np.ndarray     # int64
+    seconds: np.ndarray         # float64: ثوانٍ من بداية اليوم
+    punch_type: np.ndarray      # int64: 0 حضور، 1 انصراف، -1 غير ذلك
+    location_id: np.ndarray     # int64، -1 = بدون موقع
+    device: np.ndarray          # int64 رمز الجهاز مرمَّزاً، -1 = غير معروف
+    ip: np.ndarray              # int64 عنوان IP مرمَّزاً، -1 = غير معروف
+    devices: Tuple[str, ...] = ()
+    ips: Tuple[str, ...] = ()
+
+    def __len__(self) -> int:
+        return int(self.punch_id.size)
+
+
+@dataclass
+class LocationTable:
+    ids: np.ndarray             # مرتبة
+    latitude: np.ndarray
+    longitude: np.ndarray
+    radius: np.ndarray          # بالمتر
+
+    def index_of(self, location_ids: np.ndarray) -> np.ndarray:
+        """فهرس كل موقع في الجدول، -1 إن لم يوجد"""
+        if self.ids.size == 0:
+            return np.full(location_ids.shape, -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.ids, location_ids), self.ids.size - 1)
+        return np.where(self.ids[positions] == location_ids, positions, -1)
+
+
+@dataclass
+class PunchBaseline:
+    """خط الأساس: لكل موظف ولكل نوع بصمة عدد البصمات ومتوسط وانحراف وقتها بالدقائق"""
+    employee_ids: np.ndarray    # مرتبة
+    counts: np.ndarray          # (E, 2)
+    mean: np.ndarray            # (E, 2)
+    std: np.ndarray             # (E, 2)
+
+    @classmethod
+    def from_sums(cls, rows: Sequence[Tuple[int, str, int, float, float]]) -> 'PunchBaseline':
+        """rows: (employee_id, punch_type, punches, Σminutes, Σminutes²)"""
+        kinds = {name: index for index, name in enumerate(PUNCH_TYPES)}
+        rows = [row for row in rows if row[1] in kinds]
+        employee_ids = np.unique(np.array([row[0] for row in rows], dtype=np.int64))
+        counts, totals, squares = (np.zeros((employee_ids.size, 2)) for _ in range(3))
+        if rows:
+            positions = np.searchsorted(employee_ids, np.array([row[0] for row in rows], dtype=np.int64))
+            kind = np.array([kinds[row[1]] for row in rows])
+            counts[positions, kind] = [row[2] for row in rows]
+            totals[positions, kind] = [row[3] for row in rows]
+            squares[positions, kind] = [row[4] for row in rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(counts > 0, totals / counts, 0.0)
+            variance = np.where(counts > 1, (squares - counts * mean * mean) / np.maximum(counts - 1, 1), 0.0)
+        return cls(employee_ids, counts, mean, np.sqrt(np.maximum(variance, 0.0)))
+
+    def index_of(self, employee_ids: np.ndarray) -> np.ndarray:
+        if self.employee_ids.size == 0:
+            return np.full(employee_ids.shape, -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.employee_ids, employee_ids), self.employee_ids.size - 1)
+        return np.where(self.employee_ids[positions] == employee_ids, positions, -1)
+
+
+EMPTY_BASELINE = PunchBaseline.from_sums([])
+
+
+# --- الخصائص (كل دالة تُرجع (النسبة إلى حد التبليغ، القيمة) لكل بصمة؛ النسبة >= 1 = مشبوهة) ---
+
+def _haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = (np.sin((phi2 - phi1) / 2) ** 2 +
+         np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6_371_000.0 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def impossible_travel(punches: DayPunches, locations: LocationTable, config: AnomalyConfig):
+    """السرعة اللازمة بين بصمتين متتاليتين للموظف في موقعين مختلفين (تُنسب للبصمة الثانية)"""
+    ratio, speed = np.zeros(len(punches)), np.zeros(len(punches))
+    if len(punches) < 2:
+        return ratio, speed
+    order = np.lexsort((punches.seconds, punches.employee_id))
+    employees = punches.employee_id[order]
+    seconds = punches.seconds[order]
+    places = locations.index_of(punches.location_id[order])
+    pair = ((employees[1:] == employees[:-1]) & (places[1:] >= 0) & (places[:-1] >= 0) &
+            (places[1:] != places[:-1]))
+    first, second = places[:-1][pair], places[1:][pair]
+    # المسافة بين حدود النطاقين لا بين المركزين
+    gap = np.maximum(_haversine_m(locations.latitude[first], locations.longitude[first],
+                                  locations.latitude[second], locations.longitude[second])
+                     - locations.radius[first] - locations.radius[second], 0.0)
+    elapsed = np.maximum(seconds[1:][pair] - seconds[:-1][pair], 60.0)
+    targets = order[1:][pair]
+    speed[targets] = gap / elapsed * 3.6
+    ratio[targets] = speed[targets] / config.max_speed_kmh
+    return ratio, speed
+
+
+def unusual_hour(punches: DayPunches, baseline: PunchBaseline, config: AnomalyConfig):
+    """بُعد وقت البصمة عن متوسط الموظف لنفس النوع بوحدات الانحراف المعياري"""
+    ratio, z = np.zeros(len(punches)), np.zeros(len(punches))
+    rows = baseline.index_of(punches.employee_id)
+    usable = (rows >= 0) & (punches.punch_type >= 0)
+    rows, kinds = rows[usable], punches.punch_type[usable]
+    enough = baseline.counts[rows, kinds] >= config.min_history
+    spread = np.maximum(baseline.std[rows, kinds], config.min_std_minutes)
+    scores = np.abs(punches.seconds[usable] / 60.0 - baseline.mean[rows, kinds]) / spread
+    z[usable] = np.where(enough, scores, 0.0)
+    ratio[usable] = z[usable] / config.unusual_z
+    return ratio, z
+
+
+def shared_device(punches: DayPunches, config: AnomalyConfig):
+    """عدد الموظفين المختلفين الذين استخدموا رمز الجهاز نفسه في اليوم"""
+    ratio, sharing = np.zeros(len(punches)), np.zeros(len(punches))
+    known = punches.device >= 0
+    if not known.any():
+        return ratio, sharing
+    _, employee_codes = np.unique(punches.employee_id[known], return_inverse=True)
+    devices = punches.device[known]
+    pairs = np.unique(devices * (employee_codes.max() + 1) + employee_codes)
+    distinct = np.bincount(pairs // (employee_codes.max() + 1), minlength=devices.max() + 1)
+    sharing[known] = distinct[devices]
+    ratio[known] = np.where(sharing[known] >= 2, sharing[known] / 2.0, 0.0)
+    return ratio, sharing
+
+
+def ip_burst(punches: DayPunches, config: AnomalyConfig):
+    """عدد البصمات من نفس IP خلال burst_window_seconds المنتهية عند البصمة"""
+    ratio, burst = np.zeros(len(punches)), np.zeros(len(punches))
+    trusted = [punches.ips.index(ip) for ip in config.trusted_ips if ip in punches.ips]
+    known = (punches.ip >= 0) & ~np.isin(punches.ip, trusted)
+    if not known.any():
+        return ratio, burst
+    indices = np.nonzero(known)[0]
+    order = indices[np.lexsort((punches.seconds[indices], punches.ip[indices]))]
+    keys = punches.ip[order] * 200_000.0 + punches.seconds[order]   # اليوم أقل من 200,000 ثانية
+    window_start = np.searchsorted(keys, keys - config.burst_window_seconds, side='left')
+    burst[order] = np.arange(order.size) - window_start + 1
+    ratio[order] = burst[order] / config.burst_threshold
+    return ratio, burst
+
+
+def score_day(punches: DayPunches, baseline: PunchBaseline, locations: LocationTable,
+              config: Optional[AnomalyConfig] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """يحسب كل الخصائص لكل البصمات ويُرجع المشبوهة مرتبة تنازلياً حسب الدرجة"""
+    config = config or AnomalyConfig()
+    if not len(punches):
+        return []
+    features = {
+        'impossible_travel': impossible_travel(punches, locations, config),
+        'shared_device': shared_device(punches, config),
+        'unusual_hour': unusual_hour(punches, baseline, config),
+        'ip_burst': ip_burst(punches, config),
+    }
+    score = np.zeros(len(punches))
+    for name, (ratio, _value) in features.items():
+        score += np.where(ratio >= 1.0, ratio * config.weights.get(name, 1.0), 0.0)
+    flagged = np.nonzero(score > 0)[0]
+    flagged = flagged[np.argsort(-score[flagged], kind='stable')]
+    if limit is not None:
+        flagged = flagged[:limit]
+
+    anomalies = []
+    for rank, index in enumerate(flagged, start=1):
+        seconds = int(punches.seconds[index])
+        kind = int(punches.punch_type[index])
+        reasons = [{'feature': name, 'value': round(float(value[index]), 2)}
+                   for name, (ratio, value) in features.items() if ratio[index] >= 1.0]
+        anomalies.append({
+            'rank': rank,
+            'punch_id': int(punches.punch_id[index]),
+            'employee_id': int(punches.employee_id[index]),
+            'date': punches.day,
+            'time': f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}",
+            'type': PUNCH_TYPES[kind] if kind >= 0 else None,
+            'score': round(float(score[index]), 3),
+            'reasons': reasons,
+            'device': punches.devices[punches.device[index]] if punches.device[index] >= 0 else None,
+            'ip': punches.ips[punches.ip[index]] if punches.ip[index] >= 0 else None,
+        })
+    return anomalies
+
+
+# --- القراءة من قاعدة البيانات والمهمة اليومية ---
+
+def _seconds_sql(column: str) -> str:
+    """الثواني من بداية اليوم من check_time ('HH:MM:SS' أو طابع كامل)"""
+    return (f"CASE WHEN length({column}) <= 8 "
+            f"THEN substr({column}, 1, 2) * 3600 + substr({column}, 4, 2) * 60 + substr({column}, 7, 2) "
+            f"ELSE substr({column}, 12, 2) * 3600 + substr({column}, 15, 2) * 60 + substr({column}, 18, 2) END")
+
+
+class AttendanceAnomalyScorer:
+    """يقرأ بصمات يوم من SQLite (ومن سجل التدقيق للـ IP والجهاز)، يحدّث خط الأساس، ويحفظ النتائج"""
+
+    def __init__(self, aggregator: AttendanceAggregator, audit_store=None, config: Optional[AnomalyConfig] = None):
+        if not aggregator.db_path:
+            raise ValueError("Anomaly scoring needs the local SQLite attendance database")
+        self.aggregator = aggregator
+        self.audit_store = audit_store
+        self.config = config or AnomalyConfig()
+        self._baseline_key = None
+        self._baseline = EMPTY_BASELINE
+
+    @staticmethod
+    def ensure_schema(cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_punch_baseline (
+                employee_id INTEGER NOT NULL,
+                punch_type TEXT NOT NULL,
+                punches INTEGER NOT NULL,
+                total REAL NOT NULL,
+                total_sq REAL NOT NULL,
+                PRIMARY KEY (employee_id, punch_type)
+            ) WITHOUT ROWID
+        """)
+        # through: آخر يوم دخل خط الأساس؛ revisions/days: بصمة attendance_day_revision حتى ذلك اليوم
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_punch_baseline_state (
+                name TEXT PRIMARY KEY,
+                through TEXT,
+                revisions INTEGER NOT NULL DEFAULT 0,
+                days INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_anomalies (
+                day TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                punch_id INTEGER,
+                employee_id INTEGER,
+                score REAL NOT NULL,
+                reasons TEXT NOT NULL,
+                scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (day, rank)
+            ) WITHOUT ROWID
+        """)
+
+    def _connect(self):
+        conn = self.aggregator.connect()
+        self.ensure_schema(conn.cursor())
+        return conn
+
+    # --- خط الأساس ---
+
+    @staticmethod
+    def _fingerprint(conn, through: str) -> Tuple[int, int]:
+        return conn.execute("SELECT COALESCE(SUM(revision), 0), COUNT(*) FROM attendance_day_revision "
+                            "WHERE date <= ? AND date != ''", (through,)).fetchone()
+
+    @staticmethod
+    def _sums_sql(where: str) -> str:
+        seconds = _seconds_sql('check_time')
+        return f"""
+            SELECT employee_id, type, COUNT(*), SUM(minute), SUM(minute * minute)
+            FROM (SELECT employee_id, type, ({seconds}) / 60.0 AS minute FROM attendance
+                  WHERE {where} AND employee_id IS NOT NULL AND check_time IS NOT NULL
+                        AND type IN ('Check-In', 'Check-Out'))
+            GROUP BY employee_id, type
+        """
+
+    def baseline(self, day: str) -> PunchBaseline:
+        """خط الأساس من كل الأيام قبل day؛ الجدول يُكمَّل بالأيام الجديدة فقط"""
+        through = (date_type.fromisoformat(day) - timedelta(days=1)).isoformat()
+        conn = self._connect()
+        try:
+            state = conn.execute("SELECT through, revisions, days FROM attendance_punch_baseline_state "
+                                 "WHERE name = 'punch'").fetchone()
+            if state is not None and state[0] is not None and state[0] > through:
+                # إعادة تقييم يوم قديم: خط أساس مؤقت دون المساس بالجدول
+                return PunchBaseline.from_sums(conn.execute(self._sums_sql("date < ?"), (day,)).fetchall())
+
+            fingerprint = self._fingerprint(conn, through)
+            if self._baseline_key == (through, fingerprint):
+                return self._baseline
+            if state is not None and state[0] is not None and self._fingerprint(conn, state[0]) == (state[1], state[2]):
+                after = state[0]
+            else:
+                conn.execute("DELETE FROM attendance_punch_baseline")
+                after = ''
+            if after < through:
+                conn.execute(f"""
+                    INSERT INTO attendance_punch_baseline (employee_id, punch_type, punches, total, total_sq)
+                    {self._sums_sql("date > ? AND date <= ?")}
+                    ON CONFLICT (employee_id, punch_type) DO UPDATE SET
+                        punches = punches + excluded.punches,
+                        total = total + excluded.total,
+                        total_sq = total_sq + excluded.total_sq
+                """, (after, through))
+            conn.execute("INSERT OR REPLACE INTO attendance_punch_baseline_state (name, through, revisions, days) "
+                         "VALUES ('punch', ?, ?, ?)", (through, *fingerprint))
+            conn.commit()
+            baseline = PunchBaseline.from_sums(conn.execute(
+                "SELECT employee_id, punch_type, punches, total, total_sq FROM attendance_punch_baseline").fetchall())
+            logger.info(f"📐 Punch baseline through {through}: {baseline.employee_ids.size} employees"
+                        f" ({'incremental' if after else 'rebuilt'})")
+        finally:
+            conn.close()
+        self._baseline_key, self._baseline = (through, fingerprint), baseline
+        return baseline
+
+    # --- بصمات اليوم ---
+
+    def locations(self) -> LocationTable:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT id, latitude, longitude, COALESCE(radius_meters, 0) FROM locations "
+                                "WHERE latitude IS NOT NULL AND longitude IS NOT NULL ORDER BY id").fetchall()
+        except Exception as e:
+            logger.warning(f"⚠️ Locations not available for anomaly scoring: {e}")
+            rows = []
+        finally:
+            conn.close()
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        return LocationTable(columns[:, 0].astype(np.int64), columns[:, 1], columns[:, 2], columns[:, 3])
+
+    def load_day(self, day: str) -> DayPunches:
+        import pandas as pd
+
+        conn = self._connect()
+        try:
+            frame = pd.read_sql_query(f"""
+                SELECT id AS punch_id, employee_id, ({_seconds_sql('check_time')}) AS seconds, type,
+                       COALESCE(location_id, -1) AS location_id
+                FROM attendance
+                WHERE date = ? AND employee_id IS NOT NULL AND check_time IS NOT NULL
+            """, conn, params=(day,))
+        finally:
+            conn.close()
+        frame['seconds'] = pd.to_numeric(frame['seconds'], errors='coerce').fillna(0.0)
+        frame['employee_id'] = pd.to_numeric(frame['employee_id'], errors='coerce').fillna(-1).astype(np.int64)
+        frame['device'], frame['ip'] = None, None
+        audit = self._audit_frame(day)
+        if audit is not None and not audit.empty and not frame.empty:
+            frame = self._attach_audit(frame, audit)
+
+        device_codes, devices = pd.factorize(frame['device'])
+        ip_codes, ips = pd.factorize(frame['ip'])
+        kinds = {name: index for index, name in enumerate(PUNCH_TYPES)}
+        return DayPunches(
+            day=day,
+            punch_id=frame['punch_id'].to_numpy(dtype=np.int64),
+            employee_id=frame['employee_id'].to_numpy(dtype=np.int64),
+            seconds=frame['seconds'].to_numpy(dtype=np.float64),
+            punch_type=frame['type'].map(kinds).fillna(-1).to_numpy(dtype=np.int64),
+            location_id=pd.to_numeric(frame['location_id'], errors='coerce').fillna(-1).to_numpy(dtype=np.int64),
+            device=device_codes.astype(np.int64), ip=ip_codes.astype(np.int64),
+            devices=tuple(devices), ips=tuple(ips))
+
+    def _audit_frame(self, day: str):
+        """أحداث checkin_success لليوم: (employee_id, type, seconds, ip, device)"""
+        import pandas as pd
+
+        if self.audit_store is None:
+            return None
+        rows = []
+        try:
+            for event in self.audit_store.iter_events(page_size=1000, start_date=day, end_date=f"{day}T23:59:59.999999",
+                                                      sub_type='checkin_success'):
+                stamp = str(event.get('timestamp') or '')
+                details = event.get('details') or {}
+                if len(stamp) < 19 or event.get('employee_id') in (None, ''):
+                    continue
+                rows.append((int(event['employee_id']), details.get('check_type'),
+                             int(stamp[11:13]) * 3600 + int(stamp[14:16]) * 60 + int(stamp[17:19]),
+                             event.get('ip_address'), details.get('device_token')))
+        except Exception as e:
+            logger.warning(f"⚠️ Audit events not available for anomaly scoring: {e}")
+            return None
+        return pd.DataFrame(rows, columns=['employee_id', 'type', 'audit_seconds', 'ip', 'device'])
+
+    @staticmethod
+    def _attach_audit(frame, audit):
+        """ربط كل بصمة بأقرب حدث تدقيق لنفس الموظف ونفس النوع (merge_asof متجه)"""
+        import pandas as pd
+
+        left = frame.drop(columns=['device', 'ip']).sort_values('seconds')
+        left['seconds'] = left['seconds'].astype(np.int64)
+        right = audit.dropna(subset=['type']).sort_values('audit_seconds')
+        merged = pd.merge_asof(left, right, left_on='seconds', right_on='audit_seconds', by=['employee_id', 'type'],
+                               direction='nearest', tolerance=AUDIT_MATCH_SECONDS)
+        return merged.drop(columns=['audit_seconds']).astype({'seconds': np.float64})
+
+    # --- التشغيل ---
+
+    def score(self, day: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return score_day(self.load_day(day), self.baseline(day), self.locations(), self.config, limit)
+
+    def run_job(self, day: Optional[str] = None, limit: int = 500) -> Dict[str, Any]:
+        """المهمة اليومية: تقييم اليوم وحفظ أعلى limit حالة في attendance_anomalies (تستبدل نتائج اليوم السابقة)"""
+        day = day or date_type.today().isoformat()
+        started = time.perf_counter()
+        punches = self.load_day(day)
+        loaded = time.perf_counter()
+        anomalies = score_day(punches, self.baseline(day), self.locations(), self.config, limit)
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM attendance_anomalies WHERE day = ?", (day,))
+            conn.executemany(
+                "INSERT INTO attendance_anomalies (day, rank, punch_id, employee_id, score, reasons) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(day, item['rank'], item['punch_id'], item['employee_id'], item['score'],
+                  json.dumps(item['reasons'])) for item in anomalies])
+            conn.commit()
+        finally:
+            conn.close()
+        by_feature = {name: sum(1 for item in anomalies if any(r['feature'] == name for r in item['reasons']))
+                      for name in FEATURES}
+        summary = {
+            'day': day,
+            'punches': len(punches),
+            'anomalies': len(anomalies),
+            'by_feature': by_feature,
+            'load_ms': round((loaded - started) * 1000, 1),
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+            'top': anomalies[:10],
+        }
+        logger.info(f"🚨 {len(anomalies)} suspicious punches out of {len(punches)} on {day} "
+                    f"({summary['total_ms']:.0f} ms)")
+        return summary
+
+    def stored_anomalies(self, day: str) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT rank, punch_id, employee_id, score, reasons FROM attendance_anomalies "
+                                "WHERE day = ? ORDER BY rank", (day,)).fetchall()
+        finally:
+            conn.close()
+        return [{'rank': rank, 'punch_id': punch_id, 'employee_id': employee_id, 'score': score,
+                 'reasons': json.loads(reasons)} for rank, punch_id, employee_id, score, reasons in rows]
+
+
+def get_anomaly_scorer(db_manager, audit_store=None, config: Optional[AnomalyConfig] = None) -> AttendanceAnomalyScorer:
+    return AttendanceAnomalyScorer(get_attendance_aggregator(db_manager), audit_store, config)
+
+
+def _run_daily(scorer: AttendanceAnomalyScorer, at: str, output: Optional[str]):
+    """حلقة المهمة المجدولة: تقييم اليوم الحالي كل يوم عند الساعة at (HH:MM)"""
+    hour, minute = (int(part) for part in at.split(':'))
+    while True:
+        now = datetime.now()
+        run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        logger.info(f"⏰ Next anomaly scoring at {run_at:%Y-%m-%d %H:%M}")
+        time.sleep((run_at - now).total_seconds())
+        try:
+            _write_summary(scorer.run_job(run_at.date().isoformat()), output)
+        except Exception as e:
+            logger.error(f"❌ Anomaly scoring failed: {e}")
+
+
+def _write_summary(summary: Dict[str, Any], output: Optional[str]):
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Daily attendance anomaly scoring')
+    parser.add_argument('--db', default='attendance.db', help='Local SQLite database path')
+    parser.add_argument('--audit-db', default=None, help='Audit log database (IP and device of web punches)')
+    parser.add_argument('--day', default=None, help='Day to score (YYYY-MM-DD, default: today)')
+    parser.add_argument('--limit', type=int, default=500, help='Anomalies to keep per day')
+    parser.add_argument('--output', default=None, help='Write the JSON summary here')
+    parser.add_argument('--daily-at', default=None, help='Keep running and score every day at HH:MM')
+    parser.add_argument('--trusted-ip', action='append', default=[], help='IP excluded from burst detection')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    audit_store = None
+    if args.audit_db:
+        from app.utils.audit_store import AuditStore
+        audit_store = AuditStore(args.audit_db)
+    scorer = AttendanceAnomalyScorer(AttendanceAggregator(args.db), audit_store,
+                                     AnomalyConfig(trusted_ips=tuple(args.trusted_ip)))
+    if args.daily_at:
+        try:
+            _run_daily(scorer, args.daily_at, args.output)
+        except KeyboardInterrupt:
+            logger.info("🛑 إيقاف مهمة تقييم البصمات")
+        return
+    _write_summary(scorer.run_job(args.day, args.limit), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Attendance Forecaster
+توقعات لكل موظف ولكل قسم: وقت الوصول المتوقع، احتمال الغياب، ساعات العمل الإضافي
+- مصفوفة تجميع (موظف × يوم عمل مغلق) تُختزل إلى إحصاءات كافية لكل (موظف، يوم أسبوع)؛
+  نموذج خطي صغير لكل موظف [ثابت، اتجاه بالأسابيع، أيام الأسبوع] يُحل دفعة واحدة
+  بالمربعات الصغرى المغلقة (np.linalg.solve على مصفوفات 8×8 لكل الموظفين معاً)
+- الإحصاءات تُجمع بالإضافة: يوم يُغلق = إضافة أعمدته فقط، ونماذج الأقسام = مجموع إحصاءات موظفيها
+- المعاملات مخزنة حسب إصدار البيانات (AttendanceAggregator)؛ تعديل يوم سبق حسابه يعيد البناء كاملاً
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import date as date_type, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.database.attendance_aggregates import AttendanceAggregator, get_attendance_aggregator
+
+logger = logging.getLogger(__name__)
+
+TARGETS = ('arrival', 'absence', 'overtime')
+FEATURES = 8            # ثابت، اتجاه (أسابيع)، الثلاثاء .. الأحد (الإثنين هو الأساس)
+MIN_OBSERVATIONS = 5    # أقل من ذلك: يُستخدم نموذج القسم
+TREND_HORIZON_DAYS = 28 # الاتجاه يُمد 4 أسابيع بعد آخر يوم مغلق ثم يثبت
+UNASSIGNED = 'Unassigned'
+
+
+def _minute_sql(column: str) -> str:
+    """الدقيقة من بداية اليوم من check_time ('HH:MM:SS' أو طابع كامل)"""
+    return (f"CASE WHEN length({column}) <= 8 THEN substr({column}, 1, 2) * 60 + substr({column}, 4, 2) "
+            f"ELSE substr({column}, 12, 2) * 60 + substr({column}, 15, 2) END")
+
+
+def _day_numbers(dates: Sequence[str]) -> np.ndarray:
+    return np.array([str(day)[:10] for day in dates], dtype='datetime64[D]').astype(np.int64)
+
+
+def _weekday(day_numbers: np.ndarray) -> np.ndarray:
+    """0 = الإثنين (1970-01-01 كان خميساً)"""
+    return (day_numbers + 3) % 7
+
+
+def _weekday_stats(mask: np.ndarray, values: np.ndarray, weeks: np.ndarray, weekdays: np.ndarray) -> np.ndarray:
+    """(E, W) -> (E, 7, 6): لكل يوم أسبوع n, Σt, Σt², Σy, Σty, Σy² (عمليات مصفوفية بدون حلقات على الموظفين)"""
+    counts = mask.astype(np.float64)
+    y = np.where(mask, values, 0.0)
+    onehot = np.zeros((weekdays.size, 7))
+    onehot[np.arange(weekdays.size), weekdays] = 1.0
+    stacked = np.stack((counts, counts * weeks, counts * weeks * weeks, y, y * weeks, y * y))
+    return np.moveaxis(stacked @ onehot, 0, -1)
+
+
+def _solve(stats: np.ndarray, ridge: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    المربعات الصغرى المغلقة لكل الصفوف معاً: (XᵀX + λI)β = Xᵀy تُبنى من الإحصاءات الكافية
+    يعيد (β (K, 8)، الانحراف المعياري للبواقي (K,)، عدد المشاهدات (K,))
+    """
+    n, st, stt, sy, sty, syy = np.moveaxis(stats, -1, 0)
+    rows = stats.shape[0]
+    gram = np.zeros((rows, FEATURES, FEATURES))
+    moment = np.zeros((rows, FEATURES))
+    gram[:, 0, 0] = n.sum(axis=1)
+    gram[:, 0, 1] = gram[:, 1, 0] = st.sum(axis=1)
+    gram[:, 1, 1] = stt.sum(axis=1)
+    gram[:, 0, 2:] = gram[:, 2:, 0] = n[:, 1:]
+    gram[:, 1, 2:] = gram[:, 2:, 1] = st[:, 1:]
+    diagonal = np.arange(2, FEATURES)
+    gram[:, diagonal, diagonal] = n[:, 1:]
+    moment[:, 0] = sy.sum(axis=1)
+    moment[:, 1] = sty.sum(axis=1)
+    moment[:, 2:] = sy[:, 1:]
+
+    # الانكماش نحو الصفر للاتجاه وأيام الأسبوع (أيام بلا بيانات = نفس الأساس)؛ قيمة صغيرة للثابت تبقي الحل ممكناً
+    regularized = gram.copy()
+    regularized[:, 0, 0] += 1e-9
+    regularized[:, np.arange(1, FEATURES), np.arange(1, FEATURES)] += ridge
+    beta = np.linalg.solve(regularized, moment[..., None])[..., 0]
+
+    observations = gram[:, 0, 0]
+    sse = syy.sum(axis=1) - 2 * np.einsum('kf,kf->k', beta, moment) + np.einsum('kf,kfg,kg->k', beta, gram, beta)
+    sigma = np.sqrt(np.maximum(sse, 0.0) / np.maximum(observations - FEATURES, 1.0))
+    return beta, sigma, observations
+
+
+def _design(day_numbers: np.ndarray, origin: int, trend_until: Optional[int] = None) -> np.ndarray:
+    """(H,) -> (H, 8)؛ trend_until: بعده يثبت الاتجاه (لا استقراء بلا حد)"""
+    design = np.zeros((day_numbers.size, FEATURES))
+    design[:, 0] = 1.0
+    trend_days = day_numbers if trend_until is None else np.minimum(day_numbers, trend_until)
+    design[:, 1] = (trend_days - origin) / 7.0
+    weekdays = _weekday(day_numbers)
+    rows = np.nonzero(weekdays > 0)[0]
+    design[rows, 1 + weekdays[rows]] = 1.0
+    return design
+
+
+@dataclass(frozen=True, eq=False)
+class AttendanceForecast:
+    version: Any
+    level: str                          # 'employee' أو 'department'
+    keys: Tuple[Any, ...]
+    dates: Tuple[str, ...]
+    arrival_minutes: np.ndarray         # (K, H) - NaN لمن لا نموذج له
+    arrival_std: np.ndarray             # (K,)
+    absence_probability: np.ndarray     # (K, H)
+    overtime_hours: np.ndarray          # (K, H)
+    observed_days: np.ndarray           # (K,)
+
+    def row(self, key) -> Optional[Dict[str, Any]]:
+        try:
+            return self._record(self.keys.index(key))
+        except ValueError:
+            return None
+
+    def records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        count = len(self.keys) if limit is None else min(limit, len(self.keys))
+        return [self._record(index) for index in range(count)]
+
+    def _record(self, index: int) -> Dict[str, Any]:
+        days = []
+        for column, day in enumerate(self.dates):
+            minutes = self.arrival_minutes[index, column]
+            days.append({
+                'date': day,
+                'expected_arrival': None if np.isnan(minutes) else f"{int(minutes) // 60:02d}:{int(minutes) % 60:02d}",
+                'absence_probability': round(float(self.absence_probability[index, column]), 3),
+                'overtime_hours': round(float(self.overtime_hours[index, column]), 2),
+            })
+        return {
+            self.level: self.keys[index],
+            'observed_days': int(self.observed_days[index]),
+            'arrival_std_minutes': round(float(self.arrival_std[index]), 1),
+            'days': days,
+        }
+
+
+class AttendanceForecaster:
+    """نماذج لكل موظف ولكل قسم تُحدَّث تدريجياً مع إغلاق الأيام؛ آمن للاستدعاء من خيوط خلفية"""
+
+    def __init__(self, aggregator: AttendanceAggregator, db_manager=None,
+                 standard_work_hours: float = 8, ridge: float = 1.0):
+        self.aggregator = aggregator
+        self.db_manager = db_manager if db_manager is not None else aggregator.db_manager
+        self.standard_work_hours = standard_work_hours
+        self.ridge = ridge
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._version = None
+        self._today: Optional[str] = None
+        self._through: Optional[str] = None                 # آخر يوم مغلق دخل في الإحصاءات
+        self._fingerprint: Tuple[Tuple[str, int], ...] = ()  # مراجعة (أو عدد سجلات) كل يوم مغلق محسوب
+        self._origin: Optional[int] = None
+        self._keys: List[Any] = []
+        self._index: Dict[Any, int] = {}
+        self._first_seen = np.zeros(0, dtype=np.int64)
+        self._stats = {target: np.zeros((0, 7, 6)) for target in TARGETS}
+        self._models: Optional[Dict[str, Any]] = None
+        self._forecasts: Dict[Tuple, AttendanceForecast] = {}
+
+    # --- تحميل أيام مغلقة ---
+
+    def _load_days(self, after: Optional[str], before: str):
+        """(employee_ids, dates, first_in, last_out) لكل (موظف، يوم) في after < date < before"""
+        if self.aggregator.db_path:
+            conn = self.aggregator.connect()
+            try:
+                minute = _minute_sql('check_time')
+                rows = conn.execute(f"""
+                    SELECT employee_id, date,
+                           MIN(CASE WHEN type = 'Check-In' THEN {minute} END),
+                           MAX(CASE WHEN type = 'Check-Out' THEN {minute} END)
+                    FROM attendance
+                    WHERE date > ? AND date < ? AND employee_id IS NOT NULL
+                    GROUP BY employee_id, date
+                """, (after or '', before)).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                return np.array([], dtype=object), [], np.array([]), np.array([])
+            employee_ids, dates, first_in, last_out = zip(*rows)
+            return (np.array(employee_ids, dtype=object), list(dates),
+                    np.array(first_in, dtype=np.float64), np.array(last_out, dtype=np.float64))
+        return self._load_days_from_frame(after, before)
+
+    def _load_days_from_frame(self, after: Optional[str], before: str):
+        import pandas as pd
+
+        frame = self.aggregator.attendance_frame()
+        if frame.empty:
+            return np.array([], dtype=object), [], np.array([]), np.array([])
+        frame = frame[frame['employee_id'].notna()]
+        days = frame['date'].astype(str).str[:10]
+        frame = frame[(days > (after or '')) & (days < before)].assign(date=days)
+        times = frame['check_time'].astype(str)
+        clock = times.where(times.str.len() <= 8, times.str[11:19])
+        minutes = pd.to_numeric(clock.str[:2], errors='coerce') * 60 + pd.to_numeric(clock.str[3:5], errors='coerce')
+        frame = frame.assign(first_in=minutes.where(frame['type'] == 'Check-In'),
+                             last_out=minutes.where(frame['type'] == 'Check-Out'))
+        grouped = frame.groupby(['employee_id', 'date'], sort=False).agg(first_in=('first_in', 'min'),
+                                                                         last_out=('last_out', 'max'))
+        return (grouped.index.get_level_values(0).to_numpy(dtype=object),
+                list(grouped.index.get_level_values(1)),
+                grouped['first_in'].to_numpy(dtype=np.float64), grouped['last_out'].to_numpy(dtype=np.float64))
+
+    # --- الإحصاءات الكافية ---
+
+    def _accumulate(self, employee_ids: np.ndarray, dates: Sequence[str], first_in: np.ndarray,
+                    last_out: np.ndarray, working_days: Sequence[str]):
+        """يضيف أعمدة أيام العمل الجديدة إلى الإحصاءات (working_days مرتبة وكلها بعد _through)"""
+        import pandas as pd
+
+        if not working_days:
+            return
+        day_axis = _day_numbers(working_days)
+        if self._origin is None:
+            self._origin = int(day_axis[0])
+        weeks = (day_axis - self._origin) / 7.0
+        weekdays = _weekday(day_axis)
+
+        # فهرس الموظفين: الجدد يُضافون في آخر المصفوفات
+        codes, uniques = pd.factorize(employee_ids)
+        date_codes, date_uniques = pd.factorize(np.asarray(dates, dtype=object))
+        row_days = _day_numbers(date_uniques)[date_codes] if len(dates) else np.zeros(0, dtype=np.int64)
+        first_days = np.full(len(uniques), np.iinfo(np.int64).max)
+        np.minimum.at(first_days, codes, row_days)
+        unique_index = np.empty(len(uniques), dtype=np.int64)
+        new_first_seen = []
+        for position, key in enumerate(uniques):
+            index = self._index.get(key)
+            if index is None:
+                index = self._index[key] = len(self._keys)
+                self._keys.append(key)
+                new_first_seen.append(first_days[position])
+            unique_index[position] = index
+        if new_first_seen:
+            self._first_seen = np.concatenate((self._first_seen, np.array(new_first_seen, dtype=np.int64)))
+            for target in TARGETS:
+                grown = np.zeros((len(self._keys), 7, 6))
+                grown[:self._stats[target].shape[0]] = self._stats[target]
+                self._stats[target] = grown
+
+        # مصفوفة التجميع (موظف × يوم)
+        employees, width = len(self._keys), day_axis.size
+        columns = np.searchsorted(day_axis, row_days)
+        valid = (columns < width) & (day_axis[np.minimum(columns, width - 1)] == row_days)
+        rows, columns = unique_index[codes[valid]], columns[valid]
+        present = np.zeros((employees, width), dtype=bool)
+        arrival = np.full((employees, width), np.nan)
+        departure = np.full((employees, width), np.nan)
+        present[rows, columns] = True
+        arrival[rows, columns] = first_in[valid]
+        departure[rows, columns] = last_out[valid]
+
+        eligible = self._first_seen[:, None] <= day_axis[None, :]
+        worked = departure - arrival
+        has_worked = present & ~np.isnan(worked) & (worked > 0)
+        overtime = np.maximum(np.where(has_worked, worked, 0.0) - self.standard_work_hours * 60, 0.0) / 60.0
+
+        self._stats['absence'] += _weekday_stats(eligible, (~present).astype(np.float64), weeks, weekdays)
+        self._stats['arrival'] += _weekday_stats(present & ~np.isnan(arrival), arrival, weeks, weekdays)
+        self._stats['overtime'] += _weekday_stats(has_worked, overtime, weeks, weekdays)
+
+    def update(self, today: Optional[date_type] = None) -> str:
+        """يجلب الأيام المغلقة الجديدة فقط؛ يعيد 'cached' أو 'incremental' أو 'rebuilt'"""
+        today_text = (today or date_type.today()).isoformat()
+        with self._lock:
+            version = self.aggregator.data_version() if self.aggregator.db_path else None
+            if version is not None and version == self._version and today_text == self._today:
+                return 'cached'
+            aggregates = self.aggregator.aggregates()
+            working_days = [day[:10] for day, _count in aggregates.daily if day[:10] < today_text]
+            # SQLite: مراجعة كل يوم (أي تعديل على يوم سبق حسابه يغيرها)؛ غير ذلك: عدد السجلات لكل يوم
+            if self.aggregator.db_path:
+                fingerprint = self.aggregator.day_revisions(today_text)
+            else:
+                fingerprint = tuple((day[:10], count) for day, count in aggregates.daily if day[:10] < today_text)
+            known = tuple(item for item in fingerprint if self._through is not None and item[0] <= self._through)
+            if self._through is not None and known == self._fingerprint:
+                mode = 'incremental'
+                after = self._through
+            else:
+                mode = 'rebuilt'
+                self._reset()
+                after = None
+            new_days = [day for day in working_days if after is None or day > after]
+            if new_days:
+                self._accumulate(*self._load_days(after, today_text), new_days)
+                self._models = None
+                self._forecasts.clear()
+            elif mode == 'incremental':
+                mode = 'cached'
+            self._fingerprint = tuple(item for item in fingerprint if working_days and item[0] <= working_days[-1])
+            self._through = working_days[-1] if working_days else None
+            self._version = version if version is not None else aggregates.version
+            self._today = today_text
+            if mode != 'cached':
+                logger.info(f"📈 Forecast statistics {mode}: {len(self._keys)} employees, {len(new_days)} new day(s)")
+            return mode
+
+    # --- النماذج ---
+
+    def _departments(self) -> Tuple[List[str], np.ndarray]:
+        """أسماء الأقسام وفهرس قسم كل موظف (بترتيب _keys)"""
+        mapping: Dict[Any, str] = {}
+        try:
+            if self.aggregator.db_path:
+                conn = self.aggregator.connect()
+                try:
+                    mapping = {str(key): department for key, department in
+                               conn.execute("SELECT id, department FROM employees").fetchall()}
+                finally:
+                    conn.close()
+            elif hasattr(self.db_manager, 'get_all_employees'):
+                mapping = {str(employee.get('id')): employee.get('department')
+                           for employee in self.db_manager.get_all_employees() or []}
+        except Exception as e:
+            logger.warning(f"⚠️ Departments not available for forecasting: {e}")
+        labels = [mapping.get(str(key)) or UNASSIGNED for key in self._keys]
+        names = sorted(set(labels))
+        positions = {name: index for index, name in enumerate(names)}
+        return names, np.array([positions[label] for label in labels], dtype=np.int64)
+
+    def _fit(self) -> Dict[str, Any]:
+        if self._models is not None:
+            return self._models
+        names, membership = self._departments()
+        models = {'departments': names, 'membership': membership}
+        for target in TARGETS:
+            stats = self._stats[target]
+            pooled = np.zeros((len(names), 7, 6))
+            np.add.at(pooled, membership, stats)
+            models[target] = {'employee': _solve(stats, self.ridge), 'department': _solve(pooled, self.ridge)}
+        self._models = models
+        return models
+
+    def _forecast_dates(self, days_ahead: int, today: date_type) -> Tuple[str, ...]:
+        """أيام العمل القادمة فقط (أيام أسبوع ظهرت في السجل)؛ بدون سجل: أيام متتالية"""
+        working = self._stats['absence'][:, :, 0].sum(axis=0) > 0
+        if not working.any():
+            working[:] = True
+        dates = []
+        day = today
+        while len(dates) < days_ahead:
+            if working[day.weekday()]:
+                dates.append(day.isoformat())
+            day += timedelta(days=1)
+        return tuple(dates)
+
+    def _predict(self, level: str, days_ahead: int, today: date_type) -> AttendanceForecast:
+        models = self._fit()
+        dates = self._forecast_dates(days_ahead, today)
+        trend_until = int(_day_numbers([self._through])[0]) + TREND_HORIZON_DAYS if self._through else None
+        design = _design(_day_numbers(dates), self._origin if self._origin is not None else 0, trend_until)
+        predictions = {}
+        for target in TARGETS:
+            beta, sigma, observations = models[target][level]
+            values = beta @ design.T
+            if level == 'employee':
+                # موظف ببيانات قليلة: نموذج قسمه (وبلا توقع وصول إن كان القسم نفسه بلا بيانات كافية)
+                fallback_beta, fallback_sigma, fallback_observations = models[target]['department']
+                sparse = observations < MIN_OBSERVATIONS
+                if sparse.any():
+                    departments = models['membership'][sparse]
+                    values[sparse] = fallback_beta[departments] @ design.T
+                    sigma = sigma.copy()
+                    sigma[sparse] = fallback_sigma[departments]
+                    if target == 'arrival':
+                        values[np.nonzero(sparse)[0][fallback_observations[departments] < MIN_OBSERVATIONS]] = np.nan
+            elif target == 'arrival':
+                values[observations < MIN_OBSERVATIONS] = np.nan
+            predictions[target] = (values, sigma, observations)
+
+        keys = tuple(self._keys) if level == 'employee' else tuple(models['departments'])
+        arrival, arrival_std, _ = predictions['arrival']
+        return AttendanceForecast(
+            version=self._version, level=level, keys=keys, dates=dates,
+            arrival_minutes=np.clip(arrival, 0, 24 * 60 - 1),
+            arrival_std=arrival_std,
+            absence_probability=np.clip(predictions['absence'][0], 0.0, 1.0),
+            overtime_hours=np.maximum(predictions['overtime'][0], 0.0),
+            observed_days=predictions['absence'][2].astype(np.int64))
+
+    def forecast(self, days_ahead: int = 7, level: str = 'employee',
+                 today: Optional[date_type] = None) -> AttendanceForecast:
+        """توقعات من اليوم (غير المغلق) ولعدد days_ahead أيام؛ مخزنة حتى يتغير الإصدار أو يُغلق يوم"""
+        today = today or date_type.today()
+        self.update(today)
+        with self._lock:
+            key = (level, days_ahead, today)
+            cached = self._forecasts.get(key)
+            if cached is None:
+                cached = self._forecasts[key] = self._predict(level, days_ahead, today)
+            return cached
+
+    def department_forecast(self, days_ahead: int = 7, today: Optional[date_type] = None) -> AttendanceForecast:
+        return self.forecast(days_ahead, 'department', today)
+
+
+# متنبئ واحد لكل قاعدة بيانات (فوق المجمِّع المشترك)
+_forecasters: Dict[int, AttendanceForecaster] = {}
+_forecasters_lock = threading.Lock()
+
+
+def get_attendance_forecaster(db_manager) -> AttendanceForecaster:
+    aggregator = get_attendance_aggregator(db_manager)
+    with _forecasters_lock:
+        forecaster = _forecasters.get(id(aggregator))
+        if forecaster is None:
+            forecaster = _forecasters[id(aggregator)] = AttendanceForecaster(aggregator, db_manager)
+        return forecaster
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Attendance Manager
+معالجة دفعات البصمات المخزنة مؤقتاً في الأكشاك وجسر أجهزة ZK عند انقطاع الشبكة
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import math
+
+from app.utils.location_parser import calculate_distance
+
+logger = logging.getLogger(__name__)
+
+VALID_PUNCH_TYPES = ('Check-In', 'Check-Out')
+DEFAULT_RADIUS_METERS = 100
+
+
+def parse_client_timestamp(value: Any) -> Optional[datetime]:
+    """تحويل وقت العميل (ISO 8601 أو epoch بالثواني) إلى datetime محلي بدون منطقة زمنية"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value)
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _coordinate(value: Any, limit: float) -> Optional[float]:
+    """إحداثي رقمي محدود ضمن [-limit, limit]، وإلا None"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(number) or abs(number) > limit:
+        return None
+    return number
+
+
+class BatchPunchProcessor:
+    """
+    يتحقق من دفعة بصمات كمجموعة واحدة ثم يدخلها في معاملة واحدة:
+    - التكرار عبر فهرس مفتاح التكرار (idempotency_key) وداخل الدفعة نفسها
+    - قواعد التسلسل لكل موظف في كل يوم (حضور مرة واحدة، انصراف بعد الحضور)
+    - النطاق الجغرافي عند وجود إحداثيات
+    enforce_sequence=False لسجلات أجهزة البصمة: الجهاز هو المرجع (استراحات، عمل إضافي، بصمات مكررة)
+    فتُحفظ كل البصمات كما هي، والمدة تُحسب من آخر حضور سابق في نفس اليوم
+    """
+
+    def __init__(self, db_manager, max_batch_size: int = 5000, enforce_sequence: bool = True):
+        self.db_manager = db_manager
+        self.max_batch_size = max_batch_size
+        self.enforce_sequence = enforce_sequence
+
+    def process(self, punches: List[Dict], source: str = 'kiosk', watermark: Optional[Dict] = None) -> Dict:
+        """watermark: علامة جهاز ZK تُحفظ ذرياً مع السجلات المقبولة (انظر ZKIngestionPipeline)"""
+        results: List[Dict] = [None] * len(punches)
+        candidates: List[Tuple[int, Dict]] = []
+
+        # 1. التحقق من صحة كل عنصر وكشف التكرار داخل الدفعة
+        seen_keys = set()
+        for index, punch in enumerate(punches):
+            if not isinstance(punch, dict):
+                results[index] = self._rejected(index, '', 'invalid_item')
+                continue
+            key = str(punch.get('idempotency_key') or '').strip()
+            punch_type = punch.get('type')
+            timestamp = parse_client_timestamp(punch.get('timestamp'))
+
+            if not key:
+                results[index] = self._rejected(index, key, 'idempotency_key_required')
+            elif punch_type not in VALID_PUNCH_TYPES:
+                results[index] = self._rejected(index, key, 'invalid_type')
+            elif timestamp is None:
+                results[index] = self._rejected(index, key, 'invalid_timestamp')
+            elif not (punch.get('identifier') or punch.get('employee_id')):
+                results[index] = self._rejected(index, key, 'identifier_required')
+            elif key in seen_keys:
+                results[index] = {'index': index, 'idempotency_key': key, 'status': 'duplicate', 'record_id': None}
+            else:
+                seen_keys.add(key)
+                candidates.append((index, {'key': key, 'type': punch_type, 'timestamp': timestamp, 'raw': punch}))
+
+        # 2. التكرار مع ما سبق إدخاله - استعلام واحد عبر الفهرس الفريد
+        existing = self.db_manager.get_attendance_ids_by_idempotency_keys([c['key'] for _, c in candidates])
+        remaining = []
+        for index, candidate in candidates:
+            if candidate['key'] in existing:
+                results[index] = {'index': index, 'idempotency_key': candidate['key'],
+                                  'status': 'duplicate', 'record_id': existing[candidate['key']]}
+            else:
+                remaining.append((index, candidate))
+
+        # 3. تحديد الموظف والموقع
+        employees_cache: Dict[Any, Optional[Dict]] = {}
+        locations = self.db_manager.get_all_locations() or []
+        resolved = []
+        for index, candidate in remaining:
+            employee = self._resolve_employee(candidate['raw'], employees_cache)
+            if not employee:
+                results[index] = self._rejected(index, candidate['key'], 'employee_not_found')
+                continue
+
+            location_id, error = self._resolve_location(candidate['raw'], locations)
+            if error:
+                results[index] = self._rejected(index, candidate['key'], error)
+                continue
+
+            candidate['employee_id'] = employee['id']
+            candidate['location_id'] = location_id
+            resolved.append((index, candidate))
+
+        # 4. قواعد التسلسل لكل (موظف، يوم) بالترتيب الزمني لأوقات العميل
+        employee_ids = sorted({c['employee_id'] for _, c in resolved})
+        dates = sorted({c['timestamp'].strftime('%Y-%m-%d') for _, c in resolved})
+        day_states = self.db_manager.get_day_states(employee_ids, dates)
+
+        accepted = []
+        for index, candidate in sorted(resolved, key=lambda item: (item[1]['employee_id'], item[1]['timestamp'])):
+            date_str = candidate['timestamp'].strftime('%Y-%m-%d')
+            time_str = candidate['timestamp'].strftime('%H:%M:%S')
+            state = day_states.setdefault((candidate['employee_id'], date_str),
+                                          {'last_action': None, 'check_in_time': None})
+
+            duration_hours = None
+            if candidate['type'] == 'Check-In':
+                if self.enforce_sequence and state['last_action'] is not None:
+                    results[index] = self._rejected(index, candidate['key'], 'checkin_twice')
+                    continue
+                state['check_in_time'] = time_str
+            else:
+                if self.enforce_sequence and state['last_action'] != 'Check-In':
+                    results[index] = self._rejected(index, candidate['key'], 'checkout_before_checkin')
+                    continue
+                if state['check_in_time'] and state['check_in_time'] <= time_str:
+                    check_in = datetime.strptime(f"{date_str} {state['check_in_time']}", '%Y-%m-%d %H:%M:%S')
+                    duration_hours = round((candidate['timestamp'] - check_in).total_seconds() / 3600, 2)
+            state['last_action'] = candidate['type']
+
+            notes = candidate['raw'].get('notes') or f'Batch punch ({source})'
+            accepted.append((index, {
+                'employee_id': candidate['employee_id'],
+                'check_time': time_str,
+                'date': date_str,
+                'type': candidate['type'],
+                'notes': notes,
+                'location_id': candidate['location_id'],
+                'duration_hours': duration_hours,
+                'idempotency_key': candidate['key'],
+            }))
+
+        # 5. إدخال كل المقبول في معاملة واحدة مع مزامنة مجمعة واحدة
+        created = 0
+        if accepted:
+            record_ids = self.db_manager.record_attendance_batch([record for _, record in accepted], watermark=watermark)
+            for (index, record), record_id in zip(accepted, record_ids):
+                if record_id is None:
+                    # دفعة متزامنة أخرى أدخلت نفس المفتاح بين الفحص والإدخال
+                    results[index] = {'index': index, 'idempotency_key': record['idempotency_key'],
+                                      'status': 'duplicate', 'record_id': None}
+                else:
+                    created += 1
+                    results[index] = {'index': index, 'idempotency_key': record['idempotency_key'],
+                                      'status': 'created', 'record_id': record_id}
+        elif watermark:
+            self.db_manager.save_device_watermark(watermark)
+
+        summary = {'total': len(punches), 'created': created}
+        summary['duplicates'] = sum(1 for r in results if r['status'] == 'duplicate')
+        summary['rejected'] = sum(1 for r in results if r['status'] == 'rejected')
+        logger.info(f"📦 دفعة بصمات ({source}): {summary}")
+        return {'summary': summary, 'results': results}
+
+    def _resolve_employee(self, punch: Dict, cache: Dict) -> Optional[Dict]:
+        """تحديد الموظف بالمعرف أو الكود/الهاتف مع كاش داخل الدفعة"""
+        employee_id = punch.get('employee_id')
+        cache_key = ('id', employee_id) if employee_id else ('identifier', str(punch.get('identifier')))
+        if cache_key not in cache:
+            if employee_id:
+                cache[cache_key] = self.db_manager.get_employee_by_id(employee_id)
+            else:
+                identifier = str(punch.get('identifier'))
+                employee = None
+                if len(identifier) > 6 and identifier.isdigit():
+                    employee = self.db_manager.get_employee_by_phone(identifier)
+                cache[cache_key] = employee or self.db_manager.get_employee_by_code(identifier)
+        return cache[cache_key]
+
+    def _resolve_location(self, punch: Dict, locations: List[Dict]) -> Tuple[Optional[int], Optional[str]]:
+        """أقرب موقع معتمد عند وجود إحداثيات، وإلا location_id المرسل (موقع جهاز ZK)"""
+        location = punch.get('location')
+        if location is None:
+            location = {}
+        if not isinstance(location, dict):
+            return None, 'invalid_location'
+        lat, lon = location.get('lat'), location.get('lon')
+        if lat is None or lon is None:
+            return punch.get('location_id'), None
+        lat, lon = _coordinate(lat, 90), _coordinate(lon, 180)
+        if lat is None or lon is None:
+            return None, 'invalid_location'
+        if not locations:
+            return None, 'no_approved_locations'
+
+        closest, min_distance = None, float('inf')
+        try:
+            for loc in locations:
+                distance = calculate_distance(lat, lon, loc['latitude'], loc['longitude'])
+                if distance < min_distance:
+                    closest, min_distance = loc, distance
+        except (TypeError, ValueError):
+            return None, 'location_fail'
+
+        # موقع بلا نصف قطر مسجل يأخذ النطاق الافتراضي (نفس قيمة جدول locations)
+        radius = closest.get('radius_meters')
+        if radius is None:
+            radius = DEFAULT_RADIUS_METERS
+        if min_distance > radius:
+            return None, 'out_of_range'
+        return closest['id'], None
+
+    @staticmethod
+    def _rejected(index: int, key: str, error: str) -> Dict:
+        return {'index': index, 'idempotency_key': key, 'status': 'rejected', 'record_id': None, 'error': error}
@@ -7,8 +7,10 @@ Manages notifications using Supabase database for real-time communication
 
 import sys
 import os
+import time
+import threading
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import logging
 
@@ -25,6 +27,10 @@ except ImportError:
     SUPABASE_AVAILABLE = False
     print("⚠️ Supabase not available, using local storage")
 
+POLL_INTERVAL_MS = 10000
+# Hard deletes don't move the cursor; every Nth poll compares the active count (head request)
+RECONCILE_EVERY_POLLS = 6
+
 class NotificationsManager(QObject):
     """
     Advanced Notifications Manager using Supabase database
@@ -53,6 +59,14 @@ class NotificationsManager(QObject):
         self.realtime_subscription = None
         self.is_subscribed = False
         
+        # Incremental sync: newest created_at/updated_at seen; polls fetch only rows at or after it
+        self._cursor: Optional[str] = None
+        self._synced = False  # local cache mirrors the active rows (after the first full load)
+        self._poll_count = 0
+        
+        # Traffic measurement (requests and received payload bytes since start)
+        self.traffic = {'requests': 0, 'bytes': 0, 'since': time.monotonic()}
+        
         # Initialize Supabase connection
         if SUPABASE_AVAILABLE and supabase_url and supabase_key:
             self._init_supabase(supabase_url, supabase_key)
@@ -68,7 +82,7 @@ class NotificationsManager(QObject):
             self.supabase = create_client(supabase_url, supabase_key)
             
             # Test connection
-            response = self.supabase.table('notifications').select('id').limit(1).execute()
+            response = self._execute(self.supabase.table('notifications').select('id').limit(1))
             if response.data is not None:
                 self.supabase_available = True
                 self.logger.info("✅ Supabase connection established successfully")
@@ -88,15 +102,18 @@ class NotificationsManager(QObject):
             if not self.supabase_available:
                 return
                 
-            response = self.supabase.table('notifications')\
+            response = self._execute(self.supabase.table('notifications')\
                 .select('*')\
                 .eq('status', 'active')\
-                .order('created_at', desc=True)\
-                .execute()
+                .order('created_at', desc=True))
                 
+            self.local_notifications = response.data or []
+            self._synced = True
+            self._cursor = None
+            for notification in self.local_notifications:
+                self._advance_cursor(notification)
+            self._update_unread_count()
             if response.data:
-                self.local_notifications = response.data
-                self._update_unread_count()
                 self.logger.info(f"✅ Loaded {len(response.data)} notifications from Supabase")
             else:
                 self.logger.info("ℹ️ No notifications found in Supabase")
@@ -104,6 +121,98 @@ class NotificationsManager(QObject):
         except Exception as e:
             self.logger.error(f"❌ Error loading notifications from Supabase: {e}")
             
+    def _execute(self, query):
+        """Execute a Supabase query, counting requests and received bytes (JSON size of the rows)"""
+        response = query.execute()
+        self.traffic['requests'] += 1
+        if response.data:
+            self.traffic['bytes'] += len(json.dumps(response.data, default=str))
+        return response
+        
+    def traffic_per_minute(self) -> Dict[str, float]:
+        """Requests/min and bytes/min of this client since start"""
+        minutes = max((time.monotonic() - self.traffic['since']) / 60.0, 1e-9)
+        return {
+            'requests_per_min': self.traffic['requests'] / minutes,
+            'bytes_per_min': self.traffic['bytes'] / minutes
+        }
+        
+    def _advance_cursor(self, notification: Dict[str, Any]):
+        """Move the sync cursor to the row's updated_at/created_at if newer"""
+        stamp = notification.get('updated_at') or notification.get('created_at')
+        if stamp:
+            stamp = str(stamp)
+            if self._cursor is None or stamp > self._cursor:
+                self._cursor = stamp
+                
+    def _sync_changes(self):
+        """Fetch only rows created/updated since the cursor and apply them to the local cache"""
+        if self._cursor is None:
+            self._load_notifications_from_supabase()
+            return
+            
+        cursor = self._cursor
+        # gte (not gt): rows committed later with the same timestamp aren't missed; unchanged ones are skipped
+        response = self._execute(self.supabase.table('notifications')\
+            .select('*')\
+            .or_(f'updated_at.gte."{cursor}",created_at.gte."{cursor}"')\
+            .order('updated_at'))
+        for row in response.data or []:
+            self._apply_remote_row(row)
+            
+        self._poll_count += 1
+        if self._poll_count % RECONCILE_EVERY_POLLS == 0:
+            self._reconcile_deletions()
+        self._update_unread_count()
+        
+    def _position_of(self, notification_id) -> Optional[int]:
+        for i, notification in enumerate(self.local_notifications):
+            if notification.get('id') == notification_id:
+                return i
+        return None
+        
+    def _apply_remote_row(self, row: Dict[str, Any]):
+        """Insert/update/remove one changed row and emit the matching signal"""
+        self._advance_cursor(row)
+        position = self._position_of(row.get('id'))
+        
+        if row.get('status', 'active') != 'active':
+            # Soft delete (status changed)
+            if position is not None:
+                del self.local_notifications[position]
+                self.notification_deleted.emit(row['id'])
+            return
+            
+        if position is None:
+            self.local_notifications.append(row)
+            self.local_notifications.sort(key=lambda n: str(n.get('created_at') or ''), reverse=True)
+            self.notification_received.emit(row)
+            self.logger.info(f"🔔 New notification received: {row.get('title')}")
+        elif self.local_notifications[position] != row:
+            self.local_notifications[position] = row
+            self.notification_updated.emit(row)
+            
+    def _reconcile_deletions(self):
+        """Detect hard deletes: compare the active count (head request) and fetch ids only if it differs"""
+        response = self._execute(self.supabase.table('notifications')\
+            .select('id', count='exact', head=True)\
+            .eq('status', 'active'))
+        if response.count is None or response.count == len(self.local_notifications):
+            return
+            
+        response = self._execute(self.supabase.table('notifications')\
+            .select('id')\
+            .eq('status', 'active'))
+        remote_ids = {row['id'] for row in response.data or []}
+        local_ids = {n.get('id') for n in self.local_notifications}
+        if remote_ids - local_ids:
+            # Missed rows (e.g. clock skew on the cursor): one full reload
+            self._load_notifications_from_supabase()
+            return
+        for notification_id in local_ids - remote_ids:
+            self.local_notifications = [n for n in self.local_notifications if n.get('id') != notification_id]
+            self.notification_deleted.emit(notification_id)
+            
     def _start_realtime_monitoring(self):
         """Start real-time monitoring for notifications"""
         if not self.supabase_available:
@@ -130,23 +239,31 @@ class NotificationsManager(QObject):
             
     def _start_polling_timer(self):
         """Start polling timer for local mode or fallback"""
-        self.polling_timer = QTimer()
+        self.polling_timer = QTimer(self)  # child: moves with the manager to the GUI thread
         self.polling_timer.timeout.connect(self._poll_for_updates)
-        self.polling_timer.start(10000)  # Poll every 10 seconds
+        self.polling_timer.start(POLL_INTERVAL_MS)
         self.logger.info("🔄 Started polling timer for notifications")
         
     def _poll_for_updates(self):
         """Poll for updates when real-time is not available"""
-        if self.supabase_available:
-            self._load_notifications_from_supabase()
-        else:
-            # In local mode, just emit current state
-            self._update_unread_count()
+        try:
+            if self.supabase_available:
+                self._sync_changes()
+            else:
+                # In local mode, just emit current state
+                self._update_unread_count()
+        except Exception as e:
+            self.logger.error(f"❌ Error polling notifications: {e}")
+            
+    def sync_now(self):
+        """Manual refresh: apply pending changes immediately (same incremental sync as the poller)"""
+        self._poll_for_updates()
             
     def _on_notification_inserted(self, payload):
         """Handle new notification inserted"""
         try:
             notification = payload['record']
+            self._advance_cursor(notification)
             self.local_notifications.insert(0, notification)
             self._update_unread_count()
             
@@ -162,6 +279,7 @@ class NotificationsManager(QObject):
         try:
             updated_notification = payload['record']
             notification_id = updated_notification['id']
+            self._advance_cursor(updated_notification)
             
             # Update local notification
             for i, notification in enumerate(self.local_notifications):
@@ -217,22 +335,16 @@ class NotificationsManager(QObject):
             self.logger.error(f"❌ Error updating unread count: {e}")
             
     def _get_unread_count_from_supabase(self) -> int:
-        """Get unread count from Supabase"""
+        """Get unread count from Supabase (head request with count='exact': no rows are transferred)"""
         try:
             if not self.supabase_available:
                 return 0
                 
-            # Instead of calling a non-existent RPC function, count from the notifications table
             try:
-                response = self.supabase.table('notifications')\
-                    .select('id')\
-                    .eq('is_read', False)\
-                    .execute()
-                
-                if response.data is not None:
-                    return len(response.data)
-                else:
-                    return 0
+                response = self._execute(self.supabase.table('notifications')\
+                    .select('id', count='exact', head=True)\
+                    .eq('is_read', False))
+                return response.count or 0
                     
             except Exception as table_error:
                 self.logger.warning(f"⚠️ Error counting from notifications table: {table_error}")
@@ -291,15 +403,15 @@ class NotificationsManager(QObject):
                                 clean_data[key] = str(value) if not isinstance(value, (str, int, float, bool)) else value
                     
                     self.logger.info(f"📤 Sending to Supabase: {clean_data}")
-                    response = self.supabase.table('notifications')\
-                        .insert(clean_data)\
-                        .execute()
+                    response = self._execute(self.supabase.table('notifications')\
+                        .insert(clean_data))
                         
                     if response.data:
                         self.logger.info(f"✅ Notification sent to Supabase: {notification_data['title']}")
                         # Add to local cache for immediate access
                         if response.data[0]:
                             notification_data['id'] = response.data[0].get('id')
+                            self._advance_cursor(response.data[0])
                             self.local_notifications.insert(0, notification_data)
                             self._update_unread_count()
                             # Emit signal for real-time update
@@ -370,7 +482,14 @@ class NotificationsManager(QObject):
                          limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
         """Get notifications for a user"""
         try:
-            if self.supabase_available:
+            if self.supabase_available and self._synced:
+                # Served from the cache kept current by the incremental sync (no request)
+                notifications = self.local_notifications
+                if user_role and user_role != 'Admin':
+                    notifications = [n for n in notifications if n.get('target_users') in ['all', user_role]]
+                # Copies: callers mark items read locally without touching the cache
+                return [dict(n) for n in notifications[offset:offset + limit]]
+            elif self.supabase_available:
                 # Get from Supabase with filtering
                 query = self.supabase.table('notifications')\
                     .select('*')\
@@ -382,7 +501,7 @@ class NotificationsManager(QObject):
                 if user_role and user_role != 'Admin':
                     query = query.or_(f"target_users.eq.all,target_users.eq.{user_role}")
                     
-                response = query.execute()
+                response = self._execute(query)
                 return response.data or []
             else:
                 # Return from local storage
@@ -406,10 +525,10 @@ class NotificationsManager(QObject):
         try:
             if self.supabase_available:
                 # Update in Supabase
-                response = self.supabase.rpc('mark_notification_read', {
+                response = self._execute(self.supabase.rpc('mark_notification_read', {
                     'notification_id': notification_id,
                     'user_id': user_id
-                }).execute()
+                }))
                 
                 if response.data:
                     self.logger.info(f"✅ Marked notification {notification_id} as read")
@@ -441,10 +560,9 @@ class NotificationsManager(QObject):
         try:
             if self.supabase_available:
                 # Delete from Supabase
-                response = self.supabase.table('notifications')\
+                response = self._execute(self.supabase.table('notifications')\
                     .delete()\
-                    .eq('id', notification_id)\
-                    .execute()
+                    .eq('id', notification_id))
                     
                 if response.data:
                     self.logger.info(f"✅ Deleted notification {notification_id} from Supabase")
@@ -468,12 +586,9 @@ class NotificationsManager(QObject):
             return False
             
     def get_unread_count(self, user_id: str = None, user_role: str = None) -> int:
-        """Get unread notifications count for a user"""
+        """Get unread notifications count for a user (kept current by the poller, no request)"""
         try:
-            if self.supabase_available:
-                return self._get_unread_count_from_supabase()
-            else:
-                return self.local_unread_count
+            return self.local_unread_count
                 
         except Exception as e:
             self.logger.error(f"❌ Error getting unread count: {e}")
@@ -491,6 +606,11 @@ class NotificationsManager(QObject):
                 self.polling_timer.stop()
                 self.logger.info("✅ Polling timer stopped")
                 
+            with _shared_lock:
+                for key, manager in list(_shared_managers.items()):
+                    if manager is self:
+                        del _shared_managers[key]
+                
         except Exception as e:
             self.logger.error(f"❌ Error during cleanup: {e}")
             
@@ -503,3 +623,23 @@ class NotificationsManager(QObject):
             'unread_count': self.local_unread_count,
             'mode': 'Supabase' if self.supabase_available else 'Local'
         }
+
+
+# One manager (one poller, one cache) per Supabase project, shared by the main window and all notification widgets
+_shared_managers: Dict[Tuple[str, str], NotificationsManager] = {}
+_shared_lock = threading.Lock()
+
+
+def get_notifications_manager(supabase_url: str = None, supabase_key: str = None) -> NotificationsManager:
+    """Return the shared NotificationsManager for these credentials, creating it on first use"""
+    key = (supabase_url or '', supabase_key or '')
+    with _shared_lock:
+        manager = _shared_managers.get(key)
+        if manager is None:
+            manager = NotificationsManager(supabase_url, supabase_key)
+            # Created from a loader thread: move it (and its polling timer) to the GUI thread
+            app = QApplication.instance()
+            if app is not None and manager.thread() is not app.thread():
+                manager.moveToThread(app.thread())
+            _shared_managers[key] = manager
+        return manager
@@ -1,9 +1,11 @@
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from .app_config import app_config
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Load environment variables
 load_dotenv()
 
@@ -13,14 +15,16 @@ class SupabaseConfig:
         self.url: str = app_config.supabase_url or ""
         self.key: str = app_config.supabase_key or ""
         self.service_key: str = app_config.supabase_service_key or ""
-        self._client: Optional[Client] = None
+        self._client: Optional["Client"] = None
         self._auth_client = None
 
     @property
-    def client(self) -> Client:
+    def client(self) -> "Client":
         """Get or create a Supabase client."""
         if not self._client and self.url and self.key:
             try:
+                # استيراد مؤجل: مكتبة supabase ثقيلة ولا نحتاجها حتى أول استعلام
+                from supabase import create_client
                 self._client = create_client(self.url, self.key)
                 # Test connection
                 self._test_connection()
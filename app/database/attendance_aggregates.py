@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+تجميعات الحضور للتحليلات (يومي / أيام الأسبوع / بالساعة) مخزنة حسب إصدار البيانات
+- جدول تجميع (rollup) لكل (تاريخ، ساعة) وآخر لكل موظف تحدّثهما مشغلات (triggers) جدول attendance،
+  مع عداد إصدار في analytics_state: معرفة هل تغيرت البيانات = قراءة صف واحد
+- التجميعات تُقرأ من الـ rollup (صفوف بعدد الأيام×الساعات لا بعدد السجلات) مرة لكل إصدار،
+  وتُشارك بين شاشة التحليلات والمساعد الذكي
+- attendance_frame(): إطار pandas واحد لكل إصدار لمن يحتاج السجلات نفسها (التنبؤ، تحليل الأنماط)
+- بدون مسار SQLite (PostgreSQL مثلاً) تُحسب نفس التجميعات من get_all_attendance()
+"""
+
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def _hour_sql(column: str) -> str:
+    """الساعة من check_time: إما 'HH:MM:SS' (السجلات المحلية) أو طابع كامل 'YYYY-MM-DD HH:MM:SS' / ISO؛ -1 = غير معروفة"""
+    return (f"COALESCE(CAST(CASE WHEN length({column}) <= 8 THEN substr({column}, 1, 2) "
+            f"ELSE substr({column}, 12, 2) END AS INTEGER), -1)")
+
+
+@dataclass(frozen=True)
+class AttendanceAggregates:
+    version: Any
+    total_records: int
+    unique_employees: int
+    first_date: Optional[str]
+    last_date: Optional[str]
+    daily: Tuple[Tuple[str, int], ...]      # (التاريخ، عدد السجلات) مرتبة بالتاريخ
+    weekday: Tuple[int, ...]                # 7 قيم: الإثنين .. الأحد
+    hourly: Tuple[int, ...]                 # 24 قيمة
+
+    def daily_counts(self):
+        """مصفوفة numpy بالأعداد اليومية (numpy يُستورد هنا لا عند البدء البارد)"""
+        import numpy as np
+
+        return np.fromiter((count for _date, count in self.daily), dtype=np.int64, count=len(self.daily))
+
+    def daily_stats(self) -> Dict[str, Any]:
+        """متوسط/انحراف (ddof=1 مثل pandas)/أدنى/أعلى عدد يومي مع يومي الأدنى والأعلى"""
+        counts = self.daily_counts()
+        if counts.size == 0:
+            return {'days': 0, 'mean': 0.0, 'std': 0.0, 'min': 0, 'max': 0, 'min_date': None, 'max_date': None}
+        return {
+            'days': int(counts.size),
+            'mean': float(counts.mean()),
+            'std': float(counts.std(ddof=1)) if counts.size > 1 else 0.0,
+            'min': int(counts.min()),
+            'max': int(counts.max()),
+            'min_date': self.daily[int(counts.argmin())][0],
+            'max_date': self.daily[int(counts.argmax())][0],
+        }
+
+    def weekday_distribution(self) -> Dict[str, int]:
+        """الأيام التي فيها سجلات فقط، بترتيب الأسبوع"""
+        return {day: count for day, count in zip(WEEKDAYS, self.weekday) if count}
+
+    def hour_distribution(self) -> Dict[int, int]:
+        return {hour: count for hour, count in enumerate(self.hourly) if count}
+
+    def mean_hour(self) -> float:
+        total = sum(self.hourly)
+        return sum(hour * count for hour, count in enumerate(self.hourly)) / total if total else 0.0
+
+    def mean_weekday(self) -> float:
+        """0 = الإثنين (نفس dt.day_of_week في pandas)"""
+        total = sum(self.weekday)
+        return sum(day * count for day, count in enumerate(self.weekday)) / total if total else 0.0
+
+
+EMPTY_AGGREGATES = AttendanceAggregates(None, 0, 0, None, None, (), (0,) * 7, (0,) * 24)
+
+
+class AttendanceAggregator:
+    """تجميعات مخزنة لكل إصدار بيانات؛ آمن للاستخدام من خيوط متعددة (اتصال جديد لكل استدعاء)"""
+
+    def __init__(self, db_path: Optional[str] = None, db_manager=None):
+        self.db_path = db_path
+        self.db_manager = db_manager
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._aggregates: Optional[AttendanceAggregates] = None
+        self._frame = None
+        self._frame_version = None
+
+    # --- المخطط وعداد الإصدار ---
+
+    @staticmethod
+    def ensure_schema(cursor):
+        """جداول التجميع والعداد ومشغلات attendance (تُستدعى مع إنشاء الجداول في مديري قاعدة البيانات)"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analytics_state (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO analytics_state (name, version) VALUES ('attendance', 0)")
+        created = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendance_hourly_rollup'").fetchone() is None
+        # NULL في مفتاح أساسي لا يتعارض مع نفسه: التاريخ الفارغ '' والساعة المجهولة -1
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_hourly_rollup (
+                date TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                records INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, hour)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_employee_rollup (
+                employee_id TEXT PRIMARY KEY,
+                records INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+
+        def add(ref: str) -> str:
+            return f"""
+                INSERT INTO attendance_hourly_rollup (date, hour, records)
+                    VALUES (COALESCE({ref}.date, ''), {_hour_sql(ref + '.check_time')}, 1)
+                    ON CONFLICT (date, hour) DO UPDATE SET records = records + 1;
+                INSERT INTO attendance_employee_rollup (employee_id, records)
+                    VALUES (COALESCE({ref}.employee_id, ''), 1)
+                    ON CONFLICT (employee_id) DO UPDATE SET records = records + 1;"""
+
+        def remove(ref: str) -> str:
+            return f"""
+                UPDATE attendance_hourly_rollup SET records = records - 1
+                    WHERE date = COALESCE({ref}.date, '') AND hour = {_hour_sql(ref + '.check_time')};
+                UPDATE attendance_employee_rollup SET records = records - 1
+                    WHERE employee_id = COALESCE({ref}.employee_id, '');"""
+
+        bump = "UPDATE analytics_state SET version = version + 1 WHERE name = 'attendance';"
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS attendance_rollup_ai AFTER INSERT ON attendance BEGIN "
+                       f"{add('NEW')} {bump} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS attendance_rollup_ad AFTER DELETE ON attendance BEGIN "
+                       f"{remove('OLD')} {bump} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS attendance_rollup_au AFTER UPDATE OF date, check_time, employee_id "
+                       f"ON attendance BEGIN {remove('OLD')} {add('NEW')} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS attendance_version_au AFTER UPDATE ON attendance BEGIN {bump} END")
+
+        if created:
+            # قاعدة بيانات قائمة: ملء الـ rollup مرة واحدة من السجلات الحالية
+            cursor.execute(f"""
+                INSERT INTO attendance_hourly_rollup (date, hour, records)
+                SELECT COALESCE(date, ''), {_hour_sql('check_time')}, COUNT(*) FROM attendance GROUP BY 1, 2
+            """)
+            cursor.execute("""
+                INSERT INTO attendance_employee_rollup (employee_id, records)
+                SELECT COALESCE(employee_id, ''), COUNT(*) FROM attendance GROUP BY 1
+            """)
+            cursor.execute(bump)
+
+        # رقم مراجعة لكل يوم: أي إدخال/تعديل/حذف يمس اليوم يزيده (يعرف به المتنبئ هل تغير يوم سبق حسابه)
+        revisions_created = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendance_day_revision'").fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_day_revision (
+                date TEXT PRIMARY KEY,
+                revision INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+
+        def touch(ref: str) -> str:
+            return (f"INSERT INTO attendance_day_revision (date, revision) VALUES (COALESCE({ref}.date, ''), 1) "
+                    f"ON CONFLICT (date) DO UPDATE SET revision = revision + 1;")
+
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS attendance_revision_ai AFTER INSERT ON attendance BEGIN "
+                       f"{touch('NEW')} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS attendance_revision_ad AFTER DELETE ON attendance BEGIN "
+                       f"{touch('OLD')} END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS attendance_revision_au AFTER UPDATE ON attendance BEGIN "
+                       f"{touch('OLD')} {touch('NEW')} END")
+        if revisions_created:
+            cursor.execute("""
+                INSERT INTO attendance_day_revision (date, revision)
+                SELECT DISTINCT COALESCE(date, ''), 1 FROM attendance
+            """)
+
+    def connect(self):
+        """اتصال جديد بقاعدة البيانات (المخطط يُضمن عند أول اتصال)"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._schema_ready:
+            try:
+                self.ensure_schema(conn.cursor())
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                # قاعدة بيانات للقراءة فقط أو بدون جدول attendance بعد
+                logger.warning(f"⚠️ analytics_state not available: {e}")
+            self._schema_ready = True
+        return conn
+
+    def data_version(self) -> Any:
+        """رقم يتغير مع أي إدخال/تعديل/حذف في attendance"""
+        if not self.db_path:
+            return None
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT version FROM analytics_state WHERE name = 'attendance'").fetchone()
+            return row[0] if row else None
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            conn.close()
+
+    def day_revisions(self, before: str) -> Tuple[Tuple[str, int], ...]:
+        """(التاريخ، رقم المراجعة) للأيام قبل before مرتبة بالتاريخ"""
+        conn = self.connect()
+        try:
+            return tuple(conn.execute(
+                "SELECT date, revision FROM attendance_day_revision WHERE date < ? AND date != '' ORDER BY date",
+                (before,)).fetchall())
+        except sqlite3.OperationalError:
+            return ()
+        finally:
+            conn.close()
+
+    # --- التجميعات ---
+
+    def aggregates(self) -> AttendanceAggregates:
+        """التجميعات للإصدار الحالي (تُحسب مرة لكل إصدار)"""
+        with self._lock:
+            if self.db_path:
+                version = self.data_version()
+                cached = self._aggregates
+                if cached is not None and version is not None and cached.version == version:
+                    return cached
+                aggregates = self._aggregates_from_sql(version)
+            else:
+                aggregates = self._aggregates_from_manager()
+            self._aggregates = aggregates
+            return aggregates
+
+    def _aggregates_from_sql(self, version) -> AttendanceAggregates:
+        from datetime import date as date_type
+
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            daily: Dict[str, int] = {}
+            hourly = [0] * 24
+            total = 0
+            for day, hour, records in cursor.execute(
+                    "SELECT date, hour, records FROM attendance_hourly_rollup WHERE records > 0"):
+                total += records
+                if day:
+                    daily[day] = daily.get(day, 0) + records
+                if 0 <= hour < 24:
+                    hourly[hour] += records
+            weekday = [0] * 7
+            for day, count in daily.items():
+                try:
+                    weekday[date_type.fromisoformat(day[:10]).weekday()] += count
+                except ValueError:
+                    continue
+            employees = cursor.execute(
+                "SELECT COUNT(*) FROM attendance_employee_rollup WHERE records > 0 AND employee_id != ''").fetchone()[0]
+            days = tuple(sorted(daily.items()))
+            return AttendanceAggregates(version, total, employees, days[0][0] if days else None,
+                                        days[-1][0] if days else None, days, tuple(weekday), tuple(hourly))
+        except sqlite3.OperationalError as e:
+            logger.error(f"❌ Failed to aggregate attendance: {e}")
+            return EMPTY_AGGREGATES
+        finally:
+            conn.close()
+
+    def _load_rows(self) -> List[Dict[str, Any]]:
+        getter = getattr(self.db_manager, 'get_all_attendance', None)
+        if getter is None:
+            return []
+        try:
+            return getter() or []
+        except Exception as e:
+            logger.error(f"❌ Failed to load attendance: {e}")
+            return []
+
+    def _manager_version(self) -> Any:
+        """إصدار رخيص من المدير (مثلاً (COUNT(*), MAX(id))) دون جلب السجلات - None إن لم يتوفر"""
+        probe = getattr(self.db_manager, 'get_attendance_version', None)
+        if probe is None:
+            return None
+        try:
+            return probe()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to probe attendance version: {e}")
+            return None
+
+    def _aggregates_from_manager(self) -> AttendanceAggregates:
+        version = self._manager_version()
+        cached = self._aggregates
+        if cached is not None and version is not None and cached.version == version:
+            return cached
+        rows = self._load_rows()
+        if version is None:
+            version = (len(rows), max((row.get('id') or 0 for row in rows), default=0))
+            if cached is not None and cached.version == version:
+                return cached
+        return aggregate_rows(rows, version)
+
+    # --- السجلات كإطار pandas ---
+
+    def attendance_frame(self):
+        """DataFrame (employee_id, date, check_time, type, timestamp) لكل إصدار بيانات"""
+        import pandas as pd
+
+        with self._lock:
+            version = self.data_version() if self.db_path else self._manager_version()
+            if self._frame is not None and version is not None and version == self._frame_version:
+                return self._frame
+            if self.db_path:
+                conn = self.connect()
+                try:
+                    frame = pd.read_sql_query(
+                        "SELECT id, employee_id, date, check_time, type FROM attendance ORDER BY date, check_time",
+                        conn)
+                except Exception as e:
+                    logger.error(f"❌ Failed to load attendance frame: {e}")
+                    frame = pd.DataFrame(columns=['id', 'employee_id', 'date', 'check_time', 'type'])
+                finally:
+                    conn.close()
+            else:
+                frame = pd.DataFrame(self._load_rows())
+            if not frame.empty and 'timestamp' not in frame.columns and 'date' in frame.columns:
+                times = frame['check_time'].astype(str).str[-8:] if 'check_time' in frame.columns else '00:00:00'
+                frame['timestamp'] = pd.to_datetime(frame['date'].astype(str) + ' ' + times, errors='coerce')
+            self._frame, self._frame_version = frame, version
+            return frame
+
+
+def _row_date_and_hour(row: Dict[str, Any]) -> Tuple[Optional[str], Optional[int]]:
+    stamp = row.get('timestamp')
+    if stamp:
+        text = str(stamp).replace('T', ' ')
+        date = text[:10]
+        hour = int(text[11:13]) if len(text) >= 13 and text[11:13].isdigit() else None
+        return date, hour
+    date = row.get('date')
+    check_time = str(row.get('check_time') or '')
+    hour_text = check_time[:2] if len(check_time) <= 8 else check_time[11:13]
+    return (str(date) if date else None), (int(hour_text) if hour_text.isdigit() else None)
+
+
+def aggregate_rows(rows: Iterable[Dict[str, Any]], version: Any = None) -> AttendanceAggregates:
+    """نفس التجميعات من قائمة سجلات (مسار بدون SQLite)"""
+    from datetime import date as date_type
+
+    daily: Dict[str, int] = {}
+    hourly = [0] * 24
+    employees = set()
+    total = 0
+    for row in rows:
+        total += 1
+        employees.add(row.get('employee_id'))
+        day, hour = _row_date_and_hour(row)
+        if day:
+            daily[day] = daily.get(day, 0) + 1
+        if hour is not None and 0 <= hour < 24:
+            hourly[hour] += 1
+    weekday = [0] * 7
+    for day, count in daily.items():
+        try:
+            weekday[date_type.fromisoformat(day).weekday()] += count
+        except ValueError:
+            continue
+    days = sorted(daily.items())
+    return AttendanceAggregates(version, total, len(employees - {None}),
+                                days[0][0] if days else None, days[-1][0] if days else None,
+                                tuple(days), tuple(weekday), tuple(hourly))
+
+
+# مجمِّع واحد لكل قاعدة بيانات: كل الشاشات تشارك نفس النتائج المخزنة
+_aggregators: Dict[Any, AttendanceAggregator] = {}
+_aggregators_lock = threading.Lock()
+
+
+def get_attendance_aggregator(db_manager) -> AttendanceAggregator:
+    """المجمِّع المشترك لمدير قاعدة البيانات (SQLite المحلي إن وُجد، وإلا get_all_attendance)"""
+    db_path = getattr(db_manager, 'local_db_path', None)
+    if not db_path and getattr(db_manager, 'db_type', None) == 'sqlite':
+        db_path = getattr(db_manager, 'database_file', None)
+    key = db_path or id(db_manager)
+    with _aggregators_lock:
+        aggregator = _aggregators.get(key)
+        if aggregator is None:
+            aggregator = _aggregators[key] = AttendanceAggregator(db_path, db_manager)
+        return aggregator
@@ -1,3 +1,4 @@
+import base64
 import os
 import sqlite3
 import logging
@@ -11,6 +12,10 @@ try:
 except Exception:
     psycopg2 = None  # Optional when using SQLite only
 
+from app.fingerprint.template_store import FingerprintTemplateStore
+from app.database.full_text_search import FullTextSearch
+from app.database.attendance_aggregates import AttendanceAggregator
+
 DATABASE_FILE = os.getenv("SQLITE_FILE", "attendance.db")
 
 
@@ -35,6 +40,8 @@ class DatabaseManager:
             self.database_url = os.getenv("DATABASE_URL")
         
         self.sqlite_file = os.getenv("SQLITE_FILE", "attendance.db")
+        # يزيد مع كل تغيير في جدول الإجازات (القيود الزمنية تعيد تحميلها عند تغيره)
+        self.holidays_generation = 0
         self.database_file = os.path.join(os.path.dirname(__file__), "..", "..", self.sqlite_file)
         
         # Determine database type
@@ -47,6 +54,8 @@ class DatabaseManager:
         
         # Initialize database
         self._init_database()
+        # FTS5 search index (created on first search for older database files)
+        self.full_text_search = FullTextSearch(self.database_file)
 
     def _create_connection(self):
         """Create database connection"""
@@ -172,6 +181,10 @@ class DatabaseManager:
                 )
             """)
             
+            FingerprintTemplateStore.ensure_schema(cursor)
+            FullTextSearch.ensure_schema(cursor)
+            AttendanceAggregator.ensure_schema(cursor)
+            
             conn.commit()
             conn.close()
             print("[DB Manager] SQLite tables created successfully")
@@ -389,14 +402,41 @@ class DatabaseManager:
         return self._execute_query_with_commit("UPDATE employees SET web_fingerprint = ?, device_token = ? WHERE id = ?", (fingerprint, token, employee_id))
         
     def update_employee_zk_template(self, employee_id, zk_template):
+        if self.db_type == "sqlite":
+            # SQLite: القالب الثنائي في جدول fingerprint_templates (لا يُعاد كتابته إذا لم يتغير)
+            try:
+                conn = sqlite3.connect(self.database_file)
+                FingerprintTemplateStore.ensure_schema(conn.cursor())
+                conn.commit()
+                conn.close()
+                FingerprintTemplateStore(self.database_file).save(employee_id, zk_template)
+                return True
+            except Exception as e:
+                print(f"[DB Manager] Error saving fingerprint template: {e}")
+                return False
+        if isinstance(zk_template, (bytes, bytearray)):
+            zk_template = base64.b64encode(zk_template).decode('ascii')
         return self._execute_query_with_commit("UPDATE employees SET zk_template = ? WHERE id = ?", (zk_template, employee_id))
     
     def reset_employee_device_info(self, employee_id):
         return self._execute_query_with_commit("UPDATE employees SET web_fingerprint = NULL, device_token = NULL WHERE id = ?", (employee_id,))
         
-    def search_employees(self, search_term):
-        term = f"%{search_term}%"
-        return self._execute_query("SELECT * FROM employees WHERE name LIKE ? OR phone_number LIKE ? OR employee_code LIKE ?", (term, term, term), fetch=True)
+    def search_employees(self, search_term, limit=None):
+        """SQLite: ranked FTS5 prefix search (LIKE fallback inside FullTextSearch); PostgreSQL: LIKE.
+        limit=None returns every match; on a database error the result is []"""
+        try:
+            if self.db_type == "sqlite":
+                return self.full_text_search.search_employees(search_term, limit=limit)
+            term = f"%{search_term}%"
+            query = "SELECT * FROM employees WHERE name LIKE ? OR phone_number LIKE ? OR employee_code LIKE ?"
+            params = (term, term, term)
+            if limit is not None:
+                query += " LIMIT ?"
+                params += (limit,)
+            return self._execute_query(query, params, fetch=True)
+        except Exception as e:
+            print(f"[DB Manager] Employee search error: {e}")
+            return []
 
 
 
@@ -690,11 +730,15 @@ class DatabaseManager:
                         "INSERT INTO holidays (date, description) VALUES (%s, %s) RETURNING id",
                         (date_str, description)
                     )
-                    conn.commit(); row = cur.fetchone(); return row['id'] if row else None
+                    conn.commit(); row = cur.fetchone()
+                    self.holidays_generation += 1
+                    return row['id'] if row else None
             finally:
                 conn.close()
         query = "INSERT INTO holidays (date, description) VALUES (?, ?)"
-        return self._execute_query_with_commit(query, (date_str, description))
+        result = self._execute_query_with_commit(query, (date_str, description))
+        self.holidays_generation += 1
+        return result
 
     def get_all_holidays(self):
         """يجلب كل الإجازات الرسمية مرتبة بالتاريخ."""
@@ -703,7 +747,9 @@ class DatabaseManager:
     def delete_holiday(self, holiday_id):
         """يDelete يوم إجازة رسمي."""
         query = "DELETE FROM holidays WHERE id = ?"
-        return self._execute_query_with_commit(query, (holiday_id,))
+        result = self._execute_query_with_commit(query, (holiday_id,))
+        self.holidays_generation += 1
+        return result
 
 
 
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+بحث نصي كامل (SQLite FTS5) في الموظفين والمستخدمين
+- جداول employees_fts و users_fts تعكس الحقول النصية، ومفتاحها rowid = id في الجدول الأصلي
+- تُحدَّث بمشغلات (triggers) على الإدخال والتعديل والحذف؛ أي اتصال يكتب في الجداول يحدّثها
+  (التطبيع داخل المشغلات بـ replace() فقط، لا دوال Python مسجلة)
+- المحلل unicode61 مع remove_diacritics 2: حروف لاتينية بلا علامات (é -> e) وحالة موحدة؛
+  الحروف العربية تُطبَّع قبل الفهرسة: حذف التشكيل والتطويل، توحيد أ/إ/آ -> ا و ى -> ي و ة -> ه،
+  والأرقام العربية الهندية (٠-٩ و ۰-۹) إلى لاتينية - نفس طي search_index.normalize_text للاستعلام
+- البحث بالبادئة لكل كلمة ("احم" تطابق "أحمد")، مرتب بـ bm25 مع مقتطفات مُبرزة
+- إن لم يكن FTS5 مُضمناً في SQLite يُستخدم LIKE كما كان
+"""
+
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from app.utils.search_index import normalize_text
+
+logger = logging.getLogger(__name__)
+
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+HIGHLIGHT_START, HIGHLIGHT_END = '<b>', '</b>'
+# بادئة قصيرة تطابق آلاف الصفوف: حساب bm25 لكلها يكلف عشرات ms ولا يميز بين نتائج متشابهة،
+# فتُرجع بترتيب id؛ الترتيب يعمل بمجرد أن يضيق البحث تحت هذا الحد
+RANKED_MATCH_LIMIT = 2000
+
+# الجدول الأصلي -> (جدول FTS، الأعمدة المفهرسة، أوزان bm25 لكل عمود)
+FTS_SOURCES: Dict[str, Tuple[str, Tuple[str, ...], Tuple[float, ...]]] = {
+    'employees': ('employees_fts',
+                  ('name', 'employee_code', 'phone_number', 'department', 'job_title'),
+                  (10.0, 6.0, 6.0, 2.0, 2.0)),
+    'users': ('users_fts', ('username', 'role'), (10.0, 2.0)),
+}
+
+# نفس طي search_index.normalize_text للحالات الشائعة، بصيغة SQL على مرحلتين: الحروف ثم الأرقام
+# (replace() متداخلة: أكثر من ~25 مستوى في تعبير واحد يتجاوز مكدس المحلل، فالأرقام في SELECT خارجي)
+_SQL_LETTER_FOLDS = [(chr(c), '') for c in range(0x064B, 0x0653)] + [('ٰ', ''), ('ـ', '')] + [
+    ('أ', 'ا'), ('إ', 'ا'), ('آ', 'ا'), ('ٱ', 'ا'), ('ى', 'ي'), ('ئ', 'ي'), ('ؤ', 'و'), ('ة', 'ه'),
+]
+_SQL_DIGIT_FOLDS = [(chr(0x0660 + d), str(d)) for d in range(10)] + [(chr(0x06F0 + d), str(d)) for d in range(10)]
+
+_TOKEN_RE = re.compile(r'\w+')
+
+_fts5_available: Optional[bool] = None
+
+
+def _replace_sql(expression: str, folds: List[Tuple[str, str]]) -> str:
+    for source, target in folds:
+        expression = f"replace({expression}, '{source}', '{target}')"
+    return expression
+
+
+def _folded_select(row_id: str, columns: Tuple[str, ...], source: str = '') -> str:
+    """SELECT يُرجع (rowid، الأعمدة مطبَّعة) - row_id/columns بصيغة new.x في المشغل أو x في إعادة البناء"""
+    letters = ', '.join(_replace_sql(f"coalesce({column}, '')", _SQL_LETTER_FOLDS) + f' AS f{i}'
+                        for i, column in enumerate(columns))
+    digits = ', '.join(_replace_sql(f'f{i}', _SQL_DIGIT_FOLDS) for i in range(len(columns)))
+    return f'SELECT fold_id, {digits} FROM (SELECT {row_id} AS fold_id, {letters}{source})'
+
+
+def fts5_available(cursor) -> bool:
+    """هل SQLite مبني بدعم FTS5؟ (يُفحص مرة واحدة)"""
+    global _fts5_available
+    if _fts5_available is None:
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE IF EXISTS temp.fts5_probe')
+            _fts5_available = True
+        except sqlite3.OperationalError:
+            _fts5_available = False
+            logger.warning("⚠️ SQLite بدون FTS5 - البحث سيستخدم LIKE")
+    return _fts5_available
+
+
+def build_match_query(term: str) -> str:
+    """'أحمد  EMP-01' -> '"احمد"* "emp"* "01"*' (كل كلمة بادئة، والكلمات مجتمعة AND)"""
+    tokens = _TOKEN_RE.findall(normalize_text(term))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class FullTextSearch:
+    """بحث FTS5 في قاعدة SQLite محلية مع رجوع إلى LIKE"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._ready: Dict[str, bool] = {}
+
+    @staticmethod
+    def ensure_schema(cursor) -> bool:
+        """
+        إنشاء جداول FTS ومشغلاتها للجداول الموجودة؛ الجدول الجديد يُملأ من البيانات الحالية.
+        يُرجع False إذا لم يتوفر FTS5.
+        """
+        if not fts5_available(cursor):
+            return False
+        for table in FTS_SOURCES:
+            FullTextSearch._ensure_table(cursor, table)
+        return True
+
+    @staticmethod
+    def _ensure_table(cursor, table: str) -> bool:
+        fts_table, columns, weights = FTS_SOURCES[table]
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        if not existing or not set(columns) <= existing:
+            return False
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,))
+        created = cursor.fetchone() is None
+        column_list = ', '.join(columns)
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                       f"{column_list}, tokenize='{FTS_TOKENIZER}', prefix='2 3')")
+        # ترتيب rank المدمج بالأوزان: FTS5 يرتب داخلياً ولا تُحسب المقتطفات إلا لأول LIMIT صف
+        cursor.execute(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES ('rank', ?)",
+                       (f"bm25({', '.join(map(str, weights))})",))
+
+        folded_new = _folded_select('new.id', tuple(f'new.{column}' for column in columns))
+        insert_new = f'INSERT INTO {fts_table}(rowid, {column_list}) {folded_new};'
+        # INSERT OR REPLACE لا يشغل مشغل الحذف: يُحذف أي إدخال قديم بنفس rowid قبل الإضافة
+        triggers = {
+            f'{fts_table}_ai': f'''CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {table} BEGIN
+                DELETE FROM {fts_table} WHERE rowid = new.id;
+                {insert_new}
+            END''',
+            f'{fts_table}_ad': f'''CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                DELETE FROM {fts_table} WHERE rowid = old.id;
+            END''',
+            f'{fts_table}_au': f'''CREATE TRIGGER {fts_table}_au AFTER UPDATE OF id, {column_list} ON {table} BEGIN
+                DELETE FROM {fts_table} WHERE rowid = old.id OR rowid = new.id;
+                {insert_new}
+            END''',
+        }
+        # مشغلات إصدار أقدم (تطبيع مختلف) تُستبدل ويُعاد بناء الفهرس بالتطبيع الحالي
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,))
+        existing_triggers = dict(cursor.fetchall())
+        for name, sql in triggers.items():
+            if existing_triggers.get(name) != sql:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+                cursor.execute(sql)
+                created = True
+        if created:
+            FullTextSearch._rebuild(cursor, table)
+        return True
+
+    @staticmethod
+    def _rebuild(cursor, table: str):
+        fts_table, columns, _ = FTS_SOURCES[table]
+        column_list = ', '.join(columns)
+        cursor.execute(f'DELETE FROM {fts_table}')
+        cursor.execute(f'INSERT INTO {fts_table}(rowid, {column_list}) '
+                       f'{_folded_select("id", columns, f" FROM {table}")}')
+        cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('optimize')")
+        logger.info(f"🔎 تم بناء فهرس البحث {fts_table}")
+
+    def rebuild(self, table: str) -> bool:
+        """إعادة بناء فهرس جدول من بياناته الحالية (بعد استيراد خارج التطبيق مثلاً)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            if not self._table_ready(cursor, table):
+                return False
+            self._rebuild(cursor, table)
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5.0)
+
+    def _table_ready(self, cursor, table: str) -> bool:
+        """جدول FTS جاهز لهذا الجدول؟ (يُنشأ عند أول استخدام لقواعد البيانات الأقدم)"""
+        ready = self._ready.get(table)
+        if ready is None:
+            ready = fts5_available(cursor) and self._ensure_table(cursor, table)
+            cursor.connection.commit()
+            self._ready[table] = ready
+        return ready
+
+    def search(self, table: str, term: str, limit: Optional[int] = None,
+               select: str = '*') -> List[Dict[str, Any]]:
+        """
+        بحث في جدول مع حقول إضافية: search_rank (bm25، الأصغر أفضل)، search_highlight
+        (العمود الأول مُبرزاً) و search_snippet (مقتطف من أفضل عمود). الإبراز على النص المطبَّع.
+        limit=None: كل النتائج
+        """
+        if limit is None:
+            limit = -1  # LIMIT -1 في SQLite = بلا حد
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            match = build_match_query(term)
+            if match and self._table_ready(cursor, table):
+                try:
+                    return self._fts_search(cursor, table, match, limit, select)
+                except sqlite3.OperationalError as e:
+                    logger.warning(f"⚠️ فشل بحث FTS في {table}، الرجوع إلى LIKE: {e}")
+            return self._like_search(cursor, table, term, limit, select)
+        finally:
+            conn.close()
+
+    def search_employees(self, term: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.search('employees', term, limit)
+
+    def search_users(self, term: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.search('users', term, limit, select='id, username, password, role')
+
+    @staticmethod
+    def _fts_search(cursor, table: str, match: str, limit: int, select: str) -> List[Dict[str, Any]]:
+        fts_table = FTS_SOURCES[table][0]
+        cursor.execute(f'SELECT count(*) FROM {fts_table} WHERE {fts_table} MATCH ?', (match,))
+        order = f'{fts_table}.rank' if cursor.fetchone()[0] <= RANKED_MATCH_LIMIT else 's.id'
+        source_columns = ', '.join(f's.{column.strip()}' for column in select.split(','))
+        cursor.execute(f'''
+            SELECT {source_columns},
+                   {fts_table}.rank AS search_rank,
+                   highlight({fts_table}, 0, ?, ?) AS search_highlight,
+                   snippet({fts_table}, -1, ?, ?, '…', 10) AS search_snippet
+            FROM {fts_table}
+            JOIN {table} s ON s.id = {fts_table}.rowid
+            WHERE {fts_table} MATCH ?
+            ORDER BY {order}
+            LIMIT ?
+        ''', (HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, match, limit))
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _like_search(cursor, table: str, term: str, limit: int, select: str) -> List[Dict[str, Any]]:
+        _, columns, _ = FTS_SOURCES[table]
+        cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row[1] for row in cursor.fetchall()}
+        columns = [column for column in columns if column in existing]
+        if not columns:
+            return []
+        pattern = f'%{term}%'
+        where = ' OR '.join(f'{column} LIKE ?' for column in columns)
+        cursor.execute(f'SELECT {select} FROM {table} WHERE {where} LIMIT ?',
+                       (*([pattern] * len(columns)), limit))
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
@@ -3,33 +3,47 @@
 مدير قاعدة البيانات الهجين البسيط - مزامنة فعالة مثل النسخة الأصلية
 """
 
+import base64
 import sqlite3
 import threading
 import time
 import json
 import queue
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
 
 from .database_manager import DatabaseManager
 from .supabase_manager import SupabaseManager
+from app.utils.metrics import metrics
+from app.fingerprint.template_store import FingerprintTemplateStore, DEFAULT_DEVICE_TYPE, to_template_bytes
+from .full_text_search import FullTextSearch
+from .attendance_aggregates import AttendanceAggregator
 
 import logging
 logger = logging.getLogger('SimpleHybrid')
 
 class SimpleHybridManager:
-    def __init__(self):
+    def __init__(self, load_from_supabase: bool = True, start_sync_threads: bool = True,
+                 local_db_path: Optional[str] = None):
+        """
+        load_from_supabase: تحميل كامل من Supabase عند الإنشاء (False مع enable_read_through في وضع serverless)
+        start_sync_threads: بدء خيوط المزامنة فوراً (يُعطَّل في وضع الإنتاج، انظر claim_sync_ownership)
+        local_db_path: مسار قاعدة البيانات المحلية (مثلاً /tmp/attendance.db على Vercel)
+        """
         try:
             logger.info("🔄 تهيئة النظام الهجين - Supabase First...")
             
-            self.local_db_path = "attendance.db"
+            self.local_db_path = local_db_path or "attendance.db"
+            # بحث FTS5 في القاعدة المحلية (search_employees / search_users)
+            self.full_text_search = FullTextSearch(self.local_db_path)
             self.original_db = None  # لن ننشئه إلا عند الحاجة للمزامنة
             self.supabase_manager = None
             
             # 🚀 مزامنة فورية في الاتجاهين
             self.sync_interval = 2  # 2 ثانية للمزامنة الفورية
             self.supabase_sync_interval = 3  # 3 ثوانِ للمزامنة من Supabase
+            self.template_sync_interval = 60  # قوالب البصمة تتغير نادراً
             
             # قائمة انتظار المزامنة
             self.sync_queue = queue.Queue()
@@ -40,9 +54,20 @@ class SimpleHybridManager:
             
             # إعدادات المزامنة الفورية
             self.instant_sync = True
+            self.is_sync_owner = start_sync_threads
+            # بدون خيوط خلفية تُنفَّذ المزامنة الفورية داخل الطلب نفسه (serverless)
+            self.background_sync = True
+            # القراءة عند الطلب من Supabase بدلاً من التنزيل الكامل
+            self.read_through = False
+            self.read_through_ttl = 60  # ثوانٍ قبل إعادة تحميل الجداول المرجعية
+            self._read_through_loaded = {}
+            # يزيد مع كل تغيير في جدول الإجازات (القيود الزمنية تعيد تحميلها عند تغيره)
+            self.holidays_generation = 0
             self.supabase_first = True  # Supabase له الأولوية
             self.supabase_sync_thread_pool = []
             self.sync_thread_pool = []  # Add sync_thread_pool
+            # تُنشأ في _start_instant_sync_threads؛ None حتى لا يمر shutdown عبر __getattr__
+            self.sync_thread = self.supabase_sync_thread = self.instant_sync_thread = None
             
             # إعدادات التحكم الكامل
             self.control_settings = {
@@ -91,29 +116,31 @@ class SimpleHybridManager:
             self._setup_local_database()
             
             # 📥 تحميل البيانات من Supabase (أولوية قصوى) - في الخلفية
-            try:
-                self._load_data_from_supabase_priority()
-            except Exception as e:
-                logger.warning(f"⚠️ Failed في تحميل البيانات من Supabase: {e}")
-                logger.info("🔄 سيتم استخدام قاعدة البيانات المحلية فقط")
-            
-            # 🆕 مزامنة إضافية للإعدادات من Supabase (ضمان المزامنة)
-            try:
-                logger.info("🔄 مزامنة إضافية للإعدادات من Supabase...")
-                if self.supabase_manager:
-                    self._sync_settings_from_supabase()
-                    logger.info("✅ تمت المزامنة الإضافية للإعدادات")
-                else:
-                    logger.warning("⚠️ SupabaseManager غير متاح للمزامنة الإضافية")
-            except Exception as e:
-                logger.warning(f"⚠️ فشلت المزامنة الإضافية للإعدادات: {e}")
+            if load_from_supabase:
+                try:
+                    self._load_data_from_supabase_priority()
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed في تحميل البيانات من Supabase: {e}")
+                    logger.info("🔄 سيتم استخدام قاعدة البيانات المحلية فقط")
+                
+                # 🆕 مزامنة إضافية للإعدادات من Supabase (ضمان المزامنة)
+                try:
+                    logger.info("🔄 مزامنة إضافية للإعدادات من Supabase...")
+                    if self.supabase_manager:
+                        self._sync_settings_from_supabase()
+                        logger.info("✅ تمت المزامنة الإضافية للإعدادات")
+                    else:
+                        logger.warning("⚠️ SupabaseManager غير متاح للمزامنة الإضافية")
+                except Exception as e:
+                    logger.warning(f"⚠️ فشلت المزامنة الإضافية للإعدادات: {e}")
             
             # ⚡ بدء خيوط المزامنة الفورية - في الخلفية
-            try:
-                self._start_instant_sync_threads()
-            except Exception as e:
-                logger.warning(f"⚠️ Failed في بدء خيوط المزامنة: {e}")
-                logger.info("🔄 سيتم استخدام المزامنة اليدوية فقط")
+            if start_sync_threads:
+                try:
+                    self._start_instant_sync_threads()
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed في بدء خيوط المزامنة: {e}")
+                    logger.info("🔄 سيتم استخدام المزامنة اليدوية فقط")
             
             logger.info("✅ تم تهيئة النظام الهجين - Supabase First بنجاح")
             
@@ -214,11 +241,57 @@ class SimpleHybridManager:
                 )
             ''')
             
+            # علامة آخر سجل مستورد من كل جهاز بصمة ZK
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS zk_device_watermarks (
+                    device_key TEXT PRIMARY KEY,
+                    last_timestamp TEXT,
+                    last_uid INTEGER,
+                    total_ingested INTEGER DEFAULT 0,
+                    last_cleared_at TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # ما تم دفعه إلى كل جهاز ZK (للدفع التفاضلي والاستئناف بعد الانقطاع)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS zk_device_push_state (
+                    device_key TEXT NOT NULL,
+                    employee_id INTEGER NOT NULL,
+                    finger_index INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    device_uid INTEGER,
+                    pushed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (device_key, employee_id, finger_index)
+                )
+            ''')
+            
+            # قوالب البصمة الثنائية (خارج جدول الموظفين) + نقل zk_template القديم إن وُجد
+            FingerprintTemplateStore.ensure_schema(cursor)
+            FingerprintTemplateStore.migrate_from_employees_column(cursor)
+            
+            # فهارس البحث النصي (FTS5) للموظفين والمستخدمين - تُحدَّث بالمشغلات
+            FullTextSearch.ensure_schema(cursor)
+            
+            # جداول تجميع الحضور للتحليلات (rollup) - تُحدَّث بالمشغلات
+            AttendanceAggregator.ensure_schema(cursor)
+            
+            # أعمدة أُضيفت لاحقاً (قواعد بيانات محلية أقدم)
+            for table_name, column_sql in (('employees', 'web_fingerprint TEXT'),
+                                           ('employees', 'device_token TEXT'),
+                                           ('attendance', 'duration_hours REAL'),
+                                           ('attendance', 'idempotency_key TEXT')):
+                try:
+                    cursor.execute(f'ALTER TABLE {table_name} ADD COLUMN {column_sql}')
+                except sqlite3.OperationalError:
+                    pass  # العمود موجود مسبقاً
+            
             # إنشاء فهارس لتحسين الأداء
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_code ON employees(employee_code)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_employees_name ON employees(name)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_employee ON attendance(employee_id)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date)')
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_idempotency ON attendance(idempotency_key)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_sync_queue_status ON sync_queue(status)')
             
             conn.commit()
@@ -273,6 +346,11 @@ class SimpleHybridManager:
             except Exception as e:
                 logger.error(f"❌ Error في تحميل الموظفين: {e}")
             
+            # 📥 تحميل قوالب البصمة (القاعدة المحلية تُحذف عند الخروج افتراضياً)
+            logger.info("📥 جاري تحميل قوالب البصمة من Supabase...")
+            self.sync_fingerprint_templates_from_supabase()
+            self._last_template_sync = time.time()
+            
             # 📥 تحميل المستخدمين
             try:
                 logger.info("📥 جاري تحميل المستخدمين من Supabase...")
@@ -407,6 +485,7 @@ class SimpleHybridManager:
                     
                     conn.commit()
                     conn.close()
+                    self.holidays_generation += 1
                     logger.info(f"✅ تم تحميل {len(holidays)} إجازة من Supabase")
                 else:
                     logger.warning("⚠️ لا توجد إجازات في Supabase")
@@ -495,6 +574,42 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في بدء خيوط المزامنة: {e}")
             raise
     
+    def claim_sync_ownership(self, lock_path: Optional[str] = None) -> bool:
+        """
+        محاولة أن تصبح هذه العملية مالك المزامنة الوحيد (وضع gunicorn متعدد العمال).
+        المالك يشغّل خيوط المزامنة؛ باقي العمال يكتبون محلياً في sync_queue فقط
+        ويتركون رفعها إلى Supabase للمالك.
+        """
+        try:
+            import fcntl
+        except ImportError:
+            # Windows: لا يوجد fcntl، عملية واحدة فقط في هذه الحالة
+            self._start_instant_sync_threads()
+            return True
+        
+        lock_path = lock_path or f"{self.local_db_path}.sync.lock"
+        try:
+            lock_file = open(lock_path, 'a+')
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (OSError, IOError):
+            try:
+                lock_file.close()
+            except Exception:
+                pass
+            # عامل قارئ: لا خيوط مزامنة ولا مزامنة فورية، الطابور المحلي يكفي
+            self.instant_sync = False
+            self.control_settings['instant_sync'] = False
+            self.is_sync_owner = False
+            logger.info(f"📖 العملية {os.getpid()} تعمل كقارئ - مالك المزامنة عملية أخرى")
+            return False
+        
+        # الاحتفاظ بالملف مفتوحاً طوال عمر العملية للإبقاء على القفل
+        self._sync_lock_file = lock_file
+        self.is_sync_owner = True
+        self._start_instant_sync_threads()
+        logger.info(f"👑 العملية {os.getpid()} أصبحت مالك المزامنة")
+        return True
+    
     def _sync_worker(self):
         """عامل المزامنة الفورية من البرنامج إلى Supabase"""
         while self.sync_running:
@@ -654,6 +769,9 @@ class SimpleHybridManager:
                     return self.supabase_manager.delete_user(record_id)
             
             elif table_name == "attendance":
+                if operation == "BULK_INSERT":
+                    # دفعة كاملة من الأكشاك/أجهزة ZK في طلب واحد
+                    return self.supabase_manager.record_attendance_batch(data.get('records', []))
                 if operation == "INSERT":
                     # تحقق من وجود الموظف أولاً
                     if not self._employee_exists_in_supabase(data.get('employee_id')):
@@ -665,6 +783,11 @@ class SimpleHybridManager:
                 elif operation == "DELETE":
                     return self.supabase_manager.delete_attendance(record_id)
             
+            elif table_name == "fingerprint_templates":
+                # الحذف علامة (tombstone) وليس حذف صف: بقية التثبيتات تراها في السحب التالي
+                if operation in ("UPSERT", "DELETE"):
+                    return self.supabase_manager.upsert_fingerprint_template(data)
+            
             elif table_name == "locations":
                 if operation == "INSERT":
                     return bool(self.supabase_manager.add_location(data))
@@ -701,25 +824,25 @@ class SimpleHybridManager:
             if self.supabase_manager is None:
                 self.supabase_manager = SupabaseManager()
             
-            employees = self.supabase_manager.get_all_employees()
-            return any(emp.get('id') == employee_id for emp in employees)
+            return self.supabase_manager.employee_exists(employee_id)
         except Exception:
             return False
     
-    def _add_to_sync_queue(self, table_name: str, record_id: int, operation: str, data: Dict):
-        """Add إلى قائمة انتظار المزامنة بدون تأخير"""
+    @metrics.timed()
+    def _add_to_sync_queue(self, table_name: str, record_id: int, operation: str, data: Dict,
+                           cursor: Optional[sqlite3.Cursor] = None):
+        """
+        Add إلى قائمة انتظار المزامنة بدون تأخير
+        cursor: مؤشر معاملة الكتابة نفسها - الصف يُكتب ويُلغى معها (لا سجل محلي بلا عملية مزامنة)
+        """
+        if cursor is not None:
+            self._enqueue_sync_row(cursor, table_name, record_id, operation, data)
+            return True
+        if not self.is_sync_owner:
+            return self._add_to_sync_queue_table(table_name, record_id, operation, data)
         try:
             # محاولة واحدة فقط مع timeout قصير
-            conn = sqlite3.connect(self.local_db_path, timeout=0.5)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO sync_queue (table_name, record_id, operation, local_data)
-                VALUES (?, ?, ?, ?)
-            ''', (table_name, record_id, operation, json.dumps(data)))
-            
-            conn.commit()
-            conn.close()
+            self._insert_sync_queue_row(table_name, record_id, operation, data, timeout=0.5)
             return True
             
         except sqlite3.OperationalError as e:
@@ -737,6 +860,44 @@ class SimpleHybridManager:
             self.sync_queue.put((table_name, record_id, operation, data))
             return True
     
+    @staticmethod
+    def _enqueue_sync_row(cursor: sqlite3.Cursor, table_name: str, record_id: int, operation: str, data: Dict):
+        cursor.execute('''
+            INSERT INTO sync_queue (table_name, record_id, operation, local_data)
+            VALUES (?, ?, ?, ?)
+        ''', (table_name, record_id, operation, json.dumps(data)))
+    
+    def _insert_sync_queue_row(self, table_name: str, record_id: int, operation: str, data: Dict,
+                               timeout: float):
+        conn = sqlite3.connect(self.local_db_path, timeout=timeout)
+        try:
+            self._enqueue_sync_row(conn.cursor(), table_name, record_id, operation, data)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _add_to_sync_queue_table(self, table_name: str, record_id: int, operation: str, data: Dict,
+                                 attempts: int = 5) -> bool:
+        """
+        عامل قارئ (ليس مالك المزامنة): لا شيء في هذه العملية يفرّغ قائمة الذاكرة،
+        فالعملية تُكتب في جدول sync_queue فقط مع إعادة المحاولة عند القفل.
+        إذا فشلت كل المحاولات يُرفع الخطأ للمستدعي (لا تُسقط العملية بصمت)؛
+        مسارات الكتابة في العمال القارئة تمرر cursor لتكتب الصف في معاملتها بدلاً من ذلك
+        """
+        delay = 0.05
+        for attempt in range(1, attempts + 1):
+            try:
+                self._insert_sync_queue_row(table_name, record_id, operation, data, timeout=0.5 * attempt)
+                return True
+            except sqlite3.OperationalError as e:
+                if "database is locked" not in str(e) or attempt == attempts:
+                    logger.error(f"❌ لم تُضف {operation} {table_name}:{record_id} إلى sync_queue "
+                                 f"بعد {attempt} محاولة: {e}")
+                    raise
+                time.sleep(delay)
+                delay *= 2
+        return False
+    
     def _immediate_sync(self, table_name: str, record_id: int, operation: str, data: Dict):
         """مزامنة فورية للعملية بدون انتظار"""
         if not self.instant_sync:
@@ -745,7 +906,8 @@ class SimpleHybridManager:
         def sync_in_background():
             try:
                 # تأخير قصير لتجنب التداخل مع العملية المحلية
-                time.sleep(0.1)
+                if self.background_sync:
+                    time.sleep(0.1)
                 
                 success = self._sync_record(table_name, record_id, operation, data)
                 if success:
@@ -757,6 +919,10 @@ class SimpleHybridManager:
             except Exception as e:
                 logger.error(f"❌ Error في المزامنة الفورية: {e}")
         
+        if not self.background_sync:
+            sync_in_background()
+            return
+        
         # فحص عدد الخيوط المسموح
         active_threads = [t for t in self.sync_thread_pool if t.is_alive()]
         max_threads = self.control_settings.get('max_sync_threads', 10)
@@ -859,6 +1025,11 @@ class SimpleHybridManager:
             # 6. مزامنة الإعدادات
             self._sync_settings_from_supabase()
             
+            # 7. مزامنة قوالب البصمة (مقارنة البصمات فقط، ولا تتكرر أسرع من template_sync_interval)
+            if time.time() - getattr(self, '_last_template_sync', 0) >= self.template_sync_interval:
+                self.sync_fingerprint_templates_from_supabase()
+                self._last_template_sync = time.time()
+            
             logger.info("✅ اكتملت المزامنة من Supabase إلى البرنامج")
             
             # 🆕 Update hash البيانات بعد المزامنة
@@ -868,13 +1039,13 @@ class SimpleHybridManager:
         except Exception as e:
             logger.error(f"❌ Error في المزامنة من Supabase: {e}")
     
-    def _sync_employees_from_supabase(self):
-        """مزامنة الموظفين من Supabase"""
+    def _sync_employees_from_supabase(self) -> bool:
+        """مزامنة الموظفين من Supabase - False إن لم يُسحب شيء"""
         try:
             # الحصول على الموظفين من Supabase
             supabase_employees = self.supabase_manager.get_all_employees()
             if not supabase_employees:
-                return
+                return False
             
             # الحصول على الموظفين المحليين
             local_employees = {emp['id']: emp for emp in self.get_all_employees()}
@@ -907,9 +1078,11 @@ class SimpleHybridManager:
             
             conn.commit()
             conn.close()
+            return True
             
         except Exception as e:
             logger.error(f"❌ Error في مزامنة الموظفين من Supabase: {e}")
+            return False
     
     def _sync_users_from_supabase(self):
         """مزامنة المستخدمين من Supabase"""
@@ -1189,6 +1362,7 @@ class SimpleHybridManager:
             
             conn.commit()
             conn.close()
+            self.holidays_generation += 1
             logger.info(f"✅ تم مزامنة {len(supabase_holidays)} إجازة من Supabase")
             
         except Exception as e:
@@ -1421,6 +1595,141 @@ class SimpleHybridManager:
         """Delete إجازة محلية"""
         cursor.execute('DELETE FROM holidays WHERE id = ?', (holiday_id,))
     
+    # === القراءة عند الطلب (وضع serverless) ===
+    
+    def enable_read_through(self):
+        """
+        وضع serverless: لا تنزيل كامل عند البدء ولا خيوط خلفية.
+        الموظفون والمستخدمون يُجلبون من Supabase عند أول طلب ويُخزَّنون محلياً،
+        والجداول المرجعية الصغيرة تُحمَّل عند أول استخدام وتتجدد كل read_through_ttl.
+        """
+        self.read_through = True
+        self.background_sync = False
+    
+    def _ensure_read_through(self, table_name: str):
+        """تحميل جدول مرجعي (المواقع/الإجازات/الإعدادات) من Supabase عند انتهاء صلاحيته"""
+        if not self.read_through:
+            return
+        loaded_at = self._read_through_loaded.get(table_name)
+        if loaded_at is not None and time.time() - loaded_at < self.read_through_ttl:
+            return
+        # التسجيل قبل التحميل يمنع الاستدعاء المتكرر من داخل دوال المزامنة نفسها
+        self._read_through_loaded[table_name] = time.time()
+        try:
+            if self.supabase_manager is None:
+                self.supabase_manager = SupabaseManager()
+            if table_name == 'locations':
+                self._sync_locations_from_supabase()
+            elif table_name == 'holidays':
+                self._sync_holidays_from_supabase()
+            elif table_name == 'app_settings':
+                self._sync_settings_from_supabase()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed في تحميل {table_name} عند الطلب: {e}")
+    
+    def _read_through_employee(self, column: str, value: Any) -> Optional[Dict]:
+        """جلب موظف غير موجود محلياً من Supabase وتخزينه"""
+        if not self.read_through or value in (None, ''):
+            return None
+        try:
+            if self.supabase_manager is None:
+                self.supabase_manager = SupabaseManager()
+            employee = self.supabase_manager.find_employee(column, value)
+            if not employee:
+                return None
+            
+            row = (
+                employee.get('id'),
+                employee.get('employee_code') or f"EMP_{employee.get('id')}",
+                employee.get('name') or 'Unknown',
+                employee.get('job_title') or '',
+                employee.get('department') or '',
+                employee.get('phone_number') or f"PHONE_{employee.get('id')}",
+                employee.get('web_fingerprint') or '',
+                employee.get('device_token') or '',
+                employee.get('qr_code') or ''
+            )
+            conn = sqlite3.connect(self.local_db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO employees
+                (id, employee_code, name, job_title, department, phone_number, web_fingerprint, device_token, qr_code, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', row)
+            conn.commit()
+            conn.close()
+            
+            return {
+                'id': row[0],
+                'employee_code': row[1],
+                'name': row[2],
+                'job_title': row[3],
+                'department': row[4],
+                'phone_number': row[5],
+                'web_fingerprint': row[6],
+                'device_token': row[7],
+                'qr_code': row[8]
+            }
+        except Exception as e:
+            logger.error(f"❌ Error في جلب الموظف عند الطلب ({column}): {e}")
+            return None
+    
+    def _read_through_user(self, username: str) -> Optional[Dict]:
+        """جلب مستخدم غير موجود محلياً من Supabase وتخزينه"""
+        if not self.read_through or not username:
+            return None
+        try:
+            if self.supabase_manager is None:
+                self.supabase_manager = SupabaseManager()
+            user = self.supabase_manager.get_user_by_username(username)
+            if not user:
+                return None
+            
+            conn = sqlite3.connect(self.local_db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO users (id, username, password, role)
+                VALUES (?, ?, ?, ?)
+            ''', (user.get('id'), user.get('username'), user.get('password', ''), user.get('role', 'Viewer')))
+            conn.commit()
+            conn.close()
+            
+            return {
+                'id': user.get('id'),
+                'username': user.get('username'),
+                'password': user.get('password', ''),
+                'role': user.get('role', 'Viewer'),
+                'created_at': user.get('created_at'),
+                'updated_at': user.get('updated_at')
+            }
+        except Exception as e:
+            logger.error(f"❌ Error في جلب المستخدم عند الطلب: {e}")
+            return None
+    
+    def _read_through_attendance_today(self, employee_id: int, date_str: str) -> List[tuple]:
+        """
+        سجلات اليوم (check_time, type) من المصدرين: Supabase (قد تكون كُتبت من حاوية أخرى)
+        والقاعدة المحلية (ما كُتب هنا ولم يُزامن بعد). لا تُخزَّن لأنها بيانات متغيرة.
+        """
+        records = set()
+        try:
+            conn = sqlite3.connect(self.local_db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT check_time, type FROM attendance WHERE employee_id = ? AND date = ?',
+                (employee_id, date_str)
+            )
+            records.update(cursor.fetchall())
+            conn.close()
+            
+            if self.supabase_manager is None:
+                self.supabase_manager = SupabaseManager()
+            for record in self.supabase_manager.get_employee_attendance(employee_id, date_str, date_str):
+                records.add((record.get('check_time'), record.get('type')))
+        except Exception as e:
+            logger.warning(f"⚠️ Error في جلب سجلات اليوم عند الطلب: {e}")
+        return sorted(r for r in records if r[0])
+    
     # === دوال إدارة الموظفين ===
     
     def get_all_employees(self) -> List[Dict]:
@@ -1661,8 +1970,9 @@ class SimpleHybridManager:
             cursor = conn.cursor()
             
             cursor.execute('DELETE FROM employees WHERE id = ?', (employee_id,))
+            cursor.execute('DELETE FROM fingerprint_templates WHERE employee_id = ?', (employee_id,))
             
-            # Add إلى قائمة انتظار المزامنة
+            # Add إلى قائمة انتظار المزامنة (Supabase يحذف القوالب عبر ON DELETE CASCADE)
             self._add_to_sync_queue("employees", employee_id, "DELETE", {'id': employee_id})
             
             # مزامنة فورية
@@ -1678,6 +1988,7 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في Delete موظف: {e}")
             return False
     
+    @metrics.timed()
     def update_employee_device_info(self, employee_id: int, fingerprint: str, token: str) -> bool:
         """Update معلومات جهاز الموظف مع مزامنة فورية"""
         try:
@@ -1690,14 +2001,14 @@ class SimpleHybridManager:
                 WHERE id = ?
             ''', (fingerprint, token, employee_id))
             
-            conn.commit()
-            conn.close()
-            
-            # Add إلى قائمة انتظار المزامنة
+            # Add إلى قائمة انتظار المزامنة (نفس المعاملة)
             self._add_to_sync_queue("employees", employee_id, "UPDATE", {
                 'web_fingerprint': fingerprint,
                 'device_token': token
-            })
+            }, cursor=cursor)
+            
+            conn.commit()
+            conn.close()
             
             # مزامنة فورية
             self._immediate_sync("employees", employee_id, "UPDATE", {
@@ -1724,14 +2035,14 @@ class SimpleHybridManager:
                 WHERE id = ?
             ''', (employee_id,))
             
-            conn.commit()
-            conn.close()
-            
-            # Add إلى قائمة انتظار المزامنة
+            # Add إلى قائمة انتظار المزامنة (نفس المعاملة)
             self._add_to_sync_queue("employees", employee_id, "UPDATE", {
                 'web_fingerprint': None,
                 'device_token': None
-            })
+            }, cursor=cursor)
+            
+            conn.commit()
+            conn.close()
             
             # مزامنة فورية
             self._immediate_sync("employees", employee_id, "UPDATE", {
@@ -1870,8 +2181,8 @@ class SimpleHybridManager:
             # Delete المستخدم
             cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
             
-            # Add إلى قائمة انتظار المزامنة
-            self._add_to_sync_queue("users", user_id, "DELETE", {'username': username})
+            # Add إلى قائمة انتظار المزامنة (نفس المعاملة - الاتصال يحمل قفل الكتابة)
+            self._add_to_sync_queue("users", user_id, "DELETE", {'username': username}, cursor=cursor)
             
             # مزامنة فورية
             self._immediate_sync("users", user_id, "DELETE", {'username': username})
@@ -1915,16 +2226,6 @@ class SimpleHybridManager:
             else:
                 current_date = datetime.now().strftime('%Y-%m-%d')
             
-            # إدخال في قاعدة البيانات المحلية
-            cursor.execute('''
-                INSERT INTO attendance (employee_id, check_time, date, type, notes, location_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (employee_id, current_time, current_date, attendance_type, notes, location_id))
-            
-            record_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
             # إعداد البيانات للمزامنة
             sync_data = {
                 'employee_id': employee_id,
@@ -1935,24 +2236,407 @@ class SimpleHybridManager:
                 'location_id': location_id
             }
             
+            # إدخال في قاعدة البيانات المحلية مع عملية المزامنة في نفس المعاملة
+            try:
+                cursor.execute('''
+                    INSERT INTO attendance (employee_id, check_time, date, type, notes, location_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (employee_id, current_time, current_date, attendance_type, notes, location_id))
+                record_id = cursor.lastrowid
+                self._add_to_sync_queue("attendance", record_id, "INSERT", sync_data, cursor=cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            
             logger.info(f"✅ تم تسجيل حضور محلياً: Employee ID {employee_id}")
             
             # مزامنة فورية في الخلفية
             self._immediate_sync("attendance", record_id, "INSERT", sync_data)
             
-            # Add إلى قائمة انتظار المزامنة
-            self._add_to_sync_queue("attendance", record_id, "INSERT", sync_data)
-            
             return record_id
             
         except Exception as e:
             logger.error(f"❌ Error في تسجيل حضور: {e}")
             return None
     
+    @metrics.timed()
+    def get_attendance_ids_by_idempotency_keys(self, keys: List[str]) -> Dict[str, int]:
+        """البحث عن مفاتيح التكرار الموجودة عبر الفهرس الفريد (بدون مسح الجدول)"""
+        found = {}
+        if not keys:
+            return found
+        try:
+            conn = sqlite3.connect(self.local_db_path)
+            cursor = conn.cursor()
+            # حد SQLite لعدد المعاملات في الاستعلام الواحد
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(
+                    f'SELECT idempotency_key, id FROM attendance WHERE idempotency_key IN ({placeholders})',
+                    chunk
+                )
+                found.update(cursor.fetchall())
+            conn.close()
+        except Exception as e:
+            logger.error(f"❌ Error في البحث عن مفاتيح التكرار: {e}")
+        return found
+    
+    @metrics.timed()
+    def get_day_states(self, employee_ids: List[int], dates: List[str]) -> Dict[tuple, Dict]:
+        """
+        حالة كل (موظف، يوم) في استعلام واحد: آخر إجراء ووقت أول تسجيل حضور.
+        تُستخدم للتحقق من تسلسل الدفعات دون استعلام لكل بصمة.
+        """
+        states = {}
+        if not employee_ids or not dates:
+            return states
+        try:
+            conn = sqlite3.connect(self.local_db_path)
+            cursor = conn.cursor()
+            date_placeholders = ','.join('?' * len(dates))
+            for start in range(0, len(employee_ids), 500):
+                chunk = employee_ids[start:start + 500]
+                emp_placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT employee_id, date, type, check_time FROM attendance
+                    WHERE date IN ({date_placeholders}) AND employee_id IN ({emp_placeholders})
+                    ORDER BY check_time ASC
+                ''', list(dates) + list(chunk))
+                for employee_id, date, punch_type, check_time in cursor.fetchall():
+                    state = states.setdefault((employee_id, date), {'last_action': None, 'check_in_time': None})
+                    state['last_action'] = punch_type
+                    if punch_type == 'Check-In' and state['check_in_time'] is None:
+                        state['check_in_time'] = check_time
+            conn.close()
+        except Exception as e:
+            logger.error(f"❌ Error في الحصول على حالة الأيام: {e}")
+        return states
+    
+    @metrics.timed()
+    def get_employee_code_index(self) -> Dict[str, int]:
+        """فهرس كود الموظف -> المعرف في استعلام واحد (لربط مستخدمي أجهزة ZK بالموظفين)"""
+        try:
+            conn = sqlite3.connect(self.local_db_path)
+            cursor = conn.cursor()
+            cursor.execute('SELECT employee_code, id FROM employees')
+            index = {str(code): employee_id for code, employee_id in cursor.fetchall()}
+            conn.close()
+            return index
+        except Exception as e:
+            logger.error(f"❌ Error في بناء فهرس أكواد الموظفين: {e}")
+            return {}
+    
+    def get_device_watermark(self, device_key: str) -> Optional[Dict]:
+        """آخر سجل تم استيراده من جهاز ZK"""
+        try:
+            conn = sqlite3.connect(self.local_db_path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM zk_device_watermarks WHERE device_key = ?', (device_key,))
+            row = cursor.fetchone()
+            conn.close()
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"❌ Error في قراءة علامة الجهاز {device_key}: {e}")
+            return None
+    
+    def save_device_watermark(self, watermark: Dict) -> bool:
+        """حفظ علامة جهاز ZK خارج دفعة إدخال (مثلاً عندما لا توجد سجلات جديدة مقبولة)"""
+        try:
+            conn = sqlite3.connect(self.local_db_path, timeout=5.0)
+            self._write_device_watermark(conn.cursor(), watermark)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error في حفظ علامة الجهاز: {e}")
+            return False
+    
+    def mark_device_cleared(self, device_key: str) -> bool:
+        """تسجيل مسح سجلات الجهاز - أرقام uid على الجهاز تبدأ من جديد بعد المسح"""
+        try:
+            conn = sqlite3.connect(self.local_db_path, timeout=5.0)
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE zk_device_watermarks
+                SET last_uid = 0, last_cleared_at = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE device_key = ?
+            ''', (datetime.now().isoformat(timespec='seconds'), device_key))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error في تسجيل مسح الجهاز {device_key}: {e}")
+            return False
+    
+    @property
+    def template_store(self) -> FingerprintTemplateStore:
+        return FingerprintTemplateStore(self.local_db_path)
+    
+    def save_fingerprint_template(self, employee_id: int, template, finger_index: int = 0,
+                                  device_type: str = DEFAULT_DEVICE_TYPE) -> bool:
+        """حفظ قالب بصمة مع مزامنته فقط إذا تغيّر محتواه (مقارنة SHA-256)"""
+        try:
+            data = to_template_bytes(template)
+            changed, digest = self.template_store.save(employee_id, data, finger_index, device_type)
+            if not changed:
+                logger.info(f"ℹ️ قالب البصمة للموظف {employee_id} لم يتغير - لا مزامنة")
+                return True
+            
+            sync_data = {
+                'employee_id': employee_id,
+                'finger_index': finger_index,
+                'device_type': device_type,
+                'content_hash': digest,
+                'template_b64': base64.b64encode(data).decode('ascii'),
+                'deleted_at': None,
+            }
+            self._add_to_sync_queue("fingerprint_templates", employee_id, "UPSERT", sync_data)
+            self._immediate_sync("fingerprint_templates", employee_id, "UPSERT", sync_data)
+            logger.info(f"✅ تم حفظ قالب البصمة للموظف {employee_id} ({len(data)} بايت)")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error في حفظ قالب البصمة: {e}")
+            return False
+    
+    def delete_fingerprint_template(self, employee_id: int, finger_index: int = 0,
+                                    device_type: str = DEFAULT_DEVICE_TYPE) -> bool:
+        """حذف قالب بصمة محلياً ونشر الحذف كعلامة (deleted_at) في Supabase"""
+        try:
+            if not self.template_store.delete(employee_id, finger_index, device_type):
+                return True
+            
+            sync_data = {
+                'employee_id': employee_id,
+                'finger_index': finger_index,
+                'device_type': device_type,
+                'content_hash': '',
+                'template_b64': '',
+                'deleted_at': datetime.now(timezone.utc).isoformat(),
+            }
+            self._add_to_sync_queue("fingerprint_templates", employee_id, "DELETE", sync_data)
+            self._immediate_sync("fingerprint_templates", employee_id, "DELETE", sync_data)
+            logger.info(f"🗑️ تم حذف قالب البصمة للموظف {employee_id}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error في حذف قالب البصمة: {e}")
+            return False
+    
+    def update_employee_zk_template(self, employee_id: int, zk_template) -> bool:
+        """
+        توافق مع الواجهة القديمة: القالب يُحفظ في fingerprint_templates وليس في جدول الموظفين
+        (قالب فارغ = حذف، كما كان تفريغ العمود سابقاً)
+        """
+        if not zk_template:
+            return self.delete_fingerprint_template(employee_id)
+        return self.save_fingerprint_template(employee_id, zk_template)
+    
+    def get_fingerprint_templates(self, employee_ids: Optional[List[int]] = None,
+                                  device_type: str = DEFAULT_DEVICE_TYPE) -> Dict[int, List]:
+        """قوالب البصمة لمسار الدفع إلى الأجهزة {employee_id: [(finger_index, bytes)]}"""
+        try:
+            return self.template_store.get_for_employees(employee_ids, device_type)
+        except Exception as e:
+            logger.error(f"❌ Error في قراءة قوالب البصمة: {e}")
+            return {}
+    
+    def sync_fingerprint_templates_from_supabase(self, device_type: str = DEFAULT_DEVICE_TYPE) -> Optional[int]:
+        """
+        سحب القوالب المتغيرة فقط من Supabase: مقارنة البصمات أولاً ثم جلب القوالب المختلفة
+        يُرجع عدد القوالب المحدّثة محلياً، أو None إن فشل السحب
+        """
+        try:
+            if self.supabase_manager is None:
+                self.supabase_manager = SupabaseManager()
+            
+            local_hashes = self.template_store.get_hashes(device_type)
+            remote_hashes = self.supabase_manager.get_fingerprint_template_hashes(device_type)
+            
+            # علامات الحذف: قوالب حُذفت في تثبيت آخر
+            updated = 0
+            live = []
+            for row in remote_hashes:
+                key = (row['employee_id'], row.get('finger_index', 0))
+                if not row.get('deleted_at'):
+                    live.append(row)
+                elif key in local_hashes:
+                    updated += int(self.template_store.delete(key[0], key[1], device_type))
+            
+            changed_ids = sorted({
+                row['employee_id'] for row in live
+                if local_hashes.get((row['employee_id'], row.get('finger_index', 0))) != row['content_hash']
+            })
+            if not changed_ids:
+                if updated:
+                    logger.info(f"📥 تم حذف {updated} قالب بصمة حسب Supabase")
+                return updated
+            
+            for start in range(0, len(changed_ids), 200):
+                rows = self.supabase_manager.get_fingerprint_templates(changed_ids[start:start + 200], device_type)
+                for row in rows:
+                    key = (row['employee_id'], row.get('finger_index', 0))
+                    if row.get('deleted_at') or local_hashes.get(key) == row['content_hash']:
+                        continue
+                    changed, _ = self.template_store.save(row['employee_id'], row['template_b64'],
+                                                          row.get('finger_index', 0), device_type)
+                    updated += int(changed)
+            logger.info(f"📥 تم تحديث {updated} قالب بصمة من Supabase")
+            return updated
+        except Exception as e:
+            logger.error(f"❌ Error في مزامنة قوالب البصمة: {e}")
+            return None
+    
+    def refresh_provisioning_data(self) -> bool:
+        """
+        الموظفون وقوالب البصمة من Supabase قبل بناء لقطة التزويد لأجهزة ZK
+        (التزويد يضيف ويحدّث ولا يحذف من الأجهزة: قاعدة محلية قديمة = قوالب ناقصة أو قديمة). False إن تعذر السحب
+        """
+        if self.supabase_manager is None:
+            self.supabase_manager = SupabaseManager()
+        if not self._sync_employees_from_supabase():
+            return False
+        return self.sync_fingerprint_templates_from_supabase() is not None
+    
+    def get_device_push_state(self, device_key: str) -> Dict:
+        """بصمات القوالب المدفوعة لجهاز {(employee_id, finger_index): content_hash}"""
+        try:
+            conn = sqlite3.connect(self.local_db_path)
+            rows = conn.execute('''
+                SELECT employee_id, finger_index, content_hash FROM zk_device_push_state WHERE device_key = ?
+            ''', (device_key,)).fetchall()
+            conn.close()
+            return {(employee_id, finger_index): digest for employee_id, finger_index, digest in rows}
+        except Exception as e:
+            logger.error(f"❌ Error في قراءة حالة الدفع للجهاز {device_key}: {e}")
+            return {}
+    
+    def record_device_push(self, device_key: str, pushed: List[Dict]) -> bool:
+        """تسجيل دفعة قوالب تم رفعها بنجاح (employee_id, finger_index, content_hash, device_uid)"""
+        if not pushed:
+            return True
+        try:
+            conn = sqlite3.connect(self.local_db_path, timeout=5.0)
+            conn.executemany('''
+                INSERT INTO zk_device_push_state (device_key, employee_id, finger_index, content_hash, device_uid, pushed_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(device_key, employee_id, finger_index) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    device_uid = excluded.device_uid,
+                    pushed_at = CURRENT_TIMESTAMP
+            ''', [(device_key, item['employee_id'], item['finger_index'], item['content_hash'], item.get('device_uid'))
+                  for item in pushed])
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error في تسجيل الدفع للجهاز {device_key}: {e}")
+            return False
+    
+    def forget_device_push(self, device_key: str, employee_ids: Optional[List[int]] = None) -> bool:
+        """نسيان ما دُفع لجهاز (مثلاً بعد إعادة ضبطه أو حذف مستخدمين منه)"""
+        try:
+            conn = sqlite3.connect(self.local_db_path, timeout=5.0)
+            if employee_ids is None:
+                conn.execute('DELETE FROM zk_device_push_state WHERE device_key = ?', (device_key,))
+            else:
+                conn.executemany('DELETE FROM zk_device_push_state WHERE device_key = ? AND employee_id = ?',
+                                 [(device_key, employee_id) for employee_id in employee_ids])
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error في مسح حالة الدفع للجهاز {device_key}: {e}")
+            return False
+    
+    @staticmethod
+    def _write_device_watermark(cursor, watermark: Dict):
+        cursor.execute('''
+            INSERT INTO zk_device_watermarks (device_key, last_timestamp, last_uid, total_ingested, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(device_key) DO UPDATE SET
+                last_timestamp = excluded.last_timestamp,
+                last_uid = excluded.last_uid,
+                total_ingested = zk_device_watermarks.total_ingested + excluded.total_ingested,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (watermark['device_key'], watermark.get('last_timestamp'),
+              watermark.get('last_uid'), watermark.get('ingested', 0)))
+    
+    @metrics.timed()
+    def record_attendance_batch(self, records: List[Dict], watermark: Optional[Dict] = None) -> List[Optional[int]]:
+        """
+        إدخال دفعة سجلات حضور في معاملة واحدة مع عملية مزامنة مجمعة واحدة.
+        يُرجع معرف السجل لكل عنصر، أو None إذا كان مفتاح التكرار مسجلاً مسبقاً.
+        watermark: علامة جهاز ZK تُحفظ في نفس المعاملة (لا تتقدم العلامة إلا مع السجلات)
+        """
+        record_ids: List[Optional[int]] = []
+        if not records:
+            return record_ids
+        
+        conn = sqlite3.connect(self.local_db_path, timeout=5.0)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            for record in records:
+                # INSERT OR IGNORE: الفهرس الفريد يحسم سباق دفعتين بنفس المفتاح
+                cursor.execute('''
+                    INSERT OR IGNORE INTO attendance
+                    (employee_id, check_time, date, type, notes, location_id, duration_hours, idempotency_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    record.get('employee_id'), record.get('check_time'), record.get('date'),
+                    record.get('type'), record.get('notes', ''), record.get('location_id'),
+                    record.get('duration_hours'), record.get('idempotency_key')
+                ))
+                record_ids.append(cursor.lastrowid if cursor.rowcount else None)
+            
+            sync_records = []
+            for record, record_id in zip(records, record_ids):
+                if record_id is None:
+                    continue
+                sync_records.append({
+                    'employee_id': record.get('employee_id'),
+                    'check_time': record.get('check_time'),
+                    'date': record.get('date'),
+                    'type': record.get('type'),
+                    'notes': record.get('notes', ''),
+                    'location_id': record.get('location_id'),
+                    'duration_hours': record.get('duration_hours'),
+                    'idempotency_key': record.get('idempotency_key')
+                })
+            if sync_records:
+                # مسار واحد: طابور sync_queue فقط، في نفس المعاملة
+                # (Supabase يُحدِّث على idempotency_key عند إعادة الإرسال)
+                first_id = next(r for r in record_ids if r is not None)
+                self._add_to_sync_queue("attendance", first_id, "BULK_INSERT", {'records': sync_records},
+                                        cursor=cursor)
+            if watermark:
+                self._write_device_watermark(cursor, dict(watermark, ingested=len(sync_records)))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"❌ Error في إدخال دفعة الحضور: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        if sync_records:
+            logger.info(f"✅ تم تسجيل {len(sync_records)} سجل حضور محلياً في دفعة واحدة")
+            if self.instant_sync and not self.background_sync:
+                # serverless: لا عامل مزامنة يفرّغ الطابور، فيُفرَّغ داخل الطلب
+                self._process_sync_queue()
+        
+        return record_ids
+    
     # === دوال إدارة الإعدادات ===
     
+    @metrics.timed()
     def get_all_settings(self) -> Dict:
         """الحصول على جميع الإعدادات من قاعدة البيانات المحلية - محدث"""
+        self._ensure_read_through('app_settings')
         try:
             conn = sqlite3.connect(self.local_db_path)
             cursor = conn.cursor()
@@ -2094,6 +2778,7 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في الحصول على المستخدم: {e}")
             return None
     
+    @metrics.timed()
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """الحصول على مستخدم بواسطة اسم المستخدم"""
         try:
@@ -2117,7 +2802,7 @@ class SimpleHybridManager:
                     'created_at': None,  # غير متوفر في قاعدة البيانات المحلية
                     'updated_at': None   # غير متوفر في قاعدة البيانات المحلية
                 }
-            return None
+            return self._read_through_user(username)
             
         except Exception as e:
             logger.error(f"❌ Error في الحصول على المستخدم: {e}")
@@ -2176,29 +2861,20 @@ class SimpleHybridManager:
             return False
     
     def search_users(self, search_term: str) -> List[Dict]:
-        """الSearch عن المستخدمين"""
+        """الSearch عن المستخدمين (FTS5 بالبادئة مرتب حسب الصلة، أو LIKE إن لم يتوفر)"""
         try:
-            conn = sqlite3.connect(self.local_db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT id, username, password, role
-                FROM users 
-                WHERE username LIKE ? OR role LIKE ?
-            ''', (f'%{search_term}%', f'%{search_term}%'))
-            
-            results = cursor.fetchall()
-            conn.close()
+            results = self.full_text_search.search_users(search_term)
             
             users = []
             for result in results:
                 users.append({
-                    'id': result[0],
-                    'username': result[1],
-                    'password': result[2],
-                    'role': result[3],
+                    'id': result['id'],
+                    'username': result['username'],
+                    'password': result['password'],
+                    'role': result['role'],
                     'created_at': None,
-                    'updated_at': None
+                    'updated_at': None,
+                    'search_highlight': result.get('search_highlight')
                 })
             
             return users
@@ -2207,6 +2883,14 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في الSearch عن المستخدمين: {e}")
             return []
     
+    def search_employees(self, search_term: str, limit: Optional[int] = None) -> List[Dict]:
+        """البحث عن الموظفين في القاعدة المحلية (الاسم، الكود، الهاتف، القسم، المسمى الوظيفي) - limit=None: الكل"""
+        try:
+            return self.full_text_search.search_employees(search_term, limit=limit)
+        except Exception as e:
+            logger.error(f"❌ Error في البحث عن الموظفين: {e}")
+            return []
+    
     def verify_user_password(self, username: str, password: str) -> bool:
         """التحقق من صحة كلمة مرور المستخدم"""
         try:
@@ -2219,6 +2903,7 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في التحقق من كلمة المرور: {e}")
             return False
     
+    @metrics.timed()
     def get_employee_by_id(self, employee_id: int) -> Optional[Dict]:
         """الحصول على موظف بواسطة المعرف"""
         try:
@@ -2245,7 +2930,7 @@ class SimpleHybridManager:
                     'device_token': result[7] or '',
                     'qr_code': result[8] or ''
                 }
-            return None
+            return self._read_through_employee('id', employee_id)
             
         except Exception as e:
             logger.error(f"❌ Error في الحصول على الموظف: {e}")
@@ -2281,6 +2966,7 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في الحصول على الموظف: {e}")
             return None
     
+    @metrics.timed()
     def get_employee_by_code(self, employee_code: str) -> Optional[Dict]:
         """الحصول على موظف بواسطة كود الموظف"""
         try:
@@ -2307,7 +2993,7 @@ class SimpleHybridManager:
                     'device_token': result[7] or '',
                     'qr_code': result[8] or ''
                 }
-            return None
+            return self._read_through_employee('employee_code', employee_code)
             
         except Exception as e:
             logger.error(f"❌ Error في الحصول على الموظف: {e}")
@@ -2343,8 +3029,10 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في الحصول على المستخدمين: {e}")
             return []
     
+    @metrics.timed()
     def get_all_locations(self) -> List[Dict]:
         """الحصول على جميع المواقع"""
+        self._ensure_read_through('locations')
         try:
             conn = sqlite3.connect(self.local_db_path)
             cursor = conn.cursor()
@@ -2372,6 +3060,7 @@ class SimpleHybridManager:
     
     def get_all_holidays(self) -> List[Dict]:
         """الحصول على جميع الإجازات"""
+        self._ensure_read_through('holidays')
         try:
             conn = sqlite3.connect(self.local_db_path)
             cursor = conn.cursor()
@@ -2556,6 +3245,7 @@ class SimpleHybridManager:
             holiday_id = cursor.lastrowid
             conn.commit()
             conn.close()
+            self.holidays_generation += 1
             
             # Add إلى قائمة انتظار المزامنة
             self._add_to_sync_queue("holidays", holiday_id, "INSERT", {'description': description, 'date': date_str})
@@ -2597,6 +3287,7 @@ class SimpleHybridManager:
             
             conn.commit()
             conn.close()
+            self.holidays_generation += 1
             
             logger.info(f"✅ تم Delete إجازة: {holiday_name} - {holiday_date}")
             return True
@@ -2632,12 +3323,18 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في Update الإعداد: {e}")
             return False
     
+    @metrics.timed()
     def add_attendance_record(self, data: Dict) -> Optional[int]:
         """Add سجل حضور"""
         return self.record_attendance(data)
     
+    @metrics.timed()
     def get_last_action_today(self, employee_id: int, date_str: str) -> Optional[str]:
         """الحصول على آخر إجراء للموظف في اليوم"""
+        if self.read_through:
+            records = self._read_through_attendance_today(employee_id, date_str)
+            return records[-1][1] if records else None
+        
         try:
             conn = sqlite3.connect(self.local_db_path)
             cursor = conn.cursor()
@@ -2658,8 +3355,13 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في الحصول على آخر إجراء: {e}")
             return None
     
+    @metrics.timed()
     def get_check_in_time_today(self, employee_id: int, date_str: str) -> Optional[str]:
         """الحصول على وقت تسجيل الحضور للموظف في اليوم"""
+        if self.read_through:
+            check_ins = [r[0] for r in self._read_through_attendance_today(employee_id, date_str) if r[1] == 'Check-In']
+            return check_ins[0] if check_ins else None
+        
         try:
             conn = sqlite3.connect(self.local_db_path)
             cursor = conn.cursor()
@@ -2680,6 +3382,7 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في الحصول على وقت تسجيل الحضور: {e}")
             return None
     
+    @metrics.timed()
     def update_checkout_with_duration(self, record_id: int, duration_hours: float) -> bool:
         """Update سجل تسجيل الخروج بمدة العمل"""
         try:
@@ -2840,9 +3543,9 @@ class SimpleHybridManager:
                 'sync_interval': self.sync_interval,
                 'supabase_sync_interval': self.supabase_sync_interval,
                 'sync_threads': {
-                    'main_sync': hasattr(self, 'sync_thread') and self.sync_thread.is_alive() if hasattr(self, 'sync_thread') else False,
-                    'supabase_sync': hasattr(self, 'supabase_sync_thread') and self.supabase_sync_thread.is_alive() if hasattr(self, 'supabase_sync_thread') else False,
-                    'instant_sync': hasattr(self, 'instant_sync_thread') and self.instant_sync_thread.is_alive() if hasattr(self, 'instant_sync_thread') else False
+                    'main_sync': bool(self.sync_thread and self.sync_thread.is_alive()),
+                    'supabase_sync': bool(self.supabase_sync_thread and self.supabase_sync_thread.is_alive()),
+                    'instant_sync': bool(self.instant_sync_thread and self.instant_sync_thread.is_alive())
                 },
                 'control_settings': self.control_settings,
                 'detailed_stats': self.detailed_stats,
@@ -3003,6 +3706,29 @@ class SimpleHybridManager:
             logger.error(f"❌ Error في الحصول على تفاصيل قائمة المزامنة: {e}")
             return {}
     
+    def get_sync_queue_lag(self) -> Dict:
+        """عمق قائمة المزامنة المعلقة وعمر أقدم عملية معلقة بالثواني (للمراقبة)"""
+        try:
+            conn = sqlite3.connect(self.local_db_path)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(MAX(strftime('%s', 'now') - strftime('%s', created_at)), 0)
+                FROM sync_queue WHERE status = 'pending'
+            """)
+            pending, oldest_age = cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) FROM sync_queue WHERE status = 'failed'")
+            failed = cursor.fetchone()[0]
+            conn.close()
+            return {
+                'pending': pending,
+                'failed': failed,
+                'oldest_pending_age_seconds': float(oldest_age or 0),
+                'memory_queue_size': self.sync_queue.qsize() if hasattr(self, 'sync_queue') else 0
+            }
+        except Exception as e:
+            logger.error(f"❌ Error في حساب تأخر المزامنة: {e}")
+            return {}
+
     def clear_sync_queue(self) -> bool:
         """مسح قائمة انتظار المزامنة"""
         try:
@@ -3069,6 +3795,9 @@ class SimpleHybridManager:
     
     def shutdown(self):
         """إيقاف النظام الهجين وDelete قاعدة البيانات المحلية"""
+        if getattr(self, '_shutdown_done', False):
+            return  # استدعاء صريح ثم __del__
+        self._shutdown_done = True
         try:
             logger.info("🔄 إيقاف النظام الهجين - Supabase First...")
             
@@ -3163,6 +3892,9 @@ class SimpleHybridManager:
     
     def __getattr__(self, name):
         """توجيه باقي الدوال إلى المدير الأصلي"""
+        if name.startswith('_'):
+            # السمات الخاصة (hasattr في التنظيف مثلاً) لا تُنشئ DatabaseManager وملف attendance.db
+            raise AttributeError(name)
         if self.original_db is None:
             self.original_db = DatabaseManager()
         return getattr(self.original_db, name)
@@ -3316,6 +4048,7 @@ class SimpleHybridManager:
                 'supabase_first': False
             }
     
+    @metrics.timed()
     def get_employee_by_phone(self, phone_number: str) -> Optional[Dict]:
         """الحصول على موظف بواسطة رقم الهاتف"""
         try:
@@ -3342,12 +4075,13 @@ class SimpleHybridManager:
                     'device_token': result[7] or '',
                     'qr_code': result[8] or ''
                 }
-            return None
+            return self._read_through_employee('phone_number', phone_number)
             
         except Exception as e:
             logger.error(f"❌ Error في الحصول على الموظف: {e}")
             return None
     
+    @metrics.timed()
     def get_employee_by_token(self, device_token: str) -> Optional[Dict]:
         """الحصول على موظف بواسطة device_token"""
         try:
@@ -3374,12 +4108,13 @@ class SimpleHybridManager:
                     'device_token': result[7] or '',
                     'qr_code': result[8] or ''
                 }
-            return None
+            return self._read_through_employee('device_token', device_token)
             
         except Exception as e:
             logger.error(f"❌ Error في الحصول على الموظف بواسطة token: {e}")
             return None
     
+    @metrics.timed()
     def execute_query(self, query: str, params: tuple = (), commit: bool = False, fetch: bool = False):
         """تنفيذ استعلام SQL مع مزامنة فورية"""
         try:
@@ -3926,9 +4661,9 @@ class SimpleHybridManager:
         try:
             active_threads = [t for t in self.sync_thread_pool if t.is_alive()] if hasattr(self, 'sync_thread_pool') else []
             return {
-                'main_sync_thread_alive': hasattr(self, 'sync_thread') and self.sync_thread.is_alive(),
-                'supabase_sync_thread_alive': hasattr(self, 'supabase_sync_thread') and self.supabase_sync_thread.is_alive(),
-                'instant_sync_thread_alive': hasattr(self, 'instant_sync_thread') and self.instant_sync_thread.is_alive(),
+                'main_sync_thread_alive': bool(self.sync_thread and self.sync_thread.is_alive()),
+                'supabase_sync_thread_alive': bool(self.supabase_sync_thread and self.supabase_sync_thread.is_alive()),
+                'instant_sync_thread_alive': bool(self.instant_sync_thread and self.instant_sync_thread.is_alive()),
                 'active_sync_threads': len(active_threads),
                 'max_threads': self.control_settings.get('max_sync_threads', 10),
                 'threads_usage': f"{len(active_threads)}/{self.control_settings.get('max_sync_threads', 10)}"
@@ -4234,9 +4969,9 @@ class SimpleHybridManager:
             
             # فحص الخيوط
             threads_ok = all([
-                hasattr(self, 'sync_thread') and self.sync_thread.is_alive(),
-                hasattr(self, 'supabase_sync_thread') and self.supabase_sync_thread.is_alive(),
-                hasattr(self, 'instant_sync_thread') and self.instant_sync_thread.is_alive()
+                bool(self.sync_thread and self.sync_thread.is_alive()),
+                bool(self.supabase_sync_thread and self.supabase_sync_thread.is_alive()),
+                bool(self.instant_sync_thread and self.instant_sync_thread.is_alive())
             ])
             health_status['checks']['threads'] = {
                 'status': 'OK' if threads_ok else 'ERROR',
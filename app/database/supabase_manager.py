@@ -44,6 +44,24 @@ class SupabaseManager:
             print(f"Error getting employee: {e}")
             return None
     
+    def find_employee(self, column: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Retrieve a single employee by an arbitrary column (code, phone, token...)."""
+        try:
+            result = self.client.table('employees').select('*').eq(column, value).limit(1).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error finding employee by {column}: {e}")
+            return None
+    
+    def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        """Retrieve a user by username."""
+        try:
+            result = self.client.table('users').select('*').eq('username', username).limit(1).execute()
+            return result.data[0] if result.data else None
+        except Exception as e:
+            print(f"Error getting user: {e}")
+            return None
+    
     # Attendance Management
     def record_attendance(self, attendance_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Record a new attendance entry."""
@@ -54,6 +72,27 @@ class SupabaseManager:
             print(f"Error recording attendance: {e}")
             return None
     
+    def record_attendance_batch(self, records: List[Dict[str, Any]]) -> bool:
+        """Record many attendance entries in a single request.
+        
+        Entries with an idempotency_key are upserted on it, so replaying a batch never duplicates rows.
+        """
+        if not records:
+            return True
+        try:
+            keyed = [record for record in records if record.get('idempotency_key')]
+            plain = [record for record in records if not record.get('idempotency_key')]
+            if keyed:
+                self.client.table('attendance').upsert(
+                    keyed, on_conflict='idempotency_key', ignore_duplicates=True
+                ).execute()
+            if plain:
+                self.client.table('attendance').insert(plain).execute()
+            return True
+        except Exception as e:
+            print(f"Error recording attendance batch: {e}")
+            return False
+    
     def get_employee_attendance(self, employee_id: int, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
         """Get attendance records for an employee within a date range."""
         try:
@@ -130,6 +169,16 @@ class SupabaseManager:
             print(f"Error getting all attendance: {e}")
             return []
     
+    def get_attendance_version(self) -> Optional[tuple]:
+        """(عدد السجلات، أكبر id) بطلب واحد دون جلب السجلات - لتخزين التجميعات مؤقتاً"""
+        try:
+            result = self.client.table('attendance').select('id', count='exact') \
+                .order('id', desc=True).limit(1).execute()
+            return (result.count or 0, result.data[0]['id'] if result.data else 0)
+        except Exception as e:
+            print(f"Error getting attendance version: {e}")
+            return None
+    
     def get_all_locations(self) -> List[Dict[str, Any]]:
         """الحصول على جميع المواقع"""
         try:
@@ -342,6 +391,50 @@ class SupabaseManager:
             print(f"Error getting all holidays: {e}")
             return []
 
+    # Fingerprint Templates
+    def employee_exists(self, employee_id: int) -> bool:
+        """Check an employee id without fetching employee rows."""
+        try:
+            result = self.client.table('employees').select('id').eq('id', employee_id).limit(1).execute()
+            return bool(result.data)
+        except Exception as e:
+            print(f"Error checking employee: {e}")
+            return False
+
+    def upsert_fingerprint_template(self, template_data: Dict[str, Any]) -> bool:
+        """Insert or replace one fingerprint template (template_b64 + content_hash)."""
+        try:
+            result = self.client.table('fingerprint_templates').upsert(
+                template_data, on_conflict='employee_id,finger_index,device_type'
+            ).execute()
+            return bool(result.data)
+        except Exception as e:
+            print(f"Error upserting fingerprint template: {e}")
+            return False
+
+    def get_fingerprint_template_hashes(self, device_type: str = 'zk') -> List[Dict[str, Any]]:
+        """Get template content hashes only (no template payloads); tombstones carry deleted_at."""
+        try:
+            result = self.client.table('fingerprint_templates') \
+                .select('employee_id,finger_index,content_hash,deleted_at').eq('device_type', device_type).execute()
+            return result.data or []
+        except Exception as e:
+            print(f"Error getting fingerprint template hashes: {e}")
+            return []
+
+    def get_fingerprint_templates(self, employee_ids: List[int], device_type: str = 'zk') -> List[Dict[str, Any]]:
+        """Get full templates for the given employees."""
+        if not employee_ids:
+            return []
+        try:
+            result = self.client.table('fingerprint_templates') \
+                .select('employee_id,finger_index,content_hash,template_b64,deleted_at') \
+                .eq('device_type', device_type).in_('employee_id', employee_ids).execute()
+            return result.data or []
+        except Exception as e:
+            print(f"Error getting fingerprint templates: {e}")
+            return []
+
 # Singleton instance - سيتم إنشاؤه عند الحاجة فقط
 _supabase_manager_instance = None
 
@@ -2,12 +2,21 @@ import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from ..core.supabase_config import supabase_config
+from ..fingerprint.template_store import LEGACY_BASE64_PATTERN
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# bytea of a legacy employees.zk_template value, same rule as to_template_bytes(): canonical base64
+# is decoded, anything else is kept as its UTF-8 bytes, so content_hash matches the desktop's
+LEGACY_TEMPLATE_BYTES_SQL = (
+    "CASE WHEN zk_template ~ '%s' THEN decode(zk_template, 'base64') "
+    "ELSE convert_to(zk_template, 'UTF8') END" % LEGACY_BASE64_PATTERN
+)
+
+
 class SupabaseMigration:
     """
     Handles database migrations for Supabase.
@@ -158,6 +167,50 @@ class SupabaseMigration:
                     $$;
                 """
             },
+            {
+                'name': '0002_fingerprint_templates',
+                'sql': """
+                    -- Binary fingerprint templates, kept out of the employees row
+                    CREATE TABLE IF NOT EXISTS public.fingerprint_templates (
+                        employee_id BIGINT NOT NULL REFERENCES public.employees(id) ON DELETE CASCADE,
+                        finger_index INTEGER NOT NULL DEFAULT 0,
+                        device_type TEXT NOT NULL DEFAULT 'zk',
+                        content_hash TEXT NOT NULL,
+                        template_b64 TEXT NOT NULL,
+                        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                        PRIMARY KEY (employee_id, finger_index, device_type)
+                    );
+
+                    -- Move existing employees.zk_template values, then empty the column
+                    INSERT INTO public.fingerprint_templates (employee_id, finger_index, device_type, content_hash, template_b64)
+                    SELECT id, 0, 'zk', encode(sha256(template), 'hex'), replace(encode(template, 'base64'), E'\\n', '')
+                    FROM (
+                        SELECT id, %(template_bytes)s AS template
+                        FROM public.employees
+                        WHERE zk_template IS NOT NULL AND zk_template <> ''
+                    ) AS legacy
+                    ON CONFLICT (employee_id, finger_index, device_type) DO NOTHING;
+
+                    UPDATE public.employees SET zk_template = NULL WHERE zk_template IS NOT NULL;
+                """ % {'template_bytes': LEGACY_TEMPLATE_BYTES_SQL}
+            },
+            {
+                'name': '0003_attendance_idempotency',
+                'sql': """
+                    -- Replayed kiosk/ZK batches carry the same idempotency key: upsert instead of duplicating
+                    ALTER TABLE public.attendance ADD COLUMN IF NOT EXISTS duration_hours REAL;
+                    ALTER TABLE public.attendance ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_idempotency_key
+                        ON public.attendance(idempotency_key);
+                """
+            },
+            {
+                'name': '0004_fingerprint_template_tombstones',
+                'sql': """
+                    -- A deleted template stays as a tombstone (empty payload) so other installations remove it too
+                    ALTER TABLE public.fingerprint_templates ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+                """
+            },
             # Add more migrations here as needed
         ]
         
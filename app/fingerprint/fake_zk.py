@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+جهاز ZK وهمي داخل العملية بنفس واجهة pyzk.ZK المستخدمة في ZKManager
+يُستخدم لاختبار الاستيراد وقياس الأداء دون جهاز حقيقي
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class FakeAttendance:
+    """مطابق لـ zk.attendance.Attendance"""
+    user_id: str
+    timestamp: datetime
+    status: int = 1
+    punch: int = 0
+    uid: int = 0
+
+
+@dataclass
+class FakeUser:
+    """مطابق لـ zk.user.User"""
+    uid: int
+    name: str
+    privilege: int = 0
+    password: str = ''
+    group_id: str = ''
+    user_id: str = ''
+    card: int = 0
+
+
+@dataclass
+class FakeFinger:
+    """مطابق لـ zk.finger.Finger"""
+    uid: int
+    fid: int
+    valid: int
+    template: bytes
+
+
+class FakeZKDevice:
+    """
+    يحاكي جهاز ZK: سجل حضور في الذاكرة، حالة التفعيل، ومسح السجل.
+    log_read_delay: زمن محاكاة لكل 1000 سجل عند السحب (بالثواني)
+    failure_rate: نسبة فشل الاتصال والسحب والكتابة (لاختبار التأخير الأسي والاستئناف)
+    write_delay: زمن محاكاة لكل مستخدم أو قالب يُكتب على الجهاز (بالثواني)
+    """
+
+    def __init__(self, users: Optional[Iterable[FakeUser]] = None, log_read_delay: float = 0.0,
+                 failure_rate: float = 0.0, write_delay: float = 0.0):
+        self.users: List[FakeUser] = list(users or [])
+        self.templates: Dict[Tuple[int, int], FakeFinger] = {}
+        self.write_delay = write_delay
+        self.writes = 0
+        self.attendance: List[FakeAttendance] = []
+        self.enabled = True
+        self.connected = False
+        self.log_read_delay = log_read_delay
+        self.failure_rate = failure_rate
+        self.disabled_count = 0
+        self._next_uid = 1
+        self._lock = threading.Lock()
+
+    # --- واجهة pyzk.ZK ---
+    def connect(self):
+        self._maybe_fail()
+        self.connected = True
+        return self
+
+    def disconnect(self):
+        self.connected = False
+        return True
+
+    def disable_device(self):
+        self.enabled = False
+        self.disabled_count += 1
+        return True
+
+    def enable_device(self):
+        self.enabled = True
+        return True
+
+    def get_attendance(self) -> List[FakeAttendance]:
+        self._require_connection()
+        self._maybe_fail()
+        with self._lock:
+            records = list(self.attendance)
+        if self.log_read_delay:
+            time.sleep(self.log_read_delay * len(records) / 1000.0)
+        return records
+
+    def get_users(self) -> List[FakeUser]:
+        self._require_connection()
+        return list(self.users)
+
+    def get_templates(self) -> List[FakeFinger]:
+        self._require_connection()
+        self._maybe_fail()
+        with self._lock:
+            return list(self.templates.values())
+
+    def set_user(self, uid=None, name='', privilege=0, password='', group_id='', user_id='', card=0):
+        self._require_connection()
+        self._maybe_fail()
+        self._write()
+        user = FakeUser(uid=uid, name=name, privilege=privilege, password=password,
+                        group_id=group_id, user_id=str(user_id), card=card)
+        with self._lock:
+            self.users = [u for u in self.users if u.uid != uid] + [user]
+
+    def save_user_template(self, user, fingers=()):
+        self.HR_save_usertemplates([[user, list(fingers)]])
+
+    def HR_save_usertemplates(self, user_templates):
+        self._require_connection()
+        self._maybe_fail()
+        for user, fingers in user_templates:
+            with self._lock:
+                if all(u.uid != user.uid for u in self.users):
+                    self.users.append(user)
+            for finger in fingers:
+                self._write()
+                with self._lock:
+                    self.templates[(user.uid, finger.fid)] = FakeFinger(user.uid, finger.fid, 1, bytes(finger.template))
+
+    def delete_user(self, uid=0, user_id=''):
+        self._require_connection()
+        with self._lock:
+            self.users = [u for u in self.users if u.uid != uid]
+            self.templates = {key: f for key, f in self.templates.items() if key[0] != uid}
+
+    def clear_attendance(self):
+        self._require_connection()
+        with self._lock:
+            self.attendance.clear()
+            self._next_uid = 1
+        return True
+
+    # --- أدوات الاختبار ---
+    def punch(self, user_id: str, timestamp: datetime, punch: int = 0) -> FakeAttendance:
+        """إضافة بصمة كما لو سجلها موظف على الجهاز (مرفوضة إذا كان الجهاز معطلاً)"""
+        if not self.enabled:
+            raise RuntimeError("device is disabled")
+        with self._lock:
+            record = FakeAttendance(user_id=str(user_id), timestamp=timestamp, punch=punch, uid=self._next_uid)
+            self._next_uid += 1
+            self.attendance.append(record)
+        return record
+
+    def generate_log(self, user_ids: List[str], count: int, start: Optional[datetime] = None, seed: int = 7):
+        """
+        توليد سجل من count بصمة: لكل موظف حضور صباحي وانصراف مسائي في كل يوم عمل،
+        مرتبة زمنياً كما يسجلها الجهاز
+        """
+        rng = random.Random(seed)
+        start = start or datetime(2025, 1, 1)
+        records = []
+        day = 0
+        while len(records) < count:
+            date = start + timedelta(days=day)
+            for user_id in user_ids:
+                check_in = date.replace(hour=8) + timedelta(minutes=rng.randint(0, 60), seconds=rng.randint(0, 59))
+                check_out = date.replace(hour=16) + timedelta(minutes=rng.randint(0, 90), seconds=rng.randint(0, 59))
+                records.append((check_in, str(user_id), 0))
+                records.append((check_out, str(user_id), 1))
+            day += 1
+        records.sort()
+        for timestamp, user_id, punch in records[:count]:
+            self.punch(user_id, timestamp, punch)
+
+    def _write(self):
+        self.writes += 1
+        if self.write_delay:
+            time.sleep(self.write_delay)
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.connected = False
+            raise ConnectionError("fake device timed out")
+
+    def _require_connection(self):
+        if not self.connected:
+            raise ConnectionError("fake device is not connected")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+مخزن قوالب البصمة الثنائية منفصلاً عن جدول الموظفين
+- جدول fingerprint_templates: قالب BLOB لكل (موظف، إصبع، نوع الجهاز) مع بصمة المحتوى (SHA-256)
+- فهرس يغطي البصمات: مقارنة المحتوى (للمزامنة والدفع) تُقرأ من الفهرس دون صفحات القوالب
+- ترحيل قيم employees.zk_template (نص base64) إلى الجدول الجديد
+- القوالب تُقرأ فقط في مسارات التسجيل والدفع إلى الأجهزة
+"""
+
+import base64
+import hashlib
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEVICE_TYPE = 'zk'
+
+# base64 قانوني بحشو كامل - نفس النمط في ترحيل Supabase 0002 (~ في PostgreSQL) ليتطابق content_hash
+# (\A و\Z لا $: في Python تطابق $ قبل سطر جديد أخير وفي PostgreSQL لا)
+LEGACY_BASE64_PATTERN = r'\A([A-Za-z0-9+/]{4})*([A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?\Z'
+_LEGACY_BASE64 = re.compile(LEGACY_BASE64_PATTERN)
+
+TEMPLATES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS fingerprint_templates (
+        employee_id INTEGER NOT NULL,
+        finger_index INTEGER NOT NULL DEFAULT 0,
+        device_type TEXT NOT NULL DEFAULT 'zk',
+        content_hash TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        template BLOB NOT NULL,
+        PRIMARY KEY (employee_id, finger_index, device_type)
+    )
+'''
+
+TEMPLATES_HASH_INDEX = '''
+    CREATE INDEX IF NOT EXISTS idx_fingerprint_templates_hash
+    ON fingerprint_templates(device_type, employee_id, finger_index, content_hash)
+'''
+
+
+def content_hash(template: bytes) -> str:
+    return hashlib.sha256(template).hexdigest()
+
+
+def to_template_bytes(template: Union[bytes, bytearray, memoryview, str]) -> bytes:
+    """
+    قبول القالب كبايتات أو كنص base64 (الصيغة القديمة في employees.zk_template)
+    النص الذي لا يطابق LEGACY_BASE64_PATTERN يُحفظ كبايتات UTF-8 كما هو
+    """
+    if isinstance(template, (bytes, bytearray, memoryview)):
+        return bytes(template)
+    if _LEGACY_BASE64.fullmatch(template):
+        return base64.b64decode(template)
+    return template.encode('utf-8')
+
+
+class FingerprintTemplateStore:
+    """الوصول إلى جدول fingerprint_templates في قاعدة SQLite المحلية"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    @staticmethod
+    def ensure_schema(cursor):
+        cursor.execute(TEMPLATES_SCHEMA)
+        cursor.execute(TEMPLATES_HASH_INDEX)
+
+    @staticmethod
+    def migrate_from_employees_column(cursor) -> int:
+        """
+        نقل employees.zk_template إلى fingerprint_templates ثم تفريغ العمود
+        (لا يُحذف العمود: SQLite القديم لا يدعم DROP COLUMN، والتفريغ يكفي لتخفيف SELECT *)
+        """
+        cursor.execute('PRAGMA table_info(employees)')
+        if 'zk_template' not in {row[1] for row in cursor.fetchall()}:
+            return 0
+
+        cursor.execute("SELECT id, zk_template FROM employees WHERE zk_template IS NOT NULL AND zk_template != ''")
+        rows = cursor.fetchall()
+        for employee_id, value in rows:
+            template = to_template_bytes(value)
+            cursor.execute('''
+                INSERT OR IGNORE INTO fingerprint_templates
+                (employee_id, finger_index, device_type, content_hash, size, template)
+                VALUES (?, 0, ?, ?, ?, ?)
+            ''', (employee_id, DEFAULT_DEVICE_TYPE, content_hash(template), len(template), sqlite3.Binary(template)))
+        if rows:
+            cursor.execute("UPDATE employees SET zk_template = NULL WHERE zk_template IS NOT NULL")
+            logger.info(f"📦 تم نقل {len(rows)} قالب بصمة من جدول الموظفين إلى fingerprint_templates")
+        return len(rows)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5.0)
+
+    def save(self, employee_id: int, template, finger_index: int = 0,
+             device_type: str = DEFAULT_DEVICE_TYPE) -> Tuple[bool, str]:
+        """حفظ قالب - يُرجع (تغيّر المحتوى؟، البصمة)؛ القالب المطابق لا يُعاد كتابته"""
+        data = to_template_bytes(template)
+        digest = content_hash(data)
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT content_hash FROM fingerprint_templates
+                WHERE employee_id = ? AND finger_index = ? AND device_type = ?
+            ''', (employee_id, finger_index, device_type))
+            row = cursor.fetchone()
+            if row and row[0] == digest:
+                return False, digest
+            cursor.execute('''
+                INSERT OR REPLACE INTO fingerprint_templates
+                (employee_id, finger_index, device_type, content_hash, size, updated_at, template)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+            ''', (employee_id, finger_index, device_type, digest, len(data), sqlite3.Binary(data)))
+            conn.commit()
+            return True, digest
+        finally:
+            conn.close()
+
+    def get(self, employee_id: int, finger_index: int = 0, device_type: str = DEFAULT_DEVICE_TYPE) -> Optional[bytes]:
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT template FROM fingerprint_templates
+                WHERE employee_id = ? AND finger_index = ? AND device_type = ?
+            ''', (employee_id, finger_index, device_type)).fetchone()
+            return bytes(row[0]) if row else None
+        finally:
+            conn.close()
+
+    def get_for_employees(self, employee_ids: Optional[Iterable[int]] = None,
+                          device_type: str = DEFAULT_DEVICE_TYPE) -> Dict[int, List[Tuple[int, bytes]]]:
+        """قوالب عدة موظفين {employee_id: [(finger_index, template)]} - لمسار الدفع إلى الأجهزة"""
+        conn = self._connect()
+        templates: Dict[int, List[Tuple[int, bytes]]] = {}
+        try:
+            if employee_ids is None:
+                rows = conn.execute('''
+                    SELECT employee_id, finger_index, template FROM fingerprint_templates WHERE device_type = ?
+                ''', (device_type,)).fetchall()
+            else:
+                ids = list(employee_ids)
+                rows = []
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    rows.extend(conn.execute(f'''
+                        SELECT employee_id, finger_index, template FROM fingerprint_templates
+                        WHERE device_type = ? AND employee_id IN ({','.join('?' * len(chunk))})
+                    ''', [device_type] + chunk).fetchall())
+            for employee_id, finger_index, template in rows:
+                templates.setdefault(employee_id, []).append((finger_index, bytes(template)))
+            return templates
+        finally:
+            conn.close()
+
+    def get_hashes(self, device_type: str = DEFAULT_DEVICE_TYPE) -> Dict[Tuple[int, int], str]:
+        """بصمات المحتوى فقط {(employee_id, finger_index): hash} - بدون قراءة القوالب"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT employee_id, finger_index, content_hash FROM fingerprint_templates WHERE device_type = ?
+            ''', (device_type,)).fetchall()
+            return {(employee_id, finger_index): digest for employee_id, finger_index, digest in rows}
+        finally:
+            conn.close()
+
+    def delete(self, employee_id: int, finger_index: int = 0, device_type: str = DEFAULT_DEVICE_TYPE) -> bool:
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                DELETE FROM fingerprint_templates WHERE employee_id = ? AND finger_index = ? AND device_type = ?
+            ''', (employee_id, finger_index, device_type))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def delete_for_employee(self, employee_id: int) -> int:
+        conn = self._connect()
+        try:
+            cursor = conn.execute('DELETE FROM fingerprint_templates WHERE employee_id = ?', (employee_id,))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
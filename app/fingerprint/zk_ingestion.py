@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+استيراد تزايدي لسجلات أجهزة البصمة ZK
+- علامة لكل جهاز (آخر وقت/uid مستورد) محفوظة في قاعدة البيانات المحلية
+- تجاهل ما سبق استيراده، وربط مستخدمي الجهاز بالموظفين عبر فهرس مخزن مؤقتاً
+- إدخال السجلات الجديدة في معاملة واحدة مع عملية مزامنة مجمعة واحدة (BatchPunchProcessor)
+- مسح سجل الجهاز فقط بعد التحقق من حفظ كل السجلات
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+
+from app.core.attendance_manager import BatchPunchProcessor
+
+logger = logging.getLogger(__name__)
+
+# حالات البصمة في أجهزة ZK: 0 حضور، 1 انصراف، 2 خروج استراحة، 3 عودة، 4 بدء إضافي، 5 نهاية إضافي
+# السجلات تُحفظ كما هي بدون قاعدة "حضور واحد في اليوم" (انظر enforce_sequence)، والحالة الأصلية تبقى في الملاحظات
+DEFAULT_PUNCH_TYPES = {0: 'Check-In', 1: 'Check-Out', 2: 'Check-Out', 3: 'Check-In', 4: 'Check-In', 5: 'Check-Out'}
+ZK_PUNCH_LABELS = {0: 'check-in', 1: 'check-out', 2: 'break-out', 3: 'break-in', 4: 'overtime-in', 5: 'overtime-out'}
+
+
+class ZKIngestionPipeline:
+    """استيراد سجل جهاز ZK واحد إلى قاعدة البيانات المحلية"""
+
+    def __init__(self, db_manager, device_key: str, location_id: Optional[int] = None,
+                 punch_types: Optional[Dict[int, str]] = None, index_ttl: float = 300.0):
+        self.db_manager = db_manager
+        self.device_key = device_key
+        self.location_id = location_id
+        self.punch_types = punch_types or DEFAULT_PUNCH_TYPES
+        self.index_ttl = index_ttl
+        # الجهاز هو المرجع: استراحات وبصمات متكررة في نفس اليوم تُحفظ ولا تُرفض
+        self.processor = BatchPunchProcessor(db_manager, enforce_sequence=False)
+        self.last_keys: List[str] = []  # مفاتيح آخر استيراد (للتحقق قبل المسح)
+        self._employee_index: Dict[str, int] = {}
+        self._index_loaded_at = 0.0
+
+    def employee_index(self, refresh: bool = False) -> Dict[str, int]:
+        """فهرس user_id على الجهاز (= كود الموظف) -> معرف الموظف، يُعاد تحميله كل index_ttl"""
+        if refresh or not self._employee_index or time.monotonic() - self._index_loaded_at > self.index_ttl:
+            self._employee_index = self.db_manager.get_employee_code_index()
+            self._index_loaded_at = time.monotonic()
+        return self._employee_index
+
+    def ingest(self, zk_manager, clear_after_commit: bool = False, full_rescan: bool = False) -> Dict:
+        """
+        سحب سجل الجهاز واستيراد الجديد منه.
+        بدون مسح: الجهاز يُعطَّل أثناء السحب فقط.
+        مع المسح: الجهاز يبقى معطلاً من السحب حتى المسح حتى لا تضيع بصمة تُسجَّل بينهما.
+        """
+        started = time.perf_counter()
+        if not clear_after_commit:
+            with zk_manager.device_disabled():
+                records = zk_manager.read_attendance_log()
+            result = self.ingest_records(records, full_rescan=full_rescan)
+        else:
+            with zk_manager.device_disabled():
+                records = zk_manager.read_attendance_log()
+                result = self.ingest_records(records, full_rescan=full_rescan)
+                result['cleared'] = False
+                if self.verify_committed(records, result):
+                    if zk_manager.clear_attendance():
+                        self.db_manager.mark_device_cleared(self.device_key)
+                        result['cleared'] = True
+                else:
+                    logger.warning(f"⚠️ لم يُمسح سجل الجهاز {self.device_key}: التحقق من الحفظ لم يكتمل")
+        result['duration_seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+    def ingest_records(self, records: List, full_rescan: bool = False) -> Dict:
+        """استيراد قائمة سجلات (كائنات Attendance من pyzk أو ما يماثلها)"""
+        watermark = None if full_rescan else self.db_manager.get_device_watermark(self.device_key)
+        last_timestamp = None
+        if watermark and watermark.get('last_timestamp'):
+            last_timestamp = datetime.fromisoformat(watermark['last_timestamp'])
+
+        # السجلات الأقدم من العلامة مستوردة مسبقاً؛ السجلات بنفس ثانية العلامة يحسمها مفتاح التكرار
+        fresh = [r for r in records if last_timestamp is None or r.timestamp >= last_timestamp]
+
+        index = self.employee_index()
+        if any(str(r.user_id) not in index for r in fresh):
+            index = self.employee_index(refresh=True)  # موظفون أُضيفوا بعد آخر تحميل
+
+        punches, unknown_users = [], {}
+        for record in fresh:
+            user_id = str(record.user_id)
+            employee_id = index.get(user_id)
+            if employee_id is None:
+                unknown_users[user_id] = unknown_users.get(user_id, 0) + 1
+                continue
+            punches.append({
+                'employee_id': employee_id,
+                'type': self.punch_types.get(record.punch, 'Check-In'),
+                'timestamp': record.timestamp,
+                'idempotency_key': self.idempotency_key(record),
+                'location_id': self.location_id,
+                'notes': f'ZK device {self.device_key} ({ZK_PUNCH_LABELS.get(record.punch, record.punch)})',
+            })
+
+        new_watermark = None
+        if fresh:
+            newest = max(fresh, key=lambda r: (r.timestamp, r.uid))
+            new_watermark = {
+                'device_key': self.device_key,
+                'last_timestamp': newest.timestamp.isoformat(),
+                'last_uid': newest.uid,
+                'ingested': 0,  # يُحسب داخل معاملة الإدخال
+            }
+
+        outcome = self.processor.process(punches, source=f'zk:{self.device_key}', watermark=new_watermark) \
+            if punches else {'summary': {'total': 0, 'created': 0, 'duplicates': 0, 'rejected': 0}, 'results': []}
+        if not punches and new_watermark:
+            self.db_manager.save_device_watermark(new_watermark)
+
+        rejected = {}
+        for item in outcome['results']:
+            if item['status'] == 'rejected':
+                rejected[item['error']] = rejected.get(item['error'], 0) + 1
+
+        summary = {
+            'device_key': self.device_key,
+            'pulled': len(records),
+            'skipped_by_watermark': len(records) - len(fresh),
+            'created': outcome['summary']['created'],
+            'duplicates': outcome['summary']['duplicates'],
+            'rejected': rejected,
+            'unknown_users': unknown_users,
+            'watermark': new_watermark['last_timestamp'] if new_watermark else (watermark or {}).get('last_timestamp'),
+        }
+        self.last_keys = [p['idempotency_key'] for p in punches]
+        logger.info(f"📥 استيراد ZK {self.device_key}: سُحب {summary['pulled']}، جديد {summary['created']}، "
+                    f"مكرر {summary['duplicates']}، مجهول {sum(unknown_users.values())}")
+        return summary
+
+    def verify_committed(self, records: List, result: Dict) -> bool:
+        """
+        التحقق قبل المسح: لا مستخدمين مجهولين ولا بصمات مرفوضة (وإلا ضاعت مع المسح)،
+        وكل بصمة مستوردة موجودة فعلاً في قاعدة البيانات عبر مفتاح التكرار (المكرر محفوظ مسبقاً)
+        """
+        if result.get('unknown_users') or result.get('rejected'):
+            return False
+        if records and not (self.db_manager.get_device_watermark(self.device_key) or {}).get('last_timestamp'):
+            return False
+        stored = self.db_manager.get_attendance_ids_by_idempotency_keys(self.last_keys)
+        return len(stored) >= len(set(self.last_keys))
+
+    def idempotency_key(self, record) -> str:
+        """مفتاح ثابت لكل بصمة: الجهاز + المستخدم + الوقت (لا يتغير بعد مسح الجهاز بخلاف uid)"""
+        return f"zk:{self.device_key}:{record.user_id}:{record.timestamp.strftime('%Y%m%d%H%M%S')}"
@@ -1,21 +1,43 @@
-from zk import ZK, const
+from contextlib import contextmanager
+
+try:
+    from zk import ZK, const
+    from zk.finger import Finger
+    from zk.user import User
+except ImportError:  # مكتبة pyzk غير مثبتة (مثلاً على الخادم أو مع جهاز وهمي)
+    ZK, const = None, None
+    from app.fingerprint.fake_zk import FakeFinger as Finger, FakeUser as User
 
 class ZKManager:
-    def __init__(self, ip, port=4370, timeout=5, password=0):
+    def __init__(self, ip, port=4370, timeout=5, password=0, zk=None):
+        """zk: كائن بنفس واجهة pyzk.ZK (مثلاً FakeZKDevice في الاختبارات)"""
         self.ip = ip
         self.port = port
         self.timeout = timeout
         self.password = password
-        self.zk = ZK(self.ip, port=self.port, timeout=self.timeout, password=self.password, force_udp=False, ommit_ping=False)
+        if zk is None:
+            if ZK is None:
+                raise ImportError("pyzk is not installed")
+            zk = ZK(self.ip, port=self.port, timeout=self.timeout, password=self.password, force_udp=False, ommit_ping=False)
+        self.zk = zk
         self.conn = None
 
-    def connect(self):
-        """محاولة الاتصال بالجهاز."""
+    @property
+    def device_key(self):
+        """معرف ثابت للجهاز (لعلامة الاستيراد)"""
+        return f"{self.ip}:{self.port}"
+
+    def connect(self, disable_device=True):
+        """
+        محاولة الاتصال بالجهاز.
+        disable_device=False يبقي الجهاز متاحاً للموظفين (الاستيراد يعطله فقط أثناء السحب).
+        """
         try:
             self.conn = self.zk.connect()
             if self.conn:
                 print(f"Successfully connected to device at {self.ip}")
-                self.zk.disable_device()
+                if disable_device:
+                    self.zk.disable_device()
                 return True
         except Exception as e:
             print(f"Connection failed: {e}")
@@ -34,6 +56,16 @@ class ZKManager:
         finally:
             self.conn = None
 
+    @contextmanager
+    def device_disabled(self):
+        """تعطيل الجهاز (منع البصمات) طوال الكتلة فقط، ثم إعادة تفعيله دائماً"""
+        self.zk.disable_device()
+        try:
+            yield
+        finally:
+            if self.conn:
+                self.zk.enable_device()
+
     def get_attendance(self):
         """سحب سجلات الحضور والانصراف من الجهاز."""
         if not self.conn:
@@ -50,6 +82,15 @@ class ZKManager:
             if self.conn:
                 self.zk.enable_device()
 
+    def read_attendance_log(self):
+        """
+        سحب السجل دون تغيير حالة الجهاز (يُستدعى داخل device_disabled).
+        يرفع استثناء عند الفشل حتى لا يُخلط الفشل بسجل فارغ.
+        """
+        if not self.conn:
+            raise ConnectionError("Not connected to a device.")
+        return self.zk.get_attendance()
+
     def get_users(self):
         """سحب بيانات المستخدمين المسجلين على الجهاز."""
         if not self.conn:
@@ -61,16 +102,63 @@ class ZKManager:
             print(f"Failed to get users: {e}")
             return []
 
+    def read_users(self):
+        """سحب المستخدمين مع رفع استثناء عند الفشل (قائمة فارغة هنا تعني جهازاً فارغاً فعلاً)"""
+        if not self.conn:
+            raise ConnectionError("Not connected to a device.")
+        return self.zk.get_users()
+
+    def read_templates(self):
+        """سحب كل قوالب البصمة من الجهاز (كائنات Finger: uid, fid, template)"""
+        if not self.conn:
+            raise ConnectionError("Not connected to a device.")
+        return self.zk.get_templates()
+
+    @staticmethod
+    def make_user(uid, name, user_id, privilege=0):
+        return User(uid=uid, name=name, privilege=privilege, password='', group_id='', user_id=str(user_id), card=0)
+
+    @staticmethod
+    def make_finger(uid, fid, template):
+        return Finger(uid, fid, 1, template)
+
+    def set_user(self, user):
+        """إنشاء أو تحديث مستخدم على الجهاز (نفس uid يحدّث المستخدم الموجود)"""
+        if not self.conn:
+            raise ConnectionError("Not connected to a device.")
+        self.zk.set_user(uid=user.uid, name=user.name, privilege=user.privilege,
+                         password=user.password, group_id=user.group_id, user_id=user.user_id, card=user.card)
+
+    def save_user_templates(self, entries):
+        """
+        رفع قوالب عدة مستخدمين: entries = [(user, [finger, ...]), ...]
+        يستخدم HR_save_usertemplates (رفع مجمع في حزمة واحدة) إن توفر
+        """
+        if not self.conn:
+            raise ConnectionError("Not connected to a device.")
+        if hasattr(self.zk, 'HR_save_usertemplates'):
+            self.zk.HR_save_usertemplates([[user, fingers] for user, fingers in entries])
+        else:
+            for user, fingers in entries:
+                self.zk.save_user_template(user, fingers)
+
+    def delete_user(self, uid, user_id=''):
+        if not self.conn:
+            raise ConnectionError("Not connected to a device.")
+        self.zk.delete_user(uid=uid, user_id=user_id)
+
     def clear_attendance(self):
         """مسح سجلات الحضور من ذاكرة الجهاز."""
         if not self.conn:
             print("Not connected to a device.")
-            return
+            return False
         try:
             self.zk.clear_attendance()
             print("Attendance logs cleared from device.")
+            return True
         except Exception as e:
             print(f"Failed to clear attendance: {e}")
+            return False
 
 
     def enroll_fingerprint(self, user_id):
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+خدمة سحب متزامن من عدة أجهزة بصمة ZK
+- مجموعة خيوط تسحب الأجهزة بالتوازي مع إبقاء الاتصال مفتوحاً بين الدورات
+- تأخير أسي مع عشوائية (jitter) لكل جهاز عند الفشل
+- توزيع مواعيد السحب على الفترة حتى لا تتعطل كل الأجهزة في نفس اللحظة
+- حالة كل جهاز (آخر نجاح، التأخر، معدل السجلات) للمراقبة
+
+التشغيل بدون واجهة:
+    python -m app.fingerprint.zk_poller
+    python -m app.fingerprint.zk_poller --once --health-file /tmp/zk_health.json
+    python -m app.fingerprint.zk_poller --fake 20 --interval 10 --duration 60
+"""
+
+import argparse
+import heapq
+import json
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+
+from app.fingerprint.zk_ingestion import ZKIngestionPipeline
+from app.fingerprint.zk_manager import ZKManager
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceConfig:
+    """إعدادات جهاز واحد (قسم [Device] أو [Device:<name>] في config.ini)"""
+    name: str
+    ip: str
+    port: int = 4370
+    password: int = 0
+    timeout: int = 5
+    location_id: Optional[int] = None
+    interval: float = 60.0
+    clear_after_commit: bool = False
+
+
+@dataclass
+class DeviceState:
+    """حالة السحب لجهاز واحد"""
+    config: DeviceConfig
+    manager: Optional[ZKManager] = None
+    pipeline: Optional[ZKIngestionPipeline] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    consecutive_failures: int = 0
+    last_success: Optional[float] = None
+    last_attempt: Optional[float] = None
+    last_error: Optional[str] = None
+    last_duration: Optional[float] = None
+    next_poll_at: float = 0.0
+    watermark: Optional[str] = None
+    total_created: int = 0
+    record_rate: float = 0.0  # سجلات جديدة في الدقيقة (متوسط متحرك)
+    polls: int = 0
+
+
+def load_device_configs(config=None, default_interval: float = 60.0) -> List[DeviceConfig]:
+    """قراءة الأجهزة من config.ini: القسم [Device] وأي قسم [Device:<name>]"""
+    if config is None:
+        from app.core.config_manager import get_config
+        config = get_config()
+
+    devices = []
+    for section in config.sections():
+        if section != 'Device' and not section.startswith('Device:'):
+            continue
+        values = config[section]
+        location_id = values.get('location_id')
+        devices.append(DeviceConfig(
+            name=section.split(':', 1)[1] if ':' in section else 'default',
+            ip=values.get('ip'),
+            port=int(values.get('port', '4370')),
+            password=int(values.get('password', '0')),
+            timeout=int(values.get('timeout', '5')),
+            location_id=int(location_id) if location_id else None,
+            interval=float(values.get('interval', default_interval)),
+            clear_after_commit=values.getboolean('clear_after_commit', fallback=False),
+        ))
+    return devices
+
+
+class ZKPollerService:
+    """يدير سحب N جهاز بالتوازي عبر ThreadPoolExecutor وجدول مواعيد واحد"""
+
+    def __init__(self, db_manager, devices: List[DeviceConfig], max_workers: int = 8,
+                 zk_factory: Optional[Callable[[DeviceConfig], ZKManager]] = None,
+                 base_backoff: float = 5.0, max_backoff: float = 600.0):
+        self.db_manager = db_manager
+        self.max_workers = max(1, max_workers)
+        self.zk_factory = zk_factory or self._default_factory
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.devices: Dict[str, DeviceState] = {d.name: DeviceState(config=d) for d in devices}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='zk-poll')
+        self._stop = threading.Event()
+        _live_pollers.add(self)
+
+    @staticmethod
+    def _default_factory(config: DeviceConfig) -> ZKManager:
+        return ZKManager(config.ip, port=config.port, timeout=config.timeout, password=config.password)
+
+    # === الجدولة ===
+    def _initial_schedule(self, now: float):
+        """توزيع أول سحب لكل جهاز بالتساوي على فترته"""
+        states = list(self.devices.values())
+        for position, state in enumerate(states):
+            state.next_poll_at = now + state.config.interval * position / max(1, len(states))
+
+    def run_forever(self, duration: Optional[float] = None):
+        """حلقة الجدولة: تنتظر أقرب موعد ثم ترسل الجهاز لمجموعة الخيوط"""
+        started = time.monotonic()
+        self._initial_schedule(started)
+        queue = [(state.next_poll_at, name) for name, state in self.devices.items()]
+        heapq.heapify(queue)
+        in_flight = {}
+        logger.info(f"🚀 بدء سحب {len(self.devices)} جهاز بـ {self.max_workers} خيط")
+
+        while not self._stop.is_set():
+            if duration is not None and time.monotonic() - started >= duration:
+                break
+            # إعادة جدولة الأجهزة التي انتهى سحبها
+            for name, future in list(in_flight.items()):
+                if future.done():
+                    del in_flight[name]
+                    heapq.heappush(queue, (self.devices[name].next_poll_at, name))
+
+            if not queue:
+                self._stop.wait(0.05)
+                continue
+            due_at, name = queue[0]
+            delay = due_at - time.monotonic()
+            if delay > 0:
+                self._stop.wait(min(delay, 0.5))
+                continue
+            heapq.heappop(queue)
+            in_flight[name] = self._executor.submit(self.poll_device, name)
+
+        wait(list(in_flight.values()), timeout=30)
+
+    def poll_once(self) -> Dict[str, Dict]:
+        """سحب كل الأجهزة مرة واحدة بالتوازي (وضع --once)"""
+        futures = [self._executor.submit(self.poll_device, name) for name in self.devices]
+        wait(futures)
+        return self.get_health()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        """إيقاف الخيوط وقطع اتصالات الأجهزة"""
+        self.stop()
+        self._executor.shutdown(wait=True)
+        for state in self.devices.values():
+            if state.manager and state.manager.conn:
+                state.manager.disconnect()
+
+    # === سحب جهاز واحد ===
+    def poll_device(self, name: str) -> Optional[Dict]:
+        state = self.devices[name]
+        if not state.lock.acquire(blocking=False):
+            return None  # سحب سابق لم ينته
+        try:
+            state.last_attempt = time.time()
+            if state.manager is None:
+                state.manager = self.zk_factory(state.config)
+                state.pipeline = ZKIngestionPipeline(self.db_manager, state.manager.device_key,
+                                                     location_id=state.config.location_id)
+            # الاتصال يبقى مفتوحاً بين الدورات؛ يُعاد فتحه فقط بعد فشل
+            if not state.manager.conn and not state.manager.connect(disable_device=False):
+                raise ConnectionError(f"cannot connect to {state.config.ip}:{state.config.port}")
+
+            result = state.pipeline.ingest(state.manager, clear_after_commit=state.config.clear_after_commit)
+            self._record_success(state, result)
+            return result
+        except Exception as e:
+            self._record_failure(state, e)
+            return None
+        finally:
+            state.lock.release()
+
+    def _record_success(self, state: DeviceState, result: Dict):
+        now = time.time()
+        if state.last_success:
+            minutes = max((now - state.last_success) / 60.0, 1e-6)
+            rate = result['created'] / minutes
+            state.record_rate = rate if state.polls <= 1 else 0.7 * state.record_rate + 0.3 * rate
+        state.polls += 1
+        state.last_success = now
+        state.last_error = None
+        state.consecutive_failures = 0
+        state.last_duration = result.get('duration_seconds')
+        state.watermark = result.get('watermark')
+        state.total_created += result['created']
+        state.next_poll_at = time.monotonic() + state.config.interval
+
+    def _record_failure(self, state: DeviceState, error: Exception):
+        state.consecutive_failures += 1
+        state.last_error = str(error)
+        # إسقاط الاتصال: قد يكون نصف مفتوح بعد انقطاع الشبكة
+        if state.manager is not None:
+            try:
+                state.manager.disconnect()
+            except Exception:
+                pass
+        backoff = min(self.max_backoff, self.base_backoff * (2 ** (state.consecutive_failures - 1)))
+        backoff *= random.uniform(0.5, 1.5)
+        state.next_poll_at = time.monotonic() + backoff
+        logger.warning(f"⚠️ Failed سحب الجهاز {state.config.name} ({state.consecutive_failures} مرة): "
+                       f"{error} - إعادة المحاولة بعد {backoff:.1f}s")
+
+    # === الحالة ===
+    def get_health(self) -> Dict[str, Dict]:
+        now = time.time()
+        health = {}
+        for name, state in self.devices.items():
+            lag = None
+            if state.watermark:
+                lag = max(0.0, (datetime.now() - datetime.fromisoformat(state.watermark)).total_seconds())
+            health[name] = {
+                'ip': state.config.ip,
+                'status': 'ok' if state.consecutive_failures == 0 and state.last_success else
+                          ('failing' if state.consecutive_failures else 'pending'),
+                'last_success': datetime.fromtimestamp(state.last_success).isoformat(timespec='seconds')
+                                if state.last_success else None,
+                'last_success_age_seconds': round(now - state.last_success, 1) if state.last_success else None,
+                'consecutive_failures': state.consecutive_failures,
+                'last_error': state.last_error,
+                'last_poll_duration_seconds': state.last_duration,
+                'watermark': state.watermark,
+                'watermark_lag_seconds': round(lag, 1) if lag is not None else None,
+                'records_per_minute': round(state.record_rate, 2),
+                'total_created': state.total_created,
+                'next_poll_in_seconds': round(max(0.0, state.next_poll_at - time.monotonic()), 1),
+            }
+        return health
+
+    def write_health(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': datetime.now().isoformat(timespec='seconds'), 'devices': self.get_health()},
+                      f, ensure_ascii=False, indent=2)
+
+
+# المقاييس تُسجَّل مرة واحدة للعملية وتجمع صحة كل الخدمات الحية (لا سلاسل مكررة عند إنشاء خدمة ثانية)
+_live_pollers: 'weakref.WeakSet[ZKPollerService]' = weakref.WeakSet()
+
+
+def _per_device(field_name: str):
+    def collect():
+        values = {}
+        for poller in list(_live_pollers):
+            for name, data in poller.get_health().items():
+                if data[field_name] is not None:
+                    values[(name,)] = data[field_name]
+        return values
+    return collect
+
+
+metrics.register_gauge('zk_device_last_success_age_seconds', 'Seconds since the last successful device poll',
+                       _per_device('last_success_age_seconds'), ('device',))
+metrics.register_gauge('zk_device_consecutive_failures', 'Consecutive failed polls per device',
+                       _per_device('consecutive_failures'), ('device',))
+metrics.register_gauge('zk_device_records_per_minute', 'New punches ingested per minute per device',
+                       _per_device('records_per_minute'), ('device',))
+
+
+def _fake_devices(count: int, db_manager, interval: float, failure_rate: float = 0.0):
+    """أجهزة وهمية لتجربة الخدمة بدون أجهزة حقيقية (بصمات عشوائية لموظفين موجودين)"""
+    from app.fingerprint.fake_zk import FakeZKDevice
+    codes = list(db_manager.get_employee_code_index().keys()) or ['1']
+    fakes = {}
+
+    def factory(config: DeviceConfig) -> ZKManager:
+        device = FakeZKDevice(failure_rate=failure_rate)
+        fakes[config.name] = device
+        return ZKManager(config.ip, port=config.port, zk=device)
+
+    def punch_loop(stop_event):
+        while not stop_event.wait(1.0):
+            for device in list(fakes.values()):
+                if random.random() < 0.5:
+                    try:
+                        device.punch(random.choice(codes), datetime.now().replace(microsecond=0), random.choice((0, 1)))
+                    except RuntimeError:
+                        pass  # الجهاز معطل أثناء السحب - الموظف يعيد المحاولة
+
+    configs = [DeviceConfig(name=f'fake-{i}', ip=f'10.99.0.{i + 1}', interval=interval) for i in range(count)]
+    return configs, factory, punch_loop
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ZK multi-device poller')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--interval', type=float, default=60.0, help='Default poll interval (seconds)')
+    parser.add_argument('--once', action='store_true', help='Poll every device once and exit')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after N seconds')
+    parser.add_argument('--health-file', default=None, help='Write per-device health JSON here')
+    parser.add_argument('--db', default='attendance.db', help='Local SQLite database path')
+    parser.add_argument('--fake', type=int, default=0, help='Simulate N fake devices instead of config.ini')
+    parser.add_argument('--fake-failure-rate', type=float, default=0.0, help='Failure rate of fake devices')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    from app.database.simple_hybrid_manager import SimpleHybridManager
+
+    db_manager = SimpleHybridManager(load_from_supabase=False, start_sync_threads=False, local_db_path=args.db)
+    db_manager.control_settings['delete_local_on_exit'] = False
+    # مشاركة نفس قاعدة البيانات مع gunicorn: مالك مزامنة واحد فقط
+    db_manager.claim_sync_ownership()
+
+    punch_stop = threading.Event()
+    if args.fake:
+        devices, factory, punch_loop = _fake_devices(args.fake, db_manager, args.interval, args.fake_failure_rate)
+        threading.Thread(target=punch_loop, args=(punch_stop,), daemon=True).start()
+    else:
+        devices, factory = load_device_configs(default_interval=args.interval), None
+
+    service = ZKPollerService(db_manager, devices, max_workers=args.workers, zk_factory=factory)
+    health_stop = threading.Event()
+    if args.health_file:
+        def health_loop():
+            while not health_stop.wait(5.0):
+                service.write_health(args.health_file)
+        threading.Thread(target=health_loop, daemon=True).start()
+
+    try:
+        if args.once:
+            service.poll_once()
+        else:
+            service.run_forever(duration=args.duration)
+    except KeyboardInterrupt:
+        logger.info("🛑 إيقاف خدمة السحب")
+    finally:
+        punch_stop.set()
+        health_stop.set()
+        service.close()
+        if args.health_file:
+            service.write_health(args.health_file)
+        print(json.dumps(service.get_health(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+تجهيز أجهزة البصمة ZK بالموظفين وقوالبهم (دفع تفاضلي)
+- الفرق بين الموظفين/القوالب في قاعدة البيانات المحلية وما على الجهاز (get_users)
+- دفع المستخدمين الناقصين أو المتغير اسمهم والقوالب الجديدة أو المتغيرة فقط، على دفعات
+- تسجيل كل دفعة ناجحة في zk_device_push_state: إعادة التشغيل بعد انقطاع تكمل من حيث توقفت
+- تجهيز عدة أجهزة بالتوازي
+
+التشغيل:
+    python -m app.fingerprint.zk_provisioning --dry-run
+    python -m app.fingerprint.zk_provisioning --local-only --dry-run   # بدون سحب من Supabase
+    python -m app.fingerprint.zk_provisioning --workers 4 --batch-size 50
+    python -m app.fingerprint.zk_provisioning --fake 5 --fake-employees 300 --fake-failure-rate 0.003
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from app.fingerprint.template_store import DEFAULT_DEVICE_TYPE, content_hash
+from app.fingerprint.zk_manager import ZKManager
+from app.fingerprint.zk_poller import DeviceConfig, load_device_configs
+
+logger = logging.getLogger(__name__)
+
+ZK_NAME_LENGTH = 24  # طول اسم المستخدم المسموح في أجهزة ZK
+ZK_MAX_UID = 65535
+
+
+@dataclass
+class LocalSnapshot:
+    """الموظفون وبصمات قوالبهم محلياً - تُقرأ مرة واحدة وتُشارك بين كل الأجهزة"""
+    employees: Dict[int, Dict]  # employee_id -> {'user_id', 'name'}
+    template_hashes: Dict[Tuple[int, int], str]  # (employee_id, finger_index) -> hash
+
+    @classmethod
+    def load(cls, db_manager, device_type: str = DEFAULT_DEVICE_TYPE) -> 'LocalSnapshot':
+        employees = {
+            emp['id']: {'user_id': str(emp['employee_code']), 'name': (emp.get('name') or '')[:ZK_NAME_LENGTH]}
+            for emp in db_manager.get_all_employees() if emp.get('employee_code')
+        }
+        hashes = {key: digest for key, digest in db_manager.template_store.get_hashes(device_type).items()
+                  if key[0] in employees}
+        return cls(employees=employees, template_hashes=hashes)
+
+
+@dataclass
+class ProvisionPlan:
+    """ما يجب دفعه لجهاز واحد"""
+    device_key: str
+    users: Dict[int, object] = field(default_factory=dict)  # employee_id -> User (بـ uid الجهاز)
+    set_user: List[int] = field(default_factory=list)  # موظفون ناقصون أو تغير اسمهم
+    templates: Dict[int, List[Tuple[int, str]]] = field(default_factory=dict)  # employee_id -> [(finger, hash)]
+    unchanged_users: int = 0
+    unchanged_templates: int = 0
+
+    @property
+    def employee_ids(self) -> List[int]:
+        return sorted(set(self.set_user) | set(self.templates))
+
+    def summary(self) -> Dict:
+        return {
+            'device_key': self.device_key,
+            'users_to_push': len(self.set_user),
+            'templates_to_push': sum(len(fingers) for fingers in self.templates.values()),
+            'unchanged_users': self.unchanged_users,
+            'unchanged_templates': self.unchanged_templates,
+        }
+
+
+class ZKProvisioner:
+    """دفع الموظفين والقوالب إلى جهاز ZK واحد"""
+
+    def __init__(self, db_manager, device_key: str, batch_size: int = 50,
+                 device_type: str = DEFAULT_DEVICE_TYPE):
+        self.db_manager = db_manager
+        self.device_key = device_key
+        self.batch_size = max(1, batch_size)
+        self.device_type = device_type
+
+    def plan(self, zk_manager: ZKManager, snapshot: Optional[LocalSnapshot] = None,
+             verify_templates: bool = False) -> ProvisionPlan:
+        """
+        حساب الفرق مع الجهاز.
+        verify_templates=False: القوالب تُقارن بسجل ما دُفع سابقاً (بدون قراءة قوالب الجهاز)
+        verify_templates=True: تُقرأ قوالب الجهاز وتُقارن بصماتها (لجهاز سُجلت عليه بصمات مباشرة)
+        """
+        snapshot = snapshot or LocalSnapshot.load(self.db_manager, self.device_type)
+        device_users = {str(user.user_id): user for user in zk_manager.read_users()}
+        next_uid = max((user.uid for user in device_users.values()), default=0) + 1
+
+        if verify_templates:
+            uid_to_employee = {}
+            for employee_id, info in snapshot.employees.items():
+                user = device_users.get(info['user_id'])
+                if user is not None:
+                    uid_to_employee[user.uid] = employee_id
+            device_hashes = {
+                (uid_to_employee[finger.uid], finger.fid): content_hash(bytes(finger.template))
+                for finger in zk_manager.read_templates() if finger.uid in uid_to_employee
+            }
+        else:
+            device_hashes = self.db_manager.get_device_push_state(self.device_key)
+
+        plan = ProvisionPlan(device_key=self.device_key)
+        missing_on_device = []
+        for employee_id, info in sorted(snapshot.employees.items()):
+            user = device_users.get(info['user_id'])
+            if user is None:
+                if next_uid > ZK_MAX_UID:
+                    logger.warning(f"⚠️ الجهاز {self.device_key} ممتلئ - لم يُضف الموظف {info['user_id']}")
+                    continue
+                user = ZKManager.make_user(next_uid, info['name'], info['user_id'])
+                next_uid += 1
+                plan.set_user.append(employee_id)
+                missing_on_device.append(employee_id)
+            elif (user.name or '') != info['name']:
+                user = ZKManager.make_user(user.uid, info['name'], info['user_id'], user.privilege)
+                plan.set_user.append(employee_id)
+            else:
+                plan.unchanged_users += 1
+            plan.users[employee_id] = user
+
+        # مستخدم غير موجود على الجهاز: كل قوالبه تُدفع حتى لو سجلها الدفع القديم (الجهاز أُعيد ضبطه)
+        missing = set(missing_on_device)
+        for (employee_id, finger_index), digest in sorted(snapshot.template_hashes.items()):
+            if employee_id not in plan.users:
+                continue
+            if employee_id not in missing and device_hashes.get((employee_id, finger_index)) == digest:
+                plan.unchanged_templates += 1
+                continue
+            plan.templates.setdefault(employee_id, []).append((finger_index, digest))
+        return plan
+
+    def provision(self, zk_manager: ZKManager, snapshot: Optional[LocalSnapshot] = None,
+                  verify_templates: bool = False, dry_run: bool = False) -> Dict:
+        """
+        تنفيذ الخطة على دفعات؛ الجهاز يُعطَّل أثناء كل دفعة فقط.
+        عند الفشل تتوقف العملية وتبقى الدفعات المكتملة مسجلة (الاستئناف بإعادة التشغيل).
+        """
+        started = time.perf_counter()
+        plan = self.plan(zk_manager, snapshot, verify_templates)
+        result = plan.summary()
+        result.update({'users_pushed': 0, 'templates_pushed': 0, 'batches': 0, 'completed': True, 'error': None})
+        if dry_run or not plan.employee_ids:
+            result['duration_seconds'] = round(time.perf_counter() - started, 3)
+            return result
+
+        employee_ids = plan.employee_ids
+        set_user = set(plan.set_user)
+        for start in range(0, len(employee_ids), self.batch_size):
+            batch = employee_ids[start:start + self.batch_size]
+            templates = self.db_manager.get_fingerprint_templates(
+                [employee_id for employee_id in batch if employee_id in plan.templates], self.device_type)
+            try:
+                pushed = self._push_batch(zk_manager, plan, batch, set_user, templates)
+            except Exception as e:
+                result['completed'] = False
+                result['error'] = str(e)
+                logger.warning(f"⚠️ توقف تجهيز الجهاز {self.device_key} بعد {result['batches']} دفعة: {e}")
+                break
+            self.db_manager.record_device_push(self.device_key, pushed)
+            result['users_pushed'] += sum(1 for employee_id in batch if employee_id in set_user)
+            result['templates_pushed'] += len(pushed)
+            result['batches'] += 1
+
+        result['duration_seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"📤 تجهيز {self.device_key}: مستخدمون {result['users_pushed']}/{result['users_to_push']}، "
+                    f"قوالب {result['templates_pushed']}/{result['templates_to_push']}")
+        return result
+
+    def _push_batch(self, zk_manager: ZKManager, plan: ProvisionPlan, batch: List[int],
+                    set_user: set, templates: Dict[int, List[Tuple[int, bytes]]]) -> List[Dict]:
+        """دفعة واحدة: المستخدمون أولاً ثم القوالب في رفع مجمع واحد"""
+        entries, pushed = [], []
+        with zk_manager.device_disabled():
+            for employee_id in batch:
+                user = plan.users[employee_id]
+                if employee_id in set_user:
+                    zk_manager.set_user(user)
+                wanted = dict(plan.templates.get(employee_id, []))
+                fingers = []
+                for finger_index, template in templates.get(employee_id, []):
+                    if finger_index not in wanted:
+                        continue
+                    fingers.append(ZKManager.make_finger(user.uid, finger_index, template))
+                    pushed.append({'employee_id': employee_id, 'finger_index': finger_index,
+                                   'content_hash': wanted[finger_index], 'device_uid': user.uid})
+                if fingers:
+                    entries.append((user, fingers))
+            if entries:
+                zk_manager.save_user_templates(entries)
+        return pushed
+
+
+def provision_devices(db_manager, devices: List[DeviceConfig], max_workers: int = 4,
+                      zk_factory: Optional[Callable[[DeviceConfig], ZKManager]] = None,
+                      batch_size: int = 50, verify_templates: bool = False, dry_run: bool = False) -> Dict[str, Dict]:
+    """تجهيز عدة أجهزة بالتوازي؛ لقطة البيانات المحلية تُقرأ مرة واحدة لكل الأجهزة"""
+    zk_factory = zk_factory or (lambda config: ZKManager(config.ip, port=config.port,
+                                                         timeout=config.timeout, password=config.password))
+    snapshot = LocalSnapshot.load(db_manager)
+
+    def run(config: DeviceConfig) -> Dict:
+        manager = None
+        try:
+            manager = zk_factory(config)
+            if not manager.connect(disable_device=False):
+                return {'device_key': f"{config.ip}:{config.port}", 'completed': False, 'error': 'connection failed'}
+            provisioner = ZKProvisioner(db_manager, manager.device_key, batch_size=batch_size)
+            return provisioner.provision(manager, snapshot, verify_templates=verify_templates, dry_run=dry_run)
+        except Exception as e:
+            logger.error(f"❌ Failed في تجهيز الجهاز {config.name}: {e}")
+            return {'device_key': f"{config.ip}:{config.port}", 'completed': False, 'error': str(e)}
+        finally:
+            if manager is not None:
+                manager.disconnect()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='zk-provision') as executor:
+        results = dict(zip((config.name for config in devices), executor.map(run, devices)))
+    return results
+
+
+def _fake_setup(db_manager, devices: int, employees: int, failure_rate: float):
+    """
+    موظفون وقوالب وهمية (مباشرة في SQLite بدون مزامنة) + أجهزة وهمية فارغة لتجربة التجهيز؛
+    الجهاز الوهمي يحتفظ بحالته بين المحاولات مثل الجهاز الحقيقي
+    """
+    import os
+    import sqlite3
+    from app.fingerprint.fake_zk import FakeZKDevice
+
+    conn = sqlite3.connect(db_manager.local_db_path)
+    conn.executemany(
+        "INSERT OR IGNORE INTO employees (employee_code, name, phone_number) VALUES (?, ?, ?)",
+        [(f'{5000 + i}', f'Employee {i}', f'0190000{i:04d}') for i in range(employees)]
+    )
+    conn.commit()
+    employee_ids = [row[0] for row in conn.execute('SELECT id FROM employees')]
+    conn.close()
+    existing = db_manager.template_store.get_hashes()
+    for employee_id in employee_ids:
+        if (employee_id, 0) not in existing:
+            db_manager.template_store.save(employee_id, os.urandom(1024))
+
+    fakes = {}
+
+    def factory(config: DeviceConfig) -> ZKManager:
+        if config.name not in fakes:
+            fakes[config.name] = FakeZKDevice(failure_rate=failure_rate)
+        return ZKManager(config.ip, port=config.port, zk=fakes[config.name])
+
+    configs = [DeviceConfig(name=f'fake-{i}', ip=f'10.98.0.{i + 1}') for i in range(devices)]
+    return configs, factory
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Differential user/template push to ZK devices')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--verify-templates', action='store_true', help='Compare against templates read from devices')
+    parser.add_argument('--dry-run', action='store_true', help='Only print the diff per device')
+    parser.add_argument('--db', default='attendance.db', help='Local SQLite database path')
+    parser.add_argument('--local-only', action='store_true',
+                        help='Provision from the local database as is, without pulling from Supabase first')
+    parser.add_argument('--fake', type=int, default=0, help='Provision N fake devices instead of config.ini')
+    parser.add_argument('--fake-employees', type=int, default=200)
+    parser.add_argument('--fake-failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    from app.database.simple_hybrid_manager import SimpleHybridManager
+
+    db_manager = SimpleHybridManager(load_from_supabase=False, start_sync_threads=False, local_db_path=args.db)
+    db_manager.control_settings['delete_local_on_exit'] = False
+    db_manager.instant_sync = False
+
+    # اللقطة تُبنى من القاعدة المحلية: تُحدَّث من Supabase أولاً، وإلا يتوقف التزويد بدلاً من دفع لقطة ناقصة أو قديمة
+    if not args.fake and not args.local_only and not db_manager.refresh_provisioning_data():
+        logger.error("❌ تعذر سحب الموظفين/القوالب من Supabase - لم يُزوَّد أي جهاز (استخدم --local-only عمداً)")
+        db_manager.shutdown()
+        sys.exit(1)
+
+    if args.fake:
+        devices, factory = _fake_setup(db_manager, args.fake, args.fake_employees, args.fake_failure_rate)
+    else:
+        devices, factory = load_device_configs(), None
+
+    try:
+        results = provision_devices(db_manager, devices, max_workers=args.workers, zk_factory=factory,
+                                    batch_size=args.batch_size, verify_templates=args.verify_templates,
+                                    dry_run=args.dry_run)
+        # الأجهزة الوهمية تفشل عشوائياً: إعادة التشغيل تكمل ما تبقى فقط
+        attempts = 1
+        while args.fake and not args.dry_run and attempts < 10 and \
+                not all(result.get('completed') for result in results.values()):
+            retry = [config for config in devices if not results[config.name].get('completed')]
+            results.update(provision_devices(db_manager, retry, max_workers=args.workers, zk_factory=factory,
+                                             batch_size=args.batch_size))
+            attempts += 1
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    finally:
+        db_manager.shutdown()
+
+
+if __name__ == '__main__':
+    main()
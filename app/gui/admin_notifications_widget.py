@@ -23,7 +23,7 @@ from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QThread, pyqtSlot
 from PyQt6.QtGui import QFont
 
 try:
-    from app.core.notifications_manager import NotificationsManager
+    from app.core.notifications_manager import get_notifications_manager
     NOTIFICATIONS_MANAGER_AVAILABLE = True
     print("✅ NotificationsManager imported successfully")
 except ImportError:
@@ -71,8 +71,9 @@ class AsyncNotificationsLoader(QThread):
                         self.status_updated.emit("🔗 Connecting to Supabase...", "#0078d4")
                         self.progress_updated.emit(70)
                         
-                        # Initialize manager
-                        notifications_manager = NotificationsManager(self.supabase_url, self.supabase_key)
+                        # Shared manager (one poller for the whole app)
+                        notifications_manager = get_notifications_manager(self.supabase_url, self.supabase_key)
+                        self.notifications_manager = notifications_manager
                         
                         # Test connection
                         status = notifications_manager.get_status()
@@ -14,18 +14,12 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QFont, QColor, QPixmap, QIcon
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QDate
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import pandas as pd
-import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
 from app.core.ai_manager import AdvancedAIManager
+from app.database.attendance_aggregates import get_attendance_aggregator, EMPTY_AGGREGATES
+from app.gui.analytics_charts import AnalyticsRunner, render_chart, chart_pixmap
 
 class AdvancedAnalyticsWidget(QWidget):
     """Advanced Analytics Interface with Interactive Charts"""
@@ -34,6 +28,9 @@ class AdvancedAnalyticsWidget(QWidget):
         super().__init__()
         self.db_manager = db_manager
         self.ai_manager = AdvancedAIManager()
+        # Aggregates and rendered charts are shared with the AI assistant (cached per data version)
+        self.aggregator = get_attendance_aggregator(db_manager) if db_manager else None
+        self.runner = AnalyticsRunner(self)
         self.charts_data = {}
         self.setup_ui()
         self.load_data()
@@ -106,20 +103,43 @@ class AdvancedAnalyticsWidget(QWidget):
             }
         """)
         
+        self.hourly_chart_btn = QPushButton("⏰ Hourly Chart")
+        self.hourly_chart_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6f42c1;
+                color: white;
+                padding: 10px 15px;
+                border-radius: 15px;
+                font-size: 12px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #5a32a3;
+            }
+        """)
+        
         charts_buttons.addWidget(self.daily_chart_btn)
         charts_buttons.addWidget(self.weekly_chart_btn)
+        charts_buttons.addWidget(self.hourly_chart_btn)
         layout.addLayout(charts_buttons)
         
+        # Rendered chart (drawn off the GUI thread)
+        layout.addWidget(QLabel("📈 Interactive Charts:"))
+        self.chart_label = QLabel()
+        self.chart_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.chart_label.setMinimumHeight(320)
+        layout.addWidget(self.chart_label, 3)
+        
         # Display Area for Charts
         self.charts_display = QTextEdit()
         self.charts_display.setReadOnly(True)
         self.charts_display.setFont(QFont("Arial", 11))
-        layout.addWidget(QLabel("📈 Interactive Charts:"))
-        layout.addWidget(self.charts_display)
+        layout.addWidget(self.charts_display, 1)
         
         # Connect Signals
         self.daily_chart_btn.clicked.connect(self.create_daily_chart)
         self.weekly_chart_btn.clicked.connect(self.create_weekly_chart)
+        self.hourly_chart_btn.clicked.connect(self.create_hourly_chart)
         
         charts_widget.setLayout(layout)
         self.tabs.addTab(charts_widget, "📈 Charts")
@@ -260,147 +280,147 @@ class AdvancedAnalyticsWidget(QWidget):
         self.tabs.addTab(predictions_widget, "🔮 Advanced Predictions")
         
     def load_data(self):
-        """Load data from the database"""
-        try:
-            if self.db_manager:
-                self.attendance_data = self.db_manager.get_all_attendance() or []
-            else:
-                self.attendance_data = []
-        except Exception as e:
-            self.attendance_data = []
-            print(f"Error loading data: {e}")
+        """Warm the shared aggregates in the background (no records are loaded on the GUI thread)"""
+        if self.aggregator is not None:
+            self.runner.run('load', self.aggregator.aggregates, lambda _aggregates: None)
+    
+    def _aggregates(self):
+        """Worker thread: aggregates for the current data version"""
+        return self.aggregator.aggregates() if self.aggregator is not None else EMPTY_AGGREGATES
+    
+    def _run(self, key, job, display, on_done):
+        """Run job on a worker thread and hand the result to on_done on the GUI thread"""
+        display.setText("⏳ Processing...")
+        self.runner.run(key, job, on_done, lambda error: display.setText(f"Error: {error}"))
+    
+    def _show_chart(self, kind, describe):
+        """Render the chart of the given kind off-thread; describe(aggregates) builds the summary text"""
+        ratio = self.devicePixelRatioF()
+        width = int(max(self.chart_label.width(), 400) * ratio)
+        height = int(max(self.chart_label.height(), 320) * ratio)
+        dpi = int(100 * ratio)
+        
+        def job():
+            aggregates = self._aggregates()
+            return aggregates, render_chart(aggregates, kind, width, height, dpi)
+        
+        def done(result):
+            aggregates, image = result
+            if not aggregates.total_records:
+                self.chart_label.clear()
+                self.charts_display.setText(f"No data available for {kind} chart")
+                return
+            self.chart_label.setPixmap(chart_pixmap(image, ratio))
+            self.charts_display.setText(describe(aggregates))
+        
+        self._run('chart', job, self.charts_display, done)
     
     def create_daily_chart(self):
         """Create Daily Chart"""
-        try:
-            if not self.attendance_data:
-                self.charts_display.setText("No data available for daily chart")
-                return
-                
-            df = pd.DataFrame(self.attendance_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df['date'] = df['timestamp'].dt.date
-            
-            daily_counts = df.groupby('date').size().reset_index()
-            daily_counts.columns = ['date', 'count']
-            
+        def describe(aggregates):
+            stats = aggregates.daily_stats()
             result = "✅ Daily chart created successfully!\n\n"
-            result += f"📊 Total days: {len(daily_counts)}\n"
-            result += f"📈 Average daily attendance: {daily_counts['count'].mean():.1f}\n"
-            result += f"📉 Minimum daily attendance: {daily_counts['count'].min()}\n"
-            result += f"📊 Maximum daily attendance: {daily_counts['count'].max()}\n"
-            
-            self.charts_display.setText(result)
-            
-        except Exception as e:
-            self.charts_display.setText(f"Error creating chart: {str(e)}")
+            result += f"📊 Total days: {stats['days']}\n"
+            result += f"📈 Average daily attendance: {stats['mean']:.1f}\n"
+            result += f"📉 Minimum daily attendance: {stats['min']}\n"
+            result += f"📊 Maximum daily attendance: {stats['max']}\n"
+            return result
+        
+        self._show_chart('daily', describe)
     
     def create_weekly_chart(self):
         """Create Weekly Chart"""
-        try:
-            if not self.attendance_data:
-                self.charts_display.setText("No data available for weekly chart")
-                return
-                
-            df = pd.DataFrame(self.attendance_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df['day_of_week'] = df['timestamp'].dt.day_name()
-            
-            weekly_counts = df.groupby('day_of_week').size()
-            
+        def describe(aggregates):
             result = "✅ Weekly chart created successfully!\n\n"
             result += "📅 Attendance distribution by day:\n"
-            for day, count in weekly_counts.items():
+            for day, count in aggregates.weekday_distribution().items():
                 result += f"  {day}: {count}\n"
-            
-            self.charts_display.setText(result)
-            
-        except Exception as e:
-            self.charts_display.setText(f"Error creating chart: {str(e)}")
+            return result
+        
+        self._show_chart('weekly', describe)
+    
+    def create_hourly_chart(self):
+        """Create Hourly Chart"""
+        def describe(aggregates):
+            result = "✅ Hourly chart created successfully!\n\n"
+            result += "⏰ Attendance distribution by hour:\n"
+            for hour, count in aggregates.hour_distribution().items():
+                result += f"  {hour:02d}:00 - {count}\n"
+            return result
+        
+        self._show_chart('hourly', describe)
     
     def show_descriptive_stats(self):
         """Show Descriptive Statistics"""
-        try:
-            if not self.attendance_data:
+        def done(aggregates):
+            if not aggregates.total_records:
                 self.stats_display.setText("No data available for analysis")
                 return
-                
-            df = pd.DataFrame(self.attendance_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            
-            # General Statistics
-            total_records = len(df)
-            unique_employees = df['employee_id'].nunique()
-            date_range = f"{df['timestamp'].min().date()} to {df['timestamp'].max().date()}"
-            
-            # Daily Statistics
-            daily_counts = df.groupby(df['timestamp'].dt.date).size()
-            avg_daily = daily_counts.mean()
-            std_daily = daily_counts.std()
-            min_daily = daily_counts.min()
-            max_daily = daily_counts.max()
+            stats = aggregates.daily_stats()
             
             result = "📊 Descriptive Statistics:\n\n"
-            result += f"📈 Total records: {total_records:,}\n"
-            result += f"👥 Unique employees: {unique_employees:,}\n"
-            result += f"📅 Date range: {date_range}\n\n"
+            result += f"📈 Total records: {aggregates.total_records:,}\n"
+            result += f"👥 Unique employees: {aggregates.unique_employees:,}\n"
+            result += f"📅 Date range: {aggregates.first_date} to {aggregates.last_date}\n\n"
             
             result += "📊 Daily Statistics:\n"
-            result += f"  • Average: {avg_daily:.2f}\n"
-            result += f"  • Standard deviation: {std_daily:.2f}\n"
-            result += f"  • Minimum: {min_daily}\n"
-            result += f"  • Maximum: {max_daily}\n"
-            result += f"  • Coefficient of variation: {(std_daily/avg_daily)*100:.2f}%\n"
+            result += f"  • Average: {stats['mean']:.2f}\n"
+            result += f"  • Standard deviation: {stats['std']:.2f}\n"
+            result += f"  • Minimum: {stats['min']}\n"
+            result += f"  • Maximum: {stats['max']}\n"
+            if stats['mean']:
+                result += f"  • Coefficient of variation: {(stats['std'] / stats['mean']) * 100:.2f}%\n"
             
             self.stats_display.setText(result)
-            
-        except Exception as e:
-            self.stats_display.setText(f"Error in statistical analysis: {str(e)}")
+        
+        self._run('stats', self._aggregates, self.stats_display, done)
     
     def analyze_clustering(self):
         """Analyze Clustering"""
-        try:
-            if not self.attendance_data:
+        def done(aggregates):
+            if not aggregates.total_records:
                 self.patterns_display.setText("No data available for analysis")
                 return
-                
-            df = pd.DataFrame(self.attendance_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df['hour'] = df['timestamp'].dt.hour
-            df['day_of_week'] = df['timestamp'].dt.day_of_week
             
             result = "🎯 Clustering Analysis:\n\n"
-            result += f"📊 Total records: {len(df)}\n"
-            result += f"⏰ Average hour: {df['hour'].mean():.1f}\n"
-            result += f"📅 Average day of week: {df['day_of_week'].mean():.1f}\n\n"
+            result += f"📊 Total records: {aggregates.total_records}\n"
+            result += f"⏰ Average hour: {aggregates.mean_hour():.1f}\n"
+            result += f"📅 Average day of week: {aggregates.mean_weekday():.1f}\n\n"
             
             result += "🔍 Data analysis successful!"
             
             self.patterns_display.setText(result)
-            
-        except Exception as e:
-            self.patterns_display.setText(f"Error in clustering analysis: {str(e)}")
+        
+        self._run('patterns', self._aggregates, self.patterns_display, done)
     
     def generate_advanced_predictions(self):
         """Generate Advanced Predictions"""
-        try:
-            if not self.attendance_data:
+        days = self.days_slider.value()
+        
+        def job():
+            if self.aggregator is None:
+                return None
+            frame = self.aggregator.attendance_frame()
+            if frame.empty:
+                return None
+            departments = self.ai_manager.forecast_attendance(self.db_manager, 1, 'department')
+            return self.ai_manager.predict_attendance_trends(frame, days), departments
+        
+        def done(result):
+            if result is None:
                 self.advanced_predictions_display.setText("No data available for prediction")
                 return
-                
-            days = self.days_slider.value()
+            predictions, departments = result
             
             result = f"🔮 Advanced Predictions:\n\n"
             result += f"⚙️ Settings:\n"
             result += f"  • Number of days: {days}\n\n"
             
-            # Generate predictions
-            predictions = self.ai_manager.predict_attendance_trends(self.attendance_data, days)
-            
             if predictions.get('predictions'):
-                result += f"📊 Model accuracy: {predictions.get('model_accuracy', 0):.2%}\n"
-                result += f"📈 Trend direction: {predictions.get('trend_direction', 'Undefined')}\n"
-                result += f"💪 Trend strength: {predictions.get('trend_strength', 0):.2f}\n\n"
+                model_info = predictions.get('model_info', {})
+                result += f"📊 Model accuracy: {model_info.get('r2_score', 0):.2%}\n"
+                result += f"📈 Trend direction: {predictions.get('trend', 'Undefined')}\n"
+                result += f"💪 Trend strength: {model_info.get('slope', 0):.2f}\n\n"
                 
                 result += "🔮 Future predictions:\n"
                 for i, pred in enumerate(predictions['predictions'][:10]):
@@ -408,7 +428,17 @@ class AdvancedAnalyticsWidget(QWidget):
             else:
                 result += "❌ Failed to generate predictions"
             
-            self.advanced_predictions_display.setText(result)
+            if departments.get('forecasts'):
+                result += f"\n🏢 Department forecasts ({departments['dates'][0]}):\n"
+                for forecast in departments['forecasts']:
+                    day = forecast['days'][0]
+                    result += (f"  • {forecast['department']}: arrival {day['expected_arrival'] or '-'}, "
+                               f"absence {day['absence_probability']:.0%}, overtime {day['overtime_hours']:.1f}h\n")
             
-        except Exception as e:
-            self.advanced_predictions_display.setText(f"Error in advanced prediction: {str(e)}")
+            self.advanced_predictions_display.setText(result)
+        
+        self._run('predictions', job, self.advanced_predictions_display, done)
+    
+    def shutdown_tasks(self):
+        """Wait for running analytics tasks (called when the main window closes)"""
+        self.runner.shutdown()
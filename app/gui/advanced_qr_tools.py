@@ -13,6 +13,7 @@ from PIL import Image
 import os
 import json
 import io
+import shutil
 
 class AdvancedQRToolsDialog(QDialog):
     """
@@ -584,52 +585,44 @@ class AdvancedQRToolsDialog(QDialog):
             if not export_dir:
                 return
             
-            # إعداد شريط التقدم
+            items = []
+            for index, row in self.excel_data.iterrows():
+                content = str(row[content_column])
+                if content and content != 'nan':
+                    items.append(((index, str(row[name_column])), content))
+            
+            # الرسم في عمليات منفصلة مع كاش (الشعار يُجهز مرة واحدة لكل حجم)
+            from app.utils.qr_renderer import RenderSpec
+            from app.gui.qr_render_worker import render_with_progress
+            spec = RenderSpec.from_settings({
+                'size': self.size_spinbox.value(),
+                'error_correction': self.error_correction_combo.currentText()[0],
+                'box_size': self.box_size_spinbox.value(),
+                'border': self.border_spinbox.value(),
+                'foreground_color': getattr(self, 'foreground_color', '#000000'),
+                'background_color': getattr(self, 'background_color', '#FFFFFF'),
+                'add_logo': self.add_logo_checkbox.isChecked(),
+                'logo_path': self.logo_path_edit.text(),
+            })
             self.progress_bar.setVisible(True)
-            self.progress_bar.setMaximum(len(self.excel_data))
-            self.progress_bar.setValue(0)
+            self.progress_bar.setMaximum(max(1, len(items)))
+            rendered, _ = render_with_progress(self, items, spec, "Generating QR codes...")
+            self.progress_bar.setValue(len(rendered))
             
             success_count = 0
             error_count = 0
             
-            for index, row in self.excel_data.iterrows():
+            for (index, name), result in rendered.items():
                 try:
-                    content = str(row[content_column])
-                    name = str(row[name_column])
-                    
-                    if not content or content == 'nan':
-                        continue
-                    
-                    # إنشاء رمز QR
-                    qr = qrcode.QRCode(
-                        version=1,
-                        error_correction=getattr(qrcode.constants, f'ERROR_CORRECT_{self.error_correction_combo.currentText()[0]}'),
-                        box_size=self.box_size_spinbox.value(),
-                        border=self.border_spinbox.value()
-                    )
-                    
-                    qr.add_data(content)
-                    qr.make(fit=True)
-                    
-                    img = qr.make_image(
-                        fill_color=getattr(self, 'foreground_color', '#000000'),
-                        back_color=getattr(self, 'background_color', '#FFFFFF')
-                    )
-                    
-                    # Save الصورة
+                    if not result.path:
+                        raise RuntimeError(result.error)
+                    # Save الصورة (نسخ من الكاش)
                     filename = f"qr_{name}_{index}.png"
-                    filepath = os.path.join(export_dir, filename)
-                    img.save(filepath, 'PNG')
-                    
+                    shutil.copyfile(result.path, os.path.join(export_dir, filename))
                     success_count += 1
-                    
                 except Exception as e:
                     error_count += 1
                     print(f"Error generating QR for row {index}: {e}")
-                
-                # Update شريط التقدم
-                self.progress_bar.setValue(index + 1)
-                QCoreApplication.processEvents()
             
             # إخفاء شريط التقدم
             self.progress_bar.setVisible(False)
@@ -13,16 +13,10 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import QFont, QColor, QPixmap, QIcon
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QDate
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import pandas as pd
-import numpy as np
 
 from app.core.ai_manager import AdvancedAIManager
+from app.database.attendance_aggregates import get_attendance_aggregator, EMPTY_AGGREGATES
+from app.gui.analytics_charts import AnalyticsRunner
 
 class AIAssistantWidget(QWidget):
     """Advanced Smart Assistant Interface"""
@@ -31,6 +25,10 @@ class AIAssistantWidget(QWidget):
         super().__init__()
         self.db_manager = db_manager
         self.ai_manager = AdvancedAIManager()
+        self._query_count = 0
+        # Same aggregator as the analytics tab: results are computed once per data version
+        self.aggregator = get_attendance_aggregator(db_manager) if db_manager else None
+        self.runner = AnalyticsRunner(self)
         self.setup_ui()
         self.load_data()
         
@@ -148,6 +146,11 @@ class AIAssistantWidget(QWidget):
         quick_questions.setLayout(quick_layout)
         layout.addWidget(quick_questions)
         
+        # Cache hit metrics of the shared assistant backend
+        self.assistant_status = QLabel("")
+        self.assistant_status.setStyleSheet("color: #6c757d; font-size: 11px;")
+        layout.addWidget(self.assistant_status)
+        
         # Connect signals
         self.send_button.clicked.connect(self.send_query)
         self.query_input.returnPressed.connect(self.send_query)
@@ -341,15 +344,25 @@ class AIAssistantWidget(QWidget):
         self.tabs.addTab(reports_widget, "📊 Smart Reports")
         
     def load_data(self):
-        """Load data from database"""
-        try:
-            if self.db_manager:
-                self.attendance_data = self.db_manager.get_all_attendance() or []
-            else:
-                self.attendance_data = []
-        except Exception as e:
-            self.attendance_data = []
-            print(f"Error loading data: {e}")
+        """Warm the shared aggregates in the background (no records are loaded on the GUI thread)"""
+        if self.aggregator is not None:
+            self.runner.run('load', self.aggregator.aggregates, lambda _aggregates: None)
+    
+    def _aggregates(self):
+        """Worker thread: aggregates for the current data version"""
+        return self.aggregator.aggregates() if self.aggregator is not None else EMPTY_AGGREGATES
+    
+    def _frame(self):
+        """Worker thread: attendance records as a DataFrame (cached per data version), None if empty"""
+        if self.aggregator is None:
+            return None
+        frame = self.aggregator.attendance_frame()
+        return None if frame.empty else frame
+    
+    def _run(self, key, job, display, on_done):
+        """Run job on a worker thread and hand the result to on_done on the GUI thread"""
+        display.setText("⏳ Processing...")
+        self.runner.run(key, job, on_done, lambda error: display.setText(f"Error: {error}"))
     
     def add_message(self, sender: str, message: str):
         """Add message to conversation"""
@@ -369,12 +382,20 @@ class AIAssistantWidget(QWidget):
         self.add_message("👤 You", query)
         self.query_input.clear()
         
-        # Get response from smart assistant
-        try:
-            response = self.ai_manager.get_smart_assistant_response(query)
-            self.add_message("🤖 Smart Assistant", response)
-        except Exception as e:
-            self.add_message("🤖 Smart Assistant", f"Sorry, an error occurred: {str(e)}")
+        # Answered on a worker thread (cache lookup or model call); each question gets its own key
+        self._query_count += 1
+        self.runner.run(f'chat-{self._query_count}',
+                        lambda: self.ai_manager.ask_smart_assistant(query, self.db_manager),
+                        self._show_reply,
+                        lambda error: self.add_message("🤖 Smart Assistant", f"Sorry, an error occurred: {error}"))
+    
+    def _show_reply(self, reply):
+        """GUI thread: show the answer and the cache hit metrics"""
+        self.add_message("🤖 Smart Assistant", reply.text)
+        metrics = self.ai_manager.assistant_backend(self.db_manager).metrics()
+        self.assistant_status.setText(
+            f"{'⚡ Cached answer' if reply.cached else f'Answered in {reply.elapsed_ms / 1000:.1f} s'} · "
+            f"cache hits {metrics['hits']}/{metrics['hits'] + metrics['model']} ({metrics['hit_rate']:.0%})")
     
     def ask_quick_question(self, question: str):
         """Ask a quick question"""
@@ -383,43 +404,40 @@ class AIAssistantWidget(QWidget):
     
     def analyze_patterns(self):
         """Analyze patterns"""
-        try:
-            if not self.attendance_data:
+        def done(aggregates):
+            if not aggregates.total_records:
                 self.analysis_display.setText("No data available for analysis")
                 return
-                
-            analysis = self.ai_manager.analyze_attendance_patterns(self.attendance_data)
-            patterns = analysis.get('patterns', {})
             
             result = "🔍 Pattern Analysis:\n\n"
-            result += f"📊 Total Records: {analysis.get('total_records', 0)}\n"
-            result += f"👥 Number of Employees: {analysis.get('unique_employees', 0)}\n\n"
+            result += f"📊 Total Records: {aggregates.total_records}\n"
+            result += f"👥 Number of Employees: {aggregates.unique_employees}\n\n"
             
-            if 'day_distribution' in patterns:
-                result += "📅 Attendance Distribution by Days:\n"
-                for day, count in patterns['day_distribution'].items():
-                    result += f"  {day}: {count}\n"
-                result += "\n"
+            result += "📅 Attendance Distribution by Days:\n"
+            for day, count in aggregates.weekday_distribution().items():
+                result += f"  {day}: {count}\n"
+            result += "\n"
             
-            if 'hour_distribution' in patterns:
-                result += "⏰ Attendance Distribution by Hours:\n"
-                for hour, count in patterns['hour_distribution'].items():
-                    result += f"  {hour}:00 - {count}\n"
-                result += "\n"
+            result += "⏰ Attendance Distribution by Hours:\n"
+            for hour, count in aggregates.hour_distribution().items():
+                result += f"  {hour}:00 - {count}\n"
+            result += "\n"
             
             self.analysis_display.setText(result)
-            
-        except Exception as e:
-            self.analysis_display.setText(f"Error in analysis: {str(e)}")
+        
+        self._run('analysis', self._aggregates, self.analysis_display, done)
+    
+    def _analyze(self):
+        """Worker thread: AI pattern analysis over the cached attendance frame"""
+        frame = self._frame()
+        return None if frame is None else self.ai_manager.analyze_attendance_patterns(frame)
     
     def analyze_anomalies(self):
         """Detect anomalies"""
-        try:
-            if not self.attendance_data:
+        def done(analysis):
+            if analysis is None:
                 self.analysis_display.setText("No data available for analysis")
                 return
-                
-            analysis = self.ai_manager.analyze_attendance_patterns(self.attendance_data)
             anomalies = analysis.get('anomalies', [])
             
             result = "⚠️ Anomaly Detection:\n\n"
@@ -436,18 +454,15 @@ class AIAssistantWidget(QWidget):
                 result += "✅ No anomalies detected in the data"
             
             self.analysis_display.setText(result)
-            
-        except Exception as e:
-            self.analysis_display.setText(f"Error in analysis: {str(e)}")
+        
+        self._run('analysis', self._analyze, self.analysis_display, done)
     
     def analyze_trends(self):
         """Analyze trends"""
-        try:
-            if not self.attendance_data:
+        def done(analysis):
+            if analysis is None:
                 self.analysis_display.setText("No data available for analysis")
                 return
-                
-            analysis = self.ai_manager.analyze_attendance_patterns(self.attendance_data)
             trends = analysis.get('trends', {})
             
             result = "📈 Trend Analysis:\n\n"
@@ -458,62 +473,70 @@ class AIAssistantWidget(QWidget):
                 result += f"Monthly Growth Rate: {growth:.2f}%\n"
                 result += f"Growth Direction: {direction}\n\n"
             
-            if 'trend_direction' in trends:
-                result += f"General Trend: {trends['trend_direction']}\n"
+            linear_trend = trends.get('linear_trend', {})
+            if 'trend_direction' in trends or 'direction' in linear_trend:
+                result += f"General Trend: {trends.get('trend_direction', linear_trend.get('direction'))}\n"
             
-            if 'weekly_slope' in trends:
-                slope = trends['weekly_slope']
+            if 'weekly_slope' in trends or 'slope' in linear_trend:
+                slope = trends.get('weekly_slope', linear_trend.get('slope', 0))
                 result += f"Weekly Trend Slope: {slope:.2f}\n"
             
             self.analysis_display.setText(result)
-            
-        except Exception as e:
-            self.analysis_display.setText(f"Error in analysis: {str(e)}")
+        
+        self._run('analysis', self._analyze, self.analysis_display, done)
     
     def generate_predictions(self):
         """Generate predictions"""
-        try:
-            if not self.attendance_data:
+        days = int(self.days_combo.currentText())
+        
+        def job():
+            frame = self._frame()
+            return None if frame is None else self.ai_manager.predict_attendance_trends(frame, days)
+        
+        def done(predictions):
+            if predictions is None:
                 self.predictions_display.setText("No data available for prediction")
                 return
-                
-            days = int(self.days_combo.currentText())
-            predictions = self.ai_manager.predict_attendance_trends(self.attendance_data, days)
             
             result = f"🔮 Predictions for the next {days} days:\n\n"
             
             if predictions.get('predictions'):
-                result += f"📊 Model Accuracy: {predictions.get('model_accuracy', 0):.2%}\n"
-                result += f"📈 Trend Direction: {predictions.get('trend_direction', 'Not specified')}\n"
-                result += f"💪 Trend Strength: {predictions.get('trend_strength', 0):.2f}\n\n"
+                model_info = predictions.get('model_info', {})
+                result += f"📊 Model Accuracy: {model_info.get('r2_score', 0):.2%}\n"
+                result += f"📈 Trend Direction: {predictions.get('trend', 'Not specified')}\n"
+                result += f"💪 Trend Strength: {model_info.get('slope', 0):.2f}\n\n"
                 
                 result += "Daily predictions:\n"
                 for pred in predictions['predictions'][:10]:  # Show first 10 predictions
-                    result += f"  {pred['date']}: {pred['predicted_count']} (confidence: {pred['confidence']:.1%})\n"
+                    result += f"  {pred['date']}: {pred['predicted_count']} (confidence: {pred['confidence']})\n"
             else:
                 result += "❌ Failed to generate predictions"
             
             self.predictions_display.setText(result)
-            
-        except Exception as e:
-            self.predictions_display.setText(f"Error in prediction: {str(e)}")
+        
+        self._run('predictions', job, self.predictions_display, done)
     
     def generate_comprehensive_report(self):
         """Generate comprehensive report"""
-        try:
-            if not self.attendance_data:
+        def job():
+            frame = self._frame()
+            return None if frame is None else self.ai_manager.generate_smart_report(frame)
+        
+        def done(report):
+            if report is None:
                 self.reports_display.setText("No data available for report")
                 return
-                
-            report = self.ai_manager.generate_smart_report(self.attendance_data, "comprehensive")
             
             result = "📋 Comprehensive Report:\n\n"
             result += f"📅 Generation Date: {report.get('generated_at', 'Not specified')}\n"
-            result += f"📊 Report Type: {report.get('report_type', 'Not specified')}\n\n"
+            result += f"📊 Report Type: {report.get('report_type', 'comprehensive')}\n\n"
             
             if 'summary' in report:
                 result += "📝 Executive Summary:\n"
-                result += report['summary'] + "\n\n"
+                summary = report['summary']
+                if isinstance(summary, dict):
+                    summary = "\n".join(f"  {key}: {value}" for key, value in summary.items())
+                result += f"{summary}\n\n"
             
             if 'recommendations' in report:
                 result += "💡 Recommendations:\n"
@@ -522,42 +545,38 @@ class AIAssistantWidget(QWidget):
                 result += "\n"
             
             self.reports_display.setText(result)
-            
-        except Exception as e:
-            self.reports_display.setText(f"Error in report: {str(e)}")
+        
+        self._run('reports', job, self.reports_display, done)
     
     def generate_performance_report(self):
         """Generate performance report"""
-        try:
-            if not self.attendance_data:
+        def done(aggregates):
+            if not aggregates.total_records:
                 self.reports_display.setText("No data available for report")
                 return
-                
-            # Performance analysis
-            df = pd.DataFrame(self.attendance_data)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            stats = aggregates.daily_stats()
             
             result = "⚡ Performance Report:\n\n"
             
             # General statistics
-            result += f"📊 Total Records: {len(df)}\n"
-            result += f"👥 Number of Employees: {df['employee_id'].nunique()}\n"
-            result += f"📅 Date Range: {df['timestamp'].min().date()} to {df['timestamp'].max().date()}\n\n"
+            result += f"📊 Total Records: {aggregates.total_records}\n"
+            result += f"👥 Number of Employees: {aggregates.unique_employees}\n"
+            result += f"📅 Date Range: {aggregates.first_date} to {aggregates.last_date}\n\n"
             
             # Daily performance analysis
-            daily_counts = df.groupby(df['timestamp'].dt.date).size()
-            result += f"📈 Average Daily Attendance: {daily_counts.mean():.1f}\n"
-            result += f"📉 Lowest Attendance Day: {daily_counts.min()} (on {daily_counts.idxmin()})\n"
-            result += f"📊 Highest Attendance Day: {daily_counts.max()} (on {daily_counts.idxmax()})\n\n"
+            result += f"📈 Average Daily Attendance: {stats['mean']:.1f}\n"
+            result += f"📉 Lowest Attendance Day: {stats['min']} (on {stats['min_date']})\n"
+            result += f"📊 Highest Attendance Day: {stats['max']} (on {stats['max_date']})\n\n"
             
             # Weekly performance analysis
-            df['day_of_week'] = df['timestamp'].dt.day_name()
-            weekly_counts = df.groupby('day_of_week').size()
             result += "📅 Weekly Performance:\n"
-            for day, count in weekly_counts.items():
+            for day, count in aggregates.weekday_distribution().items():
                 result += f"  {day}: {count}\n"
             
             self.reports_display.setText(result)
-            
-        except Exception as e:
-            self.reports_display.setText(f"Error في التقرير: {str(e)}")
+        
+        self._run('reports', self._aggregates, self.reports_display, done)
+    
+    def shutdown_tasks(self):
+        """Wait for running analytics tasks (called when the main window closes)"""
+        self.runner.shutdown()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+مخططات التحليلات ومهامها خارج خيط الواجهة
+- matplotlib بواجهة Agg (Figure + FigureCanvasAgg، بدون pyplot) يرسم إلى مخزن RGBA يُنسخ إلى QImage
+- QImage تُنشأ في الخيط الخلفي؛ التحويل إلى QPixmap في خيط الواجهة فقط
+- ذاكرة للصور حسب (النوع، إصدار البيانات، الحجم): نفس المخطط لا يُرسم مرتين بين التبويبات والشاشات
+- AnalyticsRunner: مهمة واحدة فعالة لكل مفتاح؛ نتيجة مهمة قديمة (ضغطة سابقة) تُتجاهل
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+
+from app.database.attendance_aggregates import WEEKDAYS, AttendanceAggregates
+from app.utils.app_logger import get_logger
+
+logger = get_logger("AnalyticsCharts")
+
+CHART_KINDS = ('daily', 'weekly', 'hourly')
+_CHART_TITLES = {
+    'daily': "Daily attendance",
+    'weekly': "Attendance by day of week",
+    'hourly': "Attendance by hour",
+}
+_CHART_COLORS = {'daily': '#007bff', 'weekly': '#28a745', 'hourly': '#6f42c1'}
+_MAX_CACHED_CHARTS = 32
+
+_chart_cache: 'OrderedDict[Tuple, QImage]' = OrderedDict()
+_chart_cache_lock = threading.Lock()
+
+
+def render_chart(aggregates: AttendanceAggregates, kind: str, width: int, height: int, dpi: int = 100) -> QImage:
+    """يرسم المخطط إلى QImage (آمن خارج خيط الواجهة)؛ مخزن حسب إصدار البيانات والحجم"""
+    key = (kind, aggregates.version, width, height, dpi)
+    if aggregates.version is not None:
+        with _chart_cache_lock:
+            image = _chart_cache.get(key)
+            if image is not None:
+                _chart_cache.move_to_end(key)
+                return image
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    import numpy as np
+
+    figure = Figure(figsize=(max(width, 100) / dpi, max(height, 80) / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    color = _CHART_COLORS.get(kind, '#007bff')
+    if kind == 'daily':
+        if aggregates.daily:
+            dates = np.array([day[:10] for day, _count in aggregates.daily], dtype='datetime64[D]')
+            axes.plot(dates, aggregates.daily_counts(), color=color, linewidth=1.5)
+            axes.fill_between(dates, aggregates.daily_counts(), color=color, alpha=0.15)
+            figure.autofmt_xdate()
+    elif kind == 'weekly':
+        axes.bar([day[:3] for day in WEEKDAYS], aggregates.weekday, color=color)
+    elif kind == 'hourly':
+        axes.bar(range(24), aggregates.hourly, color=color)
+        axes.set_xticks(range(0, 24, 2))
+    else:
+        raise ValueError(f"Unknown chart kind: {kind}")
+    axes.set_title(_CHART_TITLES[kind])
+    axes.grid(axis='y', alpha=0.3)
+    if not aggregates.total_records:
+        axes.text(0.5, 0.5, "No data", transform=axes.transAxes, ha='center', va='center', color='#6c757d')
+    figure.tight_layout()
+    canvas.draw()
+
+    pixel_width, pixel_height = canvas.get_width_height()
+    image = QImage(bytes(canvas.buffer_rgba()), pixel_width, pixel_height, pixel_width * 4,
+                   QImage.Format.Format_RGBA8888).copy()
+    if aggregates.version is not None:
+        with _chart_cache_lock:
+            _chart_cache[key] = image
+            while len(_chart_cache) > _MAX_CACHED_CHARTS:
+                _chart_cache.popitem(last=False)
+    return image
+
+
+def chart_pixmap(image: QImage, device_pixel_ratio: float = 1.0) -> QPixmap:
+    """خيط الواجهة فقط"""
+    pixmap = QPixmap.fromImage(image)
+    pixmap.setDevicePixelRatio(device_pixel_ratio)
+    return pixmap
+
+
+class AnalyticsTask(QThread):
+    done = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, generation: int, job: Callable[[], Any], parent=None):
+        super().__init__(parent)
+        self.generation = generation
+        self.job = job
+
+    def run(self):
+        try:
+            self.done.emit(self.generation, self.job())
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
+
+
+class AnalyticsRunner(QObject):
+    """يشغل المهام في خيوط خلفية؛ لكل مفتاح (منطقة عرض) تُسلَّم نتيجة آخر مهمة فقط"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._generation = 0
+        self._latest: Dict[str, int] = {}
+        self._callbacks: Dict[int, Tuple[str, Callable[[Any], None], Optional[Callable[[str], None]]]] = {}
+        self._tasks: Dict[int, AnalyticsTask] = {}
+
+    def run(self, key: str, job: Callable[[], Any], on_done: Callable[[Any], None],
+            on_error: Optional[Callable[[str], None]] = None) -> int:
+        self._generation += 1
+        generation = self._generation
+        self._latest[key] = generation
+        self._callbacks[generation] = (key, on_done, on_error)
+        task = AnalyticsTask(generation, job, self)
+        task.done.connect(self._on_done)
+        task.failed.connect(self._on_failed)
+        task.finished.connect(lambda generation=generation: self._on_finished(generation))
+        self._tasks[generation] = task
+        task.start()
+        return generation
+
+    def _take(self, generation: int):
+        callbacks = self._callbacks.pop(generation, None)
+        if callbacks is None or self._latest.get(callbacks[0]) != generation:
+            return None
+        return callbacks
+
+    def _on_done(self, generation: int, result: Any):
+        callbacks = self._take(generation)
+        if callbacks is not None:
+            callbacks[1](result)
+
+    def _on_failed(self, generation: int, error: str):
+        logger.error(f"❌ Analytics task failed: {error}")
+        callbacks = self._take(generation)
+        if callbacks is not None and callbacks[2] is not None:
+            callbacks[2](error)
+
+    def _on_finished(self, generation: int):
+        task = self._tasks.pop(generation, None)
+        if task is not None:
+            task.deleteLater()
+
+    def is_busy(self, key: str) -> bool:
+        return self._latest.get(key) in self._callbacks
+
+    def shutdown(self, timeout_ms: int = 2000):
+        """انتظار المهام الجارية قبل إغلاق النافذة"""
+        self._callbacks.clear()
+        for task in list(self._tasks.values()):
+            if task.isRunning():
+                task.wait(timeout_ms)
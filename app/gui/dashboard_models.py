@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+نماذج جداول لوحة التحكم (Model/View)
+- AttendanceTableModel: صفوف مفتاحها معرف سجل الحضور، وكل تحديث يُطبَّق كفرق
+  (إدراج/حذف/dataChanged للصفوف التي تغيرت فقط) بدل إعادة بناء الجدول
+- DashboardFilterProxy: الفرز والبحث عبر QSortFilterProxyModel على مفاتيح فرز مُعدّة مسبقاً
+- MapLinkDelegate: عمود الخريطة يُرسم كنص رابط ويُفتح بالنقر، بدون زر QPushButton لكل صف
+- DashboardLoader: جلب السجلات والمواقع وتجهيز الصفوف خارج خيط الواجهة
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PyQt6.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QThread, QEvent, pyqtSignal
+)
+from PyQt6.QtGui import QColor
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+MAP_ROLE = Qt.ItemDataRole.UserRole + 2
+
+LATE_COLOR = QColor('red')
+LINK_COLOR = QColor('#0078d4')
+
+
+@dataclass(frozen=True)
+class DashboardRow:
+    """صف جاهز للعرض: القيم النصية ومفاتيح الفرز محسوبة مرة واحدة في خيط التحميل"""
+    record_id: Any
+    values: Tuple[str, ...]
+    sort_keys: Tuple[Any, ...]
+    late: bool = False
+    map_coords: Optional[Tuple[float, float]] = None
+
+
+def _time_to_seconds(text: str) -> Optional[int]:
+    try:
+        hours, minutes, seconds = (text or '').split(':')[:3]
+        return int(hours) * 3600 + int(minutes) * 60 + int(float(seconds))
+    except (TypeError, ValueError):
+        return None
+
+
+def build_dashboard_rows(records: Sequence[Dict], locations: Dict[Any, Dict], settings: Dict[str, Any],
+                         labels: Dict[str, str]) -> Tuple[List[DashboardRow], List[DashboardRow]]:
+    """تحويل سجلات اليوم إلى صفوف جدولي الحضور والانصراف (دالة صافية: تعمل في أي خيط)"""
+    work_start = _time_to_seconds(settings.get('work_start_time', '08:30:00')) or 0
+    try:
+        late_allowance_minutes = int(settings.get('late_allowance_minutes', '15'))
+    except (TypeError, ValueError):
+        late_allowance_minutes = 15
+    late_after = work_start + late_allowance_minutes * 60
+    not_available = labels.get('N/A', 'N/A')
+    view_label = f"🗺️ {labels.get('View', 'View')}"
+
+    checkin_rows, checkout_rows = [], []
+    for record in records:
+        record_id = record.get('id')
+        if record_id is None:
+            record_id = (record.get('employee_id'), record.get('check_time'), record.get('type'))
+        employee_name = record.get('employee_name') or ''
+        check_time = record.get('check_time') or ''
+        location_name = record.get('location_name') or not_available
+
+        map_coords = None
+        location = locations.get(record.get('location_id')) if record.get('location_id') else None
+        if location and location.get('latitude') is not None and location.get('longitude') is not None:
+            map_coords = (location['latitude'], location['longitude'])
+        map_text = view_label if map_coords else ''
+
+        if record.get('type') == 'Check-In':
+            arrival = _time_to_seconds(check_time)
+            late = arrival is not None and arrival > late_after
+            status = labels.get('Late', 'Late') if late else labels.get('On Time', 'On Time')
+            notes = record.get('notes') or ''
+            checkin_rows.append(DashboardRow(
+                record_id,
+                (employee_name, check_time, status, notes, location_name, map_text),
+                (employee_name.lower(), arrival if arrival is not None else -1, status, notes, location_name, map_text),
+                late, map_coords
+            ))
+        elif record.get('type') == 'Check-Out':
+            duration = record.get('work_duration_hours')
+            duration_str = str(duration) if duration is not None else ""
+            try:
+                duration_key = float(duration) if duration is not None else -1.0
+            except (TypeError, ValueError):
+                duration_key = -1.0
+            departure = _time_to_seconds(check_time)
+            checkout_rows.append(DashboardRow(
+                record_id,
+                (employee_name, check_time, duration_str, location_name, map_text),
+                (employee_name.lower(), departure if departure is not None else -1, duration_key, location_name, map_text),
+                False, map_coords
+            ))
+    return checkin_rows, checkout_rows
+
+
+class AttendanceTableModel(QAbstractTableModel):
+    """
+    نموذج جدول حضور/انصراف. ترتيب الصفوف داخل النموذج هو ترتيب الوصول؛ الفرز المعروض من
+    DashboardFilterProxy، لذلك يكفي إلحاق الصفوف الجديدة في النهاية.
+    """
+
+    def __init__(self, headers: Sequence[str], late_columns: Sequence[int] = (), map_column: Optional[int] = None,
+                 parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.late_columns = set(late_columns)
+        self.map_column = map_column
+        self._rows: List[DashboardRow] = []
+        self._positions: Dict[Any, int] = {}
+
+    # --- واجهة QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row.values[column]
+        if role == SORT_ROLE:
+            return row.sort_keys[column]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if column == self.map_column and row.map_coords:
+                return LINK_COLOR
+            if row.late and column in self.late_columns:
+                return LATE_COLOR
+            return None
+        if role == MAP_ROLE:
+            return row.map_coords
+        if role == Qt.ItemDataRole.ToolTipRole and column == self.map_column and row.map_coords:
+            return f"{row.map_coords[0]}, {row.map_coords[1]}"
+        return None
+
+    # --- التحديث ---
+
+    def set_headers(self, headers: Sequence[str]):
+        """عناوين مترجمة جديدة (نفس عدد الأعمدة)"""
+        self.headers = list(headers)
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, len(self.headers) - 1)
+
+    def rows(self) -> List[DashboardRow]:
+        return list(self._rows)
+
+    def reset_rows(self, rows: Sequence[DashboardRow]):
+        """استبدال كامل (عند تغيير اليوم المعروض)"""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._positions = {row.record_id: i for i, row in enumerate(self._rows)}
+        self.endResetModel()
+
+    def apply_rows(self, rows: Sequence[DashboardRow]) -> Dict[str, int]:
+        """تطبيق الحالة الجديدة كفرق مع الحالية؛ يُرجع عدد الصفوف المدرجة والمحذوفة والمتغيرة"""
+        incoming = {row.record_id: row for row in rows}
+
+        # 1) حذف الصفوف المختفية: مقاطع متصلة من الأسفل للأعلى حتى لا تتزحزح المواقع
+        removed_positions = [i for i, row in enumerate(self._rows) if row.record_id not in incoming]
+        for first, last in reversed(contiguous_runs(removed_positions)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        if removed_positions:
+            self._positions = {row.record_id: i for i, row in enumerate(self._rows)}
+
+        # 2) الصفوف المتغيرة فقط: dataChanged لكل مقطع متصل
+        changed_positions = []
+        for i, row in enumerate(self._rows):
+            new_row = incoming[row.record_id]
+            if new_row != row:
+                self._rows[i] = new_row
+                changed_positions.append(i)
+        last_column = self.columnCount() - 1
+        for first, last in contiguous_runs(changed_positions):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, last_column))
+
+        # 3) الجديدة تُلحق في النهاية دفعة واحدة
+        new_rows = [row for row in rows if row.record_id not in self._positions]
+        if new_rows:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(new_rows) - 1)
+            for offset, row in enumerate(new_rows):
+                self._positions[row.record_id] = start + offset
+            self._rows.extend(new_rows)
+            self.endInsertRows()
+
+        return {'inserted': len(new_rows), 'removed': len(removed_positions), 'changed': len(changed_positions)}
+
+
+def contiguous_runs(positions: Sequence[int]) -> List[Tuple[int, int]]:
+    """مواضع مرتبة إلى مجالات متصلة لإشارات الصفوف: [1, 2, 3, 7, 8] -> [(1, 3), (7, 8)]"""
+    runs: List[Tuple[int, int]] = []
+    for position in positions:
+        if runs and runs[-1][1] == position - 1:
+            runs[-1] = (runs[-1][0], position)
+        else:
+            runs.append((position, position))
+    return runs
+
+
+class DashboardFilterProxy(QSortFilterProxyModel):
+    """فرز بمفاتيح SORT_ROLE (الوقت بالثواني، المدة رقماً) وبحث نصي في كل الأعمدة"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setFilterKeyColumn(-1)
+        self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setDynamicSortFilter(True)
+
+
+class MapLinkDelegate(QStyledItemDelegate):
+    """عمود الخريطة: النقر على خلية لها إحداثيات يطلب فتح الخريطة"""
+
+    map_requested = pyqtSignal(float, float)
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton):
+            coords = index.data(MAP_ROLE)
+            if coords:
+                self.map_requested.emit(float(coords[0]), float(coords[1]))
+                return True
+        return super().editorEvent(event, model, option, index)
+
+
+# --- Worker Thread لجلب بيانات لوحة التحكم خارج خيط الواجهة ---
+class DashboardLoader(QThread):
+    loaded = pyqtSignal(int, str, list, list, dict)  # generation, date, checkin rows, checkout rows, locations
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, db_manager, generation: int, date_str: str, settings: Dict[str, Any],
+                 labels: Dict[str, str], parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.generation = generation
+        self.date_str = date_str
+        self.settings = settings
+        self.labels = labels
+
+    def run(self):
+        try:
+            locations = {loc['id']: loc for loc in (self.db_manager.get_all_locations() or [])}
+            records = self.db_manager.get_attendance_by_date(self.date_str) or []
+            checkin_rows, checkout_rows = build_dashboard_rows(records, locations, self.settings, self.labels)
+            self.loaded.emit(self.generation, self.date_str, checkin_rows, checkout_rows, locations)
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
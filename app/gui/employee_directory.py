@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+دليل الموظفين (Model/View)
+- EmployeeColumns: مخزن أعمدة مضغوط (قائمة لكل عمود) بدل قاموس لكل موظف
+- EmployeeTableModel: يعرض مواقع الصفوف الظاهرة فقط؛ البحث والفرز يستبدلان قائمة المواقع
+  دون إنشاء أي عنصر لكل خلية
+- EmployeesLoader: جلب الموظفين وبناء الأعمدة وفهرس البحث (مرة لكل إصدار بيانات) خارج خيط الواجهة
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QThread, pyqtSignal
+from PyQt6.QtGui import QColor
+
+from app.utils.search_index import SearchIndex
+
+STATUS_COLORS = {
+    'present': QColor(144, 238, 144),   # أخضر فاتح
+    'left': QColor(255, 255, 224),      # أصفر فاتح
+    'absent': QColor(255, 182, 193),    # أحمر فاتح
+}
+
+
+def _status_category(status: str) -> Optional[str]:
+    if 'حاضر' in status:
+        return 'present'
+    if 'انصرف' in status:
+        return 'left'
+    if 'لم يسجل' in status:
+        return 'absent'
+    return None
+
+
+@dataclass
+class EmployeeColumns:
+    """أعمدة الجدول؛ الصف رقم i هو الموظف i في كل قائمة"""
+    ids: List[int] = field(default_factory=list)
+    codes: List[str] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+    job_titles: List[str] = field(default_factory=list)
+    departments: List[str] = field(default_factory=list)
+    phones: List[str] = field(default_factory=list)
+    statuses: List[str] = field(default_factory=list)
+    last_attendance: List[str] = field(default_factory=list)
+    status_categories: List[Optional[str]] = field(default_factory=list)
+
+    @classmethod
+    def from_employees(cls, employees: Sequence[Dict[str, Any]], with_attendance: bool) -> 'EmployeeColumns':
+        columns = cls()
+        for employee in employees:
+            columns.ids.append(int(employee['id']))
+            columns.codes.append(str(employee.get('employee_code') or ''))
+            columns.names.append(str(employee.get('name') or ''))
+            columns.job_titles.append(str(employee.get('job_title') or ''))
+            columns.departments.append(str(employee.get('department') or ''))
+            columns.phones.append(str(employee.get('phone_number') or employee.get('phone') or ''))
+            if with_attendance:
+                status = employee.get('attendance_status', 'لم يسجل حضور')
+                last_attendance = ''
+                if employee.get('last_attendance_date') and employee.get('last_attendance_time'):
+                    last_attendance = f"{employee['last_attendance_date']} {employee['last_attendance_time']}"
+                elif employee.get('last_attendance_date'):
+                    last_attendance = employee['last_attendance_date']
+            else:
+                status = last_attendance = 'غير متوفر'
+            columns.statuses.append(status)
+            columns.last_attendance.append(last_attendance)
+            columns.status_categories.append(_status_category(status) if with_attendance else None)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def column(self, index: int) -> List[Any]:
+        return (self.ids, self.codes, self.names, self.job_titles, self.departments, self.phones,
+                self.statuses, self.last_attendance)[index]
+
+    def search_rows(self):
+        """الحقول المفهرسة للبحث: الاسم، الكود، القسم، الهاتف، المسمى الوظيفي"""
+        return zip(self.names, self.codes, self.departments, self.phones, self.job_titles)
+
+
+class EmployeeTableModel(QAbstractTableModel):
+    def __init__(self, headers: Sequence[str], parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.columns = EmployeeColumns()
+        self.index_ = SearchIndex(())
+        self._visible: List[int] = []
+        self._matches: List[int] = []
+        self._sort_column: Optional[int] = None
+        self._sort_order = Qt.SortOrder.AscendingOrder
+
+    # --- واجهة QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        position = self._visible[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self.columns.column(index.column())[position]
+            return str(value)
+        if role == Qt.ItemDataRole.BackgroundRole and index.column() == 6:
+            category = self.columns.status_categories[position]
+            return STATUS_COLORS.get(category) if category else None
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._sort_column, self._sort_order = column, order
+        self.layoutAboutToBeChanged.emit()
+        self._visible = self._sorted(self._matches)
+        self.layoutChanged.emit()
+
+    # --- البيانات والبحث ---
+
+    def set_data(self, columns: EmployeeColumns, index: SearchIndex, query: str = ''):
+        self.beginResetModel()
+        self.columns, self.index_ = columns, index
+        self._matches = index.search(query)
+        self._visible = self._sorted(self._matches)
+        self.endResetModel()
+
+    def apply_search(self, query: str) -> int:
+        matches = self.index_.search(query)
+        self.beginResetModel()
+        self._matches = matches
+        self._visible = self._sorted(matches)
+        self.endResetModel()
+        return len(matches)
+
+    def _sorted(self, positions: List[int]) -> List[int]:
+        if self._sort_column is None:
+            return list(positions)
+        values = self.columns.column(self._sort_column)
+        key = (lambda p: values[p]) if self._sort_column == 0 else (lambda p: values[p].casefold())
+        return sorted(positions, key=key, reverse=self._sort_order == Qt.SortOrder.DescendingOrder)
+
+    def employee_at(self, row: int) -> Optional[Dict[str, Any]]:
+        if not 0 <= row < len(self._visible):
+            return None
+        position = self._visible[row]
+        return {'id': self.columns.ids[position], 'employee_code': self.columns.codes[position],
+                'name': self.columns.names[position]}
+
+    def total_count(self) -> int:
+        return len(self.columns)
+
+
+# --- Worker Thread لجلب الموظفين وبناء فهرس البحث في الخلفية ---
+class EmployeesLoader(QThread):
+    loaded = pyqtSignal(int, object, object)  # generation, EmployeeColumns, SearchIndex
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, db_manager, generation: int, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.generation = generation
+
+    def run(self):
+        try:
+            with_attendance = hasattr(self.db_manager, 'get_employees_with_attendance')
+            if with_attendance:
+                employees = self.db_manager.get_employees_with_attendance() or []
+            else:
+                employees = self.db_manager.get_all_employees() or []
+            columns = EmployeeColumns.from_employees(employees, with_attendance)
+            self.loaded.emit(self.generation, columns, SearchIndex(columns.search_rows()))
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
@@ -1,17 +1,18 @@
 import os
 import io
 import base64
+import shutil
 import tempfile
 from PIL import Image
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableView,
     QHeaderView, QMessageBox, QInputDialog, QLabel, QLineEdit, QComboBox,
     QGroupBox, QFormLayout, QCheckBox, QSpinBox, QDateEdit, QTextEdit,
-    QSplitter, QFrame, QProgressBar, QDialog, QDialogButtonBox, QAbstractItemView,
-    QFileDialog, QApplication
+    QSplitter, QFrame, QDialog, QDialogButtonBox, QAbstractItemView,
+    QFileDialog
 )
 from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QDate, QCoreApplication
-from PyQt6.QtGui import QFont, QColor, QPalette
+from PyQt6.QtGui import QFont, QPalette
 import pandas as pd
 
 from app.database.simple_hybrid_manager import SimpleHybridManager
@@ -19,6 +20,9 @@ from app.fingerprint.zk_manager import ZKManager
 from app.core.config_manager import get_config
 from app.gui.employee_dialog import EmployeeDialog
 from app.gui.history_dialog import HistoryDialog
+from app.gui.employee_directory import EmployeeTableModel, EmployeesLoader
+
+SEARCH_DEBOUNCE_MS = 150
 
 # --- Worker Thread لتسجيل البصمة في الخلفية ---
 class EnrollWorker(QThread):
@@ -72,7 +76,10 @@ class EmployeesWidget(QWidget):
         self.zk_manager = self.initialize_zk_manager()
         self.enroll_worker = None
         self.enroll_msg_box = None
-        self.all_employees = []  # تخزين جميع الموظفين للبحث
+        # البيانات وفهرس البحث في self.model (يُبنيان في EmployeesLoader مرة لكل تحميل)
+        self.employees_loader = None
+        self._load_generation = 0
+        self._reload_pending = False
         
         self.setup_ui()
         self.connect_signals()
@@ -139,6 +146,8 @@ class EmployeesWidget(QWidget):
         search_layout.addWidget(search_label)
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(self.clear_search_button)
+        self.results_label = QLabel("")
+        search_layout.addWidget(self.results_label)
         search_layout.addStretch()
         layout.addLayout(search_layout)
         
@@ -146,8 +155,7 @@ class EmployeesWidget(QWidget):
             self.add_button.setEnabled(False); self.import_button.setEnabled(False); self.export_template_button.setEnabled(False); self.export_data_button.setEnabled(False)
             self.export_qr_button.setEnabled(False); self.export_qr_images_button.setEnabled(False); self.register_fp_button.setEnabled(False); self.edit_button.setEnabled(False); self.delete_button.setEnabled(False); self.qr_button.setEnabled(False)
         
-        self.table = QTableWidget(); self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
+        self.model = EmployeeTableModel([
             "ID", 
             self.tr("Code"), 
             self.tr("Full Name"), 
@@ -156,10 +164,18 @@ class EmployeesWidget(QWidget):
             self.tr("Phone Number"),
             self.tr("Attendance Status"),
             self.tr("Last Attendance")
-        ])
+        ], parent=self)
+        self.table = QTableView(); self.table.setModel(self.model)
+        # أعمدة بعرض ثابت (Stretch) وارتفاع صف ثابت: لا قياس لنص الخلايا مهما كان عدد الموظفين
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch); self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed); self.table.verticalHeader().setDefaultSectionSize(26)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers); self.table.setSortingEnabled(True)
         layout.addWidget(self.table)
+        
+        # البحث يُنفذ بعد توقف الكتابة لحظة وليس مع كل ضغطة مفتاح
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
 
     def connect_signals(self):
         self.add_button.clicked.connect(self.add_employee); self.import_button.clicked.connect(self.import_from_excel)
@@ -171,33 +187,52 @@ class EmployeesWidget(QWidget):
         self.history_button.clicked.connect(self.view_employee_history); self.qr_button.clicked.connect(self.show_qr_code); self.refresh_button.clicked.connect(self.load_employees_data)
         
         # إشارات البحث
-        self.search_input.textChanged.connect(self.filter_employees)
+        self.search_input.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_timer.timeout.connect(lambda: self.filter_employees(self.search_input.text()))
         self.clear_search_button.clicked.connect(self.clear_search)
         
     def load_employees_data(self):
-        # استخدام الدالة المحسنة إذا كانت متوفرة
-        if hasattr(self.db_manager, 'get_employees_with_attendance'):
-            employees = self.db_manager.get_employees_with_attendance() or []
-        else:
-            employees = self.db_manager.get_all_employees() or []
-        
-        # تخزين جميع الموظفين للبحث
-        self.all_employees = employees
-        
-        # استخدام دالة populate_table الجديدة
-        self.populate_table(employees)
+        """جلب الموظفين وبناء فهرس البحث في الخلفية؛ on_employees_loaded يعرض النتيجة"""
+        if self.employees_loader is not None and self.employees_loader.isRunning():
+            self._reload_pending = True
+            return
+        self._reload_pending = False
+        self._load_generation += 1
+        self.employees_loader = EmployeesLoader(self.db_manager, self._load_generation, parent=self)
+        self.employees_loader.loaded.connect(self.on_employees_loaded)
+        self.employees_loader.failed.connect(lambda _, error: print(f"❌ Error loading employees: {error}"))
+        self.employees_loader.finished.connect(self._on_employees_loader_finished)
+        self.employees_loader.start()
+
+    def on_employees_loaded(self, generation, columns, index):
+        if generation != self._load_generation:
+            return
+        self.model.set_data(columns, index, self.search_input.text())
+        self._update_results_label()
+
+    def _on_employees_loader_finished(self):
+        loader, self.employees_loader = self.employees_loader, None
+        if loader is not None:
+            loader.deleteLater()
+        if self._reload_pending:
+            self.load_employees_data()
+
+    def _selected_employee(self):
+        """الموظف في الصف المحدد ({'id', 'employee_code', 'name'}) أو None"""
+        index = self.table.currentIndex()
+        return self.model.employee_at(index.row()) if index.isValid() else None
 
     def register_fingerprint(self):
-        selected_row = self.table.currentRow()
-        if selected_row < 0:
+        employee = self._selected_employee()
+        if employee is None:
             QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to register their fingerprint.")); return
 
         if not self.zk_manager:
             QMessageBox.critical(self, self.tr("Error"), self.tr("Fingerprint device manager is not initialized. Check config.")); return
 
-        employee_id = int(self.table.item(selected_row, 0).text())
-        employee_code = self.table.item(selected_row, 1).text()
-        employee_name = self.table.item(selected_row, 2).text()
+        employee_id = employee['id']
+        employee_code = employee['employee_code']
+        employee_name = employee['name']
         
         msg_box = QMessageBox(self); msg_box.setWindowTitle(self.tr("Device Connection")); msg_box.setText(self.tr("Connecting to fingerprint device..."))
         msg_box.setStandardButtons(QMessageBox.StandardButton.NoButton); msg_box.show(); QCoreApplication.processEvents()
@@ -236,8 +271,9 @@ class EmployeesWidget(QWidget):
 
     def on_enroll_success(self, employee_id, template):
         try:
-            template_str = base64.b64encode(template).decode('utf-8')
-            self.db_manager.update_employee_zk_template(employee_id, template_str)
+            # القالب الثنائي يُحفظ كما هو في مخزن القوالب (لا base64 في جدول الموظفين)
+            if not self.db_manager.update_employee_zk_template(employee_id, bytes(template)):
+                raise RuntimeError(self.tr("Template store rejected the template"))
             QMessageBox.information(self, self.tr("Success"), self.tr("Fingerprint enrolled and saved successfully!"))
         except Exception as e:
             QMessageBox.critical(self, self.tr("Database Error"), f"{self.tr('Failed to save the fingerprint template:')}\n{e}")
@@ -252,8 +288,8 @@ class EmployeesWidget(QWidget):
             if data and self.db_manager.add_employee(data):
                 # إنشاء رمز QR تلقائياً للموظف الجديد
                 try:
-                    from app.utils.qr_manager import QRCodeManager
-                    qr_manager = QRCodeManager()
+                    from app.utils.qr_manager import get_qr_manager
+                    qr_manager = get_qr_manager()
                     
                     # الحصول على بيانات الموظف المحدثة (مع ID)
                     employee = self.db_manager.get_employee_by_code(data['employee_code'])
@@ -273,9 +309,9 @@ class EmployeesWidget(QWidget):
                 QMessageBox.critical(self, self.tr("Error"), self.tr("Failed to add employee. The code or phone number might already be in use."))
     
     def edit_employee(self):
-        selected_row = self.table.currentRow();
-        if selected_row < 0: QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to edit.")); return
-        employee_id = int(self.table.item(selected_row, 0).text())
+        selected = self._selected_employee()
+        if selected is None: QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to edit.")); return
+        employee_id = selected['id']
         employee_data = self.db_manager.get_employee_by_id(employee_id)
         dialog = EmployeeDialog(employee_data=employee_data, parent=self)
         if dialog.exec():
@@ -287,9 +323,9 @@ class EmployeesWidget(QWidget):
                  QMessageBox.critical(self, self.tr("Error"), self.tr("Failed to update employee data."))
 
     def delete_employee(self):
-        selected_row = self.table.currentRow();
-        if selected_row < 0: QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to delete.")); return
-        employee_id = int(self.table.item(selected_row, 0).text()); employee_name = self.table.item(selected_row, 2).text()
+        selected = self._selected_employee()
+        if selected is None: QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to delete.")); return
+        employee_id = selected['id']; employee_name = selected['name']
         reply = QMessageBox.question(self, self.tr("Confirm Deletion"), f"{self.tr('Are you sure you want to delete the employee:')} <b>{employee_name}</b>?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             if self.db_manager.delete_employee(employee_id):
@@ -299,21 +335,21 @@ class EmployeesWidget(QWidget):
                 QMessageBox.critical(self, self.tr("Error"), self.tr("Failed to delete the employee."))
     
     def view_employee_history(self):
-        selected_row = self.table.currentRow();
-        if selected_row < 0: QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to view their history.")); return
-        employee_id = int(self.table.item(selected_row, 0).text()); employee_name = self.table.item(selected_row, 2).text()
+        selected = self._selected_employee()
+        if selected is None: QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to view their history.")); return
+        employee_id = selected['id']; employee_name = selected['name']
         history_data = self.db_manager.get_employee_attendance_history(employee_id)
         if not history_data: QMessageBox.information(self, self.tr("No Data"), self.tr("There are no attendance records for this employee.")); return
         dialog = HistoryDialog(employee_name, history_data, self); dialog.exec()
     
     def show_qr_code(self):
         """عرض رمز QR للموظف المحدد"""
-        selected_row = self.table.currentRow()
-        if selected_row < 0:
+        selected = self._selected_employee()
+        if selected is None:
             QMessageBox.warning(self, self.tr("No Selection"), self.tr("Please select an employee to view their QR code."))
             return
         
-        employee_id = int(self.table.item(selected_row, 0).text())
+        employee_id = selected['id']
         employee_data = self.db_manager.get_employee_by_id(employee_id)
         
         if not employee_data:
@@ -334,8 +370,8 @@ class EmployeesWidget(QWidget):
             success_count, fail_count, failed_records = 0, 0, []
             
             # إنشاء مدير QR لإنشاء رموز تلقائياً
-            from app.utils.qr_manager import QRCodeManager
-            qr_manager = QRCodeManager()
+            from app.utils.qr_manager import get_qr_manager
+            qr_manager = get_qr_manager()
             
             for index, row in df.iterrows():
                 try:
@@ -407,82 +443,41 @@ class EmployeesWidget(QWidget):
             if not file_path:
                 return
             
-            # إنشاء مدير QR
-            from app.utils.qr_manager import QRCodeManager
-            qr_manager = QRCodeManager()
-            
-            # إعداد شريط التقدم
-            progress = QProgressBar()
-            progress.setMaximum(len(all_employees))
-            progress.setValue(0)
-            progress.setVisible(True)
+            # رسم الصور خارج خيط الواجهة (مع كاش على القرص)
+            qr_codes = self._employee_qr_payloads(all_employees)
+            rendered = self._render_qr_images(all_employees, qr_codes, self.tr("Rendering QR codes..."))
             
             # إنشاء قائمة البيانات للتصدير
             export_data = []
             
-            for i, employee in enumerate(all_employees):
+            for employee in all_employees:
+                qr_code = qr_codes.get(employee.get('id'))
+                result = rendered.get(employee.get('id'))
+                qr_base64 = ""
                 try:
-                    # إنشاء رمز QR باستخدام نفس إعدادات QRCodeManager
-                    qr_code = qr_manager.generate_qr_code(employee)
-                    
-                    # إنشاء صورة QR باستخدام نفس الإعدادات
-                    qr_pixmap = qr_manager.create_qr_image(qr_code)
-                    
-                    if qr_pixmap and not qr_pixmap.isNull():
-                        # تحويل QPixmap إلى PIL Image مباشرة في الذاكرة
-                        # إنشاء BytesIO buffer للصورة
-                        qr_buffer = io.BytesIO()
-                        qr_pixmap.save(qr_buffer, "PNG")
-                        qr_buffer.seek(0)
-                        
-                        # تحويل إلى base64 للاستخدام لاحقاً
-                        qr_base64 = base64.b64encode(qr_buffer.getvalue()).decode()
-                        
-                        print(f"✅ QR image created successfully for: {employee.get('name', 'Unknown')}")
+                    if result is not None and result.path:
+                        with open(result.path, 'rb') as f:
+                            qr_base64 = base64.b64encode(f.read()).decode()
                     else:
                         print(f"⚠️ Failed to create QR image for: {employee.get('name', 'Unknown')}")
-                        qr_base64 = ""
-                    
-                    # إضافة بيانات الموظف مع رمز QR
-                    employee_data = {
-                        'ID': employee.get('id', ''),
-                        'Employee Code': employee.get('employee_code', ''),
-                        'Full Name': employee.get('name', ''),
-                        'Job Title': employee.get('job_title', ''),
-                        'Department': employee.get('department', ''),
-                        'Phone Number': employee.get('phone_number', ''),
-                        'Email': employee.get('email', ''),
-                        'Status': employee.get('status', 'Active'),
-                        'QR Code Data': qr_code if qr_code else 'Error generating QR',
-                        'QR Code Image (Base64)': qr_base64,
-                        'Created Date': employee.get('created_at', ''),
-                        'Last Updated': employee.get('updated_at', '')
-                    }
-                    
-                    export_data.append(employee_data)
-                    
-                    # تحديث شريط التقدم
-                    progress.setValue(i + 1)
-                    QApplication.processEvents()  # تحديث الواجهة
-                    
                 except Exception as e:
                     print(f"❌ General error processing employee {employee.get('name', 'Unknown')}: {e}")
-                    # إضافة الموظف بدون رمز QR في حالة الخطأ
-                    employee_data = {
-                        'ID': employee.get('id', ''),
-                        'Employee Code': employee.get('employee_code', ''),
-                        'Full Name': employee.get('name', ''),
-                        'Job Title': employee.get('job_title', ''),
-                        'Department': employee.get('department', ''),
-                        'Phone Number': employee.get('phone_number', ''),
-                        'Email': employee.get('email', ''),
-                        'Status': employee.get('status', 'Active'),
-                        'QR Code Data': f'Error: {str(e)[:50]}',
-                        'QR Code Image (Base64)': '',
-                        'Created Date': employee.get('created_at', ''),
-                        'Last Updated': employee.get('updated_at', '')
-                    }
-                    export_data.append(employee_data)
+                
+                # إضافة بيانات الموظف مع رمز QR
+                export_data.append({
+                    'ID': employee.get('id', ''),
+                    'Employee Code': employee.get('employee_code', ''),
+                    'Full Name': employee.get('name', ''),
+                    'Job Title': employee.get('job_title', ''),
+                    'Department': employee.get('department', ''),
+                    'Phone Number': employee.get('phone_number', ''),
+                    'Email': employee.get('email', ''),
+                    'Status': employee.get('status', 'Active'),
+                    'QR Code Data': qr_code if qr_code else 'Error generating QR',
+                    'QR Code Image (Base64)': qr_base64,
+                    'Created Date': employee.get('created_at', ''),
+                    'Last Updated': employee.get('updated_at', '')
+                })
             
             # إنشاء DataFrame وتصدير إلى Excel
             df = pd.DataFrame(export_data)
@@ -621,59 +616,38 @@ class EmployeesWidget(QWidget):
             if not folder_path:
                 return
             
-            # إنشاء مدير QR
-            from app.utils.qr_manager import QRCodeManager
-            qr_manager = QRCodeManager()
-            
-            # إعداد شريط التقدم
-            progress = QProgressBar()
-            progress.setMaximum(len(all_employees))
-            progress.setValue(0)
-            progress.setVisible(True)
+            qr_codes = self._employee_qr_payloads(all_employees)
+            rendered = self._render_qr_images(all_employees, qr_codes, self.tr("Rendering QR codes..."))
             
             success_count = 0
             failed_count = 0
             failed_employees = []
             
-            for i, employee in enumerate(all_employees):
+            for employee in all_employees:
+                employee_name = employee.get('name', 'Unknown')
                 try:
-                    # إنشاء رمز QR للموظف
-                    qr_code = qr_manager.generate_qr_code(employee)
-                    
-                    # إنشاء صورة QR
-                    qr_pixmap = qr_manager.create_qr_image(qr_code)
-                    
-                    if qr_pixmap and not qr_pixmap.isNull():
-                        # إنشاء اسم الملف
-                        employee_code = employee.get('employee_code', str(employee.get('id', '')))
-                        employee_name = employee.get('name', 'Unknown')
-                        
-                        # تنظيف اسم الملف من الأحرف غير المسموحة
-                        safe_name = "".join(c for c in employee_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                        safe_name = safe_name.replace(' ', '_')
-                        
-                        file_name = f"QR_{employee_code}_{safe_name}.png"
-                        file_path = os.path.join(folder_path, file_name)
-                        
-                        # حفظ الصورة
-                        if qr_pixmap.save(file_path, "PNG"):
-                            success_count += 1
-                            print(f"✅ Saved QR image for: {employee_name}")
-                        else:
-                            failed_count += 1
-                            failed_employees.append(f"{employee_name} (Save failed)")
-                    else:
+                    result = rendered.get(employee.get('id'))
+                    if result is None or not result.path:
                         failed_count += 1
                         failed_employees.append(f"{employee_name} (QR generation failed)")
+                        continue
                     
-                    # تحديث شريط التقدم
-                    progress.setValue(i + 1)
-                    QApplication.processEvents()
+                    # إنشاء اسم الملف
+                    employee_code = employee.get('employee_code', str(employee.get('id', '')))
+                    
+                    # تنظيف اسم الملف من الأحرف غير المسموحة
+                    safe_name = "".join(c for c in employee_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+                    safe_name = safe_name.replace(' ', '_')
+                    
+                    file_name = f"QR_{employee_code}_{safe_name}.png"
+                    # نسخ الصورة من الكاش (بدون إعادة رسم)
+                    shutil.copyfile(result.path, os.path.join(folder_path, file_name))
+                    success_count += 1
                     
                 except Exception as e:
                     failed_count += 1
-                    failed_employees.append(f"{employee.get('name', 'Unknown')} ({str(e)})")
-                    print(f"❌ Error processing employee {employee.get('name', 'Unknown')}: {e}")
+                    failed_employees.append(f"{employee_name} ({str(e)})")
+                    print(f"❌ Error processing employee {employee_name}: {e}")
             
             # رسالة نجاح
             success_message = f"""✅ {self.tr('QR Images Export completed!')}
@@ -715,46 +689,36 @@ class EmployeesWidget(QWidget):
             import traceback
             traceback.print_exc()
     
+    def _employee_qr_payloads(self, employees):
+        """رمز QR المحفوظ لكل موظف؛ يُنشأ ويُحفظ فقط للموظف الذي لا يملك رمزاً"""
+        from app.utils.qr_manager import get_qr_manager
+        qr_manager = get_qr_manager()
+        payloads = {}
+        for employee in employees:
+            qr_code = employee.get('qr_code')
+            if not qr_code:
+                qr_code = qr_manager.generate_qr_code(employee)
+                if qr_code and employee.get('id'):
+                    self.db_manager.update_employee_qr_code(employee['id'], qr_code)
+            payloads[employee.get('id')] = qr_code
+        return payloads
+    
+    def _render_qr_images(self, employees, qr_codes, title):
+        """رسم صور QR في عمليات منفصلة مع نافذة تقدم - الموظفون بدون تغيير يُقرأون من الكاش"""
+        from app.utils.qr_manager import get_qr_manager
+        from app.utils.qr_renderer import RenderSpec
+        from app.gui.qr_render_worker import render_with_progress
+        spec = RenderSpec.from_settings(get_qr_manager().settings)
+        items = [(employee.get('id'), qr_codes.get(employee.get('id'))) for employee in employees]
+        rendered, stats = render_with_progress(self, items, spec, title)
+        print(f"🖼️ QR images: {stats}")
+        return rendered
+    
     def filter_employees(self, search_text):
-        """تصفية الموظفين بناءً على نص البحث"""
+        """تصفية الموظفين عبر فهرس البحث (الاسم، الكود، القسم، الهاتف، المسمى الوظيفي)"""
         try:
-            if not search_text.strip():
-                # إذا كان البحث فارغاً، اعرض جميع الموظفين
-                self.populate_table(self.all_employees)
-                return
-            
-            search_text = search_text.lower().strip()
-            filtered_employees = []
-            
-            for employee in self.all_employees:
-                # البحث في الاسم
-                name = str(employee.get('name', '')).lower()
-                # البحث في الكود
-                code = str(employee.get('employee_code', '')).lower()
-                # البحث في القسم
-                department = str(employee.get('department', '')).lower()
-                # البحث في الهاتف
-                phone = str(employee.get('phone', '')).lower()
-                # البحث في المسمى الوظيفي
-                job_title = str(employee.get('job_title', '')).lower()
-                
-                # التحقق من وجود النص في أي من الحقول
-                if (search_text in name or 
-                    search_text in code or 
-                    search_text in department or 
-                    search_text in phone or 
-                    search_text in job_title):
-                    filtered_employees.append(employee)
-            
-            # عرض النتائج المفلترة
-            self.populate_table(filtered_employees)
-            
-            # تحديث عدد النتائج في شريط الحالة
-            if hasattr(self, 'statusBar') and self.statusBar():
-                self.statusBar().showMessage(
-                    f"{self.tr('Found')} {len(filtered_employees)} {self.tr('employees matching')} '{search_text}'"
-                )
-            
+            self.model.apply_search(search_text)
+            self._update_results_label()
         except Exception as e:
             print(f"❌ Error in filter_employees: {e}")
             import traceback
@@ -763,70 +727,24 @@ class EmployeesWidget(QWidget):
     def clear_search(self):
         """مسح البحث وعرض جميع الموظفين"""
         try:
+            self.search_timer.stop()
             self.search_input.clear()
-            self.populate_table(self.all_employees)
-            
-            if hasattr(self, 'statusBar') and self.statusBar():
-                self.statusBar().showMessage(
-                    f"{self.tr('Showing all')} {len(self.all_employees)} {self.tr('employees')}"
-                )
-                
+            self.filter_employees('')
         except Exception as e:
             print(f"❌ Error in clear_search: {e}")
             import traceback
             traceback.print_exc()
     
-    def populate_table(self, employees):
-        """ملء الجدول بالموظفين المحددين"""
-        try:
-            self.table.setRowCount(0)
-            self.table.setRowCount(len(employees))
-            
-            for row_idx, employee in enumerate(employees):
-                # الأعمدة الأساسية
-                self.table.setItem(row_idx, 0, QTableWidgetItem(str(employee['id'])))
-                self.table.setItem(row_idx, 1, QTableWidgetItem(str(employee.get('employee_code', ''))))
-                self.table.setItem(row_idx, 2, QTableWidgetItem(str(employee.get('name', ''))))
-                self.table.setItem(row_idx, 3, QTableWidgetItem(str(employee.get('job_title', ''))))
-                self.table.setItem(row_idx, 4, QTableWidgetItem(str(employee.get('department', ''))))
-                self.table.setItem(row_idx, 5, QTableWidgetItem(str(employee.get('phone_number', employee.get('phone', '')))))
-                
-                # أعمدة الحضور الجديدة
-                if hasattr(self.db_manager, 'get_employees_with_attendance'):
-                    # حالة الحضور
-                    attendance_status = employee.get('attendance_status', 'لم يسجل حضور')
-                    status_item = QTableWidgetItem(attendance_status)
-                    
-                    # تلوين الحالة حسب النوع
-                    if 'حاضر' in attendance_status:
-                        status_item.setBackground(QColor(144, 238, 144))  # أخضر فاتح
-                    elif 'انصرف' in attendance_status:
-                        status_item.setBackground(QColor(255, 255, 224))  # أصفر فاتح
-                    elif 'لم يسجل' in attendance_status:
-                        status_item.setBackground(QColor(255, 182, 193))  # أحمر فاتح
-                    
-                    self.table.setItem(row_idx, 6, status_item)
-                    
-                    # آخر حضور
-                    last_attendance = ''
-                    if employee.get('last_attendance_date') and employee.get('last_attendance_time'):
-                        last_attendance = f"{employee['last_attendance_date']} {employee['last_attendance_time']}"
-                    elif employee.get('last_attendance_date'):
-                        last_attendance = employee['last_attendance_date']
-                    
-                    self.table.setItem(row_idx, 7, QTableWidgetItem(last_attendance))
-                else:
-                    # إذا لم تكن الدالة متوفرة، أعمدة فارغة
-                    self.table.setItem(row_idx, 6, QTableWidgetItem('غير متوفر'))
-                    self.table.setItem(row_idx, 7, QTableWidgetItem('غير متوفر'))
-            
-            # إعادة ترتيب الأعمدة
-            self.table.resizeColumnsToContents()
-            
-        except Exception as e:
-            print(f"❌ Error in populate_table: {e}")
-            import traceback
-            traceback.print_exc()
+    def _update_results_label(self):
+        shown, total = self.model.rowCount(), self.model.total_count()
+        if shown == total:
+            self.results_label.setText(f"{self.tr('Showing all')} {total} {self.tr('employees')}")
+        else:
+            self.results_label.setText(f"{self.tr('Found')} {shown} {self.tr('employees matching')} '{self.search_input.text().strip()}'")
+    
+    def populate_table(self, employees=None):
+        """إعادة تحميل الجدول (البيانات والفهرس يُبنيان في الخلفية)"""
+        self.load_employees_data()
     
     def tr(self, text):
         return QCoreApplication.translate("EmployeesWidget", text)
\ No newline at end of file
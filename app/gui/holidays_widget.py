@@ -10,12 +10,13 @@ class HolidaysWidget(QWidget):
     """
     Interface for managing official holidays والأعياد.
     """
-    def __init__(self, db_manager=None):
+    def __init__(self, db_manager=None, holidays=None):
+        """holidays: قائمة محملة مسبقاً (في خيط خلفي)، وإلا تُجلب من قاعدة البيانات"""
         super().__init__()
         self.db_manager = db_manager or SimpleHybridManager()
         self.setup_ui()
         self.connect_signals()
-        self.load_holidays_data()
+        self.load_holidays_data(holidays)
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -25,12 +26,12 @@ class HolidaysWidget(QWidget):
         self.date_edit = QDateEdit(calendarPopup=True, date=QDate.currentDate())
         self.date_edit.setDisplayFormat("yyyy-MM-dd")
         self.description_input = QLineEdit()
-        self.description_input.setPlaceholderText(self.tr("Holiday Description (e.g., New Year)"))
-        self.add_button = QPushButton(f"➕ {self.tr('Add Holiday')}")
-        self.add_button.setToolTip(self.tr("Add a new official holiday"))
-        add_layout.addWidget(QLabel(self.tr("Date:")))
+        self.add_button = QPushButton()
+        self.date_label = QLabel()
+        self.description_label = QLabel()
+        add_layout.addWidget(self.date_label)
         add_layout.addWidget(self.date_edit)
-        add_layout.addWidget(QLabel(self.tr("Description:")))
+        add_layout.addWidget(self.description_label)
         add_layout.addWidget(self.description_input, 1) # يأخذ المساحة المتبقية
         add_layout.addWidget(self.add_button)
         layout.addLayout(add_layout)
@@ -38,20 +39,30 @@ class HolidaysWidget(QWidget):
         # الجدول والDelete
         self.table = QTableWidget()
         self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["ID", self.tr("Date"), self.tr("Description")])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.delete_button = QPushButton(f"🗑️ {self.tr('Delete Selected Holiday')}")
-        self.delete_button.setToolTip(self.tr("Delete the selected holiday"))
+        self.delete_button = QPushButton()
         
         layout.addWidget(self.table)
         layout.addWidget(self.delete_button)
+        self.retranslate_ui()
+
+    def retranslate_ui(self):
+        self.description_input.setPlaceholderText(self.tr("Holiday Description (e.g., New Year)"))
+        self.add_button.setText(f"➕ {self.tr('Add Holiday')}")
+        self.add_button.setToolTip(self.tr("Add a new official holiday"))
+        self.date_label.setText(self.tr("Date:"))
+        self.description_label.setText(self.tr("Description:"))
+        self.table.setHorizontalHeaderLabels(["ID", self.tr("Date"), self.tr("Description")])
+        self.delete_button.setText(f"🗑️ {self.tr('Delete Selected Holiday')}")
+        self.delete_button.setToolTip(self.tr("Delete the selected holiday"))
 
     def connect_signals(self):
         self.add_button.clicked.connect(self.add_holiday)
         self.delete_button.clicked.connect(self.delete_holiday)
 
-    def load_holidays_data(self):
-        holidays = self.db_manager.get_all_holidays()
+    def load_holidays_data(self, holidays=None):
+        if holidays is None:
+            holidays = self.db_manager.get_all_holidays()
         self.table.setRowCount(0)
         self.table.setRowCount(len(holidays))
         for row, holiday in enumerate(holidays):
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+تبويبات تُنشأ عند أول تفعيل (Lazy Tabs)
+- كل تبويب يُسجَّل بمصنع (factory) وعنوان قابل للترجمة؛ حتى أول تفعيل يظهر مكانه عنصر "جاري التحميل"
+- preload اختياري يجلب البيانات في خيط خلفي، ثم يُبنى التبويب بها في خيط الواجهة
+- retranslate(): تحديث العناوين واستدعاء retranslate_ui() للتبويبات المنشأة بدل إعادة إنشائها
+- قياس لكل تبويب: زمن الإنشاء وزمن أول رسم (من لحظة التفعيل أو بدء النافذة)
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from PyQt6.QtCore import QEvent, QObject, Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QLabel, QTabWidget, QVBoxLayout, QWidget
+
+from app.utils.app_logger import get_logger
+
+logger = get_logger("LazyTabs")
+
+
+@dataclass
+class TabSpec:
+    key: str
+    title: Callable[[], str]                       # يُستدعى عند الإضافة وعند كل إعادة ترجمة
+    factory: Callable[[Any], QWidget]              # يستقبل ناتج preload (أو None)
+    preload: Optional[Callable[[], Any]] = None    # يعمل في خيط خلفي؛ بدون استدعاءات واجهة
+
+
+class TabPreloader(QThread):
+    loaded = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, key: str, preload: Callable[[], Any], parent=None):
+        super().__init__(parent)
+        self.key = key
+        self.preload = preload
+
+    def run(self):
+        try:
+            self.loaded.emit(self.key, self.preload())
+        except Exception as e:
+            self.failed.emit(self.key, str(e))
+
+
+class _FirstPaintProbe(QObject):
+    """يسجل أول حدث رسم للتبويب ثم يزيل نفسه"""
+
+    def __init__(self, tabs: 'LazyTabWidget', key: str, started: float, build_ms: Optional[float]):
+        super().__init__(tabs)
+        self.tabs, self.key, self.started, self.build_ms = tabs, key, started, build_ms
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            self.tabs._record_first_paint(self.key, (time.perf_counter() - self.started) * 1000, self.build_ms)
+            self.deleteLater()
+        return False
+
+
+class LazyTabWidget(QTabWidget):
+    tab_created = pyqtSignal(str, QWidget)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._specs: Dict[str, TabSpec] = {}
+        self._pages: Dict[str, QWidget] = {}        # العنصر الحالي في التبويب (بديل أو حقيقي)
+        self._created: Dict[str, QWidget] = {}
+        self._activated_at: Dict[str, float] = {}
+        self._loaders: Dict[str, TabPreloader] = {}
+        self.first_paint_ms: Dict[str, float] = {}
+        self.currentChanged.connect(self._on_current_changed)
+
+    # --- التسجيل ---
+
+    def register_tab(self, spec: TabSpec, widget: Optional[QWidget] = None,
+                     started_at: Optional[float] = None) -> int:
+        """widget: تبويب منشأ مسبقاً (مثل لوحة التحكم)؛ started_at: بداية قياس أول رسم له"""
+        self._specs[spec.key] = spec
+        if widget is not None:
+            self._created[spec.key] = widget
+            page = widget
+            self._probe_first_paint(spec.key, widget, started_at or time.perf_counter(), None)
+        else:
+            page = self._placeholder(self.tr("⏳ Loading..."))
+        self._pages[spec.key] = page
+        return self.addTab(page, spec.title())
+
+    def _placeholder(self, text: str) -> QWidget:
+        page = QWidget()
+        layout = QVBoxLayout(page)
+        label = QLabel(text)
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        label.setObjectName("lazyTabPlaceholder")
+        layout.addWidget(label)
+        return page
+
+    # --- الإنشاء عند التفعيل ---
+
+    def _key_at(self, index: int) -> Optional[str]:
+        page = self.widget(index)
+        for key, current in self._pages.items():
+            if current is page:
+                return key
+        return None
+
+    def _on_current_changed(self, index: int):
+        key = self._key_at(index)
+        if key is not None:
+            self.activate(key)
+
+    def activate(self, key: str):
+        """يبدأ إنشاء التبويب (مرة واحدة)؛ البديل يبقى ظاهراً حتى يجهز"""
+        if key in self._created or key in self._activated_at:
+            return
+        spec = self._specs[key]
+        self._activated_at[key] = time.perf_counter()
+        if spec.preload is None:
+            # دورة الأحداث التالية: البديل يُرسم أولاً ولا يتجمد تبديل التبويب
+            QTimer.singleShot(0, lambda: self._build(key, None))
+            return
+        loader = TabPreloader(key, spec.preload, self)
+        loader.loaded.connect(self._build)
+        loader.failed.connect(self._on_preload_failed)
+        loader.finished.connect(loader.deleteLater)
+        self._loaders[key] = loader
+        loader.start()
+
+    def ensure_created(self, key: str) -> Optional[QWidget]:
+        """إنشاء التبويب فوراً (بدون انتظار التفعيل) - للإجراءات التي تحتاجه الآن"""
+        if key not in self._created and key in self._specs:
+            loader = self._loaders.get(key)
+            if loader is not None and loader.isRunning():
+                loader.wait()
+                # الإشارة المعلقة ستصل لاحقاً وتُتجاهل لأن التبويب أُنشئ
+            self._activated_at.setdefault(key, time.perf_counter())
+            self._build(key, None)
+        return self._created.get(key)
+
+    def _on_preload_failed(self, key: str, error: str):
+        logger.error(f"❌ Failed to preload tab {key}: {error}")
+        self._build(key, None)  # المصنع يجلب البيانات بنفسه عند غياب التحميل المسبق
+
+    def _build(self, key: str, data: Any):
+        self._loaders.pop(key, None)
+        if key in self._created:
+            return
+        spec = self._specs[key]
+        started = time.perf_counter()
+        try:
+            widget = spec.factory(data)
+        except Exception as e:
+            logger.error(f"❌ Failed to create tab {key}: {e}")
+            widget = self._placeholder(self.tr("Failed to load this tab") + f"\n{e}")
+        build_ms = (time.perf_counter() - started) * 1000
+
+        placeholder = self._pages[key]
+        index = self.indexOf(placeholder)
+        was_current = self.currentIndex() == index
+        self._created[key] = widget
+        self._pages[key] = widget
+        self._probe_first_paint(key, widget, self._activated_at.get(key, started), build_ms)
+
+        self.blockSignals(True)
+        try:
+            self.removeTab(index)
+            self.insertTab(index, widget, spec.title())
+            if was_current:
+                self.setCurrentIndex(index)
+        finally:
+            self.blockSignals(False)
+        placeholder.deleteLater()
+        self.tab_created.emit(key, widget)
+
+    # --- القياس ---
+
+    def _probe_first_paint(self, key: str, widget: QWidget, started: float, build_ms: Optional[float]):
+        widget.installEventFilter(_FirstPaintProbe(self, key, started, build_ms))
+
+    def _record_first_paint(self, key: str, paint_ms: float, build_ms: Optional[float]):
+        self.first_paint_ms[key] = paint_ms
+        if build_ms is None:
+            logger.info(f"⏱️ Tab '{key}' first paint after {paint_ms:.0f} ms")
+        else:
+            logger.info(f"⏱️ Tab '{key}' first paint after {paint_ms:.0f} ms (construction {build_ms:.0f} ms)")
+
+    # --- الوصول والترجمة ---
+
+    def widget_for(self, key: str) -> Optional[QWidget]:
+        """التبويب المنشأ أو None (لا يُنشئه)"""
+        return self._created.get(key)
+
+    def created_widgets(self) -> List[QWidget]:
+        return list(self._created.values())
+
+    def retranslate(self):
+        for key, spec in self._specs.items():
+            page = self._pages[key]
+            self.setTabText(self.indexOf(page), spec.title())
+            widget = self._created.get(key)
+            if widget is not None and hasattr(widget, 'retranslate_ui'):
+                try:
+                    widget.retranslate_ui()
+                except Exception as e:
+                    logger.error(f"❌ Failed to retranslate tab {key}: {e}")
+            elif widget is None:
+                label = page.findChild(QLabel, "lazyTabPlaceholder")
+                if label is not None:
+                    label.setText(self.tr("⏳ Loading..."))
+
+    def shutdown(self, timeout_ms: int = 2000):
+        """انتظار خيوط التحميل المسبق ومهام التبويبات الخلفية (shutdown_tasks) قبل إغلاق النافذة"""
+        for loader in list(self._loaders.values()):
+            if loader.isRunning():
+                loader.wait(timeout_ms)
+        for key, widget in self._created.items():
+            if hasattr(widget, 'shutdown_tasks'):
+                try:
+                    widget.shutdown_tasks()
+                except Exception as e:
+                    logger.error(f"❌ Failed to stop tasks of tab {key}: {e}")
@@ -10,22 +10,20 @@ class LocationsWidget(QWidget):
     """
     Interface for managing approved locations (Add، Edit، Delete).
     """
-    def __init__(self, db_manager=None):
+    def __init__(self, db_manager=None, locations=None):
+        """locations: قائمة محملة مسبقاً (في خيط خلفي)، وإلا تُجلب من قاعدة البيانات"""
         super().__init__()
         self.db_manager = db_manager or SimpleHybridManager()
         self.setup_ui()
         self.connect_signals()
-        self.load_locations_data()
+        self.load_locations_data(locations)
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
         button_layout = QHBoxLayout()
-        self.add_button = QPushButton(f"➕ {self.tr('Add Location')}")
-        self.add_button.setToolTip(self.tr("Create a new approved location"))
-        self.edit_button = QPushButton(f"✏️ {self.tr('Edit Selected')}")
-        self.edit_button.setToolTip(self.tr("Edit the selected location"))
-        self.delete_button = QPushButton(f"🗑️ {self.tr('Delete Selected')}")
-        self.delete_button.setToolTip(self.tr("Delete the selected location"))
+        self.add_button = QPushButton()
+        self.edit_button = QPushButton()
+        self.delete_button = QPushButton()
         
         button_layout.addWidget(self.add_button)
         button_layout.addWidget(self.edit_button)
@@ -35,19 +33,29 @@ class LocationsWidget(QWidget):
         
         self.table = QTableWidget()
         self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", self.tr("Name"), self.tr("Latitude"), self.tr("Longitude"), self.tr("Radius (m)")])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         layout.addWidget(self.table)
+        self.retranslate_ui()
 
     def connect_signals(self):
         self.add_button.clicked.connect(self.add_location)
         self.edit_button.clicked.connect(self.edit_location)
         self.delete_button.clicked.connect(self.delete_location)
 
-    def load_locations_data(self):
-        locations = self.db_manager.get_all_locations() or []
+    def retranslate_ui(self):
+        self.add_button.setText(f"➕ {self.tr('Add Location')}")
+        self.add_button.setToolTip(self.tr("Create a new approved location"))
+        self.edit_button.setText(f"✏️ {self.tr('Edit Selected')}")
+        self.edit_button.setToolTip(self.tr("Edit the selected location"))
+        self.delete_button.setText(f"🗑️ {self.tr('Delete Selected')}")
+        self.delete_button.setToolTip(self.tr("Delete the selected location"))
+        self.table.setHorizontalHeaderLabels(["ID", self.tr("Name"), self.tr("Latitude"), self.tr("Longitude"), self.tr("Radius (m)")])
+
+    def load_locations_data(self, locations=None):
+        if locations is None:
+            locations = self.db_manager.get_all_locations() or []
         self.table.setRowCount(0)
         self.table.setRowCount(len(locations))
         for row, loc in enumerate(locations):
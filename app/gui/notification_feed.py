@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+قائمة التنبيهات (Model/View)
+- FeedItem: ما يحتاجه رسم البطاقة محسوباً مرة لكل تنبيه (نص الوقت، ألوان الأولوية، أنواع الروابط)
+- NotificationsModel: مفهرس بمعرّف التنبيه؛ التحديث الدوري يُطبَّق كفرق (حذف/تعديل/إدراج) بدل إعادة البناء
+- NotificationFilterProxy: فلاتر الحالة والأولوية والنوع تُطبَّق في البروكسي دون لمس البيانات
+- NotificationDelegate: يرسم البطاقة مباشرة (بدون QFrame لكل تنبيه) ويحوّل النقرات إلى إشارات؛
+  ارتفاع البطاقة يُخزَّن حسب (النص، العرض) فالتمرير لا يعيد حساب تخطيط النص
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from PyQt6.QtCore import QAbstractListModel, QEvent, QModelIndex, QRect, QSize, QSortFilterProxyModel, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen
+from PyQt6.QtWidgets import QStyle, QStyledItemDelegate
+
+from app.gui.dashboard_models import contiguous_runs
+
+ITEM_ROLE = Qt.ItemDataRole.UserRole + 1
+
+# نفس النصوص التي تطابقها مربعات اختيار النوع في لوحة الفلاتر
+NOTIFICATION_TYPES = (
+    "General Announcement", "System Update", "Important Notice", "Celebration/Event",
+    "Maintenance Notice", "Training/Workshop", "Policy Change", "Emergency Alert",
+    "Document/Resource", "Download Link", "Website Link",
+)
+PRIORITIES = ("urgent", "high", "medium", "low")
+
+PRIORITY_COLORS = {
+    "urgent": ("#f44336", "#d32f2f", "white"),
+    "high": ("#ff9800", "#f57c00", "white"),
+    "medium": ("#ffc107", "#ffa000", "#212121"),
+    "low": ("#4caf50", "#388e3c", "white"),
+}
+DEFAULT_PRIORITY_COLORS = ("#9e9e9e", "#757575", "white")
+
+LINK_ICONS = {"document": "📄", "download": "📥", "video": "🎥", "image": "🖼️", "website": "🌐"}
+_LINK_EXTENSIONS = (
+    ("document", ('.pdf', '.doc', '.docx', '.txt', '.rtf')),
+    ("download", ('.zip', '.rar', '.exe', '.msi', '.dmg')),
+    ("video", ('.mp4', '.avi', '.mov', '.wmv', '.flv')),
+    ("image", ('.jpg', '.jpeg', '.png', '.gif', '.bmp')),
+)
+
+
+@lru_cache(maxsize=4096)
+def link_category(link: str) -> str:
+    """نوع الرابط من امتداده (document/download/video/image/website)"""
+    link_lower = link.lower()
+    for category, extensions in _LINK_EXTENSIONS:
+        if any(ext in link_lower for ext in extensions):
+            return category
+    return "website"
+
+
+@lru_cache(maxsize=8192)
+def _format_time(timestamp: Any) -> str:
+    if not timestamp:
+        return "Unknown"
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00')) if isinstance(timestamp, str) else timestamp
+        return dt.strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        return str(timestamp)
+
+
+@dataclass(frozen=True)
+class FeedItem:
+    key: str
+    title: str
+    message: str
+    type_text: str
+    type_keys: FrozenSet[str]           # أنواع الفلتر التي يطابقها هذا التنبيه
+    priority: str
+    time_text: str
+    is_read: bool
+    links: Tuple[Tuple[str, str], ...]  # (أيقونة النوع، الرابط)
+
+    @classmethod
+    def from_notification(cls, notification: Dict[str, Any]) -> 'FeedItem':
+        notification_type = str(notification.get("notification_type") or "Notification")
+        return cls(
+            key=str(notification.get("id")),
+            title=str(notification.get("title") or "No Title"),
+            message=str(notification.get("message") or "No Message"),
+            type_text=f"📢 {notification_type}",
+            type_keys=frozenset(t for t in NOTIFICATION_TYPES if t in notification_type),
+            priority=str(notification.get("priority") or "medium"),
+            time_text=f"🕒 {_format_time(notification.get('created_at') or notification.get('timestamp'))}",
+            is_read=bool(notification.get("is_read", False)),
+            links=tuple((LINK_ICONS.get(link_category(str(link)), "🔗"), str(link))
+                        for link in (notification.get("links") or []) if link),
+        )
+
+
+class NotificationsModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items: List[FeedItem] = []
+        self._positions: Dict[str, int] = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self._items[index.row()]
+        if role == ITEM_ROLE:
+            return item
+        if role == Qt.ItemDataRole.DisplayRole:
+            return item.title
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return item.message
+        return None
+
+    def item(self, row: int) -> FeedItem:
+        return self._items[row]
+
+    def row_of(self, key: str) -> Optional[int]:
+        return self._positions.get(str(key))
+
+    def apply_notifications(self, notifications: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        تطبيق القائمة الجديدة (بترتيبها) كفرق مع الحالية؛ يُرجع عدد المدرجة والمحذوفة والمتغيرة.
+        التنبيهات الجديدة تُدرج في مواضعها (عادة أعلى القائمة) فلا يتغير موضع التمرير.
+        """
+        items: List[FeedItem] = []
+        seen = set()
+        for notification in notifications:
+            item = FeedItem.from_notification(notification)
+            if item.key not in seen:
+                seen.add(item.key)
+                items.append(item)
+
+        # 1) حذف المختفية: مقاطع متصلة من الأسفل للأعلى
+        removed_positions = [i for i, item in enumerate(self._items) if item.key not in seen]
+        for first, last in reversed(contiguous_runs(removed_positions)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._items[first:last + 1]
+            self.endRemoveRows()
+
+        # الباقية يجب أن تحافظ على ترتيبها النسبي؛ وإلا (إعادة ترتيب من الخادم) استبدال كامل
+        kept = [item.key for item in self._items]
+        if kept != [item.key for item in items if item.key in self._positions]:
+            self.beginResetModel()
+            self._items = items
+            self._positions = {item.key: i for i, item in enumerate(items)}
+            self.endResetModel()
+            return {'inserted': len(items), 'removed': len(removed_positions), 'changed': 0}
+
+        # 2) المتغيرة تُستبدل في مكانها، 3) الجديدة تُدرج كمقاطع متصلة
+        changed_positions = []
+        position = 0
+        pending: List[FeedItem] = []
+        inserted = 0
+        for item in items + [None]:
+            if item is not None and item.key not in self._positions:
+                pending.append(item)
+                continue
+            if pending:
+                self.beginInsertRows(QModelIndex(), position, position + len(pending) - 1)
+                self._items[position:position] = pending
+                self.endInsertRows()
+                position += len(pending)
+                inserted += len(pending)
+                pending = []
+            if item is None:
+                break
+            if self._items[position] != item:
+                self._items[position] = item
+                changed_positions.append(position)
+            position += 1
+
+        self._positions = {item.key: i for i, item in enumerate(self._items)}
+        for first, last in contiguous_runs(changed_positions):
+            self.dataChanged.emit(self.index(first), self.index(last))
+        return {'inserted': inserted, 'removed': len(removed_positions), 'changed': len(changed_positions)}
+
+
+class NotificationFilterProxy(QSortFilterProxyModel):
+    """فلاتر لوحة التنبيهات؛ None = بدون تقييد"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setDynamicSortFilter(True)  # تغيّر is_read يعيد تقييم الصف وحده
+        self._filters: Tuple[bool, bool, Optional[FrozenSet[str]], Optional[FrozenSet[str]]] = (True, True, None, None)
+
+    def set_filters(self, show_unread: bool, show_read: bool,
+                    priorities: Optional[Iterable[str]] = None, types: Optional[Iterable[str]] = None):
+        filters = (show_unread, show_read,
+                   None if priorities is None else frozenset(priorities),
+                   None if types is None else frozenset(types))
+        if filters != self._filters:
+            self._filters = filters
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        item = self.sourceModel().item(source_row)
+        show_unread, show_read, priorities, types = self._filters
+        if not (show_read if item.is_read else show_unread):
+            return False
+        if priorities is not None and item.priority not in priorities:
+            return False
+        return types is None or not types.isdisjoint(item.type_keys)
+
+
+class _CardLayout(NamedTuple):
+    card: QRect
+    type_pill: QRect
+    priority_pill: QRect
+    time_pill: QRect
+    title: QRect
+    message: QRect
+    links: List[Tuple[QRect, QRect, str, str]]  # (نص الرابط، زر النسخ، الرابط، الأيقونة)
+    mark_read: Optional[QRect]
+    status_pill: QRect
+    height: int
+
+
+class NotificationDelegate(QStyledItemDelegate):
+    """بطاقة التنبيه مرسومة؛ النقر على الروابط والأزرار يصدر الإشارات المقابلة"""
+
+    mark_read_requested = pyqtSignal(str)
+    link_activated = pyqtSignal(str)
+    copy_requested = pyqtSignal(str)
+
+    MARGIN = 8
+    PADDING = 16
+    SPACING = 10
+    PILL_HEIGHT = 28
+    LINK_HEIGHT = 28
+    BUTTON_HEIGHT = 34
+    COPY_WIDTH = 90
+    MARK_READ_WIDTH = 160
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pill_font = QFont("Segoe UI", 10, QFont.Weight.Bold)
+        self.title_font = QFont("Segoe UI", 14, QFont.Weight.Bold)
+        self.message_font = QFont("Segoe UI", 11)
+        self.link_font = QFont("Segoe UI", 10, QFont.Weight.DemiBold)
+        self._pill_metrics = QFontMetrics(self.pill_font)
+        self._title_metrics = QFontMetrics(self.title_font)
+        self._message_metrics = QFontMetrics(self.message_font)
+        self._message_heights: Dict[Tuple[str, int], int] = {}
+        self._heights: Dict[Tuple[FeedItem, int], int] = {}
+        self._pill_widths: Dict[str, int] = {}
+        self.labels = {'copy': "📋 Copy", 'mark_read': "✅ Mark as Read", 'read': "📖 Read", 'unread': "📖 Unread"}
+
+    # --- التخطيط ---
+
+    def _message_height(self, message: str, width: int) -> int:
+        key = (message, width)
+        height = self._message_heights.get(key)
+        if height is None:
+            if len(self._message_heights) > 20000:
+                self._message_heights.clear()
+            height = self._message_metrics.boundingRect(
+                QRect(0, 0, max(width, 1), 100000), Qt.TextFlag.TextWordWrap, message).height()
+            self._message_heights[key] = height
+        return height
+
+    def _pill_width(self, text: str) -> int:
+        width = self._pill_widths.get(text)
+        if width is None:
+            width = self._pill_widths[text] = self._pill_metrics.horizontalAdvance(text) + 24
+        return width
+
+    def _layout(self, rect: QRect, item: FeedItem, direction=Qt.LayoutDirection.LeftToRight) -> _CardLayout:
+        card = rect.adjusted(self.MARGIN, self.MARGIN // 2, -self.MARGIN, -self.MARGIN // 2)
+        inner = card.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+        x, y, width = inner.left(), inner.top(), inner.width()
+
+        time_width = self._pill_width(item.time_text)
+        time_pill = QRect(inner.right() - time_width + 1, y, time_width, self.PILL_HEIGHT)
+        priority_width = self._pill_width(f"⚡ {item.priority.upper()}")
+        priority_pill = QRect(time_pill.left() - self.SPACING - priority_width, y, priority_width, self.PILL_HEIGHT)
+        type_pill = QRect(x, y, max(0, min(self._pill_width(item.type_text),
+                                            priority_pill.left() - self.SPACING - x)), self.PILL_HEIGHT)
+        y += self.PILL_HEIGHT + self.SPACING
+
+        title = QRect(x, y, width, self._title_metrics.height())
+        y += title.height() + self.SPACING
+        message = QRect(x, y, width, self._message_height(item.message, width))
+        y += message.height() + self.SPACING
+
+        links = []
+        for icon, link in item.links:
+            copy_rect = QRect(inner.right() - self.COPY_WIDTH + 1, y, self.COPY_WIDTH, self.LINK_HEIGHT)
+            text_rect = QRect(x, y, max(0, copy_rect.left() - self.SPACING - x), self.LINK_HEIGHT)
+            links.append((text_rect, copy_rect, link, icon))
+            y += self.LINK_HEIGHT + 6
+        if links:
+            y += self.SPACING - 6
+
+        mark_read = None if item.is_read else QRect(x, y, self.MARK_READ_WIDTH, self.BUTTON_HEIGHT)
+        status_text = self.labels['read' if item.is_read else 'unread']
+        status_width = self._pill_width(status_text)
+        status_pill = QRect(inner.right() - status_width + 1, y, status_width, self.BUTTON_HEIGHT)
+        y += self.BUTTON_HEIGHT
+        height = y + self.PADDING + self.MARGIN // 2 - rect.top()
+
+        if direction == Qt.LayoutDirection.RightToLeft:
+            mirror = lambda r: QStyle.visualRect(direction, card, r)  # noqa: E731
+            type_pill, priority_pill, time_pill = mirror(type_pill), mirror(priority_pill), mirror(time_pill)
+            links = [(mirror(t), mirror(c), link, icon) for t, c, link, icon in links]
+            mark_read = mirror(mark_read) if mark_read is not None else None
+            status_pill = mirror(status_pill)
+        return _CardLayout(card, type_pill, priority_pill, time_pill, title, message, links,
+                           mark_read, status_pill, height)
+
+    def _view_width(self, option) -> int:
+        view = self.parent()
+        if view is not None and hasattr(view, 'viewport'):
+            return view.viewport().width()
+        return option.rect.width()
+
+    def sizeHint(self, option, index):
+        item = index.data(ITEM_ROLE)
+        width = self._view_width(option)
+        if item is None:
+            return QSize(width, 0)
+        key = (item, width)
+        height = self._heights.get(key)
+        if height is None:
+            if len(self._heights) > 20000:
+                self._heights.clear()
+            height = self._heights[key] = self._layout(QRect(0, 0, width, 0), item).height
+        return QSize(width, height)
+
+    # --- الرسم ---
+
+    def _draw_pill(self, painter: QPainter, rect: QRect, text: str, background: str, border: str, color: str):
+        painter.setPen(QPen(QColor(border), 1.5))
+        painter.setBrush(QColor(background))
+        painter.drawRoundedRect(rect, 8, 8)
+        painter.setPen(QColor(color))
+        painter.drawText(rect.adjusted(10, 0, -10, 0), Qt.AlignmentFlag.AlignCenter,
+                         self._pill_metrics.elidedText(text, Qt.TextElideMode.ElideRight, rect.width() - 20))
+
+    def paint(self, painter, option, index):
+        item = index.data(ITEM_ROLE)
+        if item is None:
+            return
+        layout = self._layout(option.rect, item, option.direction)
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        if item.is_read:
+            border, background, border_width = ("#1e88e5" if hovered else "#e0e0e0"), "#fafafa", 2
+        else:
+            border, background, border_width = ("#1565c0" if hovered else "#1e88e5"), "#f0f8ff", 3
+        painter.setPen(QPen(QColor(border), border_width))
+        painter.setBrush(QColor(background))
+        painter.drawRoundedRect(layout.card, 16, 16)
+
+        painter.setFont(self.pill_font)
+        self._draw_pill(painter, layout.type_pill, item.type_text, "#3f51b5", "#303f9f", "#ffffff")
+        bg, bd, fg = PRIORITY_COLORS.get(item.priority, DEFAULT_PRIORITY_COLORS)
+        self._draw_pill(painter, layout.priority_pill, f"⚡ {item.priority.upper()}", bg, bd, fg)
+        self._draw_pill(painter, layout.time_pill, item.time_text, "#f5f5f5", "#e0e0e0", "#424242")
+
+        text_alignment = (Qt.AlignmentFlag.AlignRight if option.direction == Qt.LayoutDirection.RightToLeft
+                          else Qt.AlignmentFlag.AlignLeft)
+        painter.setFont(self.title_font)
+        painter.setPen(QColor("#212121"))
+        painter.drawText(layout.title, text_alignment | Qt.AlignmentFlag.AlignVCenter,
+                         self._title_metrics.elidedText(item.title, Qt.TextElideMode.ElideRight, layout.title.width()))
+
+        painter.setFont(self.message_font)
+        painter.setPen(QColor("#424242"))
+        painter.drawText(layout.message, text_alignment | Qt.TextFlag.TextWordWrap, item.message)
+
+        if layout.links:
+            painter.setFont(self.link_font)
+            link_metrics = QFontMetrics(self.link_font)
+            for text_rect, copy_rect, link, icon in layout.links:
+                painter.setPen(QPen(QColor("#e3f2fd"), 1.5))
+                painter.setBrush(QColor("#f8f9fa"))
+                painter.drawRoundedRect(text_rect, 6, 6)
+                painter.setPen(QColor("#1976d2"))
+                painter.drawText(text_rect.adjusted(10, 0, -10, 0), text_alignment | Qt.AlignmentFlag.AlignVCenter,
+                                 link_metrics.elidedText(f"{icon} {link}", Qt.TextElideMode.ElideMiddle,
+                                                         text_rect.width() - 20))
+                painter.setFont(self.pill_font)
+                self._draw_pill(painter, copy_rect, self.labels['copy'], "#4caf50", "#43a047", "white")
+                painter.setFont(self.link_font)
+
+        painter.setFont(self.pill_font)
+        if layout.mark_read is not None:
+            self._draw_pill(painter, layout.mark_read, self.labels['mark_read'], "#4caf50", "#43a047", "white")
+        if item.is_read:
+            self._draw_pill(painter, layout.status_pill, self.labels['read'], "#e8f5e8", "#c8e6cb", "#2e7d32")
+        else:
+            self._draw_pill(painter, layout.status_pill, self.labels['unread'], "#ffebee", "#ffcdd2", "#d32f2f")
+        painter.restore()
+
+    # --- النقرات ---
+
+    def hit_test(self, option, item: FeedItem, pos) -> Optional[Tuple[str, str]]:
+        """('mark_read'|'open'|'copy', القيمة) للنقطة pos أو None"""
+        layout = self._layout(option.rect, item, option.direction)
+        if layout.mark_read is not None and layout.mark_read.contains(pos):
+            return 'mark_read', item.key
+        for text_rect, copy_rect, link, _icon in layout.links:
+            if copy_rect.contains(pos):
+                return 'copy', link
+            if text_rect.contains(pos):
+                return 'open', link
+        return None
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton):
+            item = index.data(ITEM_ROLE)
+            hit = self.hit_test(option, item, event.position().toPoint()) if item is not None else None
+            if hit is not None:
+                action, value = hit
+                {'mark_read': self.mark_read_requested, 'open': self.link_activated,
+                 'copy': self.copy_requested}[action].emit(value)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+
+def configure_feed_view(view) -> NotificationDelegate:
+    """إعداد QListView للبطاقات: تمرير بالبكسل، تخطيط على دفعات، وعرض ثابت (شريط التمرير ظاهر دائماً)
+    حتى لا يُعاد حساب ارتفاع كل البطاقات عند ظهور الشريط أو اختفائه"""
+    view.setVerticalScrollMode(view.ScrollMode.ScrollPerPixel)
+    view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+    view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+    view.setResizeMode(view.ResizeMode.Adjust)
+    view.setLayoutMode(view.LayoutMode.Batched)
+    view.setBatchSize(200)
+    view.setUniformItemSizes(False)
+    view.setSelectionMode(view.SelectionMode.NoSelection)
+    view.setMouseTracking(True)
+    view.verticalScrollBar().setSingleStep(24)
+    delegate = NotificationDelegate(view)
+    view.setItemDelegate(delegate)
+    return delegate
@@ -4,7 +4,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QCoreApplication
 from PyQt6.QtGui import QPixmap, QFont
-from app.utils.qr_manager import QRCodeManager
+from app.utils.qr_manager import get_qr_manager
 from app.database.database_manager import DatabaseManager
 
 class QRCodeDialog(QDialog):
@@ -15,7 +15,7 @@ class QRCodeDialog(QDialog):
         super().__init__(parent)
         
         self.employee_data = employee_data
-        self.qr_manager = QRCodeManager()
+        self.qr_manager = get_qr_manager()
         self.db_manager = DatabaseManager()
         
         self.setWindowTitle(self.tr("QR Code - {name}").format(name=employee_data.get('name', '')))
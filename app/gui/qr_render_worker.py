@@ -0,0 +1,60 @@
+"""
+رسم صور QR بالجملة من الواجهة: QRRenderWorker يشغّل QRRenderEngine في QThread،
+وrender_with_progress ينتظره مع نافذة تقدم قابلة للإلغاء بدلاً من حلقات processEvents()
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QThread, pyqtSignal, QEventLoop
+from PyQt6.QtWidgets import QProgressDialog
+
+from app.utils.qr_renderer import QRRenderEngine, RenderSpec, get_render_engine
+
+
+# --- Worker Thread لرسم صور QR بالجملة خارج خيط الواجهة ---
+class QRRenderWorker(QThread):
+    progress = pyqtSignal(int, int)
+    result = pyqtSignal(object)  # RenderResult لكل عنصر فور جاهزيته
+
+    def __init__(self, items: List[Tuple[Any, str]], spec: RenderSpec, engine: Optional[QRRenderEngine] = None):
+        super().__init__()
+        self.items = items
+        self.spec = spec
+        self.engine = engine or get_render_engine()
+        self.stats: Dict[str, Any] = {}
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        for item in self.engine.render_many(self.items, self.spec,
+                                            progress=self.progress.emit,
+                                            cancelled=lambda: self._cancelled):
+            self.result.emit(item)
+        self.stats = dict(self.engine.last_stats)
+
+
+def render_with_progress(parent, items: List[Tuple[Any, str]], spec: RenderSpec,
+                         title: str = "Rendering QR codes...") -> Tuple[Dict[Any, Any], Dict[str, Any]]:
+    """
+    رسم الصور في خيط منفصل مع نافذة تقدم؛ الواجهة تبقى مستجيبة.
+    يُرجع {item_id: RenderResult} وإحصاءات الكاش.
+    """
+    results: Dict[Any, Any] = {}
+    dialog = QProgressDialog(title, "Cancel", 0, max(1, len(items)), parent)
+    dialog.setMinimumDuration(300)
+    dialog.setAutoClose(False)
+
+    worker = QRRenderWorker(items, spec)
+    loop = QEventLoop()
+    worker.progress.connect(lambda done, total: dialog.setValue(done))
+    worker.result.connect(lambda item: results.__setitem__(item.item_id, item))
+    worker.finished.connect(loop.quit)
+    dialog.canceled.connect(worker.cancel)
+
+    worker.start()
+    loop.exec()
+    worker.wait()
+    dialog.close()
+    return results, worker.stats
@@ -2,14 +2,78 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QMessageBox, QFileDialog, QFrame, QTextEdit, QLineEdit
 )
-from PyQt6.QtCore import Qt, QCoreApplication, QTimer
+from PyQt6.QtCore import Qt, QCoreApplication, QThread, pyqtSignal
 from PyQt6.QtGui import QPixmap, QFont, QImage
-from app.utils.qr_manager import QRCodeManager
+from app.utils.qr_manager import get_qr_manager
+from app.utils.qr_scan_pipeline import QRScanPipeline
 from app.database.database_manager import DatabaseManager
 import cv2
 from pyzbar import pyzbar
 import numpy as np
 
+
+# --- Worker Thread لمعالجة إطارات الكاميرا خارج خيط الواجهة ---
+class QRScanWorker(QThread):
+    frame_ready = pyqtSignal(QImage)
+    code_detected = pyqtSignal(str)
+    stats_updated = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    STATS_INTERVAL = 1.0
+
+    def __init__(self, pipeline: QRScanPipeline, preview_size=(400, 300)):
+        super().__init__()
+        self.pipeline = pipeline
+        self.preview_size = preview_size  # تحدّثه النافذة عند تغيير حجمها
+        self._running = True
+
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        import time
+        self.pipeline.start()
+        last_stats = time.perf_counter()
+        try:
+            while self._running:
+                processed = self.pipeline.process_next(timeout=0.5)
+                if processed is None:
+                    if not self.pipeline.capture_thread.is_alive():
+                        self.failed.emit(self.pipeline.capture_thread.error or "Camera stopped")
+                        break
+                    continue
+                frame, detections, new_payloads = processed
+                for payload in new_payloads:
+                    self.code_detected.emit(payload)
+                self.frame_ready.emit(self._preview(frame, detections))
+
+                now = time.perf_counter()
+                if now - last_stats >= self.STATS_INTERVAL:
+                    self.stats_updated.emit(self.pipeline.snapshot_stats())
+                    last_stats = now
+        finally:
+            self.pipeline.stop()
+
+    def _preview(self, frame, detections) -> QImage:
+        """تصغير الإطار لحجم العرض أولاً ثم رسم المضلعات والتحويل إلى RGB"""
+        height, width = frame.shape[:2]
+        target_w, target_h = self.preview_size
+        scale = min(target_w / width, target_h / height, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        else:
+            frame = frame.copy()
+        for detection in detections:
+            points = np.array([(int(x * scale), int(y * scale)) for x, y in detection.polygon], dtype=np.int32)
+            if len(points) > 4:
+                points = cv2.convexHull(points)
+            cv2.polylines(frame, [points.reshape(-1, 1, 2)], True, (0, 255, 0), 3)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_frame.shape
+        # copy(): الصورة تعيش بعد انتهاء مصفوفة numpy في هذا الخيط
+        return QImage(rgb_frame.data, w, h, ch * w, QImage.Format.Format_RGB888).copy()
+
+
 class QRScannerDialog(QDialog):
     """
     Dialog window for scanning QR codes للموظفين
@@ -17,9 +81,11 @@ class QRScannerDialog(QDialog):
     def __init__(self, db_manager=None, parent=None):
         super().__init__(parent)
         
-        self.qr_manager = QRCodeManager()
+        self.qr_manager = get_qr_manager()
         self.db_manager = db_manager or DatabaseManager()
         self.camera = None
+        self.scan_worker = None
+        self._stopping_workers = []  # عمّال لم ينتهوا خلال مهلة الإيقاف: مرجع حتى إشارة finished
         self.scanning = False
         
         self.setWindowTitle(self.tr("QR Code Scanner"))
@@ -46,6 +112,12 @@ class QRScannerDialog(QDialog):
         self.camera_label.setText(self.tr("Camera not started"))
         layout.addWidget(self.camera_label)
         
+        # أداء المسح (إطارات/ثانية وزمن فك الترميز)
+        self.stats_label = QLabel("")
+        self.stats_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.stats_label.setStyleSheet("color: #666; font-size: 11px;")
+        layout.addWidget(self.stats_label)
+        
         # منطقة إدخال رمز QR يدوياً
         manual_frame = QFrame()
         manual_frame.setFrameStyle(QFrame.Shape.StyledPanel)
@@ -91,10 +163,6 @@ class QRScannerDialog(QDialog):
         button_layout.addWidget(self.close_button)
         
         layout.addLayout(button_layout)
-        
-        # مؤقت لUpdate الكاميرا
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_camera)
     
     def toggle_camera(self):
         """تشغيل/إيقاف الكاميرا"""
@@ -104,17 +172,27 @@ class QRScannerDialog(QDialog):
             self.stop_camera()
     
     def start_camera(self):
-        """تشغيل الكاميرا"""
+        """تشغيل الكاميرا (الالتقاط وفك الترميز في خيوط منفصلة)"""
         try:
             self.camera = cv2.VideoCapture(0)
             if not self.camera.isOpened():
                 QMessageBox.warning(self, self.tr("Warning"), 
                                   self.tr("Could not open camera. Please check if camera is connected."))
                 return
+            # لا نريد إطارات قديمة متراكمة داخل برنامج تشغيل الكاميرا
+            self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            
+            debounce = float(self.qr_manager.settings.get('scan_debounce_seconds', 3))
+            pipeline = QRScanPipeline(self.camera, debounce_seconds=debounce)
+            self.scan_worker = QRScanWorker(pipeline, self._preview_size())
+            self.scan_worker.frame_ready.connect(self.on_frame_ready)
+            self.scan_worker.code_detected.connect(self.process_qr_code)
+            self.scan_worker.stats_updated.connect(self.on_stats_updated)
+            self.scan_worker.failed.connect(self.on_camera_failed)
+            self.scan_worker.start()
             
             self.scanning = True
             self.start_button.setText(self.tr("Stop Camera"))
-            self.timer.start(30)  # 30ms = ~33 FPS
             
         except Exception as e:
             QMessageBox.critical(self, self.tr("Error"), 
@@ -124,50 +202,59 @@ class QRScannerDialog(QDialog):
         """إيقاف الكاميرا"""
         self.scanning = False
         self.start_button.setText(self.tr("Start Camera"))
-        self.timer.stop()
         
-        if self.camera:
-            self.camera.release()
-            self.camera = None
+        worker, camera = self.scan_worker, self.camera
+        self.scan_worker = None
+        self.camera = None
+        
+        if worker:
+            worker.stop()
+            if not worker.wait(3000):
+                # لا يُحرَّر QThread يعمل ولا الكاميرا التي يقرأ منها: التحرير عند انتهائه
+                for signal in (worker.frame_ready, worker.code_detected, worker.stats_updated, worker.failed):
+                    signal.disconnect()
+                self._stopping_workers.append(worker)
+                worker.finished.connect(lambda: self._on_worker_finished(worker, camera))
+                camera = None
+            else:
+                worker.deleteLater()
+        
+        if camera:
+            camera.release()
         
         self.camera_label.setText(self.tr("Camera stopped"))
+        self.stats_label.setText("")
     
-    def update_camera(self):
-        """Update إطار الكاميرا"""
-        if not self.scanning or not self.camera:
-            return
-        
-        ret, frame = self.camera.read()
-        if not ret:
+    def _on_worker_finished(self, worker, camera):
+        if camera:
+            camera.release()
+        if worker in self._stopping_workers:
+            self._stopping_workers.remove(worker)
+        worker.deleteLater()
+    
+    def _preview_size(self):
+        return (self.camera_label.width(), self.camera_label.height())
+    
+    def on_frame_ready(self, image):
+        """عرض إطار جاهز (مصغّر ومرسوم في خيط المعالجة)"""
+        if not self.scanning:
             return
-        
-        # الSearch عن رموز QR في الإطار
-        qr_codes = self.detect_qr_codes(frame)
-        
-        # رسم مربعات حول رموز QR المكتشفة
-        for qr_code in qr_codes:
-            points = qr_code.polygon
-            if len(points) > 4:
-                hull = cv2.convexHull(np.array([point for point in points], dtype=np.float32))
-                points = hull
-            
-            n = len(points)
-            for j in range(n):
-                cv2.line(frame, tuple(points[j]), tuple(points[(j + 1) % n]), (0, 255, 0), 3)
-            
-            # معالجة رمز QR المكتشف
-            self.process_qr_code(qr_code.data.decode('utf-8'))
-        
-        # تحويل الإطار إلى QPixmap
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        
-        # تغيير حجم الصورة لتناسب العرض
-        scaled_pixmap = pixmap.scaled(self.camera_label.size(), Qt.AspectRatioMode.KeepAspectRatio)
-        self.camera_label.setPixmap(scaled_pixmap)
+        self.camera_label.setPixmap(QPixmap.fromImage(image))
+    
+    def on_stats_updated(self, stats):
+        self.stats_label.setText(
+            f"{stats['fps']} fps | decode {stats['decode_ms']} ms (p95 {stats['decode_p95_ms']} ms) "
+            f"| 1/{stats['stride']} frames | dropped {stats.get('dropped', 0)}"
+        )
+    
+    def on_camera_failed(self, message):
+        self.add_result(f"❌ {self.tr('Camera error')}: {message}")
+        self.stop_camera()
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.scan_worker:
+            self.scan_worker.preview_size = self._preview_size()
     
     def detect_qr_codes(self, frame):
         """اكتشاف رموز QR في الإطار"""
@@ -12,12 +12,13 @@ class ReportsWidget(QWidget):
     """
     Professional reporting center مع واجهة ديناميكية وأدوات تحكم متقدمة.
     """
-    def __init__(self, db_manager=None):
+    def __init__(self, db_manager=None, app_settings=None, employees=None):
+        """app_settings / employees: بيانات محملة مسبقاً (من النافذة الرئيسية أو خيط خلفي)، وإلا تُجلب هنا"""
         super().__init__()
         self.db_manager = db_manager or SimpleHybridManager()
-        self.app_settings = self.db_manager.get_all_settings()
+        self.app_settings = app_settings if app_settings is not None else self.db_manager.get_all_settings()
         self.setup_ui()
-        self.load_employees()
+        self.load_employees(employees)
 
     def setup_ui(self):
         main_layout = QHBoxLayout(self)
@@ -101,8 +102,9 @@ class ReportsWidget(QWidget):
         self.export_button.clicked.connect(self.generate_report)
         self.on_report_type_change()
 
-    def load_employees(self):
-        employees = self.db_manager.get_all_employees() or []
+    def load_employees(self, employees=None):
+        if employees is None:
+            employees = self.db_manager.get_all_employees() or []
         self.employee_combo.clear()
         for emp in employees:
             self.employee_combo.addItem(f"{emp['name']} ({emp['employee_code']})", emp['id'])
@@ -21,21 +21,18 @@ class SearchWidget(QWidget):
         
         # --- تصميم حقل الSearch ---
         search_layout = QHBoxLayout()
-        search_layout.addWidget(QLabel(f"<b>{self.tr('Search Employee')}:</b>"))
+        self.search_label = QLabel()
+        search_layout.addWidget(self.search_label)
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText(self.tr("Enter part of a name, phone number, or code..."))
         search_layout.addWidget(self.search_input)
         
-        self.search_button = QPushButton(f"🔍 {self.tr('Search')}")
+        self.search_button = QPushButton()
         search_layout.addWidget(self.search_button)
         layout.addLayout(search_layout)
 
         # --- جدول النتائج ---
         self.results_table = QTableWidget()
         self.results_table.setColumnCount(4)
-        self.results_table.setHorizontalHeaderLabels([
-            self.tr("Code"), self.tr("Full Name"), self.tr("Job Title"), self.tr("Phone Number")
-        ])
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         
         # --- تحسينات تجربة المستخدم ---
@@ -44,6 +41,16 @@ class SearchWidget(QWidget):
         self.results_table.setSortingEnabled(True)
         
         layout.addWidget(self.results_table)
+        self.retranslate_ui()
+
+    def retranslate_ui(self):
+        """نصوص الواجهة (عند الإنشاء وبعد تغيير اللغة)."""
+        self.search_label.setText(f"<b>{self.tr('Search Employee')}:</b>")
+        self.search_input.setPlaceholderText(self.tr("Enter part of a name, phone number, or code..."))
+        self.search_button.setText(f"🔍 {self.tr('Search')}")
+        self.results_table.setHorizontalHeaderLabels([
+            self.tr("Code"), self.tr("Full Name"), self.tr("Job Title"), self.tr("Phone Number")
+        ])
 
     def connect_signals(self):
         """تربط إشارات عناصر الواجهة بالدوال المناسبة."""
@@ -16,13 +16,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, 
     QPushButton, QScrollArea, QFrame, QGroupBox, QCheckBox,
-    QMessageBox, QSplitter, QProgressBar, QSizePolicy
+    QMessageBox, QSplitter, QProgressBar, QListView
 )
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon, QPixmap
 
+from app.gui.notification_feed import (
+    NotificationFilterProxy, NotificationsModel, configure_feed_view, link_category
+)
+
 try:
-    from app.core.notifications_manager import NotificationsManager
+    from app.core.notifications_manager import get_notifications_manager
     NOTIFICATIONS_MANAGER_AVAILABLE = True
 except ImportError:
     NOTIFICATIONS_MANAGER_AVAILABLE = False
@@ -50,13 +54,11 @@ class UserNotificationsWidget(QWidget):
         self.setup_ui()
         self.load_notifications()
         
-        # Connect to notifications manager signals
+        # Connect to notifications manager signals (the shared manager's poller pushes changes;
+        # the widget has no refresh timer of its own)
         if self.notifications_manager:
             self._connect_notifications_manager()
         
-        # Start auto-refresh timer
-        self._start_auto_refresh_timer()
-        
     def _init_notifications_manager(self, supabase_url, supabase_key):
         """Initialize the notifications manager"""
         try:
@@ -67,7 +69,7 @@ class UserNotificationsWidget(QWidget):
                 if not supabase_key:
                     supabase_key = os.getenv('SUPABASE_ANON_KEY')
                 
-                self.notifications_manager = NotificationsManager(supabase_url, supabase_key)
+                self.notifications_manager = get_notifications_manager(supabase_url, supabase_key)
                 print(f"✅ Notifications Manager initialized: {self.notifications_manager.get_status()['mode']}")
             else:
                 print("⚠️ NotificationsManager not available, using local mode")
@@ -94,11 +96,11 @@ class UserNotificationsWidget(QWidget):
         try:
             # Check if notification is targeted to this user
             if self._is_notification_targeted(notification):
-                # Add to local list
-                self.notifications.insert(0, notification)
+                # Add to local list (a copy: the manager's cache stays untouched)
+                self.notifications.insert(0, dict(notification))
                 
-                # Refresh display
-                self.apply_filters()
+                # Refresh display (keyed diff: only the new row is inserted)
+                self._sync_feed()
                 self.update_unread_count()
                 
                 print(f"🔔 New notification received: {notification['title']}")
@@ -112,11 +114,11 @@ class UserNotificationsWidget(QWidget):
             # Update in local list
             for i, n in enumerate(self.notifications):
                 if n['id'] == notification['id']:
-                    self.notifications[i] = notification
+                    self.notifications[i] = dict(notification)
                     break
                     
-            # Refresh display
-            self.apply_filters()
+            # Refresh display (keyed diff)
+            self._sync_feed()
             self.update_unread_count()
             
             print(f"🔄 Notification updated: {notification['title']}")
@@ -130,8 +132,8 @@ class UserNotificationsWidget(QWidget):
             # Remove from local list
             self.notifications = [n for n in self.notifications if n['id'] != notification_id]
             
-            # Refresh display
-            self.apply_filters()
+            # Refresh display (keyed diff)
+            self._sync_feed()
             self.update_unread_count()
             
             print(f"🗑️ Notification deleted: {notification_id}")
@@ -173,41 +175,6 @@ class UserNotificationsWidget(QWidget):
             print(f"❌ Error checking notification target: {e}")
             return False
             
-    def _start_auto_refresh_timer(self):
-        """Start auto-refresh timer for notifications"""
-        try:
-            self.auto_refresh_timer = QTimer(self)
-            self.auto_refresh_timer.timeout.connect(self.auto_refresh_notifications)
-            self.auto_refresh_timer.start(10000)  # Refresh every 10 seconds
-            print("✅ Started auto-refresh timer for notifications")
-            
-        except Exception as e:
-            print(f"❌ Error starting auto-refresh timer: {e}")
-        
-    def auto_refresh_notifications(self):
-        """Auto-refresh notifications from manager"""
-        try:
-            if self.notifications_manager:
-                # Get fresh notifications from manager
-                fresh_notifications = self.notifications_manager.get_notifications(
-                    user_id=self.user_id,
-                    user_role=self.user_role,
-                    limit=100
-                )
-                
-                # Update local list
-                self.notifications = fresh_notifications
-                
-                # Refresh display
-                self.apply_filters()
-                self.update_unread_count()
-                
-                print(f"🔄 Auto-refresh completed: {len(fresh_notifications)} notifications")
-                
-        except Exception as e:
-            # Don't print errors in auto-refresh to avoid spam
-            pass
-        
     def setup_ui(self):
         """Setup user interface with modern, beautiful design"""
         # Main layout with improved spacing
@@ -400,11 +367,12 @@ class UserNotificationsWidget(QWidget):
         
         self.setLayout(main_layout)
         
-        # Initialize notifications_layout reference after it's created
-        if hasattr(self, 'notifications_layout'):
+        # Initialize the feed filters from the checkboxes after they're created
+        if hasattr(self, 'notifications_proxy'):
+            self.apply_filters()
             print("✅ UserNotificationsWidget UI setup completed successfully")
         else:
-            print("⚠️ Warning: notifications_layout not found after UI setup")
+            print("⚠️ Warning: notifications feed not found after UI setup")
             
         # Update status
         self._update_status()
@@ -912,19 +880,22 @@ class UserNotificationsWidget(QWidget):
         self.empty_state.setVisible(False)
         layout.addWidget(self.empty_state)
         
-        # Enhanced scrollable notifications area
-        self.notifications_widget = QWidget()
-        self.notifications_layout = QVBoxLayout()
-        self.notifications_layout.setSpacing(20)
-        self.notifications_layout.setContentsMargins(15, 15, 15, 15)
-        self.notifications_widget.setLayout(self.notifications_layout)
-        
-        # Enhanced scroll area with beautiful styling
-        scroll_area = QScrollArea()
-        scroll_area.setWidget(self.notifications_widget)
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setStyleSheet("""
-            QScrollArea {
+        # Virtualized notifications feed: one model row per notification, cards painted by the delegate
+        self.notifications_model = NotificationsModel(self)
+        self.notifications_proxy = NotificationFilterProxy(self)
+        self.notifications_proxy.setSourceModel(self.notifications_model)
+        self.notifications_view = QListView()
+        self.notifications_delegate = configure_feed_view(self.notifications_view)
+        self.notifications_view.setModel(self.notifications_proxy)
+        self.notifications_delegate.mark_read_requested.connect(self.mark_as_read)
+        self.notifications_delegate.link_activated.connect(self._open_link)
+        self.notifications_delegate.copy_requested.connect(self._copy_link)
+        self.notifications_proxy.rowsInserted.connect(self._update_empty_state)
+        self.notifications_proxy.rowsRemoved.connect(self._update_empty_state)
+        self.notifications_proxy.modelReset.connect(self._update_empty_state)
+        self.notifications_proxy.layoutChanged.connect(self._update_empty_state)
+        self.notifications_view.setStyleSheet("""
+            QListView {
                 border: none;
                 background-color: transparent;
             }
@@ -947,7 +918,7 @@ class UserNotificationsWidget(QWidget):
                     stop:0 #495057, stop:1 #343a40);
             }
         """)
-        layout.addWidget(scroll_area)
+        layout.addWidget(self.notifications_view)
         
         panel.setLayout(layout)
         return panel
@@ -956,7 +927,8 @@ class UserNotificationsWidget(QWidget):
         """تحديث التنبيهات من النظام المشترك"""
         try:
             if self.notifications_manager:
-                # Get fresh notifications from manager
+                # Apply pending changes now (incremental), then read the manager's cache
+                self.notifications_manager.sync_now()
                 fresh_notifications = self.notifications_manager.get_notifications(
                     user_id=self.user_id,
                     user_role=self.user_role,
@@ -971,7 +943,7 @@ class UserNotificationsWidget(QWidget):
             else:
                 print("⚠️ لا يمكن الوصول للنظام المشترك")
                 
-            self.apply_filters()
+            self._sync_feed()
             self.update_unread_count()
             self._update_status()
             
@@ -982,9 +954,9 @@ class UserNotificationsWidget(QWidget):
 
     def load_notifications(self):
         """Load notifications from database or local storage"""
-        # Safety check: ensure notifications_layout is properly initialized
-        if not hasattr(self, 'notifications_layout') or self.notifications_layout is None:
-            print("Warning: notifications_layout not initialized, skipping load_notifications")
+        # Safety check: ensure the feed model is properly initialized
+        if getattr(self, 'notifications_model', None) is None:
+            print("Warning: notifications_model not initialized, skipping load_notifications")
             return
             
         try:
@@ -1002,7 +974,7 @@ class UserNotificationsWidget(QWidget):
                     self.add_sample_notifications()
                     print("ℹ️ تم استخدام البيانات المحلية (لا يوجد مدير تنبيهات)")
                     
-            self.apply_filters()
+            self._sync_feed()
             self.update_unread_count()
             
         except Exception as e:
@@ -1058,22 +1030,12 @@ class UserNotificationsWidget(QWidget):
         self.notifications.extend(sample_notifications)
         
     def apply_filters(self):
-        """Apply selected filters to notifications"""
-        # Safety check: ensure notifications_layout is properly initialized
-        if not hasattr(self, 'notifications_layout') or self.notifications_layout is None:
-            print("Warning: notifications_layout not initialized, skipping apply_filters")
+        """Apply selected filters to notifications (proxy filters only, no rows are rebuilt)"""
+        # Safety check: ensure the feed is properly initialized
+        if getattr(self, 'notifications_proxy', None) is None:
+            print("Warning: notifications_proxy not initialized, skipping apply_filters")
             return
             
-        # Clear existing notifications
-        for i in reversed(range(self.notifications_layout.count())):
-            widget = self.notifications_layout.itemAt(i).widget()
-            if widget is not None:
-                widget.setParent(None)
-            
-        # Get filter states
-        show_unread = self.show_unread.isChecked()
-        show_read = self.show_read.isChecked()
-        
         # Get priority filters
         priority_filters = []
         if self.priority_urgent.isChecked():
@@ -1086,378 +1048,44 @@ class UserNotificationsWidget(QWidget):
             priority_filters.append("low")
             
         # Get type filters
-        type_filters = []
-        if self.type_general.isChecked():
-            type_filters.append("General Announcement")
-        if self.type_update.isChecked():
-            type_filters.append("System Update")
-        if self.type_important.isChecked():
-            type_filters.append("Important Notice")
-        if self.type_event.isChecked():
-            type_filters.append("Celebration/Event")
-        if self.type_maintenance.isChecked():
-            type_filters.append("Maintenance Notice")
-        if self.type_training.isChecked():
-            type_filters.append("Training/Workshop")
-        if self.type_policy.isChecked():
-            type_filters.append("Policy Change")
-        if self.type_emergency.isChecked():
-            type_filters.append("Emergency Alert")
-        if self.type_document.isChecked():
-            type_filters.append("Document/Resource")
-        if self.type_download.isChecked():
-            type_filters.append("Download Link")
-        if self.type_website.isChecked():
-            type_filters.append("Website Link")
-            
-        # Filter notifications
-        filtered_notifications = []
-        for notification in self.notifications:
-            # Check status filter
-            is_read = notification.get("is_read", False)
-            if is_read and not show_read:
-                continue
-            if not is_read and not show_unread:
-                continue
-                
-            # Check priority filter
-            priority = notification.get("priority", "medium")
-            if priority not in priority_filters:
-                continue
-                
-            # Check type filter
-            notification_type = notification.get("notification_type", "")
-            if not any(type_filter in notification_type for type_filter in type_filters):
-                continue
-                
-            filtered_notifications.append(notification)
-            
-        # Display filtered notifications
-        if filtered_notifications:
-            self.empty_state.setVisible(False)
-            for notification in filtered_notifications:
-                notification_widget = self.create_notification_widget(notification)
-                if notification_widget is not None:
-                    self.notifications_layout.addWidget(notification_widget)
-        else:
-            self.empty_state.setVisible(True)
-            
-        # Add stretch to push notifications to top
-        self.notifications_layout.addStretch()
-        
-    def create_notification_widget(self, notification: Dict[str, Any]):
-        """Create a beautiful, clear, and easy-to-read notification widget"""
-        widget = QFrame()
-        widget.setFrameStyle(QFrame.Shape.StyledPanel)
-        
-        # Enhanced styling with better contrast and readability
-        is_read = notification.get("is_read", False)
-        if not is_read:
-            widget.setStyleSheet("""
-                QFrame {
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #ffffff, stop:1 #f0f8ff);
-                    border: 3px solid #1e88e5;
-                    border-radius: 20px;
-                    padding: 25px;
-                    margin: 15px;
-                }
-                QFrame:hover {
-                    border-color: #1565c0;
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #f0f8ff, stop:1 #e3f2fd);
-                }
-            """)
-        else:
-            widget.setStyleSheet("""
-                QFrame {
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #ffffff, stop:1 #fafafa);
-                    border: 2px solid #e0e0e0;
-                    border-radius: 20px;
-                    padding: 25px;
-                    margin: 15px;
-                }
-                QFrame:hover {
-                    border-color: #1e88e5;
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #fafafa, stop:1 #f0f8ff);
-                }
-            """)
-        
-        layout = QVBoxLayout()
-        layout.setSpacing(25)
-        layout.setContentsMargins(25, 25, 25, 25)
-        
-        # Enhanced header with clear visual hierarchy
-        header_layout = QHBoxLayout()
-        header_layout.setSpacing(25)
-        
-        # Notification type with clear icon and styling
-        notification_type = notification.get("notification_type", "Notification")
-        type_label = QLabel(f"📢 {notification_type}")
-        type_label.setStyleSheet("""
-            font-weight: 700; 
-            color: #ffffff; 
-            font-size: 16px;
-            padding: 12px 20px;
-            background: qlineargradient(x1:0, y1:0, x2:1, y2:0, 
-                stop:0 #3f51b5, stop:1 #5c6bc0);
-            border-radius: 12px;
-            border: 2px solid #303f9f;
-        """)
-        
-        # Priority with clear color coding
-        priority = notification.get("priority", "medium")
-        priority_label = QLabel(f"⚡ {priority.upper()}")
-        priority_colors = {
-            "urgent": {"bg": "#f44336", "border": "#d32f2f", "text": "white"},
-            "high": {"bg": "#ff9800", "border": "#f57c00", "text": "white"},
-            "medium": {"bg": "#ffc107", "border": "#ffa000", "text": "#212121"},
-            "low": {"bg": "#4caf50", "border": "#388e3c", "text": "white"}
-        }
-        priority_style = priority_colors.get(priority, {"bg": "#9e9e9e", "border": "#757575", "text": "white"})
-        priority_label.setStyleSheet(f"""
-            color: {priority_style['text']}; 
-            font-weight: 700; 
-            font-size: 14px; 
-            padding: 10px 16px; 
-            background-color: {priority_style['bg']}; 
-            border: 2px solid {priority_style['border']};
-            border-radius: 10px;
-        """)
-        
-        # Clear timestamp display
-        timestamp = notification.get("created_at") or notification.get("timestamp")
-        if timestamp:
-            try:
-                if isinstance(timestamp, str):
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                else:
-                    dt = timestamp
-                time_str = dt.strftime("%Y-%m-%d %H:%M")
-            except:
-                time_str = str(timestamp)
-        else:
-            time_str = "Unknown"
-            
-        time_label = QLabel(f"🕒 {time_str}")
-        time_label.setStyleSheet("""
-            color: #424242; 
-            font-size: 13px; 
-            padding: 10px 16px; 
-            background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                stop:0 #f5f5f5, stop:1 #eeeeee);
-            border: 1px solid #e0e0e0;
-            border-radius: 10px;
-            font-weight: 600;
-        """)
-        
-        header_layout.addWidget(type_label)
-        header_layout.addStretch()
-        header_layout.addWidget(priority_label)
-        header_layout.addWidget(time_label)
-        
-        layout.addLayout(header_layout)
+        type_checkboxes = [
+            (self.type_general, "General Announcement"),
+            (self.type_update, "System Update"),
+            (self.type_important, "Important Notice"),
+            (self.type_event, "Celebration/Event"),
+            (self.type_maintenance, "Maintenance Notice"),
+            (self.type_training, "Training/Workshop"),
+            (self.type_policy, "Policy Change"),
+            (self.type_emergency, "Emergency Alert"),
+            (self.type_document, "Document/Resource"),
+            (self.type_download, "Download Link"),
+            (self.type_website, "Website Link"),
+        ]
+        type_filters = [name for checkbox, name in type_checkboxes if checkbox.isChecked()]
         
-        # Enhanced title with clear typography and emphasis
-        title_label = QLabel(notification.get("title", "No Title"))
-        title_label.setStyleSheet("""
-            font-size: 20px; 
-            font-weight: 700; 
-            color: #212121; 
-            margin: 20px 0; 
-            padding: 15px 20px;
-            background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                stop:0 #f8f9fa, stop:1 #e9ecef);
-            border-radius: 12px;
-            border-left: 6px solid #1e88e5;
-            line-height: 1.4;
-        """)
-        layout.addWidget(title_label)
-        
-        # Enhanced message with excellent readability
-        message_label = QLabel(notification.get("message", "No Message"))
-        message_label.setWordWrap(True)
-        message_label.setStyleSheet("""
-            color: #424242; 
-            margin: 20px 0; 
-            font-size: 16px; 
-            line-height: 1.7; 
-            padding: 20px;
-            background-color: #ffffff;
-            border-radius: 12px;
-            border: 2px solid #e8eaf6;
-            font-weight: 500;
-            text-align: justify;
-        """)
-        # Ensure message is fully visible
-        message_label.setMinimumHeight(80)
-        message_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-        layout.addWidget(message_label)
-        
-        # Enhanced spacing before links
-        layout.addSpacing(20)
-        
-        # Enhanced links section with clear visual separation
-        links = notification.get("links", [])
-        if links:
-            links_group = QGroupBox("🔗 Links & Resources")
-            links_group.setStyleSheet("""
-                QGroupBox {
-                    font-weight: 700;
-                    font-size: 16px;
-                    padding: 20px;
-                    border: 3px solid #e3f2fd;
-                    border-radius: 15px;
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #ffffff, stop:1 #f3f8ff);
-                    margin-top: 15px;
-                }
-                QGroupBox::title {
-                    subcontrol-origin: margin;
-                    left: 20px;
-                    padding: 0 15px 0 15px;
-                    color: #1976d2;
-                    background-color: #ffffff;
-                }
-            """)
-            links_layout = QVBoxLayout()
-            links_layout.setSpacing(15)
-            
-            for i, link in enumerate(links):
-                link_layout = QHBoxLayout()
-                link_layout.setSpacing(20)
-                
-                # Enhanced link icon based on type
-                link_type = self._get_link_type(link)
-                icon_map = {
-                    "document": "📄",
-                    "download": "📥",
-                    "video": "🎥",
-                    "image": "🖼️",
-                    "website": "🌐"
-                }
-                icon = icon_map.get(link_type, "🔗")
-                
-                # Enhanced link label with better styling and readability
-                link_label = QLabel(f"{icon} {link}")
-                link_label.setStyleSheet("""
-                    font-size: 14px;
-                    color: #1976d2;
-                    padding: 12px 16px;
-                    background-color: #f8f9fa;
-                    border: 2px solid #e3f2fd;
-                    border-radius: 8px;
-                    font-weight: 600;
-                    line-height: 1.4;
-                """)
-                link_label.setWordWrap(True)
-                link_label.mousePressEvent = lambda e, url=link: self._open_link(url)
-                link_label.setCursor(Qt.CursorShape.PointingHandCursor)
-                
-                # Enhanced copy button with clear design
-                copy_button = QPushButton("📋 Copy")
-                copy_button.setStyleSheet("""
-                    QPushButton {
-                        background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                            stop:0 #4caf50, stop:1 #66bb6a);
-                        color: white;
-                        border: none;
-                        padding: 12px 20px;
-                        border-radius: 8px;
-                        font-weight: 700;
-                        font-size: 13px;
-                        min-width: 90px;
-                    }
-                    QPushButton:hover {
-                        background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                            stop:0 #66bb6a, stop:1 #81c784);
-                    }
-                    QPushButton:pressed {
-                        background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                            stop:0 #388e3c, stop:1 #4caf50);
-                    }
-                """)
-                copy_button.clicked.connect(lambda checked, url=link: self._copy_link(url))
-                
-                link_layout.addWidget(link_label)
-                link_layout.addWidget(copy_button)
-                links_layout.addLayout(link_layout)
-            
-            links_group.setLayout(links_layout)
-            layout.addWidget(links_group)
-        
-        # Enhanced footer with clear action buttons
-        footer_layout = QHBoxLayout()
-        footer_layout.setSpacing(25)
-        
-        if not is_read:
-            mark_read_button = QPushButton("✅ Mark as Read")
-            mark_read_button.setMinimumHeight(50)
-            mark_read_button.setStyleSheet("""
-                QPushButton {
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #4caf50, stop:1 #66bb6a);
-                    color: white;
-                    border: none;
-                    padding: 15px 25px;
-                    border-radius: 10px;
-                    font-size: 15px;
-                    font-weight: 700;
-                    min-height: 50px;
-                }
-                QPushButton:hover {
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #66bb6a, stop:1 #81c784);
-                }
-                QPushButton:pressed {
-                    background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
-                        stop:0 #388e3c, stop:1 #4caf50);
-                }
-            """)
-            mark_read_button.clicked.connect(lambda: self.mark_as_read(notification["id"]))
-            footer_layout.addWidget(mark_read_button)
-        
-        footer_layout.addStretch()
-        
-        # Enhanced status indicator with clear visual feedback
-        status_text = "📖 Read" if is_read else "📖 Unread"
-        status_label = QLabel(status_text)
-        status_style = {
-            "read": {"color": "#2e7d32", "bg": "#e8f5e8", "border": "#c8e6cb"},
-            "unread": {"color": "#d32f2f", "bg": "#ffebee", "border": "#ffcdd2"}
-        }
-        status_style_data = status_style["read" if is_read else "unread"]
-        status_label.setStyleSheet(f"""
-            color: {status_style_data['color']}; 
-            font-size: 15px; 
-            font-weight: 700;
-            padding: 12px 20px; 
-            background-color: {status_style_data['bg']};
-            border-radius: 10px; 
-            border: 2px solid {status_style_data['border']};
-        """)
-        footer_layout.addWidget(status_label)
+        self.notifications_proxy.set_filters(
+            show_unread=self.show_unread.isChecked(),
+            show_read=self.show_read.isChecked(),
+            priorities=priority_filters,
+            types=type_filters
+        )
+        self._update_empty_state()
         
-        layout.addLayout(footer_layout)
+    def _sync_feed(self):
+        """Apply self.notifications to the feed model as a keyed diff"""
+        if getattr(self, 'notifications_model', None) is None:
+            return
+        self.notifications_model.apply_notifications(self.notifications)
+        self._update_empty_state()
         
-        widget.setLayout(layout)
-        return widget
+    def _update_empty_state(self, *args):
+        """Show the empty state when no notification passes the filters"""
+        if getattr(self, 'notifications_proxy', None) is not None:
+            self.empty_state.setVisible(self.notifications_proxy.rowCount() == 0)
     
     def _get_link_type(self, link):
         """Determine the type of link"""
-        link_lower = link.lower()
-        if any(ext in link_lower for ext in ['.pdf', '.doc', '.docx', '.txt', '.rtf']):
-            return "document"
-        elif any(ext in link_lower for ext in ['.zip', '.rar', '.exe', '.msi', '.dmg']):
-            return "download"
-        elif any(ext in link_lower for ext in ['.mp4', '.avi', '.mov', '.wmv', '.flv']):
-            return "video"
-        elif any(ext in link_lower for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']):
-            return "image"
-        else:
-            return "website"
+        return link_category(str(link))
     
     def _open_link(self, url):
         """Open link in default browser"""
@@ -1500,7 +1128,7 @@ class UserNotificationsWidget(QWidget):
                     notification["is_read"] = True
                     break
                     
-            self.apply_filters()
+            self._sync_feed()
             self.update_unread_count()
             
         except Exception as e:
@@ -1530,7 +1158,7 @@ class UserNotificationsWidget(QWidget):
                 for notification in self.notifications:
                     notification["is_read"] = True
                     
-                self.apply_filters()
+                self._sync_feed()
                 self.update_unread_count()
                 
                 print("✅ Marked all notifications as read")
@@ -1585,8 +1213,8 @@ class UserNotificationsWidget(QWidget):
             # Add to list
             self.notifications.insert(0, notification)
             
-            # Refresh display
-            self.apply_filters()
+            # Refresh display (keyed diff)
+            self._sync_feed()
             self.update_unread_count()
             
             print(f"✅ Added new notification: {notification.get('title', 'No Title')}")
@@ -1597,11 +1225,12 @@ class UserNotificationsWidget(QWidget):
     def closeEvent(self, event):
         """Cleanup when widget is closed"""
         try:
-            if hasattr(self, 'auto_refresh_timer'):
-                self.auto_refresh_timer.stop()
-                
+            # The manager is shared (main window, other widgets): disconnect only, don't stop its poller
             if self.notifications_manager:
-                self.notifications_manager.cleanup()
+                self.notifications_manager.notification_received.disconnect(self._on_notification_received)
+                self.notifications_manager.notification_updated.disconnect(self._on_notification_updated)
+                self.notifications_manager.notification_deleted.disconnect(self._on_notification_deleted)
+                self.notifications_manager.unread_count_changed.disconnect(self._on_unread_count_changed)
                 
         except Exception as e:
             print(f"❌ Error during cleanup: {e}")
@@ -14,25 +14,22 @@ class UsersWidget(QWidget):
     """
     Integrated interface for managing program users (المديرين والمشرفين).
     """
-    def __init__(self, db_manager=None):
+    def __init__(self, db_manager=None, users=None):
+        """users: قائمة محملة مسبقاً (في خيط خلفي)، وإلا تُجلب من قاعدة البيانات"""
         super().__init__()
         self.db_manager = db_manager or SimpleHybridManager()
         self.setup_ui()
         self.connect_signals()
-        self.load_users_data()
+        self.load_users_data(users)
 
     def setup_ui(self):
         """تنشئ وتنظم عناصر الواجهة."""
         layout = QVBoxLayout(self)
         button_layout = QHBoxLayout()
-        self.add_user_button = QPushButton(f"➕ {self.tr('Add User')}")
-        self.add_user_button.setToolTip(self.tr("Create a new application user"))
-        self.edit_user_button = QPushButton(f"✏️ {self.tr('Edit Role')}")
-        self.edit_user_button.setToolTip(self.tr("Change the selected user's role"))
-        self.change_pass_button = QPushButton(f"🔑 {self.tr('Change Password')}")
-        self.change_pass_button.setToolTip(self.tr("Set a new password for the selected user"))
-        self.delete_user_button = QPushButton(f"🗑️ {self.tr('Delete User')}")
-        self.delete_user_button.setToolTip(self.tr("Delete the selected user (except main admin)"))
+        self.add_user_button = QPushButton()
+        self.edit_user_button = QPushButton()
+        self.change_pass_button = QPushButton()
+        self.delete_user_button = QPushButton()
         
         button_layout.addWidget(self.add_user_button)
         button_layout.addWidget(self.edit_user_button)
@@ -43,12 +40,12 @@ class UsersWidget(QWidget):
         
         self.table = QTableWidget()
         self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["ID", self.tr("Username"), self.tr("Role")])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.setSortingEnabled(True)
         layout.addWidget(self.table)
+        self.retranslate_ui()
 
     def connect_signals(self):
         """تربط إشارات الأزرار بالدوال الخاصة بها."""
@@ -57,9 +54,22 @@ class UsersWidget(QWidget):
         self.change_pass_button.clicked.connect(self.change_password)
         self.delete_user_button.clicked.connect(self.delete_user)
 
-    def load_users_data(self):
-        """تحمل بيانات المستخدمين من قاعدة البيانات وتملأ الجدول."""
-        users = self.db_manager.get_all_users() or []
+    def retranslate_ui(self):
+        """نصوص الواجهة (عند الإنشاء وبعد تغيير اللغة)."""
+        self.add_user_button.setText(f"➕ {self.tr('Add User')}")
+        self.add_user_button.setToolTip(self.tr("Create a new application user"))
+        self.edit_user_button.setText(f"✏️ {self.tr('Edit Role')}")
+        self.edit_user_button.setToolTip(self.tr("Change the selected user's role"))
+        self.change_pass_button.setText(f"🔑 {self.tr('Change Password')}")
+        self.change_pass_button.setToolTip(self.tr("Set a new password for the selected user"))
+        self.delete_user_button.setText(f"🗑️ {self.tr('Delete User')}")
+        self.delete_user_button.setToolTip(self.tr("Delete the selected user (except main admin)"))
+        self.table.setHorizontalHeaderLabels(["ID", self.tr("Username"), self.tr("Role")])
+
+    def load_users_data(self, users=None):
+        """تحمل بيانات المستخدمين من قاعدة البيانات (أو القائمة المعطاة) وتملأ الجدول."""
+        if users is None:
+            users = self.db_manager.get_all_users() or []
         self.table.setRowCount(0)
         self.table.setRowCount(len(users))
         for row, user in enumerate(users):
@@ -1,14 +1,15 @@
 import sys
+import time
 import webbrowser
 import pandas as pd
 from PyQt6.QtWidgets import (
-    QMainWindow, QTabWidget, QWidget, QVBoxLayout, QLabel, QTableWidget, 
-    QTableWidgetItem, QHeaderView, QPushButton, QApplication, QDateEdit, QHBoxLayout,
+    QMainWindow, QTabWidget, QWidget, QVBoxLayout, QLabel, QTableView, 
+    QLineEdit, QHeaderView, QPushButton, QApplication, QDateEdit, QHBoxLayout,
     QMessageBox, QFileDialog, QMenuBar, QStatusBar
 )
 from PyQt6.QtGui import QAction, QIcon, QPixmap
-from PyQt6.QtGui import QFont, QColor
-from PyQt6.QtCore import Qt, QDate, QTime, QCoreApplication, QTranslator, QLocale, QTimer
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt, QDate, QCoreApplication, QTranslator, QLocale, QTimer
 
 # استيراد جميع الواجهات الفرعية والوحدات الخدمية
 from app.gui.employees_widget import EmployeesWidget
@@ -17,13 +18,15 @@ from app.gui.search_widget import SearchWidget
 from app.gui.settings_widget import SettingsWidget
 from app.gui.users_widget import UsersWidget
 from app.gui.locations_widget import LocationsWidget
+from app.gui.dashboard_models import AttendanceTableModel, DashboardFilterProxy, MapLinkDelegate, DashboardLoader
+from app.gui.lazy_tabs import LazyTabWidget, TabSpec
 from app.database.simple_hybrid_manager import SimpleHybridManager
 from app.utils.notifier import NotifierThread
 from app.gui.holidays_widget import HolidaysWidget # <-- استيراد الواجهة الجديدة
 from app.gui.gentle_notification import GentleNotification  # <-- استيراد الإشعارات اللطيفة
 from app.utils.app_logger import get_logger
 from app.utils.update_checker import get_current_version, fetch_latest_info, is_newer_version, download_file, run_windows_installer
-from app.core.notifications_manager import NotificationsManager  # <-- استيراد مدير التنبيهات المتقدم
+from app.core.notifications_manager import get_notifications_manager  # <-- مدير التنبيهات المشترك
 from datetime import datetime
 
 
@@ -33,6 +36,7 @@ class MainWindow(QMainWindow):
     """
     def __init__(self, user_data: dict, app_instance, db_manager=None):
         super().__init__()
+        self._startup_started = time.perf_counter()  # بداية قياس أول رسم للوحة التحكم
         self.user_data = user_data
         self.db_manager = db_manager or SimpleHybridManager()
         self.logger = get_logger("MainWindow")
@@ -46,6 +50,12 @@ class MainWindow(QMainWindow):
         # نظام التنبيهات المشترك
         self.shared_notifications = []
         
+        # تحميل لوحة التحكم في الخلفية: تحميل واحد في كل مرة، وطلب أثناءه يُعاد بعده مرة واحدة
+        self._dashboard_loader = None
+        self._dashboard_generation = 0
+        self._dashboard_refresh_pending = False
+        self._dashboard_loaded_date = None
+        
         # تهيئة مدير التنبيهات المتقدم
         try:
             import os
@@ -54,7 +64,7 @@ class MainWindow(QMainWindow):
             supabase_key = os.getenv('SUPABASE_KEY') or os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY', '')
             
             if supabase_url and supabase_key:
-                self.notifications_manager = NotificationsManager(supabase_url, supabase_key)
+                self.notifications_manager = get_notifications_manager(supabase_url, supabase_key)
                 self.logger.info("✅ Advanced Notifications Manager initialized successfully")
             else:
                 self.logger.warning("⚠️ Supabase credentials not found, notifications will use local mode")
@@ -65,6 +75,7 @@ class MainWindow(QMainWindow):
         
         self.initial_load_language()
         self.rebuild_ui()
+        self.logger.info(f"⏱️ MainWindow constructed in {(time.perf_counter() - self._startup_started) * 1000:.0f} ms")
         self.start_notifier_service()
         self.start_auto_refresh_timer()
         self.start_change_detection_system()  # 🆕 نظام كشف التغييرات
@@ -88,8 +99,12 @@ class MainWindow(QMainWindow):
 
     def rebuild_ui(self):
         """
-        تعيد بناء كل الواجهة (التبويبات) لتطبيق التغييرات مثل اللغة.
+        تبني الواجهة في أول استدعاء؛ بعده (تغيير اللغة مثلاً) تُعاد ترجمة العناصر الموجودة فقط
+        دون إعادة إنشاء التبويبات أو إعادة جلب بياناتها.
         """
+        if hasattr(self, 'tabs'):
+            self.retranslate_ui()
+            return
         window_title = self.tr("Dashboard") + f" - [{self.user_data.get('username')}] - ({self.user_data.get('role')})"
         self.setWindowTitle(window_title)
         self.setGeometry(100, 100, 1280, 720)
@@ -120,7 +135,7 @@ class MainWindow(QMainWindow):
         # شريط الحالة
         self._ensure_status_bar()
 
-        self.tabs = QTabWidget()
+        self.tabs = LazyTabWidget()
         self.tabs.setFont(QFont("Segoe UI", 10, QFont.Weight.Medium))
         self.tabs.setTabPosition(QTabWidget.TabPosition.North)
         self.tabs.setMovable(True)
@@ -133,63 +148,136 @@ class MainWindow(QMainWindow):
         # --- تبويب لوحة التحكم (Dashboard) ---
         self.dashboard_tab = QWidget()
         main_layout = QVBoxLayout(self.dashboard_tab)
-        top_layout = QHBoxLayout(); top_layout.addWidget(QLabel(self.tr("Displaying attendance for day:"))); self.date_selector = QDateEdit(calendarPopup=True); self.date_selector.setDate(QDate.currentDate()); top_layout.addWidget(self.date_selector); self.refresh_button = QPushButton(self.tr("🔄 Refresh Now")); top_layout.addWidget(self.refresh_button); top_layout.addStretch(); main_layout.addLayout(top_layout)
+        top_layout = QHBoxLayout(); self.dashboard_date_label = QLabel(self.tr("Displaying attendance for day:")); top_layout.addWidget(self.dashboard_date_label); self.date_selector = QDateEdit(calendarPopup=True); self.date_selector.setDate(QDate.currentDate()); top_layout.addWidget(self.date_selector); self.refresh_button = QPushButton(self.tr("🔄 Refresh Now")); top_layout.addWidget(self.refresh_button); top_layout.addStretch()
+        self.dashboard_filter = QLineEdit(); self.dashboard_filter.setPlaceholderText(f"🔍 {self.tr('Filter...')}"); self.dashboard_filter.setClearButtonEnabled(True); self.dashboard_filter.setMaximumWidth(260); top_layout.addWidget(self.dashboard_filter); main_layout.addLayout(top_layout)
         
         tables_layout = QHBoxLayout()
+        self._dashboard_loaded_date = None  # نماذج جديدة (إعادة بناء الواجهة): أول تحميل يملؤها كاملة
+        self.map_delegate = MapLinkDelegate(self)
         
-        checkin_layout = QVBoxLayout(); checkin_layout.addWidget(QLabel(f"<h3>✅ {self.tr('Check-in')}</h3>"))
-        self.checkin_table = QTableWidget(); self.checkin_table.setColumnCount(6)
-        self.checkin_table.setHorizontalHeaderLabels([self.tr("Employee"), self.tr("Check-in Time"), self.tr("Status"), self.tr("Notes"), self.tr("Approved Location"), self.tr("Map View")])
-        self.checkin_table.setSortingEnabled(True); checkin_layout.addWidget(self.checkin_table)
+        checkin_layout = QVBoxLayout(); self.checkin_title_label = QLabel(f"<h3>✅ {self.tr('Check-in')}</h3>"); checkin_layout.addWidget(self.checkin_title_label)
+        self.checkin_model = AttendanceTableModel(self._checkin_headers(), late_columns=(1, 2), map_column=5, parent=self)
+        self.checkin_proxy = DashboardFilterProxy(self); self.checkin_proxy.setSourceModel(self.checkin_model)
+        self.checkin_table = self._create_dashboard_view(self.checkin_proxy, map_column=5); checkin_layout.addWidget(self.checkin_table)
         self.checkin_export_button = QPushButton(f"💾 {self.tr('Export Check-ins (Excel)')}"); checkin_layout.addWidget(self.checkin_export_button); tables_layout.addLayout(checkin_layout)
         
-        checkout_layout = QVBoxLayout(); checkout_layout.addWidget(QLabel(f"<h3>❌ {self.tr('Check-out')}</h3>"))
-        self.checkout_table = QTableWidget(); self.checkout_table.setColumnCount(5)
-        self.checkout_table.setHorizontalHeaderLabels([self.tr("Employee"), self.tr("Check-out Time"), self.tr("Work Duration (H)"), self.tr("Approved Location"), self.tr("Map View")])
-        self.checkout_table.setSortingEnabled(True); checkout_layout.addWidget(self.checkout_table)
+        checkout_layout = QVBoxLayout(); self.checkout_title_label = QLabel(f"<h3>❌ {self.tr('Check-out')}</h3>"); checkout_layout.addWidget(self.checkout_title_label)
+        self.checkout_model = AttendanceTableModel(self._checkout_headers(), map_column=4, parent=self)
+        self.checkout_proxy = DashboardFilterProxy(self); self.checkout_proxy.setSourceModel(self.checkout_model)
+        self.checkout_table = self._create_dashboard_view(self.checkout_proxy, map_column=4); checkout_layout.addWidget(self.checkout_table)
         self.checkout_export_button = QPushButton(f"💾 {self.tr('Export Check-outs (Excel)')}"); checkout_layout.addWidget(self.checkout_export_button); tables_layout.addLayout(checkout_layout)
         
         main_layout.addLayout(tables_layout)
-        self.tabs.addTab(self.dashboard_tab, f"📊 {self.tr('Dashboard')}")
+        self.tabs.register_tab(TabSpec('dashboard', lambda: f"📊 {self.tr('Dashboard')}", lambda _data: self.dashboard_tab),
+                               widget=self.dashboard_tab, started_at=self._startup_started)
+
+        # --- باقي التبويبات: تُنشأ عند أول فتح لها، والبيانات تُجلب في الخلفية ---
+        self.register_lazy_tabs()
+
+        self.setCentralWidget(self.tabs)
+
+        # Update شريط الحالة بInformation المستخدم
+        self._update_status_message()
+
+    def register_lazy_tabs(self):
+        """تسجيل التبويبات بمصانعها؛ لا يُنشأ أي منها ولا تُقرأ بياناته قبل فتحه"""
+        register = self.tabs.register_tab
+        db = self.db_manager
 
         # --- التبويبات العامة ---
-        self.employees_widget = EmployeesWidget(user_role=self.user_data['role'], db_manager=self.db_manager)
-        self.tabs.addTab(self.employees_widget, f"👥 {self.tr('Employees')}")
-        self.reports_widget = ReportsWidget(db_manager=self.db_manager)
-        self.tabs.addTab(self.reports_widget, f"📊 {self.tr('Reports')}")
-        self.search_widget = SearchWidget(db_manager=self.db_manager)
-        self.tabs.addTab(self.search_widget, f"🔍 {self.tr('Search')}")
+        register(TabSpec('employees', lambda: f"👥 {self.tr('Employees')}", self._create_employees_tab))
+        register(TabSpec('reports', lambda: f"📊 {self.tr('Reports')}", self._create_reports_tab,
+                         preload=lambda: db.get_all_employees() or []))
+        register(TabSpec('search', lambda: f"🔍 {self.tr('Search')}", self._create_search_tab))
 
         # --- التبويبات الخاصة بالمدير فقط ---
         if self.user_data['role'] == 'Admin':
-            self.locations_widget = LocationsWidget(db_manager=self.db_manager)
-            self.tabs.addTab(self.locations_widget, f"📍 {self.tr('Locations')}")
-            self.holidays_widget = HolidaysWidget(db_manager=self.db_manager)
-            self.tabs.addTab(self.holidays_widget, f"📅 {self.tr('Holidays')}")
-
-            self.users_widget = UsersWidget(db_manager=self.db_manager)
-            self.tabs.addTab(self.users_widget, f"👤 {self.tr('Users')}")
-            
-            self.settings_widget = SettingsWidget()
-            self.settings_widget.theme_changed.connect(self.apply_theme)
-            self.settings_widget.language_changed.connect(self.change_language)
-            self.tabs.addTab(self.settings_widget, f"⚙️ {self.tr('Settings')}")
-
-        # --- تبويبات الذكاء الاصطناعي الجديدة ---
+            register(TabSpec('locations', lambda: f"📍 {self.tr('Locations')}", self._create_locations_tab,
+                             preload=lambda: db.get_all_locations() or []))
+            register(TabSpec('holidays', lambda: f"📅 {self.tr('Holidays')}", self._create_holidays_tab,
+                             preload=lambda: db.get_all_holidays() or []))
+            register(TabSpec('users', lambda: f"👤 {self.tr('Users')}", self._create_users_tab,
+                             preload=lambda: db.get_all_users() or []))
+            register(TabSpec('settings', lambda: f"⚙️ {self.tr('Settings')}", self._create_settings_tab))
+
+        # --- تبويبات الذكاء الاصطناعي ---
         self.setup_ai_tabs()
         
         # --- تبويب التنبيهات ---
         self.setup_notifications_tab()
 
-        self.setCentralWidget(self.tabs)
+    # --- مصانع التبويبات (تُستدعى في خيط الواجهة عند أول تفعيل) ---
 
-        # Update شريط الحالة بInformation المستخدم
+    def _create_employees_tab(self, _data):
+        self.employees_widget = EmployeesWidget(user_role=self.user_data['role'], db_manager=self.db_manager)
+        return self.employees_widget
+
+    def _create_reports_tab(self, employees):
+        self.reports_widget = ReportsWidget(db_manager=self.db_manager, app_settings=dict(self.app_settings or {}),
+                                            employees=employees)
+        return self.reports_widget
+
+    def _create_search_tab(self, _data):
+        self.search_widget = SearchWidget(db_manager=self.db_manager)
+        return self.search_widget
+
+    def _create_locations_tab(self, locations):
+        self.locations_widget = LocationsWidget(db_manager=self.db_manager, locations=locations)
+        return self.locations_widget
+
+    def _create_holidays_tab(self, holidays):
+        self.holidays_widget = HolidaysWidget(db_manager=self.db_manager, holidays=holidays)
+        return self.holidays_widget
+
+    def _create_users_tab(self, users):
+        self.users_widget = UsersWidget(db_manager=self.db_manager, users=users)
+        return self.users_widget
+
+    def _create_settings_tab(self, _data):
+        self.settings_widget = SettingsWidget()
+        self.settings_widget.theme_changed.connect(self.apply_theme)
+        self.settings_widget.language_changed.connect(self.change_language)
+        return self.settings_widget
+
+    def _update_status_message(self):
         if self.statusBar():
             self.statusBar().showMessage(self.tr("Logged in as") + f": {self.user_data.get('username')} ({self.user_data.get('role')})")
 
+    def _checkin_headers(self):
+        return [self.tr("Employee"), self.tr("Check-in Time"), self.tr("Status"), self.tr("Notes"), self.tr("Approved Location"), self.tr("Map View")]
+
+    def _checkout_headers(self):
+        return [self.tr("Employee"), self.tr("Check-out Time"), self.tr("Work Duration (H)"), self.tr("Approved Location"), self.tr("Map View")]
+
+    def retranslate_ui(self):
+        """تحديث نصوص الواجهة الموجودة بعد تغيير اللغة (دون إعادة إنشاء التبويبات أو إعادة جلب بياناتها)"""
+        self.setWindowTitle(self.tr("Dashboard") + f" - [{self.user_data.get('username')}] - ({self.user_data.get('role')})")
+        self.file_menu.setTitle(self.tr("File"))
+        self.logout_action.setText(self.tr("Logout"))
+        self.exit_action.setText(self.tr("Exit"))
+        self.help_menu.setTitle(self.tr("Help"))
+
+        self.dashboard_date_label.setText(self.tr("Displaying attendance for day:"))
+        self.refresh_button.setText(self.tr("🔄 Refresh Now"))
+        self.dashboard_filter.setPlaceholderText(f"🔍 {self.tr('Filter...')}")
+        self.checkin_title_label.setText(f"<h3>✅ {self.tr('Check-in')}</h3>")
+        self.checkout_title_label.setText(f"<h3>❌ {self.tr('Check-out')}</h3>")
+        self.checkin_model.set_headers(self._checkin_headers())
+        self.checkout_model.set_headers(self._checkout_headers())
+        self.checkin_export_button.setText(f"💾 {self.tr('Export Check-ins (Excel)')}")
+        self.checkout_export_button.setText(f"💾 {self.tr('Export Check-outs (Excel)')}")
+
+        self.tabs.retranslate()
+        self._update_status_message()
+        # نصوص الخلايا ("في الموعد"، "عرض"...) تُبنى مع الصفوف: التحميل التالي يطبقها كفرق
+        self.update_dashboard_table()
+
     def connect_signals(self):
         self.date_selector.dateChanged.connect(self.update_dashboard_table)
         self.refresh_button.clicked.connect(self.update_dashboard_table)
+        self.dashboard_filter.textChanged.connect(self.checkin_proxy.setFilterFixedString)
+        self.dashboard_filter.textChanged.connect(self.checkout_proxy.setFilterFixedString)
+        self.map_delegate.map_requested.connect(self.open_map)
         self.checkin_export_button.clicked.connect(lambda: self.export_table_to_excel(self.checkin_table, self.tr("Check-in Report")))
         self.checkout_export_button.clicked.connect(lambda: self.export_table_to_excel(self.checkout_table, self.tr("Check-out Report")))
     
@@ -236,115 +324,57 @@ class MainWindow(QMainWindow):
         if self.translator.load(QLocale(lang_code), "", "", "translations"):
             self.app.installTranslator(self.translator)
             self.app.setLayoutDirection(Qt.LayoutDirection.RightToLeft if lang_code == 'ar' else Qt.LayoutDirection.LeftToRight)
+        self.rebuild_ui()
     
     def setup_ai_tabs(self):
-        """إعداد تبويبات الذكاء الاصطناعي الجديدة"""
-        try:
-            # استيراد الواجهات الجديدة
+        """تبويبات الذكاء الاصطناعي (الوحدات نفسها تُستورد عند أول فتح)"""
+        def create_ai_assistant(_data):
             from app.gui.ai_assistant_widget import AIAssistantWidget
-            from app.gui.advanced_analytics_widget import AdvancedAnalyticsWidget
-            
-            # تبويب المساعد الذكي
             self.ai_assistant_widget = AIAssistantWidget(self.db_manager)
-            self.tabs.addTab(self.ai_assistant_widget, f"🤖 {self.tr('AI Assistant')}")
-            
-            # تبويب التحليل المتقدم
+            return self.ai_assistant_widget
+
+        def create_analytics(_data):
+            from app.gui.advanced_analytics_widget import AdvancedAnalyticsWidget
             self.advanced_analytics_widget = AdvancedAnalyticsWidget(self.db_manager)
-            self.tabs.addTab(self.advanced_analytics_widget, f"📈 {self.tr('Analytics')}")
-            
-            print("✅ تم Add تبويبات الذكاء الاصطناعي بنجاح")
-            
-        except Exception as e:
-            print(f"❌ Failed في Add تبويبات الذكاء الاصطناعي: {e}")
-            import traceback
-            traceback.print_exc()
-            self.rebuild_ui()
-        # تم Add تبويبات الذكاء الاصطناعي بنجاح
+            return self.advanced_analytics_widget
+
+        self.tabs.register_tab(TabSpec('ai_assistant', lambda: f"🤖 {self.tr('AI Assistant')}", create_ai_assistant))
+        self.tabs.register_tab(TabSpec('analytics', lambda: f"📈 {self.tr('Analytics')}", create_analytics))
 
     def setup_notifications_tab(self):
-        """إعداد تبويب التنبيهات - تصميم جديد ومحسن"""
-        try:
-            # استيراد واجهات التنبيهات
+        """تبويب التنبيهات: الإرسال للمدير، والعرض لباقي المستخدمين (يُنشأ عند أول فتح)"""
+        import os
+        supabase_url = os.getenv('SUPABASE_URL') or os.getenv('NEXT_PUBLIC_SUPABASE_URL', '')
+        supabase_key = os.getenv('SUPABASE_KEY') or os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY', '')
+
+        def create_admin_notifications(_data):
             from app.gui.admin_notifications_widget import AdminNotificationsWidget
+            self.admin_notifications_widget = AdminNotificationsWidget(
+                self.db_manager,
+                supabase_url=supabase_url,
+                supabase_key=supabase_key
+            )
+            # ربط إشارة إرسال التنبيه
+            self.admin_notifications_widget.notification_sent.connect(self.on_admin_notification_sent)
+            # ربط إشارة إضافة التنبيه للتحديث المباشر
+            self.admin_notifications_widget.notification_added.connect(self.on_notification_added)
+            print("✅ تم إنشاء Admin Notifications Widget الجديد بنجاح")
+            return self.admin_notifications_widget
+
+        def create_user_notifications(_data):
             from app.gui.user_notifications_widget import UserNotificationsWidget
-            
-            # الحصول على بيانات Supabase من البيئة
-            import os
-            supabase_url = os.getenv('SUPABASE_URL') or os.getenv('NEXT_PUBLIC_SUPABASE_URL', '')
-            supabase_key = os.getenv('SUPABASE_KEY') or os.getenv('NEXT_PUBLIC_SUPABASE_ANON_KEY', '')
-            
-            if self.user_data['role'] == 'Admin':
-                # تبويب إرسال التنبيهات للمدير - تصميم جديد
-                try:
-                    self.admin_notifications_widget = AdminNotificationsWidget(
-                        self.db_manager,
-                        supabase_url=supabase_url,
-                        supabase_key=supabase_key
-                    )
-                    # Ensure the widget has a proper parent
-                    self.admin_notifications_widget.setParent(self.tabs)
-                    self.tabs.addTab(self.admin_notifications_widget, f"🔔 {self.tr('Notifications')}")
-                    
-                    # ربط إشارة إرسال التنبيه
-                    self.admin_notifications_widget.notification_sent.connect(self.on_admin_notification_sent)
-                    
-                    # ربط إشارة إضافة التنبيه للتحديث المباشر
-                    self.admin_notifications_widget.notification_added.connect(self.on_notification_added)
-                    
-                    print("✅ تم إنشاء Admin Notifications Widget الجديد بنجاح")
-                    
-                except Exception as widget_error:
-                    print(f"❌ Failed في إنشاء Admin Notifications Widget: {widget_error}")
-                    import traceback
-                    traceback.print_exc()
-                    # Create a fallback widget
-                    fallback_widget = QWidget()
-                    fallback_layout = QVBoxLayout()
-                    fallback_label = QLabel("Failed to load Admin Notifications Widget")
-                    fallback_layout.addWidget(fallback_label)
-                    fallback_widget.setLayout(fallback_layout)
-                    self.tabs.addTab(fallback_widget, "🔔 Admin Notifications (Error)")
-                
-            else:
-                # تبويب عرض التنبيهات للمستخدمين العاديين
-                try:
-                    self.user_notifications_widget = UserNotificationsWidget(
-                        self.db_manager, 
-                        self.user_data.get('id'), 
-                        self.user_data.get('role'),
-                        supabase_url=supabase_url,
-                        supabase_key=supabase_key
-                    )
-                    # Ensure the widget has a proper parent
-                    self.user_notifications_widget.setParent(self.tabs)
-                    self.tabs.addTab(self.user_notifications_widget, f"🔔 {self.tr('Notifications')}")
-                    print("✅ تم إنشاء User Notifications Widget بنجاح")
-                    
-                except Exception as widget_error:
-                    print(f"❌ Failed في إنشاء User Notifications Widget: {widget_error}")
-                    import traceback
-                    traceback.print_exc()
-                    # Create a fallback widget
-                    fallback_widget = QWidget()
-                    fallback_layout = QVBoxLayout()
-                    fallback_label = QLabel("Failed to load User Notifications Widget")
-                    fallback_layout.addWidget(fallback_label)
-                    fallback_widget.setLayout(fallback_layout)
-                    self.tabs.addTab(fallback_widget, "🔔 Notifications (Error)")
-            
-            print("✅ تم Add تبويب التنبيهات بنجاح")
-            
-        except Exception as e:
-            print(f"❌ Failed في Add تبويب التنبيهات: {e}")
-            import traceback
-            traceback.print_exc()
-            # Create a basic error tab
-            error_widget = QWidget()
-            error_layout = QVBoxLayout()
-            error_label = QLabel("Failed to load Notifications System")
-            error_layout.addWidget(error_label)
-            error_widget.setLayout(error_layout)
-            self.tabs.addTab(error_widget, "🔔 Notifications (System Error)")
+            self.user_notifications_widget = UserNotificationsWidget(
+                self.db_manager, 
+                self.user_data.get('id'), 
+                self.user_data.get('role'),
+                supabase_url=supabase_url,
+                supabase_key=supabase_key
+            )
+            print("✅ تم إنشاء User Notifications Widget بنجاح")
+            return self.user_notifications_widget
+
+        factory = create_admin_notifications if self.user_data['role'] == 'Admin' else create_user_notifications
+        self.tabs.register_tab(TabSpec('notifications', lambda: f"🔔 {self.tr('Notifications')}", factory))
 
     def on_notification_added(self, notification_data: dict):
         """معالج إضافة تنبيه جديد للتحديث المباشر (للتوافق مع النظام القديم)"""
@@ -473,82 +503,77 @@ class MainWindow(QMainWindow):
             self.notifier_thread.quit()
             self.notifier_thread.wait(2000)
 
+    def _create_dashboard_view(self, proxy: DashboardFilterProxy, map_column: int) -> QTableView:
+        view = QTableView()
+        view.setModel(proxy)
+        view.setSortingEnabled(True)
+        view.sortByColumn(1, Qt.SortOrder.AscendingOrder)  # الوقت
+        view.setItemDelegateForColumn(map_column, self.map_delegate)
+        view.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        view.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        view.verticalHeader().setDefaultSectionSize(26)
+        view.horizontalHeader().setStretchLastSection(True)
+        return view
+
     def update_dashboard_table(self):
         """
-        يجلب البيانات ويحدّث جداول لوحة التحكم، مع منطق صحيح لزر الخريطة.
+        يطلب تحديث جداول لوحة التحكم: الجلب وتجهيز الصفوف في DashboardLoader (خارج خيط الواجهة)،
+        ثم on_dashboard_loaded يطبق الفرق فقط على النماذج.
         """
-        print("[Dashboard] Refreshing data...")
-        self.locations_cache = {loc['id']: loc for loc in (self.db_manager.get_all_locations() or [])}
-        
-        selected_date = self.date_selector.date().toString("yyyy-MM-dd")
-        all_records = self.db_manager.get_attendance_by_date(selected_date) or []
-        
-        checkin_records = [r for r in all_records if r['type'] == 'Check-In']
-        checkout_records = [r for r in all_records if r['type'] == 'Check-Out']
-        
-        work_start_time_str = self.app_settings.get('work_start_time', '08:30:00')
-        late_allowance_minutes = int(self.app_settings.get('late_allowance_minutes', '15'))
-        work_start_time = QTime.fromString(work_start_time_str, "HH:mm:ss")
-
-        # ملء جدول الحضور
-        self.checkin_table.setRowCount(0)
-        self.checkin_table.setRowCount(len(checkin_records))
-        for row, record in enumerate(checkin_records):
-            arrival_time = QTime.fromString(record['check_time'], "HH:mm:ss")
-            time_item = QTableWidgetItem(record['check_time'])
-            status_item = QTableWidgetItem(self.tr("On Time"))
-            if arrival_time > work_start_time.addSecs(late_allowance_minutes * 60):
-                time_item.setForeground(QColor('red')); status_item.setText(self.tr("Late")); status_item.setForeground(QColor('red'))
-            
-            self.checkin_table.setItem(row, 0, QTableWidgetItem(record['employee_name']))
-            self.checkin_table.setItem(row, 1, time_item)
-            self.checkin_table.setItem(row, 2, status_item)
-            self.checkin_table.setItem(row, 3, QTableWidgetItem(record.get('notes', '')))
-            
-            location_id = record.get('location_id')
-            location_name = record.get('location_name', self.tr('N/A'))
-            self.checkin_table.setItem(row, 4, QTableWidgetItem(location_name))
-            
-            # الآن هذا الشرط سيعمل بشكل صحيح
-            if location_id and location_id in self.locations_cache:
-                location_info = self.locations_cache[location_id]
-                lat, lon = location_info['latitude'], location_info['longitude']
-                map_button = QPushButton(f"🗺️ {self.tr('View')}")
-                map_button.clicked.connect(lambda ch, la=lat, lo=lon: self.open_map(la, lo))
-                self.checkin_table.setCellWidget(row, 5, map_button)
-
-        # ملء جدول الانصراف
-        self.checkout_table.setRowCount(0)
-        self.checkout_table.setRowCount(len(checkout_records))
-        for row, record in enumerate(checkout_records):
-            self.checkout_table.setItem(row, 0, QTableWidgetItem(record['employee_name']))
-            self.checkout_table.setItem(row, 1, QTableWidgetItem(record['check_time']))
-            duration = record.get('work_duration_hours'); duration_str = str(duration) if duration is not None else ""; 
-            self.checkout_table.setItem(row, 2, QTableWidgetItem(duration_str))
-            
-            location_id = record.get('location_id')
-            location_name = record.get('location_name', self.tr('N/A'))
-            self.checkout_table.setItem(row, 3, QTableWidgetItem(location_name))
-            
-            if location_id and location_id in self.locations_cache:
-                location_info = self.locations_cache[location_id]
-                lat, lon = location_info['latitude'], location_info['longitude']
-                map_button = QPushButton(f"🗺️ {self.tr('View')}")
-                map_button.clicked.connect(lambda ch, la=lat, lo=lon: self.open_map(la, lo))
-                self.checkout_table.setCellWidget(row, 4, map_button)
-
-
-
-    def export_table_to_excel(self, table: QTableWidget, report_name: str):
-        if table.rowCount() == 0: QMessageBox.warning(self, self.tr("No Data"), self.tr("There is no data in the table to export.")); return
+        if self._dashboard_loader is not None and self._dashboard_loader.isRunning():
+            self._dashboard_refresh_pending = True
+            return
+        self._dashboard_refresh_pending = False
+        self._dashboard_generation += 1
+        labels = {key: self.tr(key) for key in ("On Time", "Late", "N/A", "View")}
+        self._dashboard_loader = DashboardLoader(
+            self.db_manager, self._dashboard_generation, self.date_selector.date().toString("yyyy-MM-dd"),
+            dict(self.app_settings or {}), labels, parent=self
+        )
+        self._dashboard_loader.loaded.connect(self.on_dashboard_loaded)
+        self._dashboard_loader.failed.connect(self.on_dashboard_load_failed)
+        self._dashboard_loader.finished.connect(self._on_dashboard_loader_finished)
+        self._dashboard_loader.start()
+
+    def on_dashboard_loaded(self, generation: int, date_str: str, checkin_rows: list, checkout_rows: list,
+                            locations: dict):
+        if generation != self._dashboard_generation or not hasattr(self, 'checkin_model'):
+            return
+        self.locations_cache = locations
+        if date_str != self.date_selector.date().toString("yyyy-MM-dd"):
+            return  # تغير اليوم أثناء التحميل: الطلب المعلق سيجلب اليوم الجديد
+        if date_str != self._dashboard_loaded_date:
+            self.checkin_model.reset_rows(checkin_rows)
+            self.checkout_model.reset_rows(checkout_rows)
+            self._dashboard_loaded_date = date_str
+            return
+        checkin_stats = self.checkin_model.apply_rows(checkin_rows)
+        checkout_stats = self.checkout_model.apply_rows(checkout_rows)
+        if any(checkin_stats.values()) or any(checkout_stats.values()):
+            self.logger.info(f"[Dashboard] check-in {checkin_stats}, check-out {checkout_stats}")
+
+    def on_dashboard_load_failed(self, generation: int, error: str):
+        self.logger.error(f"❌ Error loading dashboard data: {error}")
+
+    def _on_dashboard_loader_finished(self):
+        loader, self._dashboard_loader = self._dashboard_loader, None
+        if loader is not None:
+            loader.deleteLater()
+        if self._dashboard_refresh_pending:
+            self.update_dashboard_table()
+
+    def export_table_to_excel(self, table: QTableView, report_name: str):
+        model = table.model()
+        if model is None or model.rowCount() == 0: QMessageBox.warning(self, self.tr("No Data"), self.tr("There is no data in the table to export.")); return
         file_path, _ = QFileDialog.getSaveFileName(self, self.tr("Save Report"), "", f"{self.tr('Excel Files (*.xlsx)')}");
         if not file_path: return
         try:
-            headers = [table.horizontalHeaderItem(i).text() for i in range(table.columnCount())]; data = []
-            for row in range(table.rowCount()):
-                row_data = {headers[col]: (table.item(row, col).text() if table.item(row, col) else "") for col in range(table.columnCount()) if not table.cellWidget(row, col)}
-                data.append(row_data)
-            df = pd.DataFrame(data); df.to_excel(file_path, index=False, engine='openpyxl')
+            # ما يظهر في الجدول (بعد الفرز والبحث)، بدون عمود الخريطة
+            map_column = model.sourceModel().map_column
+            columns = [col for col in range(model.columnCount()) if col != map_column]
+            headers = [model.headerData(col, Qt.Orientation.Horizontal) for col in columns]
+            data = [{headers[i]: model.index(row, col).data() or "" for i, col in enumerate(columns)} for row in range(model.rowCount())]
+            df = pd.DataFrame(data, columns=headers); df.to_excel(file_path, index=False, engine='openpyxl')
             QMessageBox.information(self, self.tr("Success"), f"{self.tr('Report saved successfully at:')}\n{file_path}")
         except Exception as e: QMessageBox.critical(self, self.tr("Error"), f"{self.tr('Failed to save the report:')} {e}")
     
@@ -560,13 +585,13 @@ class MainWindow(QMainWindow):
         menubar: QMenuBar = self.menuBar() or QMenuBar(self)
         self.setMenuBar(menubar)
 
-        file_menu = menubar.addMenu(self.tr("File"))
+        self.file_menu = file_menu = menubar.addMenu(self.tr("File"))
 
-        logout_action = QAction(self.tr("Logout"), self)
+        self.logout_action = logout_action = QAction(self.tr("Logout"), self)
         logout_action.triggered.connect(self._handle_logout)
         file_menu.addAction(logout_action)
 
-        exit_action = QAction(self.tr("Exit"), self)
+        self.exit_action = exit_action = QAction(self.tr("Exit"), self)
         exit_action.triggered.connect(self._handle_exit)
         file_menu.addAction(exit_action)
 
@@ -587,7 +612,7 @@ class MainWindow(QMainWindow):
         advanced_qr_action.triggered.connect(self._open_advanced_qr_tools)
         qr_menu.addAction(advanced_qr_action)
 
-        help_menu = menubar.addMenu(self.tr("Help"))
+        self.help_menu = help_menu = menubar.addMenu(self.tr("Help"))
         
         # User Manual
         user_manual_action = QAction("📖 User Manual", self)
@@ -1277,6 +1302,11 @@ This software is proprietary and confidential.
     def closeEvent(self, event):
         # ضمان إيقاف الخيوط الخلفية قبل الغلق
         self.stop_notifier_service()
+        if self._dashboard_loader is not None and self._dashboard_loader.isRunning():
+            self._dashboard_refresh_pending = False
+            self._dashboard_loader.wait(2000)
+        if hasattr(self, 'tabs'):
+            self.tabs.shutdown()
         
         # تنظيف مدير التنبيهات المتقدم
         try:
@@ -1510,11 +1540,11 @@ Now you can see all new updates in all tabs!"""
                 self._refresh_dashboard_tables()
                 self.logger.info("✅ Dashboard tables updated")
             
-            # 2. Update different tabs
-            if hasattr(self, 'tabs') and self.tabs.count() > 0:
-                for i in range(self.tabs.count()):
-                    widget = self.tabs.widget(i)
-                    self._refresh_widget_data(widget)
+            # 2. Update different tabs (المنشأة فقط؛ غير المفتوحة ستقرأ البيانات الجديدة عند فتحها)
+            if hasattr(self, 'tabs'):
+                for widget in self.tabs.created_widgets():
+                    if widget is not self.dashboard_tab:
+                        self._refresh_widget_data(widget)
             
             # 3. Update locations cache
             if hasattr(self, 'locations_cache'):
@@ -1683,17 +1713,7 @@ Now you can see all new updates in all tabs!"""
     def _refresh_dashboard_tables(self):
         """Update dashboard tables"""
         try:
-            # Update check-in table
-            if hasattr(self, 'checkin_table'):
-                self.checkin_table.clearContents()
-                self.checkin_table.setRowCount(0)
-            
-            # Update check-out table
-            if hasattr(self, 'checkout_table'):
-                self.checkout_table.clearContents()
-                self.checkout_table.setRowCount(0)
-            
-            # Reload data
+            # النماذج تطبق الفرق بنفسها: لا حاجة لتفريغ الجداول قبل إعادة التحميل
             self.update_dashboard_table()
             
         except Exception as e:
@@ -1814,9 +1834,9 @@ Now you can see all new updates in all tabs!"""
         """Handle change in general QR settings"""
         try:
             # Update all existing QR codes
-            from app.utils.qr_manager import QRCodeManager
-            qr_manager = QRCodeManager()
-            qr_manager.update_settings(new_settings)
+            from app.utils.qr_manager import get_qr_manager
+            qr_manager = get_qr_manager()
+            qr_manager.reload()  # الإعدادات محفوظة في الملف بالفعل
             
             # Regenerate all QR codes
             self._regenerate_all_qr_codes(new_settings)
@@ -1833,8 +1853,8 @@ Now you can see all new updates in all tabs!"""
         try:
             from app.database.database_manager import DatabaseManager
             db_manager = DatabaseManager()
-            from app.utils.qr_manager import QRCodeManager
-            qr_manager = QRCodeManager()
+            from app.utils.qr_manager import get_qr_manager
+            qr_manager = get_qr_manager()
             
             # Get all employees
             employees = db_manager.get_all_employees()
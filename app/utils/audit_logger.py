@@ -4,64 +4,38 @@
 """
 
 import json
-import os
 import hashlib
+import sqlite3
+import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 import logging
 import threading
 
+from app.utils.audit_store import AuditStore, DEFAULT_DB_PATH, MAX_PAGE_SIZE
+
 logger = logging.getLogger(__name__)
 
 class AuditLogger:
     """نظام سجل التدقيق الشامل"""
     
-    def __init__(self):
-        self.audit_db_path = "audit_log.json"
-        self.audit_data = self.load_audit_data()
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
         self.lock = threading.Lock()
         
         # إعدادات التدقيق
-        self.max_log_entries = 10000
         self.log_retention_days = 365
         
-    def load_audit_data(self) -> Dict:
-        """تحميل بيانات التدقيق"""
+        # الأحداث في SQLite مفهرسة (انظر audit_store)؛ كل حدث إدخال صف واحد
         try:
-            if os.path.exists(self.audit_db_path):
-                with open(self.audit_db_path, 'r') as f:
-                    return json.load(f)
-            return {
-                'audit_entries': [],
-                'security_events': [],
-                'access_logs': [],
-                'metadata': {
-                    'created_at': datetime.now().isoformat(),
-                    'last_cleanup': None,
-                    'total_entries': 0
-                }
-            }
-        except Exception as e:
-            logger.error(f"❌ خطأ في تحميل سجل التدقيق: {e}")
-            return {
-                'audit_entries': [],
-                'security_events': [],
-                'access_logs': [],
-                'metadata': {
-                    'created_at': datetime.now().isoformat(),
-                    'last_cleanup': None,
-                    'total_entries': 0
-                }
-            }
+            self.store = AuditStore(db_path, retention_days=self.log_retention_days)
+        except sqlite3.Error as e:
+            # نظام ملفات للقراءة فقط (serverless): السجل في الذاكرة لهذه العملية
+            logger.warning(f"⚠️ تعذر فتح {db_path} ({e}) - استخدام قاعدة في الذاكرة")
+            self.store = AuditStore(':memory:', retention_days=self.log_retention_days)
+        self.store.import_legacy_json("audit_log.json")
     
-    def save_audit_data(self):
-        """حفظ بيانات التدقيق"""
-        try:
-            with self.lock:
-                with open(self.audit_db_path, 'w') as f:
-                    json.dump(self.audit_data, f, indent=2)
-        except Exception as e:
-            logger.error(f"❌ خطأ في حفظ سجل التدقيق: {e}")
+    def _append(self, event: Dict[str, Any]):
+        self.store.append(event)
     
     def log_attendance_event(self, employee_id: int, event_type: str, 
                            details: Dict, ip_address: str = None, 
@@ -83,15 +57,7 @@ class AuditLogger:
                 'hash': self.calculate_event_hash(employee_id, event_type, details)
             }
             
-            with self.lock:
-                self.audit_data['audit_entries'].append(audit_entry)
-                self.audit_data['metadata']['total_entries'] += 1
-                
-                # تنظيف السجل إذا تجاوز الحد الأقصى
-                if len(self.audit_data['audit_entries']) > self.max_log_entries:
-                    self.audit_data['audit_entries'] = self.audit_data['audit_entries'][-self.max_log_entries:]
-            
-            self.save_audit_data()
+            self._append(audit_entry)
             
             logger.info(f"📝 تم تسجيل حدث الحضور: {event_type} للموظف {employee_id}")
             return event_id
@@ -118,10 +84,7 @@ class AuditLogger:
                 'hash': self.calculate_event_hash(employee_id, event_type, details)
             }
             
-            with self.lock:
-                self.audit_data['security_events'].append(security_event)
-            
-            self.save_audit_data()
+            self._append(security_event)
             
             logger.warning(f"🔒 تم تسجيل حدث أمني: {event_type}")
             return event_id
@@ -148,10 +111,7 @@ class AuditLogger:
                 'severity': 'high' if not success else 'low'
             }
             
-            with self.lock:
-                self.audit_data['access_logs'].append(access_event)
-            
-            self.save_audit_data()
+            self._append(access_event)
             
             logger.info(f"🔐 تم تسجيل حدث الوصول: {action} - {'نجح' if success else 'فشل'}")
             return event_id
@@ -240,7 +200,8 @@ class AuditLogger:
         """إنشاء معرف فريد للحدث"""
         try:
             timestamp = datetime.now().isoformat()
-            random_part = hashlib.md5(timestamp.encode()).hexdigest()[:8]
+            # عشوائي لا مشتق من الوقت: event_id فريد في الفهرس وحدثان في نفس الميكروثانية لا يتصادمان
+            random_part = uuid.uuid4().hex[:8]
             return f"EVT_{timestamp.replace(':', '').replace('-', '').replace('.', '')}_{random_part}"
         except Exception as e:
             logger.error(f"❌ خطأ في إنشاء معرف الحدث: {e}")
@@ -287,50 +248,61 @@ class AuditLogger:
             return 'low'
     
     def get_audit_report(self, start_date: str = None, end_date: str = None, 
-                        event_type: str = None, employee_id: int = None) -> Dict:
-        """الحصول على تقرير التدقيق"""
+                        event_type: str = None, employee_id: int = None,
+                        sub_type: str = None, severity: str = None,
+                        limit: int = MAX_PAGE_SIZE, cursor: str = None,
+                        include_employees: bool = False) -> Dict:
+        """
+        الحصول على تقرير التدقيق: صفحة من الأحدث للأقدم (limit حتى 1000) مع next_cursor للصفحة التالية.
+        الملخص والعدد الكلي بنفس فلاتر الصفحة (من العدادات اليومية، أو من الفهرس مع sub_type)
+        ويُحسبان للصفحة الأولى فقط (None مع cursor).
+        """
         try:
-            with self.lock:
-                all_events = []
-                all_events.extend(self.audit_data['audit_entries'])
-                all_events.extend(self.audit_data['security_events'])
-                all_events.extend(self.audit_data['access_logs'])
-                
-                # فلترة الأحداث
-                filtered_events = []
-                for event in all_events:
-                    # فلترة حسب التاريخ
-                    if start_date and event['timestamp'] < start_date:
-                        continue
-                    if end_date and event['timestamp'] > end_date:
-                        continue
-                    
-                    # فلترة حسب نوع الحدث
-                    if event_type and event.get('event_type') != event_type:
-                        continue
-                    
-                    # فلترة حسب الموظف
-                    if employee_id and event.get('employee_id') != employee_id:
-                        continue
-                    
-                    filtered_events.append(event)
-                
-                # ترتيب حسب التاريخ
-                filtered_events.sort(key=lambda x: x['timestamp'], reverse=True)
-                
-                return {
-                    'total_events': len(filtered_events),
-                    'events': filtered_events[:1000],  # آخر 1000 حدث
-                    'summary': self.generate_audit_summary(filtered_events)
-                }
-                
+            events, next_cursor = self.store.query(
+                start_date=start_date, end_date=end_date, event_type=event_type,
+                employee_id=employee_id, sub_type=sub_type, severity=severity,
+                limit=limit, cursor=cursor
+            )
+            total, summary = None, None
+            if not cursor:
+                summary = self.generate_audit_summary(
+                    start_date=start_date, end_date=end_date, event_type=event_type,
+                    employee_id=employee_id, include_employees=include_employees,
+                    sub_type=sub_type, severity=severity
+                )
+                total = summary.get('total_events', len(events))
+                summary['recent_activity'] = events[:10]
+            
+            return {
+                'total_events': total,
+                'events': events,
+                'next_cursor': next_cursor,
+                'summary': summary
+            }
+        
+        except ValueError:
+            # مؤشر صفحة تالف: خطأ من العميل وليس من النظام
+            raise
         except Exception as e:
             logger.error(f"❌ خطأ في إنشاء تقرير التدقيق: {e}")
-            return {'total_events': 0, 'events': [], 'summary': {}}
+            return {'total_events': 0, 'events': [], 'next_cursor': None, 'summary': {}}
     
-    def generate_audit_summary(self, events: List[Dict]) -> Dict:
-        """إنشاء ملخص التدقيق"""
+    def iter_audit_events(self, **filters) -> Iterator[Dict]:
+        """كل الأحداث المطابقة (من الأحدث) صفحةً صفحة - للتصدير والبث"""
+        return self.store.iter_events(**filters)
+    
+    def generate_audit_summary(self, events: List[Dict] = None, start_date: str = None, end_date: str = None,
+                               event_type: str = None, employee_id: int = None,
+                               include_employees: bool = False, sub_type: str = None,
+                               severity: str = None) -> Dict:
+        """إنشاء ملخص التدقيق (من العدادات اليومية؛ أو من قائمة أحداث إن مُرّرت)"""
         try:
+            if events is None:
+                summary = self.store.summary(start_date, end_date, event_type, employee_id, include_employees,
+                                             sub_type, severity)
+                summary['recent_activity'] = []
+                return summary
+            
             summary = {
                 'total_events': len(events),
                 'by_type': {},
@@ -362,5 +334,6 @@ class AuditLogger:
             logger.error(f"❌ خطأ في إنشاء ملخص التدقيق: {e}")
             return {}
 
+
 # إنشاء مثيل عام
 audit_logger = AuditLogger()
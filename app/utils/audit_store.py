@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+فهرس سجل التدقيق في SQLite
+- جدول audit_events بفهارس على (timestamp)، (employee_id, timestamp)، (event_type, timestamp)،
+  (sub_type, timestamp) و (severity, timestamp): استعلامات المدى الزمني ولكل موظف لا تمسح السجل كاملاً
+- ترقيم بالمؤشر (timestamp, id) بدل OFFSET: الصفحة رقم 1000 بتكلفة الصفحة الأولى
+- عدادات تُحدَّث مع كل إدخال: audit_daily_counts (يوم، نوع، خطورة) للملخص العام و
+  audit_employee_daily_counts (موظف، يوم، نوع، خطورة) لملخص الموظف. الملخص يجمع الأيام الكاملة
+  من العدادات، واليومان الطرفيان الجزئيان فقط من جدول الأحداث
+- حذف ما تجاوز مدة الاحتفاظ دورياً
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv('AUDIT_DB_PATH', 'audit_log.db')
+MAX_PAGE_SIZE = 1000
+
+_INSERT_EVENT = (
+    "INSERT OR IGNORE INTO audit_events (event_id, timestamp, event_type, sub_type, employee_id, severity, payload) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_BUMP_COUNTER = """
+    INSERT INTO audit_daily_counts (day, event_type, severity, count) VALUES (?, ?, ?, 1)
+    ON CONFLICT(day, event_type, severity) DO UPDATE SET count = count + 1
+"""
+_BUMP_EMPLOYEE_COUNTER = """
+    INSERT INTO audit_employee_daily_counts (employee_id, day, event_type, severity, count) VALUES (?, ?, ?, ?, 1)
+    ON CONFLICT(employee_id, day, event_type, severity) DO UPDATE SET count = count + 1
+"""
+
+
+def encode_cursor(timestamp: str, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp}|{row_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    timestamp, row_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+    return timestamp, int(row_id)
+
+
+def _next_day(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+class AuditStore:
+    """أحداث التدقيق والعدادات اليومية (اتصال واحد محمي بقفل؛ WAL للقراءة المتزامنة بين العمليات)"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, retention_days: int = 365,
+                 retention_check_interval: float = 3600.0):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.retention_check_interval = retention_check_interval
+        self._last_retention = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self._lock:
+            cursor = self._conn.cursor()
+            if self.db_path != ':memory:':
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS audit_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id TEXT UNIQUE,
+                    timestamp TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    sub_type TEXT,
+                    employee_id INTEGER,
+                    severity TEXT,
+                    payload TEXT NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_ts ON audit_events(timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_employee_ts ON audit_events(employee_id, timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_type_ts ON audit_events(event_type, timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_subtype_ts ON audit_events(sub_type, timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_events_severity_ts ON audit_events(severity, timestamp)")
+            # عدادات عامة: بضعة صفوف لكل يوم مهما كان عدد الموظفين
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS audit_daily_counts (
+                    day TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (day, event_type, severity)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS audit_employee_daily_counts (
+                    employee_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (employee_id, day, event_type, severity)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_employee_daily_counts_day ON audit_employee_daily_counts(day)")
+
+    # --- الكتابة ---
+
+    @staticmethod
+    def _row(event: Dict[str, Any]) -> Tuple:
+        employee_id = event.get('employee_id')
+        if employee_id in ('', None):
+            employee_id = None
+        else:
+            try:
+                employee_id = int(employee_id)
+            except (TypeError, ValueError):
+                employee_id = None
+        return (
+            event.get('event_id'), event['timestamp'], event.get('event_type', 'unknown'),
+            event.get('sub_type') or event.get('action'), employee_id,
+            event.get('severity', 'low'), json.dumps(event, ensure_ascii=False, default=str)
+        )
+
+    def _insert_locked(self, rows: Iterable[Tuple]) -> int:
+        inserted = 0
+        for row in rows:
+            if self._conn.execute(_INSERT_EVENT, row).rowcount:
+                inserted += 1
+                day, severity = row[1][:10], row[5] or 'low'
+                self._conn.execute(_BUMP_COUNTER, (day, row[2], severity))
+                if row[4] is not None:
+                    self._conn.execute(_BUMP_EMPLOYEE_COUNTER, (row[4], day, row[2], severity))
+        return inserted
+
+    def append(self, event: Dict[str, Any]) -> bool:
+        row = self._row(event)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = self._insert_locked([row])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.maybe_apply_retention()
+        return bool(inserted)
+
+    def append_many(self, events: Iterable[Dict[str, Any]], batch_size: int = 5000) -> int:
+        """إدخال دفعات (الاستيراد والقياس)"""
+        total = 0
+        batch: List[Tuple] = []
+        for event in events:
+            batch.append(self._row(event))
+            if len(batch) >= batch_size:
+                total += self._append_batch(batch)
+                batch = []
+        if batch:
+            total += self._append_batch(batch)
+        return total
+
+    def _append_batch(self, rows: List[Tuple]) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = self._insert_locked(rows)
+                self._conn.execute("COMMIT")
+                return inserted
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # --- القراءة ---
+
+    @staticmethod
+    def _filters(start_date: Optional[str], end_date: Optional[str], event_type: Optional[str],
+                 employee_id: Optional[int], sub_type: Optional[str] = None,
+                 severity: Optional[str] = None) -> Tuple[List[str], List[Any]]:
+        # نفس دلالة الإصدار السابق: مقارنة نصية مع timestamp (ISO)
+        clauses, params = [], []
+        if start_date:
+            clauses.append("timestamp >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("timestamp <= ?")
+            params.append(end_date)
+        if event_type:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if sub_type:
+            clauses.append("sub_type = ?")
+            params.append(sub_type)
+        if employee_id:
+            clauses.append("employee_id = ?")
+            params.append(int(employee_id))
+        if severity:
+            clauses.append("severity = ?")
+            params.append(severity)
+        return clauses, params
+
+    def query(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+              event_type: Optional[str] = None, employee_id: Optional[int] = None,
+              sub_type: Optional[str] = None, severity: Optional[str] = None,
+              limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """صفحة أحداث من الأحدث للأقدم؛ يُرجع (الأحداث، مؤشر الصفحة التالية أو None)"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = self._filters(start_date, end_date, event_type, employee_id, sub_type, severity)
+        if cursor:
+            cursor_ts, cursor_id = decode_cursor(cursor)
+            clauses.append("(timestamp, id) < (?, ?)")
+            params.extend([cursor_ts, cursor_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT id, timestamp, payload FROM audit_events {where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit + 1]).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        events = [json.loads(row[2]) for row in rows]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0]) if has_more and rows else None
+        return events, next_cursor
+
+    def iter_events(self, page_size: int = 500, **filters) -> Iterator[Dict[str, Any]]:
+        """كل الأحداث المطابقة صفحةً صفحة (للتصدير والبث)"""
+        cursor = None
+        while True:
+            events, cursor = self.query(limit=page_size, cursor=cursor, **filters)
+            yield from events
+            if not cursor:
+                return
+
+    def _range_counts(self, group_by: str, table: str, start_date: Optional[str], end_date: Optional[str],
+                      event_type: Optional[str], employee_id: Optional[int],
+                      sub_type: Optional[str] = None, severity: Optional[str] = None) -> Dict[Tuple, int]:
+        """
+        عدد الأحداث لكل مجموعة group_by: الأيام الكاملة في المدى من جدول العدادات table،
+        وأجزاء اليومين الطرفيين فقط من جدول الأحداث (بالفهرس). يُستدعى والقفل محجوز.
+        sub_type لا تفصله العدادات: يُعد كل المدى من جدول الأحداث (فهرس sub_type, timestamp)
+        """
+        counts: Dict[Tuple, int] = {}
+        if sub_type:
+            clauses, params = self._filters(start_date, end_date, event_type, employee_id, sub_type, severity)
+            return {tuple(row[:-1]): row[-1] for row in self._conn.execute(
+                f"SELECT {group_by}, COUNT(*) FROM audit_events WHERE {' AND '.join(clauses)} GROUP BY {group_by}",
+                params
+            ).fetchall()}
+
+        def add(rows):
+            for row in rows:
+                key = tuple(row[:-1])
+                counts[key] = counts.get(key, 0) + row[-1]
+
+        # الأيام الكاملة: [full_start, full_end]
+        full_start = None
+        if start_date:
+            full_start = start_date[:10] if len(start_date) <= 10 else _next_day(start_date[:10])
+        full_end = None
+        if end_date:
+            # timestamp <= '2025-01-31' لا يشمل أي حدث من يوم 31 نفسه؛ وأي وقت بعده يجعل اليوم جزئياً
+            full_end = (date.fromisoformat(end_date[:10]) - timedelta(days=1)).isoformat()
+
+        bucket_clauses, bucket_params = [], []
+        if full_start:
+            bucket_clauses.append("day >= ?")
+            bucket_params.append(full_start)
+        if full_end:
+            bucket_clauses.append("day <= ?")
+            bucket_params.append(full_end)
+        if event_type:
+            bucket_clauses.append("event_type = ?")
+            bucket_params.append(event_type)
+        if employee_id:
+            bucket_clauses.append("employee_id = ?")
+            bucket_params.append(int(employee_id))
+        if severity:
+            bucket_clauses.append("severity = ?")
+            bucket_params.append(severity)
+        bucket_where = f"WHERE {' AND '.join(bucket_clauses)}" if bucket_clauses else ""
+
+        def partial(range_start: str, range_end_exclusive: Optional[str]):
+            clauses, params = self._filters(max(range_start, start_date or ''), end_date, event_type, employee_id,
+                                            severity=severity)
+            if range_end_exclusive:
+                clauses.append("timestamp < ?")
+                params.append(range_end_exclusive)
+            return self._conn.execute(
+                f"SELECT {group_by}, COUNT(*) FROM audit_events WHERE {' AND '.join(clauses)} GROUP BY {group_by}",
+                params
+            ).fetchall()
+
+        if not (full_start and full_end and full_start > full_end):
+            add(self._conn.execute(
+                f"SELECT {group_by}, SUM(count) FROM {table} {bucket_where} GROUP BY {group_by}", bucket_params
+            ).fetchall())
+        # الجزء الطرفي الأول: [start_date, بداية اليوم التالي)
+        if start_date and len(start_date) > 10:
+            add(partial(start_date, full_start))
+        # الجزء الطرفي الأخير: [بداية يوم end_date, end_date] دون تكرار ما سبق
+        if end_date:
+            add(partial(max(end_date[:10], full_start or ''), None))
+        return counts
+
+    def summary(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                event_type: Optional[str] = None, employee_id: Optional[int] = None,
+                include_employees: bool = False, sub_type: Optional[str] = None,
+                severity: Optional[str] = None) -> Dict[str, Any]:
+        """
+        (total, by_type, by_severity) من العدادات بنفس فلاتر query(). by_employee يُحسب لملخص موظف محدد، أو عند
+        include_employees فقط: توزيع كل الموظفين على مدى واسع يمر على عدادات كل موظف في كل يوم.
+        """
+        table = 'audit_employee_daily_counts' if employee_id else 'audit_daily_counts'
+        with self._lock:
+            counts = self._range_counts("event_type, severity", table, start_date, end_date, event_type, employee_id,
+                                        sub_type, severity)
+            employee_counts = None
+            if include_employees and not employee_id:
+                employee_counts = self._range_counts("employee_id", 'audit_employee_daily_counts',
+                                                     start_date, end_date, event_type, None, sub_type, severity)
+
+        summary = {
+            'total_events': 0,
+            'by_type': {},
+            'by_severity': {'high': 0, 'medium': 0, 'low': 0},
+        }
+        for (row_type, row_severity), count in counts.items():
+            summary['total_events'] += count
+            summary['by_type'][row_type] = summary['by_type'].get(row_type, 0) + count
+            summary['by_severity'][row_severity] = summary['by_severity'].get(row_severity, 0) + count
+        if employee_id:
+            summary['by_employee'] = {int(employee_id): summary['total_events']} if summary['total_events'] else {}
+        elif employee_counts is not None:
+            summary['by_employee'] = {row_employee: count for (row_employee,), count in employee_counts.items()
+                                      if row_employee is not None and count}
+        return summary
+
+    # --- الصيانة ---
+
+    def maybe_apply_retention(self, force: bool = False) -> int:
+        now = time.time()
+        if not force and now - self._last_retention < self.retention_check_interval:
+            return 0
+        self._last_retention = now
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).date().isoformat()
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM audit_events WHERE timestamp < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM audit_daily_counts WHERE day < ?", (cutoff,))
+            self._conn.execute("DELETE FROM audit_employee_daily_counts WHERE day < ?", (cutoff,))
+        if deleted:
+            logger.info(f"🧹 تم حذف {deleted} حدث تدقيق أقدم من {cutoff}")
+        return deleted
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM audit_events").fetchone()[0]
+
+    def import_legacy_json(self, json_path: str) -> bool:
+        """نقل audit_log.json القديم مرة واحدة ثم إعادة تسميته (.migrated)"""
+        if not os.path.exists(json_path):
+            return False
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            events = (event for key in ('audit_entries', 'security_events', 'access_logs')
+                      for event in data.get(key, []) if event.get('timestamp'))
+            imported = self.append_many(events)
+            os.replace(json_path, json_path + '.migrated')
+            logger.info(f"✅ تم نقل {imported} حدث من {json_path} إلى {self.db_path}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ خطأ في نقل سجل التدقيق القديم: {e}")
+            return False
@@ -4,78 +4,57 @@
 """
 
 import hashlib
+import secrets
+import sqlite3
 import time
-import json
-import os
 from typing import Dict, List, Optional, Tuple
 import logging
-from datetime import datetime, timedelta
-import random
-import string
+
+from app.utils.security_store import AttemptStore, SessionStore, TTLSessionStore, DEFAULT_DB_PATH
 
 logger = logging.getLogger(__name__)
 
 class BiometricSecurityManager:
     """مدير الأمان البيومتري المتقدم"""
     
-    def __init__(self):
-        self.security_db_path = "biometric_security.json"
-        self.security_data = self.load_security_data()
-        
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, session_store: Optional[SessionStore] = None):
         # إعدادات الأمان
         self.max_failed_attempts = 3
         self.lockout_duration = 300  # 5 دقائق
         self.verification_timeout = 30  # 30 ثانية
+        # الجلسة تبقى في المخزن بعد انتهائها مدة إضافية ليُرجع التحقق 'Session expired' لا 'Invalid session'
+        self.expired_session_grace = 300
+        self.failed_attempt_window = 3600  # عداد المحاولات الفاشلة يُنسى بعد ساعة بلا محاولات
         
-    def load_security_data(self) -> Dict:
-        """تحميل بيانات الأمان"""
-        try:
-            if os.path.exists(self.security_db_path):
-                with open(self.security_db_path, 'r') as f:
-                    return json.load(f)
-            return {
-                'failed_attempts': {},
-                'lockouts': {},
-                'verification_sessions': {},
-                'security_events': []
-            }
-        except Exception as e:
-            logger.error(f"❌ خطأ في تحميل بيانات الأمان: {e}")
-            return {
-                'failed_attempts': {},
-                'lockouts': {},
-                'verification_sessions': {},
-                'security_events': []
-            }
-    
-    def save_security_data(self):
-        """حفظ بيانات الأمان"""
+        # التحديات في الذاكرة (عمرها 30 ثانية)، والمحاولات والحظر في SQLite
+        self.sessions = session_store or TTLSessionStore()
         try:
-            with open(self.security_db_path, 'w') as f:
-                json.dump(self.security_data, f, indent=2)
-        except Exception as e:
-            logger.error(f"❌ خطأ في حفظ بيانات الأمان: {e}")
+            self.attempts = AttemptStore(db_path)
+        except sqlite3.Error as e:
+            # نظام ملفات للقراءة فقط (serverless): الحالة في الذاكرة لهذه العملية
+            logger.warning(f"⚠️ تعذر فتح {db_path} ({e}) - استخدام قاعدة في الذاكرة")
+            self.attempts = AttemptStore(':memory:')
+        self.attempts.import_legacy_json("biometric_security.json", self.lockout_duration,
+                                         self.failed_attempt_window)
     
     def generate_verification_challenge(self, employee_id: int) -> Dict:
         """إنشاء تحدي التحقق"""
         try:
             # إنشاء تحدي عشوائي
-            challenge = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+            challenge = secrets.token_urlsafe(12)  # 16 حرفاً
             timestamp = time.time()
             
             # حفظ جلسة التحقق
             session_id = f"{employee_id}_{timestamp}"
-            self.security_data['verification_sessions'][session_id] = {
+            self.sessions.put(session_id, {
                 'employee_id': employee_id,
                 'challenge': challenge,
                 'timestamp': timestamp,
                 'expires_at': timestamp + self.verification_timeout,
                 'used': False
-            }
-            
-            self.save_security_data()
+            }, self.verification_timeout + self.expired_session_grace)
             
-            logger.info(f"✅ تم إنشاء تحدي التحقق للموظف {employee_id}")
+            logger.debug(f"✅ تم إنشاء تحدي التحقق للموظف {employee_id}")
             
             return {
                 'session_id': session_id,
@@ -91,16 +70,14 @@ class BiometricSecurityManager:
                                 device_fingerprint: str, device_token: str) -> Dict:
         """التحقق من الاستجابة البيومترية"""
         try:
-            # التحقق من صحة الجلسة
-            if session_id not in self.security_data['verification_sessions']:
+            # التحقق من صحة الجلسة (المخزن يحذفها بعد انتهائها بمدة expired_session_grace)
+            session = self.sessions.get(session_id)
+            if session is None:
                 return {'success': False, 'error': 'Invalid session'}
             
-            session = self.security_data['verification_sessions'][session_id]
-            
             # التحقق من انتهاء صلاحية الجلسة
             if time.time() > session['expires_at']:
-                del self.security_data['verification_sessions'][session_id]
-                self.save_security_data()
+                self.sessions.delete(session_id)
                 return {'success': False, 'error': 'Session expired'}
             
             # التحقق من استخدام الجلسة
@@ -118,7 +95,7 @@ class BiometricSecurityManager:
                 session['challenge'], device_fingerprint, device_token
             )
             
-            if response == expected_response:
+            if secrets.compare_digest(response, expected_response):
                 # نجح التحقق
                 session['used'] = True
                 self.clear_failed_attempts(employee_id)
@@ -164,67 +141,36 @@ class BiometricSecurityManager:
             return ""
     
     def record_failed_attempt(self, employee_id: int):
-        """تسجيل محاولة فاشلة"""
+        """تسجيل محاولة فاشلة (والحظر عند بلوغ الحد)"""
         try:
-            if str(employee_id) not in self.security_data['failed_attempts']:
-                self.security_data['failed_attempts'][str(employee_id)] = {
-                    'count': 0,
-                    'last_attempt': None
-                }
-            
-            self.security_data['failed_attempts'][str(employee_id)]['count'] += 1
-            self.security_data['failed_attempts'][str(employee_id)]['last_attempt'] = time.time()
-            
-            # التحقق من الحاجة للحظر
-            if self.security_data['failed_attempts'][str(employee_id)]['count'] >= self.max_failed_attempts:
-                self.lockout_employee(employee_id)
-            
-            self.save_security_data()
-            
+            result = self.attempts.record_failure(
+                employee_id, self.max_failed_attempts, self.lockout_duration, self.failed_attempt_window
+            )
+            if result['locked']:
+                logger.warning(f"🔒 تم حظر الموظف {employee_id} مؤقتاً")
         except Exception as e:
             logger.error(f"❌ خطأ في تسجيل المحاولة الفاشلة: {e}")
     
     def clear_failed_attempts(self, employee_id: int):
         """مسح المحاولات الفاشلة"""
         try:
-            if str(employee_id) in self.security_data['failed_attempts']:
-                del self.security_data['failed_attempts'][str(employee_id)]
-            if str(employee_id) in self.security_data['lockouts']:
-                del self.security_data['lockouts'][str(employee_id)]
-            self.save_security_data()
+            self.attempts.clear(employee_id)
         except Exception as e:
             logger.error(f"❌ خطأ في مسح المحاولات الفاشلة: {e}")
     
     def lockout_employee(self, employee_id: int):
         """حظر الموظف مؤقتاً"""
         try:
-            self.security_data['lockouts'][str(employee_id)] = {
-                'locked_at': time.time(),
-                'expires_at': time.time() + self.lockout_duration
-            }
-            self.save_security_data()
-            
+            self.attempts.lock(employee_id, self.lockout_duration)
             logger.warning(f"🔒 تم حظر الموظف {employee_id} مؤقتاً")
-            
         except Exception as e:
             logger.error(f"❌ خطأ في حظر الموظف: {e}")
     
     def is_employee_locked_out(self, employee_id: int) -> bool:
         """التحقق من حظر الموظف"""
         try:
-            if str(employee_id) not in self.security_data['lockouts']:
-                return False
-            
-            lockout = self.security_data['lockouts'][str(employee_id)]
-            
-            # التحقق من انتهاء الحظر
-            if time.time() > lockout['expires_at']:
-                del self.security_data['lockouts'][str(employee_id)]
-                self.save_security_data()
-                return False
-            
-            return True
-            
+            state = self.attempts.get(employee_id)
+            return bool(state and state['locked_until'] and state['locked_until'] > time.time())
         except Exception as e:
             logger.error(f"❌ خطأ في التحقق من الحظر: {e}")
             return False
@@ -232,52 +178,52 @@ class BiometricSecurityManager:
     def get_remaining_attempts(self, employee_id: int) -> int:
         """الحصول على المحاولات المتبقية"""
         try:
-            if str(employee_id) not in self.security_data['failed_attempts']:
-                return self.max_failed_attempts
-            
-            failed_count = self.security_data['failed_attempts'][str(employee_id)]['count']
+            state = self.attempts.get(employee_id)
+            failed_count = state['failed_count'] if state else 0
             return max(0, self.max_failed_attempts - failed_count)
-            
         except Exception as e:
             logger.error(f"❌ خطأ في الحصول على المحاولات المتبقية: {e}")
             return 0
     
     def log_security_event(self, employee_id: int, event_type: str, details: str = ""):
-        """تسجيل حدث أمني"""
+        """تسجيل حدث أمني (يُحتفظ بآخر 1000 حدث)"""
         try:
-            event = {
-                'timestamp': datetime.now().isoformat(),
-                'employee_id': employee_id,
-                'event_type': event_type,
-                'details': details,
-                'ip_address': 'unknown'  # يمكن إضافة IP لاحقاً
-            }
-            
-            self.security_data['security_events'].append(event)
-            
-            # الاحتفاظ بآخر 1000 حدث فقط
-            if len(self.security_data['security_events']) > 1000:
-                self.security_data['security_events'] = self.security_data['security_events'][-1000:]
-            
-            self.save_security_data()
-            
+            self.attempts.log_event(employee_id, event_type, details)
         except Exception as e:
             logger.error(f"❌ خطأ في تسجيل الحدث الأمني: {e}")
     
+    def get_recent_security_events(self, limit: int = 100) -> List[Dict]:
+        """آخر الأحداث الأمنية (الأحدث أولاً)"""
+        try:
+            return self.attempts.recent_events(limit)
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة الأحداث الأمنية: {e}")
+            return []
+    
+    def compact(self) -> Dict:
+        """حذف الجلسات والحظر المنتهي وتقليم الأحداث (يحدث تلقائياً كل دقيقة)"""
+        removed_sessions = self.sessions.purge_expired()
+        self.attempts.maybe_compact(force=True)
+        return {'expired_sessions_removed': removed_sessions, 'active_sessions': self.sessions.size()}
+    
     def get_security_status(self, employee_id: int) -> Dict:
         """الحصول على حالة الأمان للموظف"""
         try:
+            state = self.attempts.get(employee_id) or {}
+            locked_until = state.get('locked_until')
+            is_locked_out = bool(locked_until and locked_until > time.time())
             return {
                 'employee_id': employee_id,
-                'is_locked_out': self.is_employee_locked_out(employee_id),
-                'failed_attempts': self.security_data['failed_attempts'].get(str(employee_id), {}).get('count', 0),
-                'remaining_attempts': self.get_remaining_attempts(employee_id),
-                'last_failed_attempt': self.security_data['failed_attempts'].get(str(employee_id), {}).get('last_attempt'),
-                'lockout_expires_at': self.security_data['lockouts'].get(str(employee_id), {}).get('expires_at')
+                'is_locked_out': is_locked_out,
+                'failed_attempts': state.get('failed_count', 0),
+                'remaining_attempts': max(0, self.max_failed_attempts - state.get('failed_count', 0)),
+                'last_failed_attempt': state.get('last_attempt'),
+                'lockout_expires_at': locked_until if is_locked_out else None
             }
         except Exception as e:
             logger.error(f"❌ خطأ في الحصول على حالة الأمان: {e}")
             return {}
 
+
 # إنشاء مثيل عام
 biometric_security = BiometricSecurityManager()
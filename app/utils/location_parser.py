@@ -1,6 +1,7 @@
 # app/utils/location_parser.py
 
 import re
+from math import radians, cos, sin, asin, sqrt
 
 def extract_lat_lon_from_url(url: str):
     """
@@ -29,4 +30,20 @@ def extract_lat_lon_from_url(url: str):
         lon = float(groups[1] or groups[3])
         return lat, lon
         
-    return None
\ No newline at end of file
+    return None
+
+
+def calculate_distance(lat1, lon1, lat2, lon2):
+    """
+    تحسب المسافة بالأمتار بين نقطتين باستخدام صيغة Haversine.
+    """
+    # تحويل الدرجات إلى راديان
+    lon1, lat1, lon2, lat2 = map(radians, [float(lon1), float(lat1), float(lon2), float(lat2)])
+
+    # صيغة Haversine
+    dlon = lon2 - lon1 
+    dlat = lat2 - lat1 
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a)) 
+    r = 6371 # نصف قطر الأرض بالكيلومترات
+    return c * r * 1000 # التحويل إلى أمتار
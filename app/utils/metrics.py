@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+مقاييس الأداء بصيغة Prometheus النصية لطبقة الويب
+- مدرجات زمن الطلبات لكل مسار، وزمن مراحل تسجيل الحضور، وزمن استعلامات قاعدة البيانات بحسب التسمية
+- مقاييس تُحسب عند القراءة (عمق قائمة المزامنة وتأخرها)
+- عند التعطيل تتحول كل الاستدعاءات إلى فحص علم واحد دون أي تخزين
+"""
+
+import os
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# حدود المدرج بالثواني (من 1ms حتى 10s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INF_LABEL = 'le="+Inf"'
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Histogram:
+    """مدرج تراكمي بسيط متوافق مع Prometheus"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [عدادات الحدود..., المجموع, العدد]
+                series = [0] * len(self.buckets) + [0.0, 0]
+                self._series[label_values] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            for i, bound in enumerate(self.buckets):
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, le)} {series[i]}')
+            lines.append(f'{self.name}_bucket{_format_labels(self.label_names, labels, INF_LABEL)} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {series[-1]}')
+        return lines
+
+
+class _NullStageTimer:
+    """مؤقت مراحل لا يفعل شيئاً (عند تعطيل المقاييس)"""
+
+    def mark(self, stage: str):
+        pass
+
+
+class StageTimer:
+    """يقيس زمن كل مرحلة منذ العلامة السابقة داخل نفس الطلب"""
+
+    def __init__(self, histogram: Histogram, operation: str):
+        self._histogram = histogram
+        self._operation = operation
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self._histogram.observe((self._operation, stage), now - self._last)
+        self._last = now
+
+
+_NULL_STAGE_TIMER = _NullStageTimer()
+
+
+class MetricsRegistry:
+    """سجل المقاييس - المقاييس مستقلة لكل عملية (كل عامل gunicorn يعرض أرقامه)"""
+
+    def __init__(self, enabled: bool = False, prefix: str = 'attendance'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.request_duration = Histogram(
+            f'{prefix}_http_request_duration_seconds', 'HTTP request latency by route',
+            ('method', 'route', 'status'))
+        self.stage_duration = Histogram(
+            f'{prefix}_stage_duration_seconds', 'Per-stage latency inside an operation',
+            ('operation', 'stage'))
+        self.db_duration = Histogram(
+            f'{prefix}_db_query_duration_seconds', 'Local database call latency by statement label',
+            ('statement',))
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[Tuple[str, ...], float]], Tuple[str, ...], str]] = []
+
+    def stage_timer(self, operation: str):
+        """مؤقت مراحل للطلب الحالي - كائن فارغ عند التعطيل"""
+        if not self.enabled:
+            return _NULL_STAGE_TIMER
+        return StageTimer(self.stage_duration, operation)
+
+    def timed(self, label: Optional[str] = None):
+        """مزخرف لقياس زمن استدعاء دالة قاعدة بيانات تحت تسمية ثابتة"""
+        def decorator(func):
+            statement = label or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.db_duration.observe((statement,), time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def register_gauge(self, name: str, help_text: str, callback: Callable[[], Dict[Tuple[str, ...], float]],
+                       label_names: Sequence[str] = (), metric_type: str = 'gauge'):
+        """مقياس يُحسب عند القراءة: callback يُرجع {قيم التسميات: القيمة}"""
+        self._gauges.append((f'{self.prefix}_{name}', help_text, callback, tuple(label_names), metric_type))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in (self.request_duration, self.stage_duration, self.db_duration):
+            lines.extend(histogram.render())
+        for name, help_text, callback, label_names, metric_type in self._gauges:
+            try:
+                values = callback() or {}
+            except Exception as e:
+                logger.warning(f"⚠️ Failed في حساب المقياس {name}: {e}")
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for label_values, value in sorted(values.items()):
+                lines.append(f'{name}{_format_labels(label_names, label_values)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry(enabled=os.getenv('METRICS_ENABLED', '0') == '1')
@@ -1,6 +1,6 @@
 import sqlite3
 import os
-from app.utils.qr_manager import QRCodeManager
+from app.utils.qr_manager import get_qr_manager
 from app.database.database_manager import DatabaseManager
 
 class QRAutoGenerator:
@@ -9,7 +9,7 @@ class QRAutoGenerator:
     """
     
     def __init__(self):
-        self.qr_manager = QRCodeManager()
+        self.qr_manager = get_qr_manager()
         self.db_manager = DatabaseManager()
     
     def add_qr_column_if_not_exists(self):
@@ -47,8 +47,8 @@ class QRAutoGenerator:
             print(f"Error في Add عمود qr_code: {e}")
             return False
     
-    def generate_qr_for_all_employees(self):
-        """إنشاء رموز QR لجميع الموظفين الذين لا يملكون رموز"""
+    def generate_qr_for_all_employees(self, render_images: bool = True):
+        """إنشاء رموز QR لجميع الموظفين الذين لا يملكون رموز (ورسم صورهم في كاش الصور)"""
         try:
             # Add العمود إذا لم يكن موجوداً
             if not self.add_qr_column_if_not_exists():
@@ -64,42 +64,45 @@ class QRAutoGenerator:
             
             success_count = 0
             error_count = 0
+            updates = []
             
             for employee in employees:
                 try:
                     # التحقق من وجود رمز QR
                     if not employee.get('qr_code'):
-                        print(f"إنشاء رمز QR للموظف: {employee.get('name', 'غير معروف')}")
-                        
-                        # إنشاء رمز QR
                         qr_code = self.qr_manager.generate_qr_code(employee)
-                        
                         if not qr_code:
                             print(f"❌ Failed في إنشاء رمز QR للموظف: {employee.get('name')}")
                             error_count += 1
                             continue
-                        
-                        # Save الرمز في قاعدة البيانات مباشرة
-                        conn = sqlite3.connect("attendance.db")
-                        cursor = conn.cursor()
-                        
-                        try:
-                            cursor.execute("UPDATE employees SET qr_code = ? WHERE id = ?", (qr_code, employee['id']))
-                            conn.commit()
-                            success_count += 1
-                            print(f"✅ تم إنشاء رمز QR للموظف: {employee.get('name')}")
-                        except Exception as db_error:
-                            print(f"❌ Error في قاعدة البيانات للموظف {employee.get('name')}: {db_error}")
-                            error_count += 1
-                        finally:
-                            conn.close()
-                    else:
-                        print(f"الموظف {employee.get('name')} لديه رمز QR بالفعل")
-                        
+                        employee['qr_code'] = qr_code
+                        updates.append((qr_code, employee['id']))
                 except Exception as e:
                     error_count += 1
                     print(f"❌ Error في إنشاء رمز QR للموظف {employee.get('name')}: {e}")
             
+            # Save كل الرموز الجديدة في معاملة واحدة
+            if updates:
+                conn = sqlite3.connect("attendance.db")
+                try:
+                    conn.executemany("UPDATE employees SET qr_code = ? WHERE id = ?", updates)
+                    conn.commit()
+                    success_count = len(updates)
+                except Exception as db_error:
+                    print(f"❌ Error في قاعدة البيانات: {db_error}")
+                    error_count += len(updates)
+                finally:
+                    conn.close()
+            
+            # تجهيز الصور مسبقاً في الكاش (التصدير اللاحق ينسخ فقط)
+            if render_images:
+                from app.utils.qr_renderer import RenderSpec, get_render_engine
+                spec = RenderSpec.from_settings(self.qr_manager.settings)
+                items = [(employee['id'], employee.get('qr_code')) for employee in employees]
+                for _ in get_render_engine().render_many(items, spec):
+                    pass
+                print(f"🖼️ صور QR: {get_render_engine().last_stats}")
+            
             print(f"\n=== ملخص العملية ===")
             print(f"✅ تم إنشاء رموز QR بنجاح: {success_count}")
             print(f"❌ Failed في إنشاء رموز QR: {error_count}")
@@ -1,25 +1,87 @@
-import qrcode
 import base64
 import hashlib
+import hmac
 import secrets
+import struct
+import threading
+import time
 import json
 from datetime import datetime
-from typing import Optional, Dict, Any
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtGui import QPixmap, QFont
-from PyQt6.QtCore import Qt
+from typing import Optional, Dict, Any, Tuple, TYPE_CHECKING
 import io
 import os
 
+# PyQt6 و qrcode تُستورد عند إنشاء الصور فقط: التحقق من الرموز يعمل على الخادم بدون واجهة
+if TYPE_CHECKING:
+    from PyQt6.QtGui import QPixmap
+
+SIGNED_PREFIX = 'Q1'
+SIGNED_VERSION = 1
+MAC_LENGTH = 10  # 80 بت من HMAC-SHA256 (يكفي لرمز مطبوع مع تحديد معدل المسح)
+_PAYLOAD = struct.Struct('>BBII')  # الإصدار، معرف المفتاح، معرف الموظف، وقت الإصدار (epoch)
+TOKEN_BODY_LENGTH = (_PAYLOAD.size + MAC_LENGTH) * 8 // 5  # 20 بايت = 32 محرف base32 بدون حشو
+SETTINGS_CHECK_INTERVAL = 1.0  # أقل فترة بين فحص mtime لملفات الإعدادات والمفاتيح
+
+
 class QRCodeManager:
     """
     نظام إدارة رموز QR للموظفين
-    يقوم بإنشاء رموز QR مشفرة وفريدة لكل موظف
+    - رموز موقعة مضغوطة (Q1 + base32hex): معرف الموظف ووقت الإصدار ومعرف المفتاح موقعة بـ HMAC
+      وتُتحقق في الذاكرة بدون قاعدة البيانات؛ المفاتيح تدور (مفتاح نشط للتوقيع، والقديمة للتحقق)
+    - قراءة التنسيقات القديمة (ID:..|CODE:..|TIME:.. و EMP:..) للتوافق
+    - الإعدادات والمفاتيح تُعاد قراءتها تلقائياً عند تغير الملف (get_qr_manager مشترك للعملية)
     """
     
-    def __init__(self):
+    def __init__(self, settings_path: str = 'qr_settings.json', keys_path: Optional[str] = None):
         """تهيئة مدير رموز QR"""
-        self.settings = self.load_settings()
+        self.settings_path = settings_path
+        self.keys_path = keys_path or os.getenv('QR_KEYS_FILE', 'qr_keys.json')
+        self._overrides: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._settings_mtime = None
+        self._keys_mtime = None
+        self._next_check = 0.0
+        self._settings = self.load_settings()
+        self._keys, self._active_key_id = self._load_keys()
+    
+    @property
+    def settings(self) -> Dict[str, Any]:
+        self._maybe_reload()
+        return self._settings
+    
+    @settings.setter
+    def settings(self, value: Dict[str, Any]):
+        self._settings = value
+    
+    def _maybe_reload(self):
+        """إعادة قراءة الإعدادات والمفاتيح إذا تغير mtime (فحص واحد كل ثانية على الأكثر)"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + SETTINGS_CHECK_INTERVAL
+            if self._file_mtime(self.settings_path) != self._settings_mtime:
+                settings = self.load_settings()
+                settings.update(self._overrides)
+                self._settings = settings
+            if self._file_mtime(self.keys_path) != self._keys_mtime:
+                self._keys, self._active_key_id = self._load_keys()
+    
+    def reload(self):
+        """إعادة القراءة فوراً دون انتظار فترة الفحص"""
+        with self._lock:
+            self._settings_mtime = self._keys_mtime = None
+            self._next_check = 0.0
+        self._maybe_reload()
+    
+    @staticmethod
+    def _file_mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
     
     def load_settings(self):
         """تحميل الإعدادات من الملف"""
@@ -51,12 +113,16 @@ class QRCodeManager:
             'dpi': 300,
             'export_folder': '',
             'file_naming': 'qr_code_{employee_code}',
-            'custom_filename': ''
+            'custom_filename': '',
+            'token_format': 'signed',  # signed: رمز Q1 موقع، legacy: التنسيق النصي القديم
+            'accept_unsigned': True,  # قبول الرموز القديمة غير الموقعة عند المسح
+            'scan_debounce_seconds': 3  # تجاهل تكرار نفس الرمز أمام الكاميرا خلال هذه المدة
         }
         
+        self._settings_mtime = self._file_mtime(self.settings_path)
         try:
-            if os.path.exists('qr_settings.json'):
-                with open('qr_settings.json', 'r', encoding='utf-8') as f:
+            if self._settings_mtime is not None:
+                with open(self.settings_path, 'r', encoding='utf-8') as f:
                     loaded_settings = json.load(f)
                     # دمج الإعدادات المحملة مع الإعدادات الافتراضية
                     for key, value in loaded_settings.items():
@@ -67,9 +133,107 @@ class QRCodeManager:
         
         return default_settings
     
+    # === مفاتيح التوقيع ===
+    def _load_keys(self) -> Tuple[Dict[int, bytes], Optional[int]]:
+        """
+        المفاتيح من QR_SIGNING_KEYS ("2:secret,1:old" - الأول نشط) أو من ملف المفاتيح
+        {"active": 2, "keys": {"2": "secret", "1": "old"}}
+        """
+        self._keys_mtime = self._file_mtime(self.keys_path)
+        keys: Dict[int, bytes] = {}
+        active = None
+        env_keys = os.getenv('QR_SIGNING_KEYS', '').strip()
+        try:
+            if env_keys:
+                for item in env_keys.split(','):
+                    key_id, secret = item.strip().split(':', 1)
+                    keys[int(key_id)] = secret.encode('utf-8')
+                    if active is None:
+                        active = int(key_id)
+            elif self._keys_mtime is not None:
+                with open(self.keys_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                keys = {int(key_id): secret.encode('utf-8') for key_id, secret in data.get('keys', {}).items()}
+                active = int(data['active']) if data.get('active') is not None else None
+        except Exception as e:
+            print(f"Error في تحميل مفاتيح توقيع QR: {e}")
+        if active not in keys:
+            active = max(keys) if keys else None
+        # حالة HMAC مهيأة مسبقاً لكل مفتاح: التحقق ينسخها فقط بدل تهيئة المفتاح في كل مسح
+        self._macs = {key_id: hmac.new(secret, digestmod='sha256') for key_id, secret in keys.items()}
+        return keys, active
+    
+    def rotate_signing_key(self) -> int:
+        """
+        إنشاء مفتاح جديد وجعله نشطاً في ملف المفاتيح؛ المفاتيح السابقة تبقى للتحقق
+        (الرموز المطبوعة سابقاً تبقى صالحة حتى تُحذف مفاتيحها)
+        """
+        with self._lock:
+            keys, _ = self._load_keys()
+            key_id = (max(keys) + 1) % 256 if keys else 1
+            keys[key_id] = secrets.token_urlsafe(32).encode('utf-8')
+            data = {'active': key_id, 'keys': {str(k): v.decode('utf-8') for k, v in keys.items()}}
+            tmp_path = f"{self.keys_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.keys_path)
+            self._keys, self._active_key_id = self._load_keys()
+            return key_id
+    
+    def _signing_key(self) -> Tuple[Optional[int], Optional[bytes]]:
+        self._maybe_reload()
+        if self._active_key_id is None and not os.getenv('QR_SIGNING_KEYS'):
+            # أول تشغيل للبرنامج المكتبي: إنشاء ملف مفاتيح (يُنسخ إلى الخادم عبر QR_SIGNING_KEYS)
+            self.rotate_signing_key()
+        return self._active_key_id, self._keys.get(self._active_key_id)
+    
+    def _mac(self, key_id: int, payload: bytes) -> bytes:
+        mac = self._macs[key_id].copy()
+        mac.update(payload)
+        return mac.digest()[:MAC_LENGTH]
+    
+    def create_signed_token(self, employee_id: int, issued_at: Optional[int] = None) -> Optional[str]:
+        """رمز موقع مضغوط: Q1 + base32hex (محارف QR الأبجدية الرقمية فقط: رمز أقل كثافة)"""
+        key_id, key = self._signing_key()
+        if key is None:
+            return None
+        payload = _PAYLOAD.pack(SIGNED_VERSION, key_id, int(employee_id), int(issued_at or time.time()))
+        mac = self._mac(key_id, payload)
+        return SIGNED_PREFIX + base64.b32hexencode(payload + mac).decode('ascii')
+    
+    def verify_signed_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """التحقق من رمز Q1 في الذاكرة فقط (بدون قاعدة البيانات)"""
+        body = token[len(SIGNED_PREFIX):]
+        # base32hex بطول ثابت = عدد صحيح بالأساس 32 (فك الترميز في C بدل base64.b32decode)
+        if len(body) != TOKEN_BODY_LENGTH or not body.isalnum():
+            return None
+        try:
+            raw = int(body, 32).to_bytes(_PAYLOAD.size + MAC_LENGTH, 'big')
+        except (ValueError, OverflowError):
+            return None
+        payload, mac = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+        version, key_id, employee_id, issued_at = _PAYLOAD.unpack(payload)
+        settings = self.settings  # يفحص تغير الملفات أيضاً
+        if version != SIGNED_VERSION or key_id not in self._macs:
+            return None
+        if not hmac.compare_digest(mac, self._mac(key_id, payload)):
+            return None
+        if time.time() - issued_at > settings.get('expiry_days', 30) * 86400:
+            return None
+        return {
+            'employee_id': str(employee_id),
+            'employee_code': '',
+            'issued_at': issued_at,
+            'key_id': key_id,
+            'signed': True,
+            'is_valid': True
+        }
+    
     def update_settings(self, new_settings):
-        """Update الإعدادات"""
-        self.settings.update(new_settings)
+        """Update الإعدادات (تبقى فوق إعدادات الملف عند إعادة تحميله)"""
+        self._overrides.update(new_settings)
+        self._settings.update(new_settings)
     
     def _generate_secret_key(self) -> str:
         """إنشاء مفتاح سري عشوائي"""
@@ -120,6 +284,12 @@ class QRCodeManager:
             if not employee_name or employee_name == 'None':
                 employee_name = 'UNKNOWN'
             
+            # الرمز الموقع المضغوط (يتطلب معرفاً رقمياً)
+            if self.settings.get('token_format', 'signed') == 'signed' and employee_id.isdigit():
+                token = self.create_signed_token(int(employee_id))
+                if token:
+                    return token
+            
             # استخدام تنسيق التاريخ من الإعدادات
             date_format = self.settings.get('date_format', '%Y%m%d%H%M%S')
             timestamp = datetime.now().strftime(date_format)
@@ -181,14 +351,17 @@ class QRCodeManager:
             # إرجاع رمز QR بسيط في حالة الخطأ
             return f"EMP:ERROR:{datetime.now().strftime('%Y%m%d%H%M%S')}"
     
-    def create_qr_image(self, qr_code: str, size: int = None) -> QPixmap:
+    def create_qr_image(self, qr_code: str, size: int = None) -> 'QPixmap':
         """
         إنشاء صورة رمز QR
         :param qr_code: رمز QR
         :param size: حجم الصورة (اختياري)
         :return: صورة QPixmap
         """
+        from PyQt6.QtGui import QPixmap
+        from PyQt6.QtCore import Qt
         try:
+            import qrcode
             # استخدام الحجم من الإعدادات إذا لم يتم تحديده
             if size is None:
                 size = self.settings.get('size', 300)
@@ -255,6 +428,7 @@ class QRCodeManager:
         :return: True إذا Saved successfully
         """
         try:
+            import qrcode
             # إنشاء رمز QR مباشرة بدون QPixmap
             qr = qrcode.QRCode(
                 version=1,
@@ -313,7 +487,13 @@ class QRCodeManager:
         :return: بيانات الموظف إذا كان الرمز صحيحاً
         """
         try:
-            # التحقق من التنسيق الجديد (مفصول بـ |)
+            scanned_qr = scanned_qr.strip()
+            if scanned_qr.upper().startswith(SIGNED_PREFIX) and ':' not in scanned_qr:
+                return self.verify_signed_token(scanned_qr)
+            if not self.settings.get('accept_unsigned', True):
+                return None
+            
+            # التحقق من التنسيق النصي (مفصول بـ |)
             if '|' in scanned_qr:
                 qr_parts = scanned_qr.split('|')
                 qr_data = {}
@@ -355,6 +535,7 @@ class QRCodeManager:
                     'employee_id': employee_id,
                     'employee_code': qr_data.get('CODE', ''),
                     'timestamp': qr_data.get('TIME', ''),
+                    'signed': False,
                     'is_valid': True
                 }
             
@@ -390,6 +571,7 @@ class QRCodeManager:
                     'employee_id': employee_id,
                     'employee_code': employee_code,
                     'timestamp': timestamp,
+                    'signed': False,
                     'is_valid': True
                 }
             
@@ -408,6 +590,7 @@ class QRCodeManager:
         :return: True إذا Saved successfully
         """
         try:
+            import qrcode
             # استخدام الحجم من الإعدادات إذا لم يتم تحديده
             if size is None:
                 size = self.settings.get('size', 300)
@@ -446,3 +629,17 @@ class QRCodeManager:
         except Exception as e:
             print(f"Error saving QR image: {e}")
             return False
+
+
+_shared_manager: Optional[QRCodeManager] = None
+_shared_lock = threading.Lock()
+
+
+def get_qr_manager() -> QRCodeManager:
+    """مدير QR مشترك للعملية (الخادم وشاشة المسح) - يعيد قراءة الإعدادات عند تغير الملف"""
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_lock:
+            if _shared_manager is None:
+                _shared_manager = QRCodeManager()
+    return _shared_manager
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+محرك رسم صور QR بالجملة
+- مجموعة عمليات (ProcessPoolExecutor) تعمل على قائمة الموظفين بدلاً من خيط الواجهة
+- كاش PNG على القرص بمفتاح = SHA-256 لـ (المحتوى، الحجم، الألوان، الشعار): إعادة تصدير
+  الموظفين الذين لم يتغيروا لا ترسم شيئاً
+- الشعار يُحمَّل ويُصغَّر مرة واحدة لكل حجم في كل عملية
+- النتائج تُرجع تدريجياً مع تقدم العملية
+- الكاش محدود بالحجم والعمر: الأقدم استخداماً يُحذف بعد كل دفعة رسم
+
+لا يستورد PyQt6: العمليات الفرعية تحمّل qrcode و PIL فقط.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv('QR_CACHE_DIR', 'qr_cache')
+DEFAULT_CACHE_MAX_BYTES = int(float(os.getenv('QR_CACHE_MAX_MB', '200')) * 1024 * 1024)
+DEFAULT_CACHE_MAX_AGE_SECONDS = float(os.getenv('QR_CACHE_MAX_AGE_DAYS', '30')) * 24 * 3600
+INLINE_RENDER_LIMIT = 8  # عدد قليل من الصور يُرسم مباشرة (تشغيل العمليات أبطأ منه)
+LOGO_RATIO = 0.2  # الشعار 20% من عرض الرمز كما في QRCodeManager.add_logo_to_qr
+
+
+@dataclass(frozen=True)
+class RenderSpec:
+    """إعدادات الرسم التي تغيّر الصورة (وتدخل في مفتاح الكاش)"""
+    size: int = 300
+    error_correction: str = 'L'
+    box_size: int = 10
+    border: int = 4
+    foreground_color: str = '#000000'
+    background_color: str = '#FFFFFF'
+    logo_path: str = ''
+    logo_stamp: str = ''  # mtime وحجم ملف الشعار: تغيير الشعار يُبطل الكاش
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], size: Optional[int] = None) -> 'RenderSpec':
+        logo_path = settings.get('logo_path', '') if settings.get('add_logo') else ''
+        logo_stamp = ''
+        if logo_path:
+            try:
+                stat = os.stat(logo_path)
+                logo_stamp = f"{stat.st_mtime_ns}:{stat.st_size}"
+            except OSError:
+                logo_path = ''  # الشعار غير موجود - رمز بدون شعار كما في add_logo_to_qr
+        return cls(
+            size=int(size or settings.get('size', 300)),
+            error_correction=settings.get('error_correction', 'L'),
+            box_size=int(settings.get('box_size', 10)),
+            border=int(settings.get('border', 4)),
+            foreground_color=settings.get('foreground_color', '#000000'),
+            background_color=settings.get('background_color', '#FFFFFF'),
+            logo_path=logo_path,
+            logo_stamp=logo_stamp,
+        )
+
+    def cache_key(self, payload: str) -> str:
+        material = json.dumps([payload, asdict(self)], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class RenderResult:
+    item_id: Any
+    payload: str
+    path: Optional[str]
+    cached: bool
+    error: Optional[str] = None
+
+
+class QRImageCache:
+    """
+    PNG على القرص بمسار مشتق من مفتاح المحتوى (cache_dir/ab/abcdef...png)
+    mtime = آخر استخدام: touch() عند كل إصابة، وprune() يحذف ما تجاوز العمر ثم الأقدم حتى حد الحجم
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_CACHE_MAX_AGE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        return path if self.touch(path) else None
+
+    @staticmethod
+    def touch(path: str) -> bool:
+        """تحديث وقت الاستخدام - False إن لم يكن الملف موجوداً"""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def prune(self, keep_newer_than: Optional[float] = None) -> int:
+        """
+        حذف الصور الأقدم من max_age_seconds ثم الأقدم استخداماً حتى يصبح الحجم <= max_bytes.
+        keep_newer_than: الملفات المستخدمة بعد هذا الوقت لا تُحذف (نتائج الدفعة الحالية).
+        """
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith('.tmp'):
+                    # ملف مؤقت يتيم من رسم انقطع (الكتابة الجارية أحدث من ساعة)
+                    if now - stat.st_mtime > 3600:
+                        self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age_seconds and total <= self.max_bytes:
+                break
+            if keep_newer_than is not None and mtime >= keep_newer_than:
+                break
+            if not self._remove(path):
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"🧹 كاش صور QR: حُذف {removed} ملف (الحجم الآن {total // 1024} KB)")
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+# --- الرسم (يعمل داخل العمليات الفرعية) ---
+_logo_cache: Dict[Tuple[str, str, int], Any] = {}
+
+
+def _logo_for(spec: RenderSpec):
+    """الشعار مُصغَّر لحجم الرمز - مرة واحدة لكل (شعار، حجم) في كل عملية"""
+    key = (spec.logo_path, spec.logo_stamp, spec.size)
+    if key not in _logo_cache:
+        from PIL import Image
+        logo_size = int(spec.size * LOGO_RATIO)
+        logo = Image.open(spec.logo_path).convert('RGBA')
+        _logo_cache[key] = logo.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
+    return _logo_cache[key]
+
+
+def render_png(payload: str, spec: RenderSpec) -> bytes:
+    """رسم رمز واحد إلى PNG بنفس إعدادات QRCodeManager.create_qr_image"""
+    import io
+    import qrcode
+    from PIL import Image
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, f'ERROR_CORRECT_{spec.error_correction}'),
+        box_size=spec.box_size,
+        border=spec.border
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color=spec.foreground_color, back_color=spec.background_color).convert('RGB')
+    if img.size[0] != spec.size:
+        img = img.resize((spec.size, spec.size), Image.Resampling.NEAREST)
+    if spec.logo_path:
+        try:
+            logo = _logo_for(spec)
+            pos = ((spec.size - logo.size[0]) // 2, (spec.size - logo.size[1]) // 2)
+            img.paste(logo, pos, logo)
+        except Exception as e:
+            logger.warning(f"⚠️ تعذر إضافة الشعار: {e}")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _render_to_cache(payload: str, spec: RenderSpec, path: str) -> str:
+    """رسم وكتابة ذرية في الكاش (عمليتان ترسمان نفس المفتاح لا تكتبان ملفاً ناقصاً)"""
+    data = render_png(payload, spec)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+class QRRenderEngine:
+    """رسم صور QR لقائمة عناصر مع كاش على القرص ومجموعة عمليات"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_workers: Optional[int] = None):
+        self.cache = QRImageCache(cache_dir)
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1))
+        self.last_stats: Dict[str, Any] = {}
+
+    def render_many(self, items: Iterable[Tuple[Any, str]], spec: RenderSpec,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    cancelled: Optional[Callable[[], bool]] = None) -> Iterator[RenderResult]:
+        """
+        items: (معرف العنصر، محتوى الرمز). النتائج تُرجع فور جاهزيتها: الموجود في الكاش أولاً
+        ثم ما ترسمه العمليات بترتيب الانتهاء. progress(done, total) بعد كل نتيجة.
+        """
+        started = time.perf_counter()
+        started_at = time.time()
+        items = [(item_id, payload) for item_id, payload in items if payload]
+        total, done = len(items), 0
+        misses = []
+        for item_id, payload in items:
+            key = spec.cache_key(payload)
+            path = self.cache.get(key)
+            if path:
+                done += 1
+                yield RenderResult(item_id, payload, path, cached=True)
+                if progress:
+                    progress(done, total)
+            else:
+                misses.append((item_id, payload, self.cache.path_for(key)))
+
+        rendered = 0
+        if len(misses) <= INLINE_RENDER_LIMIT or self.max_workers == 1:
+            for item_id, payload, path in misses:
+                if cancelled and cancelled():
+                    break
+                result = self._render_inline(item_id, payload, spec, path)
+                rendered += int(result.error is None)
+                done += 1
+                yield result
+                if progress:
+                    progress(done, total)
+        else:
+            # spawn: آمن مع برنامج Qt قيد التشغيل (fork ينسخ حالة الواجهة والخيوط)
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(misses)), mp_context=context) as pool:
+                futures = {pool.submit(_render_to_cache, payload, spec, path): (item_id, payload)
+                           for item_id, payload, path in misses}
+                for future in as_completed(futures):
+                    item_id, payload = futures[future]
+                    try:
+                        result = RenderResult(item_id, payload, future.result(), cached=False)
+                    except Exception as e:
+                        # عملية فرعية تعطلت (BrokenProcessPool مثلاً): نرسم العنصر هنا بدلاً من فقده
+                        logger.warning(f"⚠️ فشل الرسم في عملية فرعية ({e}) - إعادة المحاولة محلياً")
+                        result = self._render_inline(item_id, payload, spec, self.cache.path_for(spec.cache_key(payload)))
+                    rendered += int(result.error is None)
+                    done += 1
+                    yield result
+                    if progress:
+                        progress(done, total)
+                    if cancelled and cancelled():
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+        if rendered:
+            # الدفعة الحالية محمية (المستدعي يقرأ المسارات بعد انتهاء المولد)؛ هامش لدقة mtime في نظام الملفات
+            self.cache.prune(keep_newer_than=started_at - 2)
+
+        self.last_stats = {
+            'total': total,
+            'cache_hits': total - len(misses),
+            'rendered': rendered,
+            'duration_seconds': round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"🖼️ صور QR: {total} (من الكاش {self.last_stats['cache_hits']}، رُسمت {rendered}) "
+                    f"في {self.last_stats['duration_seconds']} ث")
+
+    def render_one(self, payload: str, spec: RenderSpec) -> Optional[str]:
+        key = spec.cache_key(payload)
+        return self.cache.get(key) or self._render_inline(None, payload, spec, self.cache.path_for(key)).path
+
+    @staticmethod
+    def _render_inline(item_id, payload: str, spec: RenderSpec, path: str) -> RenderResult:
+        try:
+            return RenderResult(item_id, payload, _render_to_cache(payload, spec, path), cached=False)
+        except Exception as e:
+            return RenderResult(item_id, payload, None, cached=False, error=str(e))
+
+
+_shared_engine: Optional[QRRenderEngine] = None
+
+
+def get_render_engine() -> QRRenderEngine:
+    global _shared_engine
+    if _shared_engine is None:
+        _shared_engine = QRRenderEngine()
+    return _shared_engine
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+خط معالجة كاميرا مسح QR خارج خيط الواجهة
+- خيط التقاط يكتب في مخزن "آخر إطار" (إطار واحد فقط؛ القديم يُسقط بدلاً من التراكم)
+- فك الترميز على صورة رمادية مصغّرة، وبعد أول اكتشاف يُبحث داخل منطقة الرمز (ROI) فقط
+- تخطي فك الترميز تكيفياً عندما يتجاوز زمنه ميزانية الإطار (المعاينة تبقى سلسة)
+- نافذة تجاهل لكل محتوى: نفس الرمز يُعالج مرة واحدة كل N ثانية
+- إحصاءات: إطارات/ثانية للالتقاط والمعالجة وفك الترميز، وزمن فك الترميز (متوسط و p95)
+
+لا يستورد PyQt6: نافذة المسح تغلف QRScanPipeline في QThread.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+DECODE_MAX_WIDTH = 640      # عرض الصورة المصغّرة لفك الترميز
+ROI_MARGIN = 0.5            # توسيع منطقة الرمز بنسبة من حجمه (حركة اليد بين الإطارات)
+FRAME_BUDGET_SECONDS = 1 / 30
+MAX_DECODE_STRIDE = 6
+
+
+@dataclass
+class Detection:
+    data: str
+    polygon: List[Tuple[int, int]]  # بإحداثيات الإطار الأصلي
+
+
+def _default_decode(image) -> Sequence[Any]:
+    from pyzbar import pyzbar
+    from pyzbar.pyzbar import ZBarSymbol
+    return pyzbar.decode(image, symbols=[ZBarSymbol.QRCODE])
+
+
+class LatestFrameBuffer:
+    """مخزن بسعة إطار واحد: الكتابة تستبدل الإطار غير المقروء وتعدّه كإطار مُسقط"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._captured_at = 0.0
+        self.sequence = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._captured_at = time.perf_counter()
+            self.sequence += 1
+            self._cond.notify()
+
+    def take(self, timeout: float = 0.5) -> Optional[Tuple[Any, float]]:
+        """ينتظر إطاراً جديداً ويأخذه (frame, captured_at) أو None عند انتهاء المهلة"""
+        with self._cond:
+            if self._frame is None:
+                self._cond.wait(timeout)
+            if self._frame is None:
+                return None
+            frame, captured_at = self._frame, self._captured_at
+            self._frame = None
+            return frame, captured_at
+
+
+class CaptureThread(threading.Thread):
+    """يقرأ من الكاميرا بأسرع ما يمكن ويكتب في المخزن؛ لا يعالج شيئاً"""
+
+    def __init__(self, capture, buffer: LatestFrameBuffer, max_failures: int = 50):
+        super().__init__(name='qr-capture', daemon=True)
+        self.capture = capture
+        self.buffer = buffer
+        self.max_failures = max_failures
+        self.error: Optional[str] = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            ok, frame = self.capture.read()
+            if not ok or frame is None:
+                failures += 1
+                if failures >= self.max_failures:
+                    self.error = "Camera stopped delivering frames"
+                    logger.error(f"❌ {self.error}")
+                    break
+                time.sleep(0.01)
+                continue
+            failures = 0
+            self.buffer.put(frame)
+
+
+class QRFrameDecoder:
+    """فك ترميز على صورة رمادية مصغّرة مع تتبع منطقة آخر رمز"""
+
+    def __init__(self, decode_fn: Optional[Callable] = None, max_width: int = DECODE_MAX_WIDTH,
+                 roi_margin: float = ROI_MARGIN):
+        self.decode_fn = decode_fn or _default_decode
+        self.max_width = max_width
+        self.roi_margin = roi_margin
+        self.roi: Optional[Tuple[int, int, int, int]] = None  # (x0, y0, x1, y1) في الصورة المصغّرة
+        self.roi_hits = 0
+
+    def prepare(self, frame) -> Tuple[Any, float]:
+        """تحويل إلى رمادي ثم تصغير (التصغير بعد التحويل: قناة واحدة بدل ثلاث)"""
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        width = gray.shape[1]
+        if width <= self.max_width:
+            return gray, 1.0
+        scale = self.max_width / width
+        small = cv2.resize(gray, (self.max_width, int(round(gray.shape[0] * scale))),
+                           interpolation=cv2.INTER_AREA)
+        return small, scale
+
+    def decode(self, frame) -> List[Detection]:
+        small, scale = self.prepare(frame)
+        offset = (0, 0)
+        found = []
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            found = self.decode_fn(small[y0:y1, x0:x1])
+            if found:
+                offset = (x0, y0)
+                self.roi_hits += 1
+            else:
+                self.roi = None  # الرمز تحرك أو خرج من الصورة: بحث كامل
+        if not found:
+            found = self.decode_fn(small)
+
+        detections = []
+        points = []
+        for symbol in found:
+            polygon = [(int((p[0] + offset[0]) / scale), int((p[1] + offset[1]) / scale))
+                       for p in symbol.polygon]
+            points.extend((p[0] + offset[0], p[1] + offset[1]) for p in symbol.polygon)
+            try:
+                data = symbol.data.decode('utf-8')
+            except UnicodeDecodeError:
+                continue
+            detections.append(Detection(data, polygon))
+        if points:
+            self.roi = self._expand(points, small.shape)
+        return detections
+
+    def _expand(self, points, shape) -> Tuple[int, int, int, int]:
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        margin_x = int((max(xs) - min(xs)) * self.roi_margin) + 8
+        margin_y = int((max(ys) - min(ys)) * self.roi_margin) + 8
+        height, width = shape[:2]
+        return (max(0, min(xs) - margin_x), max(0, min(ys) - margin_y),
+                min(width, max(xs) + margin_x), min(height, max(ys) + margin_y))
+
+
+class AdaptiveSkipper:
+    """يفك الترميز كل stride إطار؛ stride ≈ زمن فك الترميز / ميزانية الإطار"""
+
+    def __init__(self, budget_seconds: float = FRAME_BUDGET_SECONDS, max_stride: int = MAX_DECODE_STRIDE):
+        self.budget = budget_seconds
+        self.max_stride = max_stride
+        self.stride = 1
+        self._latency_ema: Optional[float] = None
+        self._counter = 0
+
+    def should_decode(self) -> bool:
+        self._counter += 1
+        if self._counter >= self.stride:
+            self._counter = 0
+            return True
+        return False
+
+    def record(self, latency: float):
+        self._latency_ema = latency if self._latency_ema is None else 0.8 * self._latency_ema + 0.2 * latency
+        self.stride = max(1, min(self.max_stride, math.ceil(self._latency_ema / self.budget)))
+
+
+class Debouncer:
+    """نفس المحتوى يمر مرة واحدة خلال النافذة الزمنية"""
+
+    def __init__(self, window_seconds: float = 3.0):
+        self.window = window_seconds
+        self._seen: Dict[str, float] = {}
+
+    def accept(self, payload: str, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        last = self._seen.get(payload)
+        if last is not None and now - last < self.window:
+            return False
+        self._seen[payload] = now
+        if len(self._seen) > 256:
+            self._seen = {key: seen for key, seen in self._seen.items() if now - seen < self.window}
+        return True
+
+
+@dataclass
+class ScanStats:
+    """عدادات فترة التقرير (تُصفّر عند كل قراءة snapshot)"""
+    started: float = field(default_factory=time.perf_counter)
+    frames: int = 0
+    decoded_frames: int = 0
+    detections: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=120))
+    frame_ages: deque = field(default_factory=lambda: deque(maxlen=120))
+
+    def snapshot(self, buffer: Optional[LatestFrameBuffer] = None, stride: int = 1) -> Dict[str, Any]:
+        elapsed = max(1e-6, time.perf_counter() - self.started)
+        latencies = sorted(self.latencies)
+        result = {
+            'fps': round(self.frames / elapsed, 1),
+            'decode_fps': round(self.decoded_frames / elapsed, 1),
+            'decode_ms': round(1000 * sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            'decode_p95_ms': round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else 0.0,
+            'frame_age_ms': round(1000 * sum(self.frame_ages) / len(self.frame_ages), 1) if self.frame_ages else 0.0,
+            'stride': stride,
+            'detections': self.detections,
+        }
+        if buffer is not None:
+            result['captured'] = buffer.sequence
+            result['dropped'] = buffer.dropped
+        self.started = time.perf_counter()
+        self.frames = self.decoded_frames = self.detections = 0
+        return result
+
+
+class QRScanPipeline:
+    """
+    يربط المكونات: process_next() يأخذ أحدث إطار، يفك الترميز إن سمح المتخطي،
+    ويُرجع (frame, detections, new_payloads) أو None إن لم يصل إطار.
+    """
+
+    def __init__(self, capture, debounce_seconds: float = 3.0, decode_fn: Optional[Callable] = None,
+                 max_width: int = DECODE_MAX_WIDTH, budget_seconds: float = FRAME_BUDGET_SECONDS):
+        self.buffer = LatestFrameBuffer()
+        self.capture_thread = CaptureThread(capture, self.buffer)
+        self.decoder = QRFrameDecoder(decode_fn, max_width=max_width)
+        self.skipper = AdaptiveSkipper(budget_seconds)
+        self.debouncer = Debouncer(debounce_seconds)
+        self.stats = ScanStats()
+        self._last_detections: List[Detection] = []
+
+    def start(self):
+        self.capture_thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self.capture_thread.stop()
+        if self.capture_thread.is_alive():
+            self.capture_thread.join(timeout)
+
+    def process_next(self, timeout: float = 0.5):
+        taken = self.buffer.take(timeout)
+        if taken is None:
+            return None
+        frame, captured_at = taken
+        self.stats.frames += 1
+        self.stats.frame_ages.append(time.perf_counter() - captured_at)
+
+        new_payloads = []
+        if self.skipper.should_decode():
+            started = time.perf_counter()
+            try:
+                self._last_detections = self.decoder.decode(frame)
+            except Exception as e:
+                logger.warning(f"⚠️ خطأ في فك ترميز الإطار: {e}")
+                self._last_detections = []
+            latency = time.perf_counter() - started
+            self.skipper.record(latency)
+            self.stats.latencies.append(latency)
+            self.stats.decoded_frames += 1
+            self.stats.detections += len(self._last_detections)
+            new_payloads = [d.data for d in self._last_detections if self.debouncer.accept(d.data)]
+        # الإطارات المتخطاة تعرض آخر مضلعات معروفة
+        return frame, self._last_detections, new_payloads
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        return self.stats.snapshot(self.buffer, self.skipper.stride)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+تحديد معدل الطلبات (Token Bucket) لنقاط تسجيل الحضور والتحقق من الوجه ومسح QR
+- دلاء لكل (فئة النقطة، IP) ولكل (فئة النقطة، الموظف)
+- حالة O(1) في قاموس محدود الحجم (LRU) داخل العملية
+- واجهة Backend قابلة للاستبدال لاحقاً بمخزن مشترك (مثلاً Redis)
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RatePolicy:
+    """معدل إعادة التعبئة بالدقيقة وسعة الدلو (أقصى دفعة متتالية)"""
+    per_minute: float
+    burst: int
+
+    @property
+    def rate_per_second(self) -> float:
+        return self.per_minute / 60.0
+
+    @classmethod
+    def from_env(cls, name: str, default: 'RatePolicy') -> 'RatePolicy':
+        """قراءة سياسة من متغير بيئة بصيغة "per_minute,burst" """
+        value = os.getenv(name)
+        if not value:
+            return default
+        try:
+            per_minute, burst = value.split(',')
+            return cls(float(per_minute), int(burst))
+        except ValueError:
+            logger.warning(f"⚠️ قيمة غير صالحة لـ {name}: {value}")
+            return default
+
+
+class RateLimitBackend(ABC):
+    """واجهة مخزن الدلاء - take يُرجع (مسموح؟، ثوانٍ حتى التوفر)"""
+
+    @abstractmethod
+    def take(self, key: str, policy: RatePolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        ...
+
+    def size(self) -> int:
+        return 0
+
+
+class InMemoryBucketBackend(RateLimitBackend):
+    """دلاء في الذاكرة مع طرد الأقدم استخداماً عند تجاوز max_keys"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key: str, policy: RatePolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        rate = policy.rate_per_second
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens = float(policy.burst)
+                state = [tokens, now]
+                self._buckets[key] = state
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                tokens = min(float(policy.burst), state[0] + (now - state[1]) * rate)
+                self._buckets.move_to_end(key)
+
+            if tokens >= cost:
+                state[0], state[1] = tokens - cost, now
+                return True, 0.0
+
+            state[0], state[1] = tokens, now
+            retry_after = (cost - tokens) / rate if rate > 0 else 60.0
+            return False, retry_after
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """محدد المعدل لفئات النقاط: checkin، face (أشد لأنها مكلفة للمعالج)، qr"""
+
+    DEFAULT_POLICIES = {
+        'checkin': {'ip': RatePolicy(60, 20), 'employee': RatePolicy(6, 3)},
+        'face': {'ip': RatePolicy(10, 5), 'employee': RatePolicy(3, 2)},
+        'qr': {'ip': RatePolicy(120, 30), 'employee': RatePolicy(6, 3)},
+    }
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None, enabled: bool = True):
+        self.backend = backend or InMemoryBucketBackend()
+        self.enabled = enabled
+        self.policies: Dict[str, Dict[str, RatePolicy]] = {}
+        for endpoint_class, scopes in self.DEFAULT_POLICIES.items():
+            self.policies[endpoint_class] = {
+                scope: RatePolicy.from_env(f'RATE_LIMIT_{endpoint_class.upper()}_{scope.upper()}', policy)
+                for scope, policy in scopes.items()
+            }
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._counters_lock = threading.Lock()
+
+    def check(self, endpoint_class: str, ip: Optional[str], employee_key: Optional[str] = None,
+              include_ip: bool = True) -> Tuple[bool, float, Optional[str]]:
+        """
+        يُرجع (مسموح؟، Retry-After بالثواني، النطاق الذي رفض الطلب).
+        يُفحص دلو الـ IP أولاً ثم دلو الموظف إن وُجد معرف.
+        include_ip=False: دلو الموظف فقط (الـ IP فُحص في بداية الطلب قبل معرفة الموظف)
+        """
+        if not self.enabled or endpoint_class not in self.policies:
+            return True, 0.0, None
+
+        policies = self.policies[endpoint_class]
+        checks = [('ip', ip or 'unknown')] if include_ip else []
+        if employee_key:
+            checks.append(('employee', str(employee_key)))
+
+        for scope, value in checks:
+            allowed, retry_after = self.backend.take(f'{endpoint_class}:{scope}:{value}', policies[scope])
+            if not allowed:
+                self._count(endpoint_class, f'limited_{scope}')
+                return False, retry_after, scope
+
+        self._count(endpoint_class, 'allowed')
+        return True, 0.0, None
+
+    def _count(self, endpoint_class: str, name: str):
+        with self._counters_lock:
+            counters = self._counters.setdefault(endpoint_class, {'allowed': 0, 'limited_ip': 0, 'limited_employee': 0})
+            counters[name] += 1
+
+    def get_stats(self) -> Dict:
+        """عدادات للمراقبة"""
+        with self._counters_lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+        return {
+            'enabled': self.enabled,
+            'tracked_keys': self.backend.size(),
+            'evictions': getattr(self.backend, 'evictions', 0),
+            'endpoints': counters,
+            'policies': {
+                name: {scope: {'per_minute': p.per_minute, 'burst': p.burst} for scope, p in scopes.items()}
+                for name, scopes in self.policies.items()
+            }
+        }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+فهرس بحث نصي في الذاكرة (للموظفين وغيرهم)
+- تطبيع موحد للنص: حروف صغيرة، إزالة التشكيل والتطويل، توحيد الألف والياء والتاء المربوطة،
+  الأرقام العربية الهندية إلى لاتينية، وإزالة علامات الحروف اللاتينية (é -> e)
+- فهرس ثلاثيات حروف (trigrams) يُبنى مرة لكل إصدار من البيانات: البحث يبدأ من أندر ثلاثية
+  في الكلمة ويتحقق من المرشحين فقط، بدل المرور على كل السجلات مع كل ضغطة مفتاح
+- نفس دلالة البحث السابق (نص جزئي داخل أي حقل)؛ عدة كلمات = كل كلمة في أي حقل
+"""
+
+import unicodedata
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# الحركات وعلامات القرآن والتطويل تُحذف؛ أشكال الحروف المتقاربة توحَّد
+_ARABIC_DIACRITICS = [chr(c) for c in range(0x0610, 0x061B)] + [chr(c) for c in range(0x064B, 0x0660)] + \
+                     ['ٰ', 'ـ'] + [chr(c) for c in range(0x06D6, 0x06EE)]
+_FOLD_TABLE = {ord(ch): None for ch in _ARABIC_DIACRITICS}
+_FOLD_TABLE.update({
+    ord('أ'): 'ا', ord('إ'): 'ا', ord('آ'): 'ا', ord('ٱ'): 'ا',
+    ord('ى'): 'ي', ord('ئ'): 'ي', ord('ؤ'): 'و', ord('ة'): 'ه',
+})
+_FOLD_TABLE.update({0x0660 + d: str(d) for d in range(10)})  # ٠-٩
+_FOLD_TABLE.update({0x06F0 + d: str(d) for d in range(10)})  # ۰-۹ (فارسية)
+
+NGRAM = 3
+
+
+def normalize_text(value: Any) -> str:
+    """تطبيع نص للبحث (يُطبَّق على البيانات وعلى نص الاستعلام بنفس الطريقة)"""
+    if value is None:
+        return ''
+    text = str(value).casefold().translate(_FOLD_TABLE)
+    if not text.isascii():
+        # é -> e ...؛ الحروف العربية لا تتأثر بعد الطي أعلاه
+        decomposed = unicodedata.normalize('NFKD', text)
+        text = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return text
+
+
+class SearchIndex:
+    """
+    فهرس ثلاثيات على حقول نصية لكل صف. الصفوف تُعرَّف بموقعها (0..n-1) في البيانات المفهرسة.
+    search() يُرجع مواقع الصفوف المطابقة بترتيبها الأصلي.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._texts: List[str] = []
+        postings: Dict[str, List[int]] = {}
+        for position, fields in enumerate(rows):
+            normalized = [normalize_text(field) for field in fields]
+            # الحقول مفصولة بسطر جديد: كلمة بحث بلا مسافات لا تطابق عبر حدود حقلين
+            self._texts.append('\n'.join(normalized))
+            grams = set()
+            for field in normalized:
+                grams.update(field[i:i + NGRAM] for i in range(len(field) - NGRAM + 1))
+            for gram in grams:
+                bucket = postings.get(gram)
+                if bucket is None:
+                    postings[gram] = [position]
+                else:
+                    bucket.append(position)
+        # قوائم مضغوطة مرتبة تصاعدياً (بُنيت بترتيب الصفوف)
+        self._postings: Dict[str, array] = {gram: array('I', bucket) for gram, bucket in postings.items()}
+        self._last_query: Optional[List[str]] = None
+        self._last_result: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _candidates(self, term: str) -> Optional[Sequence[int]]:
+        """أصغر قائمة مرشحين للكلمة؛ None = لا فهرس يفيد (كلمة أقصر من ثلاثة أحرف)"""
+        if len(term) < NGRAM:
+            return None
+        best = None
+        for i in range(len(term) - NGRAM + 1):
+            bucket = self._postings.get(term[i:i + NGRAM])
+            if bucket is None:
+                return ()
+            if best is None or len(bucket) < len(best):
+                best = bucket
+        return best
+
+    def search(self, query: str) -> List[int]:
+        terms = normalize_text(query).split()
+        if not terms:
+            return list(range(len(self._texts)))
+
+        texts = self._texts
+        # الكتابة المتتابعة ("ah" ثم "ahm"): النتيجة مجموعة جزئية من السابقة
+        previous = self._last_query
+        narrowing = (previous is not None and len(terms) >= len(previous)
+                     and all(term.find(old) != -1 for term, old in zip(terms, previous)))
+
+        candidates: Optional[Sequence[int]] = self._last_result if narrowing else None
+        # أندر ثلاثية عبر كل الكلمات تحدد المرشحين
+        for term in terms:
+            term_candidates = self._candidates(term)
+            if term_candidates is not None and (candidates is None or len(term_candidates) < len(candidates)):
+                candidates = term_candidates
+        if candidates is None:
+            candidates = range(len(texts))  # كلمات قصيرة جداً فقط: النتيجة غالباً كبيرة أصلاً
+
+        if len(terms) == 1:
+            term = terms[0]
+            result = [position for position in candidates if term in texts[position]]
+        else:
+            result = [position for position in candidates
+                      if all(term in texts[position] for term in terms)]
+        self._last_query, self._last_result = terms, result
+        return result
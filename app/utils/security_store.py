@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+مخازن حالة الأمان البيومتري
+- جلسات التحقق (التحديات) في الذاكرة مع انتهاء صلاحية عبر كومة (heap): الإضافة والحذف O(log n)
+  والمنتهي يُحذف دون انتظار أن يقدمه أحد
+- المحاولات الفاشلة والحظر والأحداث الأمنية في جدول SQLite صغير بفهرس على وقت الانتهاء:
+  كل عملية تحدّث صفاً واحداً بدل إعادة كتابة ملف JSON كامل
+- ضغط دوري (حذف المنتهي وتقليم الأحداث) مرة كل compact_interval ثانية على الأكثر
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv('BIOMETRIC_SECURITY_DB', 'biometric_security.db')
+MAX_SECURITY_EVENTS = 1000
+
+
+class SessionStore(ABC):
+    """واجهة مخزن الجلسات - قابلة للاستبدال لاحقاً بمخزن مشترك (مثلاً Redis)"""
+
+    @abstractmethod
+    def put(self, key: str, value: Dict[str, Any], ttl: float):
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    def purge_expired(self) -> int:
+        return 0
+
+    def size(self) -> int:
+        return 0
+
+
+class TTLSessionStore(SessionStore):
+    """
+    قاموس + كومة (expires_at, key). الحذف من الكومة كسول: إدخال قديم لمفتاح أعيدت كتابته
+    أو حُذف يُتجاهل عند وصوله لرأس الكومة.
+    """
+
+    def __init__(self, max_sessions: int = 100_000):
+        self.max_sessions = max_sessions
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, key: str, value: Dict[str, Any], ttl: float):
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            heapq.heappush(self._heap, (expires_at, key))
+            self._purge_locked(time.time())
+            # حماية من الإغراق: طرد الأقرب انتهاءً
+            while len(self._entries) > self.max_sessions and self._heap:
+                _, oldest = heapq.heappop(self._heap)
+                if self._entries.pop(oldest, None) is not None:
+                    self.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge_locked(time.time())
+
+    def _purge_locked(self, now: float) -> int:
+        removed = 0
+        heap = self._heap
+        while heap and heap[0][0] < now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == expires_at:
+                del self._entries[key]
+                removed += 1
+        # الكومة قد تمتلئ بإدخالات قديمة لمفاتيح أعيدت كتابتها: إعادة بناء عند التضخم
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._heap = [(expires_at, key) for key, (expires_at, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+        return removed
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class AttemptStore:
+    """المحاولات الفاشلة والحظر والأحداث الأمنية في SQLite (اتصال واحد محمي بقفل)"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, compact_interval: float = 60.0):
+        self.db_path = db_path
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._last_compact = 0.0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self._lock:
+            cursor = self._conn.cursor()
+            if self.db_path != ':memory:':
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS biometric_attempts (
+                    employee_id TEXT PRIMARY KEY,
+                    failed_count INTEGER NOT NULL DEFAULT 0,
+                    last_attempt REAL,
+                    locked_at REAL,
+                    locked_until REAL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_biometric_attempts_expires ON biometric_attempts(expires_at)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS biometric_security_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    employee_id TEXT,
+                    event_type TEXT NOT NULL,
+                    details TEXT,
+                    ip_address TEXT
+                )
+            """)
+
+    def get(self, employee_id) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT failed_count, last_attempt, locked_at, locked_until, expires_at "
+                "FROM biometric_attempts WHERE employee_id = ?", (str(employee_id),)
+            ).fetchone()
+        if row is None or row['expires_at'] < time.time():
+            return None
+        return dict(row)
+
+    def record_failure(self, employee_id, max_attempts: int, lockout_duration: float,
+                       attempt_window: float) -> Dict[str, Any]:
+        """زيادة العداد والحظر عند بلوغ الحد - تحديث صف الموظف فقط"""
+        now = time.time()
+        with self._lock:
+            # صف منتهٍ يبدأ العد من جديد
+            self._conn.execute("""
+                INSERT INTO biometric_attempts (employee_id, failed_count, last_attempt, expires_at)
+                VALUES (?, 1, ?, ?)
+                ON CONFLICT(employee_id) DO UPDATE SET
+                    failed_count = CASE WHEN expires_at < excluded.last_attempt THEN 1 ELSE failed_count + 1 END,
+                    locked_at = CASE WHEN expires_at < excluded.last_attempt THEN NULL ELSE locked_at END,
+                    locked_until = CASE WHEN expires_at < excluded.last_attempt THEN NULL ELSE locked_until END,
+                    last_attempt = excluded.last_attempt,
+                    expires_at = MAX(excluded.expires_at, COALESCE(locked_until, 0))
+            """, (str(employee_id), now, now + attempt_window))
+            row = self._conn.execute(
+                "SELECT failed_count, locked_until FROM biometric_attempts WHERE employee_id = ?",
+                (str(employee_id),)
+            ).fetchone()
+            failed_count, locked_until = row[0], row[1]
+            locked = False
+            if failed_count >= max_attempts and not (locked_until and locked_until > now):
+                locked_until = now + lockout_duration
+                self._conn.execute(
+                    "UPDATE biometric_attempts SET locked_at = ?, locked_until = ?, "
+                    "expires_at = MAX(expires_at, ?) WHERE employee_id = ?",
+                    (now, locked_until, locked_until, str(employee_id))
+                )
+                locked = True
+        self.maybe_compact()
+        return {'failed_count': failed_count, 'locked_until': locked_until, 'locked': locked}
+
+    def lock(self, employee_id, lockout_duration: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO biometric_attempts (employee_id, failed_count, locked_at, locked_until, expires_at)
+                VALUES (?, 0, ?, ?, ?)
+                ON CONFLICT(employee_id) DO UPDATE SET
+                    locked_at = excluded.locked_at,
+                    locked_until = excluded.locked_until,
+                    expires_at = MAX(expires_at, excluded.expires_at)
+            """, (str(employee_id), now, now + lockout_duration, now + lockout_duration))
+
+    def clear(self, employee_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM biometric_attempts WHERE employee_id = ?", (str(employee_id),))
+
+    def log_event(self, employee_id, event_type: str, details: str = "", ip_address: str = 'unknown',
+                  timestamp: Optional[str] = None):
+        from datetime import datetime
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO biometric_security_events (timestamp, employee_id, event_type, details, ip_address) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (timestamp or datetime.now().isoformat(), None if employee_id is None else str(employee_id),
+                 event_type, details, ip_address)
+            )
+        self.maybe_compact()
+
+    def recent_events(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT timestamp, employee_id, event_type, details, ip_address "
+                "FROM biometric_security_events ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def maybe_compact(self, force: bool = False) -> bool:
+        now = time.time()
+        if not force and now - self._last_compact < self.compact_interval:
+            return False
+        self._last_compact = now
+        with self._lock:
+            self._conn.execute("DELETE FROM biometric_attempts WHERE expires_at < ?", (now,))
+            # الاحتفاظ بآخر MAX_SECURITY_EVENTS حدث فقط
+            self._conn.execute(
+                "DELETE FROM biometric_security_events WHERE id <= "
+                "(SELECT MAX(id) FROM biometric_security_events) - ?", (MAX_SECURITY_EVENTS,)
+            )
+        return True
+
+    def import_legacy_json(self, json_path: str, lockout_duration: float, attempt_window: float) -> bool:
+        """نقل biometric_security.json القديم مرة واحدة ثم إعادة تسميته (.migrated)"""
+        if not os.path.exists(json_path):
+            return False
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+            now = time.time()
+            with self._lock:
+                self._conn.execute("BEGIN")
+                for employee_id, attempts in data.get('failed_attempts', {}).items():
+                    last_attempt = attempts.get('last_attempt') or now
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO biometric_attempts (employee_id, failed_count, last_attempt, expires_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (str(employee_id), int(attempts.get('count', 0)), last_attempt, last_attempt + attempt_window)
+                    )
+                for employee_id, lockout in data.get('lockouts', {}).items():
+                    locked_until = lockout.get('expires_at', now + lockout_duration)
+                    self._conn.execute("""
+                        INSERT INTO biometric_attempts (employee_id, failed_count, locked_at, locked_until, expires_at)
+                        VALUES (?, 0, ?, ?, ?)
+                        ON CONFLICT(employee_id) DO UPDATE SET
+                            locked_at = excluded.locked_at, locked_until = excluded.locked_until,
+                            expires_at = MAX(expires_at, excluded.expires_at)
+                    """, (str(employee_id), lockout.get('locked_at'), locked_until, locked_until))
+                for event in data.get('security_events', [])[-MAX_SECURITY_EVENTS:]:
+                    self._conn.execute(
+                        "INSERT INTO biometric_security_events (timestamp, employee_id, event_type, details, ip_address) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (event.get('timestamp', ''), str(event.get('employee_id')), event.get('event_type', ''),
+                         event.get('details', ''), event.get('ip_address', 'unknown'))
+                    )
+                self._conn.execute("COMMIT")
+            os.replace(json_path, json_path + '.migrated')
+            logger.info(f"✅ تم نقل {json_path} إلى {self.db_path}")
+            return True
+        except Exception as e:
+            try:
+                self._conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            logger.error(f"❌ خطأ في نقل بيانات الأمان القديمة: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,23 +1,159 @@
 #!/usr/bin/env python3
 """
 نظام القيود الزمنية المتقدم للأمان
+- القيود العامة وقيود الأقسام والموظفين تُترجم مرة واحدة إلى مصفوفات فترات مرتبة لكل يوم من الأسبوع
+  (بالميكروثانية من بداية اليوم) ويُبحث فيها بـ bisect: كل تحقق من تسجيل حضور زمنه ثابت
+- الإجازات من جدول holidays كمجموعة تواريخ؛ تُعاد قراءتها عند تغير holidays_generation في مدير
+  قاعدة البيانات (أو كل HOLIDAY_REFRESH_SECONDS لالتقاط تغييرات العمليات الأخرى)
+- إعادة الترجمة فقط عند set_employee_restrictions / set_department_restrictions / update_global_restrictions
+- evaluate_day: تقييم كل بصمات يوم كامل دفعة واحدة للتقارير
 """
 
 import json
 import os
-from datetime import datetime, time as dt_time, timedelta
-from typing import Dict, List, Optional
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+HOLIDAY_REFRESH_SECONDS = float(os.getenv('HOLIDAY_REFRESH_SECONDS', '600'))
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+ALL_DAYS = (0, 1, 2, 3, 4, 5, 6)
+
+
+def _to_us(value: str) -> int:
+    """'HH:MM' أو 'HH:MM:SS' إلى ميكروثانية من بداية اليوم"""
+    parsed = dt_time.fromisoformat(value)
+    return ((parsed.hour * 60 + parsed.minute) * 60 + parsed.second) * 1_000_000 + parsed.microsecond
+
+
+def _time_us(moment) -> int:
+    return ((moment.hour * 60 + moment.minute) * 60 + moment.second) * 1_000_000 + moment.microsecond
+
+
+def _parse_clock_us(value: str) -> int:
+    """قراءة سريعة لـ check_time من سجلات الحضور ('HH:MM:SS')"""
+    if len(value) == 8 and value[2] == ':' and value[5] == ':':
+        return ((int(value[0:2]) * 60 + int(value[3:5])) * 60 + int(value[6:8])) * 1_000_000
+    return _to_us(value)
+
+
+@dataclass(frozen=True)
+class CompiledWindow:
+    """
+    نافذة عمل [start, end] (مغلقة كما في الإصدار السابق) مع فترات راحة مدموجة ومرتبة.
+    evaluate يُرجع None عند السماح أو (نوع القيد، الرسالة).
+    """
+    start: int
+    end: int
+    hours_message: str
+    hours_type: str
+    break_starts: Tuple[int, ...] = ()
+    break_ends: Tuple[int, ...] = ()
+    break_messages: Tuple[str, ...] = ()
+
+    def evaluate(self, us: int) -> Optional[Tuple[str, str]]:
+        if us < self.start or us > self.end:
+            return self.hours_type, self.hours_message
+        if self.break_starts:
+            index = bisect_right(self.break_starts, us) - 1
+            if index >= 0 and us <= self.break_ends[index]:
+                return 'break_time', self.break_messages[index]
+        return None
+
+
+def _compile_window(work_hours: Optional[Dict], breaks: Sequence[Dict], message_prefix: str,
+                    hours_type: str) -> CompiledWindow:
+    work_hours = work_hours or {}
+    start_text, end_text = work_hours.get('start', '08:00'), work_hours.get('end', '17:00')
+    start_label, end_label = dt_time.fromisoformat(start_text), dt_time.fromisoformat(end_text)
+
+    # دمج فترات الراحة المتداخلة (الوصف للأولى) حتى يكفي bisect واحد
+    merged: List[List[Any]] = []
+    for item in sorted(breaks or [], key=lambda b: _to_us(b['start'])):
+        b_start, b_end = _to_us(item['start']), _to_us(item['end'])
+        message = f'Check-in not allowed during {item.get("description", "break time")}'
+        if merged and b_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], b_end)
+        else:
+            merged.append([b_start, b_end, message])
+
+    return CompiledWindow(
+        start=_to_us(start_text),
+        end=_to_us(end_text),
+        hours_message=f'{message_prefix} only allowed between {start_label} and {end_label}',
+        hours_type=hours_type,
+        break_starts=tuple(m[0] for m in merged),
+        break_ends=tuple(m[1] for m in merged),
+        break_messages=tuple(m[2] for m in merged),
+    )
+
+
+@dataclass(frozen=True)
+class CompiledScope:
+    """
+    قيود نطاق واحد (عام/قسم/موظف): days[weekday] هي النافذة، أو None (اليوم غير مسموح)،
+    أو True (اليوم مسموح بلا قيد ساعات).
+    """
+    name: str
+    disabled: Optional[Tuple[str, str]] = None
+    days: Tuple[Any, ...] = (True,) * 7
+    day_type: str = 'day_of_week'
+
+    def evaluate(self, weekday: int, us: int) -> Optional[Tuple[str, str]]:
+        if self.disabled is not None:
+            return self.disabled
+        window = self.days[weekday]
+        if window is None:
+            return self.day_type, f'Check-in not allowed on {DAY_NAMES[weekday]}'
+        if window is True:
+            return None
+        return window.evaluate(us)
+
+
+def _compile_scope(name: str, restrictions: Dict, message_prefix: str, hours_type: str,
+                   disabled_message: str, disabled_type: str, default_days: Sequence[int] = ALL_DAYS,
+                   with_breaks: bool = False, day_type: str = 'day_of_week') -> CompiledScope:
+    if restrictions.get('disabled', False):
+        return CompiledScope(name, disabled=(disabled_type, disabled_message))
+    work_hours = restrictions.get('work_hours')
+    breaks = restrictions.get('break_times', []) if with_breaks else []
+    window: Any = True
+    if work_hours or breaks:
+        window = _compile_window(work_hours, breaks, message_prefix, hours_type)
+    allowed = set(restrictions.get('allowed_days', default_days))
+    return CompiledScope(name, days=tuple(window if day in allowed else None for day in range(7)),
+                         day_type=day_type)
+
+
+_UNRESTRICTED = CompiledScope('none')
+_ALLOWED_RESULT = {
+    'allowed': True,
+    'message': 'Check-in allowed',
+    'restrictions_checked': ['global', 'employee', 'department', 'holiday']
+}
+
+
 class TimeRestrictionsManager:
     """مدير القيود الزمنية المتقدم"""
-    
+
     def __init__(self):
         self.restrictions_db_path = "time_restrictions.json"
         self.restrictions_data = self.load_restrictions_data()
-        
+
+        # مصدر الإجازات: مدير قاعدة البيانات (attach_database) أو مجموعة تواريخ ثابتة
+        self._db = None
+        self._holidays: frozenset = frozenset()
+        self._holidays_generation = None
+        self._holidays_loaded_at = 0.0
+        self._compile_lock = threading.Lock()
+        self.compile_all()
+
     def load_restrictions_data(self) -> Dict:
         """تحميل بيانات القيود الزمنية"""
         try:
@@ -49,7 +185,7 @@ class TimeRestrictionsManager:
         except Exception as e:
             logger.error(f"❌ خطأ في تحميل القيود الزمنية: {e}")
             return {}
-    
+
     def save_restrictions_data(self):
         """حفظ بيانات القيود الزمنية"""
         try:
@@ -57,39 +193,138 @@ class TimeRestrictionsManager:
                 json.dump(self.restrictions_data, f, indent=2)
         except Exception as e:
             logger.error(f"❌ خطأ في حفظ القيود الزمنية: {e}")
-    
-    def is_checkin_allowed(self, employee_id: int, check_time: datetime = None) -> Dict:
-        """التحقق من السماح بتسجيل الحضور"""
+
+    # --- الترجمة ---
+
+    def compile_all(self):
+        """ترجمة كل القيود (عند التحميل أو بعد تعديل restrictions_data مباشرة)"""
+        with self._compile_lock:
+            try:
+                self._global = self._compile_global()
+                self._employees = {key: self._compile_employee(value)
+                                   for key, value in self.restrictions_data.get('employee_restrictions', {}).items()}
+                self._departments = {key: self._compile_department(key, value)
+                                     for key, value in self.restrictions_data.get('department_restrictions', {}).items()}
+            except Exception as e:
+                # إعدادات غير صالحة: الرفض كما كان التحقق السابق يفعل عند الخطأ
+                logger.error(f"❌ خطأ في ترجمة القيود الزمنية: {e}")
+                self._global = CompiledScope('global', disabled=('invalid_configuration',
+                                                                 'Unable to verify time restrictions'))
+                self._employees, self._departments = {}, {}
+            self._compile_holiday_policy()
+
+    def _compile_global(self) -> CompiledScope:
+        global_restrictions = self.restrictions_data.get('global_restrictions', {})
+        if not global_restrictions.get('enabled', True):
+            return _UNRESTRICTED
+        restrictions = dict(global_restrictions)
+        restrictions.setdefault('work_hours', {})
+        return _compile_scope('global', restrictions, 'Check-in', 'work_hours',
+                              'Check-in is disabled', 'global_disabled',
+                              default_days=(0, 1, 2, 3, 4), with_breaks=True)
+
+    def _compile_employee(self, restrictions: Dict) -> CompiledScope:
+        if not restrictions:
+            return _UNRESTRICTED
+        return _compile_scope('employee', restrictions, 'Employee check-in', 'employee_work_hours',
+                              'Employee check-in is disabled', 'employee_disabled',
+                              with_breaks=True, day_type='employee_day_of_week')
+
+    def _compile_department(self, department: str, restrictions: Dict) -> CompiledScope:
+        if not restrictions:
+            return _UNRESTRICTED
+        return _compile_scope('department', restrictions, f'{department} department check-in',
+                              'department_work_hours', f'Check-in disabled for {department} department',
+                              'department_disabled', with_breaks=True, day_type='department_day_of_week')
+
+    def _compile_holiday_policy(self):
+        holiday_restrictions = self.restrictions_data.get('holiday_restrictions', {})
+        self._holiday_enabled = holiday_restrictions.get('enabled', True)
+        if holiday_restrictions.get('allow_emergency_checkin', False):
+            self._holiday_result = {
+                'allowed': True,
+                'message': 'Emergency check-in allowed on holiday',
+                'restriction_type': 'emergency_holiday'
+            }
+        else:
+            self._holiday_result = {
+                'allowed': False,
+                'message': 'Check-in not allowed on holidays',
+                'restriction_type': 'holiday'
+            }
+
+    # --- الإجازات ---
+
+    def attach_database(self, db_manager):
+        """ربط مدير قاعدة البيانات كمصدر للإجازات (get_all_holidays + holidays_generation)"""
+        self._db = db_manager
+        self._holidays_generation = None
+
+    def set_holidays(self, dates: Iterable[Any]):
+        """تعيين الإجازات مباشرة (تواريخ أو نصوص YYYY-MM-DD)"""
+        self._holidays = frozenset(self._parse_date(value) for value in dates if value)
+        self._holidays_loaded_at = time.monotonic()
+
+    def invalidate_holidays(self):
+        self._holidays_generation = None
+
+    def _refresh_holidays(self):
+        db = self._db
+        if db is None:
+            return
+        generation = getattr(db, 'holidays_generation', 0)
+        if (generation == self._holidays_generation
+                and time.monotonic() - self._holidays_loaded_at < HOLIDAY_REFRESH_SECONDS):
+            return
+        try:
+            rows = db.get_all_holidays() or []
+            self.set_holidays(row.get('date') if isinstance(row, dict) else row['date'] for row in rows)
+            self._holidays_generation = generation
+            logger.debug(f"📅 تم تحميل {len(self._holidays)} إجازة للقيود الزمنية")
+        except Exception as e:
+            # الإبقاء على المجموعة السابقة؛ المحاولة مجدداً بعد مدة التحديث
+            self._holidays_loaded_at = time.monotonic()
+            logger.warning(f"⚠️ تعذر تحميل الإجازات: {e}")
+
+    @staticmethod
+    def _parse_date(value) -> date:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+
+    def is_holiday(self, day: date) -> bool:
+        self._refresh_holidays()
+        return day in self._holidays
+
+    # --- التقييم ---
+
+    def _evaluate(self, employee_id, department: Optional[str], weekday: int, us: int,
+                  holiday: bool) -> Dict:
+        violation = self._global.evaluate(weekday, us)
+        if violation is None:
+            violation = self._employees.get(str(employee_id), _UNRESTRICTED).evaluate(weekday, us)
+        if violation is None:
+            violation = self._departments.get(department or 'default', _UNRESTRICTED).evaluate(weekday, us)
+        if violation is not None:
+            return {'allowed': False, 'message': violation[1], 'restriction_type': violation[0]}
+        if holiday and self._holiday_enabled:
+            if not self._holiday_result['allowed']:
+                return self._holiday_result
+        return _ALLOWED_RESULT
+
+    def is_checkin_allowed(self, employee_id: int, check_time: datetime = None,
+                           department: Optional[str] = None) -> Dict:
+        """التحقق من السماح بتسجيل الحضور (department: قسم الموظف إن كان معروفاً لدى المستدعي)"""
         try:
             if check_time is None:
                 check_time = datetime.now()
-            
-            # التحقق من القيود العامة
-            global_check = self.check_global_restrictions(check_time)
-            if not global_check['allowed']:
-                return global_check
-            
-            # التحقق من قيود الموظف
-            employee_check = self.check_employee_restrictions(employee_id, check_time)
-            if not employee_check['allowed']:
-                return employee_check
-            
-            # التحقق من قيود القسم
-            department_check = self.check_department_restrictions(employee_id, check_time)
-            if not department_check['allowed']:
-                return department_check
-            
-            # التحقق من الإجازات
-            holiday_check = self.check_holiday_restrictions(check_time)
-            if not holiday_check['allowed']:
-                return holiday_check
-            
-            return {
-                'allowed': True,
-                'message': 'Check-in allowed',
-                'restrictions_checked': ['global', 'employee', 'department', 'holiday']
-            }
-            
+
+            holiday = self.is_holiday(check_time.date()) if self._holiday_enabled else False
+            return dict(self._evaluate(employee_id, department, check_time.weekday(),
+                                       _time_us(check_time), holiday))
+
         except Exception as e:
             logger.error(f"❌ خطأ في التحقق من القيود الزمنية: {e}")
             return {
@@ -97,172 +332,110 @@ class TimeRestrictionsManager:
                 'error': 'Time restriction check failed',
                 'message': 'Unable to verify time restrictions'
             }
-    
+
+    def evaluate_day(self, day, punches: Iterable[Dict], departments: Optional[Dict[Any, str]] = None) -> Dict:
+        """
+        تقييم بصمات يوم كامل للتقارير: الإجازة واليوم يُحسبان مرة واحدة.
+        punches: سجلات حضور فيها employee_id و check_time ('HH:MM:SS')؛
+        departments: {employee_id: department} اختياري.
+        """
+        day = self._parse_date(day)
+        weekday = day.weekday()
+        holiday = self.is_holiday(day) if self._holiday_enabled else False
+        departments = departments or {}
+
+        results = []
+        violations = 0
+        for punch in punches:
+            employee_id = punch.get('employee_id')
+            try:
+                us = _parse_clock_us(str(punch.get('check_time', '')))
+                result = self._evaluate(employee_id, departments.get(employee_id), weekday, us, holiday)
+            except ValueError:
+                result = {'allowed': False, 'message': 'Invalid check time', 'restriction_type': 'invalid_time'}
+            if not result['allowed']:
+                violations += 1
+            results.append({**result, 'employee_id': employee_id, 'check_time': punch.get('check_time')})
+
+        return {
+            'date': day.isoformat(),
+            'is_holiday': holiday,
+            'total': len(results),
+            'violations': violations,
+            'results': results
+        }
+
     def check_global_restrictions(self, check_time: datetime) -> Dict:
         """التحقق من القيود العامة"""
-        try:
-            global_restrictions = self.restrictions_data.get('global_restrictions', {})
-            
-            if not global_restrictions.get('enabled', True):
-                return {'allowed': True, 'message': 'Global restrictions disabled'}
-            
-            # التحقق من أيام العمل
-            weekday = check_time.weekday()
-            allowed_days = global_restrictions.get('allowed_days', [0, 1, 2, 3, 4])
-            
-            if weekday not in allowed_days:
-                return {
-                    'allowed': False,
-                    'message': f'Check-in not allowed on {check_time.strftime("%A")}',
-                    'restriction_type': 'day_of_week'
-                }
-            
-            # التحقق من ساعات العمل
-            work_hours = global_restrictions.get('work_hours', {})
-            start_time = dt_time.fromisoformat(work_hours.get('start', '08:00'))
-            end_time = dt_time.fromisoformat(work_hours.get('end', '17:00'))
-            current_time = check_time.time()
-            
-            if not (start_time <= current_time <= end_time):
-                return {
-                    'allowed': False,
-                    'message': f'Check-in only allowed between {start_time} and {end_time}',
-                    'restriction_type': 'work_hours'
-                }
-            
-            # التحقق من أوقات الراحة
-            break_times = global_restrictions.get('break_times', [])
-            for break_time in break_times:
-                break_start = dt_time.fromisoformat(break_time['start'])
-                break_end = dt_time.fromisoformat(break_time['end'])
-                
-                if break_start <= current_time <= break_end:
-                    return {
-                        'allowed': False,
-                        'message': f'Check-in not allowed during {break_time.get("description", "break time")}',
-                        'restriction_type': 'break_time'
-                    }
-            
-            return {'allowed': True, 'message': 'Global restrictions passed'}
-            
-        except Exception as e:
-            logger.error(f"❌ خطأ في التحقق من القيود العامة: {e}")
-            return {'allowed': False, 'error': 'Global restriction check failed'}
-    
+        violation = self._global.evaluate(check_time.weekday(), _time_us(check_time))
+        if violation is not None:
+            return {'allowed': False, 'message': violation[1], 'restriction_type': violation[0]}
+        return {'allowed': True, 'message': 'Global restrictions passed'}
+
     def check_employee_restrictions(self, employee_id: int, check_time: datetime) -> Dict:
         """التحقق من قيود الموظف"""
-        try:
-            employee_restrictions = self.restrictions_data.get('employee_restrictions', {}).get(str(employee_id), {})
-            
-            if not employee_restrictions:
-                return {'allowed': True, 'message': 'No employee-specific restrictions'}
-            
-            # التحقق من القيود المخصصة للموظف
-            if employee_restrictions.get('disabled', False):
-                return {
-                    'allowed': False,
-                    'message': 'Employee check-in is disabled',
-                    'restriction_type': 'employee_disabled'
-                }
-            
-            # التحقق من ساعات العمل المخصصة
-            custom_hours = employee_restrictions.get('work_hours')
-            if custom_hours:
-                start_time = dt_time.fromisoformat(custom_hours.get('start', '08:00'))
-                end_time = dt_time.fromisoformat(custom_hours.get('end', '17:00'))
-                current_time = check_time.time()
-                
-                if not (start_time <= current_time <= end_time):
-                    return {
-                        'allowed': False,
-                        'message': f'Employee check-in only allowed between {start_time} and {end_time}',
-                        'restriction_type': 'employee_work_hours'
-                    }
-            
-            return {'allowed': True, 'message': 'Employee restrictions passed'}
-            
-        except Exception as e:
-            logger.error(f"❌ خطأ في التحقق من قيود الموظف: {e}")
-            return {'allowed': False, 'error': 'Employee restriction check failed'}
-    
-    def check_department_restrictions(self, employee_id: int, check_time: datetime) -> Dict:
+        scope = self._employees.get(str(employee_id), _UNRESTRICTED)
+        if scope is _UNRESTRICTED:
+            return {'allowed': True, 'message': 'No employee-specific restrictions'}
+        violation = scope.evaluate(check_time.weekday(), _time_us(check_time))
+        if violation is not None:
+            return {'allowed': False, 'message': violation[1], 'restriction_type': violation[0]}
+        return {'allowed': True, 'message': 'Employee restrictions passed'}
+
+    def check_department_restrictions(self, employee_id: int, check_time: datetime,
+                                      department: Optional[str] = None) -> Dict:
         """التحقق من قيود القسم"""
-        try:
-            # الحصول على قسم الموظف (يجب تنفيذ هذا من قاعدة البيانات)
-            # department = get_employee_department(employee_id)
-            
-            # للآن، سنستخدم قسم افتراضي
-            department = 'default'
-            
-            department_restrictions = self.restrictions_data.get('department_restrictions', {}).get(department, {})
-            
-            if not department_restrictions:
-                return {'allowed': True, 'message': 'No department-specific restrictions'}
-            
-            # التحقق من قيود القسم
-            if department_restrictions.get('disabled', False):
-                return {
-                    'allowed': False,
-                    'message': f'Check-in disabled for {department} department',
-                    'restriction_type': 'department_disabled'
-                }
-            
-            return {'allowed': True, 'message': 'Department restrictions passed'}
-            
-        except Exception as e:
-            logger.error(f"❌ خطأ في التحقق من قيود القسم: {e}")
-            return {'allowed': False, 'error': 'Department restriction check failed'}
-    
+        scope = self._departments.get(department or 'default', _UNRESTRICTED)
+        if scope is _UNRESTRICTED:
+            return {'allowed': True, 'message': 'No department-specific restrictions'}
+        violation = scope.evaluate(check_time.weekday(), _time_us(check_time))
+        if violation is not None:
+            return {'allowed': False, 'message': violation[1], 'restriction_type': violation[0]}
+        return {'allowed': True, 'message': 'Department restrictions passed'}
+
     def check_holiday_restrictions(self, check_time: datetime) -> Dict:
         """التحقق من قيود الإجازات"""
-        try:
-            holiday_restrictions = self.restrictions_data.get('holiday_restrictions', {})
-            
-            if not holiday_restrictions.get('enabled', True):
-                return {'allowed': True, 'message': 'Holiday restrictions disabled'}
-            
-            # التحقق من الإجازات (يجب تنفيذ هذا من قاعدة البيانات)
-            # is_holiday = is_date_holiday(check_time.date())
-            
-            # للآن، سنعتبر أن كل التواريخ عادية
-            is_holiday = False
-            
-            if is_holiday:
-                if not holiday_restrictions.get('allow_emergency_checkin', False):
-                    return {
-                        'allowed': False,
-                        'message': 'Check-in not allowed on holidays',
-                        'restriction_type': 'holiday'
-                    }
-                else:
-                    return {
-                        'allowed': True,
-                        'message': 'Emergency check-in allowed on holiday',
-                        'restriction_type': 'emergency_holiday'
-                    }
-            
-            return {'allowed': True, 'message': 'Holiday restrictions passed'}
-            
-        except Exception as e:
-            logger.error(f"❌ خطأ في التحقق من قيود الإجازات: {e}")
-            return {'allowed': False, 'error': 'Holiday restriction check failed'}
-    
+        if not self._holiday_enabled:
+            return {'allowed': True, 'message': 'Holiday restrictions disabled'}
+        if self.is_holiday(check_time.date()):
+            return dict(self._holiday_result)
+        return {'allowed': True, 'message': 'Holiday restrictions passed'}
+
+    # --- التعديل (إعادة ترجمة الجزء المتغير فقط) ---
+
     def set_employee_restrictions(self, employee_id: int, restrictions: Dict) -> bool:
         """تعيين قيود للموظف"""
         try:
+            compiled = self._compile_employee(restrictions)
             if 'employee_restrictions' not in self.restrictions_data:
                 self.restrictions_data['employee_restrictions'] = {}
-            
+
             self.restrictions_data['employee_restrictions'][str(employee_id)] = restrictions
+            self._employees[str(employee_id)] = compiled
             self.save_restrictions_data()
-            
+
             logger.info(f"✅ تم تعيين قيود للموظف {employee_id}")
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ خطأ في تعيين قيود الموظف: {e}")
             return False
-    
+
+    def set_department_restrictions(self, department: str, restrictions: Dict) -> bool:
+        """تعيين قيود لقسم (disabled / work_hours / allowed_days / break_times)"""
+        try:
+            compiled = self._compile_department(department, restrictions)
+            self.restrictions_data.setdefault('department_restrictions', {})[department] = restrictions
+            self._departments[department] = compiled
+            self.save_restrictions_data()
+
+            logger.info(f"✅ تم تعيين قيود للقسم {department}")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ خطأ في تعيين قيود القسم: {e}")
+            return False
+
     def get_employee_restrictions(self, employee_id: int) -> Dict:
         """الحصول على قيود الموظف"""
         try:
@@ -270,19 +443,31 @@ class TimeRestrictionsManager:
         except Exception as e:
             logger.error(f"❌ خطأ في الحصول على قيود الموظف: {e}")
             return {}
-    
+
     def update_global_restrictions(self, restrictions: Dict) -> bool:
         """تحديث القيود العامة"""
         try:
             self.restrictions_data['global_restrictions'].update(restrictions)
+            self._global = self._compile_global()
             self.save_restrictions_data()
-            
+
             logger.info("✅ تم تحديث القيود العامة")
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ خطأ في تحديث القيود العامة: {e}")
             return False
 
+    def update_holiday_restrictions(self, restrictions: Dict) -> bool:
+        """تحديث سياسة الإجازات (enabled / allow_emergency_checkin)"""
+        try:
+            self.restrictions_data.setdefault('holiday_restrictions', {}).update(restrictions)
+            self._compile_holiday_policy()
+            self.save_restrictions_data()
+            return True
+        except Exception as e:
+            logger.error(f"❌ خطأ في تحديث سياسة الإجازات: {e}")
+            return False
+
 # إنشاء مثيل عام
 time_restrictions = TimeRestrictionsManager()
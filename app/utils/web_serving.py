@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+أدوات تشغيل خادم الويب في وضع الإنتاج (gunicorn)
+- كاش قراءة بمدة صلاحية للبيانات شبه الثابتة (المواقع، الإعدادات)
+- ميزانية اتصالات قاعدة البيانات لكل عامل
+- استيراد مؤجل للوحدات الاختيارية الثقيلة (LazyFeature)
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReadCache:
+    """كاش قراءة بسيط بمدة صلاحية (TTL) - ttl_seconds=0 يعطّل الكاش"""
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """إرجاع القيمة من الكاش أو تحميلها عبر loader عند انتهاء صلاحيتها"""
+        if self.ttl_seconds <= 0:
+            return loader()
+
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.ttl_seconds:
+            return entry[1]
+
+        value = loader()
+        with self._lock:
+            self._entries[key] = (now, value)
+        return value
+
+    def invalidate(self, key: Optional[str] = None):
+        """إبطال مفتاح واحد أو الكاش بالكامل"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def warm(self, loaders: Dict[str, Callable[[], Any]]):
+        """تحميل مسبق للكاش (يُستدعى في العملية الأم قبل fork)"""
+        now = time.monotonic()
+        for key, loader in loaders.items():
+            try:
+                value = loader()
+                with self._lock:
+                    self._entries[key] = (now, value)
+                logger.info(f"🔥 تم تحميل '{key}' مسبقاً في الكاش")
+            except Exception as e:
+                logger.warning(f"⚠️ Failed في التحميل المسبق لـ '{key}': {e}")
+
+
+class ConnectionBudget:
+    """حد أقصى لعدد الطلبات المتزامنة التي تفتح اتصالات قاعدة البيانات داخل العامل - 0 يعطّل الحد"""
+
+    def __init__(self, max_connections: int = 0, acquire_timeout: float = 2.0):
+        self.max_connections = max_connections
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = threading.BoundedSemaphore(max_connections) if max_connections > 0 else None
+        self._in_use = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._semaphore is not None
+
+    def acquire(self) -> bool:
+        if self._semaphore is None:
+            return True
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._rejected += 1
+            return False
+        with self._lock:
+            self._in_use += 1
+        return True
+
+    def release(self):
+        if self._semaphore is None:
+            return
+        with self._lock:
+            self._in_use -= 1
+        self._semaphore.release()
+
+    def get_status(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'max_connections': self.max_connections,
+            'in_use': self._in_use,
+            'rejected': self._rejected
+        }
+
+
+class LazyFeature:
+    """
+    وكيل لكائن عام في وحدة اختيارية يستوردها عند أول استخدام فقط.
+    يقلل زمن البدء البارد (مثلاً face_recognition يحمّل dlib/cv2 عند الاستيراد).
+    """
+
+    def __init__(self, module_name: str, attr_name: str, unavailable_message: str = '',
+                 on_load: Optional[Callable[[Any], None]] = None):
+        self._module_name = module_name
+        self._attr_name = attr_name
+        self._unavailable_message = unavailable_message
+        self._on_load = on_load  # ربط الكائن بموارد التطبيق بعد الاستيراد (مثلاً مدير قاعدة البيانات)
+        self._target = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return self._target
+        with self._lock:
+            if not self._loaded:
+                try:
+                    import importlib
+                    module = importlib.import_module(self._module_name)
+                    self._target = getattr(module, self._attr_name)
+                    if self._on_load is not None:
+                        self._on_load(self._target)
+                except Exception as e:
+                    print(self._unavailable_message or f"⚠️ {self._module_name} not available: {e}")
+                    self._target = None
+                self._loaded = True
+        return self._target
+
+    @property
+    def available(self) -> bool:
+        return self._load() is not None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __getattr__(self, name):
+        target = self._load()
+        if target is None:
+            raise AttributeError(f"{self._module_name}.{self._attr_name} is not available")
+        return getattr(target, name)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the analytics layer (synthetic data in temporary SQLite files, no Supabase traffic):
+  aggregates  rollup tables + per-version cache vs. pandas groupby over raw rows
+  forecaster  batched closed-form fit for 5,000 employees vs. a per-employee lstsq loop
+  anomalies   vectorised anomaly scoring of one day vs. per-record checks
+  assistant   quick-action questions through the response cache (before/after restart and new data)
+  charts      rendering the three analytics charts once per data version
+
+Usage:
+    python deploy/benchmark_analytics.py
+    python deploy/benchmark_analytics.py aggregates forecaster
+    python deploy/benchmark_analytics.py anomalies --punches 50000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as date_type, timedelta
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from app.database.attendance_aggregates import AttendanceAggregator, aggregate_rows  # noqa: E402
+
+ATTENDANCE_TABLE = """CREATE TABLE attendance (id INTEGER PRIMARY KEY AUTOINCREMENT, employee_id INTEGER,
+                      check_time TIMESTAMP, date DATE, type TEXT, notes TEXT, location_id INTEGER)"""
+
+
+def bench_aggregates(args):
+    """200,000 سجل: القراءة من الـ rollup لكل إصدار مقارنة بـ pandas groupby من السجلات الخام"""
+    import pandas as pd
+
+    path = os.path.join(args.workdir, 'analytics.db')
+    conn = sqlite3.connect(path)
+    conn.execute(ATTENDANCE_TABLE)
+    AttendanceAggregator.ensure_schema(conn.cursor())
+    rng = random.Random(7)
+    rows = [(rng.randrange(1, 800), f"{rng.randrange(6, 19):02d}:{rng.randrange(60):02d}:00",
+             f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}", rng.choice(['Check-In', 'Check-Out']))
+            for i in range(200_000)]
+    started = time.perf_counter()
+    conn.executemany("INSERT INTO attendance (employee_id, check_time, date, type) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    print(f"insert 200k rows with rollup triggers: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    aggregator = AttendanceAggregator(path)
+    started = time.perf_counter()
+    aggregates = aggregator.aggregates()
+    print(f"rollup aggregates: {(time.perf_counter() - started) * 1000:.0f} ms "
+          f"({aggregates.total_records} records, {len(aggregates.daily)} days)")
+    started = time.perf_counter()
+    aggregator.aggregates()
+    print(f"cached (same version): {(time.perf_counter() - started) * 1000:.2f} ms")
+    records = [dict(zip(('employee_id', 'check_time', 'date', 'type'), row)) for row in rows]
+    check = aggregate_rows(records)
+    print("rollup matches row aggregation:", (check.daily, check.weekday, check.hourly, check.unique_employees)
+          == (aggregates.daily, aggregates.weekday, aggregates.hourly, aggregates.unique_employees))
+
+    conn.execute("INSERT INTO attendance (employee_id, check_time, date, type) VALUES (1, '08:00:00', '2024-12-31', 'Check-In')")
+    conn.commit()
+    started = time.perf_counter()
+    aggregates = aggregator.aggregates()
+    print(f"after one insert: {(time.perf_counter() - started) * 1000:.0f} ms (version {aggregates.version})")
+
+    started = time.perf_counter()
+    df = pd.DataFrame(records)
+    df['timestamp'] = pd.to_datetime(df['date'] + ' ' + df['check_time'])
+    df.groupby(df['timestamp'].dt.date).size()
+    df.groupby(df['timestamp'].dt.day_name()).size()
+    df.groupby(df['timestamp'].dt.hour).size()
+    print(f"previous pandas path (one screen): {(time.perf_counter() - started) * 1000:.0f} ms")
+    conn.close()
+
+
+def bench_forecaster(args):
+    """5,000 موظف × 250 يوم عمل: بناء الإحصاءات وحل كل النماذج دفعة واحدة، ثم إغلاق يوم جديد"""
+    from app.core.attendance_forecaster import FEATURES, AttendanceForecaster, _day_numbers, _design, _solve
+
+    rng = np.random.default_rng(11)
+    employees, departments = 5_000, 40
+    start = date_type(2024, 1, 1)
+    calendar = [start + timedelta(days=offset) for offset in range(360)]
+    working_days = [day.isoformat() for day in calendar if day.weekday() < 5][:250]
+    base_arrival = rng.normal(8 * 60 + 30, 20, employees)
+    weekday_shift = rng.normal(0, 6, (employees, 7))
+    absence_rate = rng.uniform(0.02, 0.2, employees)
+
+    def simulate(days):
+        ids, dates, first_in, last_out = [], [], [], []
+        for day in days:
+            weekday = date_type.fromisoformat(day).weekday()
+            present = rng.random(employees) > absence_rate
+            count = int(present.sum())
+            arrival = base_arrival[present] + weekday_shift[present, weekday] + rng.normal(0, 8, count)
+            ids.append(np.nonzero(present)[0])
+            dates.extend([day] * count)
+            first_in.append(arrival)
+            last_out.append(arrival + rng.normal(8.5 * 60, 30, count))
+        return (np.concatenate(ids).astype(object), dates, np.concatenate(first_in), np.concatenate(last_out))
+
+    history = simulate(working_days[:-1])
+    aggregator = AttendanceAggregator()
+    forecaster = AttendanceForecaster(aggregator)
+    forecaster._departments = lambda: ([f"D{index}" for index in range(departments)],
+                                       np.array(forecaster._keys, dtype=np.int64) % departments)
+
+    started = time.perf_counter()
+    forecaster._accumulate(*history, working_days[:-1])
+    accumulate_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    today = date_type.fromisoformat(working_days[-1]) + timedelta(days=1)
+    result = forecaster._predict('employee', 7, today)
+    fit_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(history[1]):,} employee-days -> rollup statistics: {accumulate_ms:.0f} ms")
+    print(f"fit {employees:,} employees x 3 targets + {departments} departments, forecast 7 days: {fit_ms:.0f} ms")
+
+    started = time.perf_counter()
+    forecaster._accumulate(*simulate(working_days[-1:]), working_days[-1:])
+    forecaster._models = None
+    forecaster._predict('employee', 7, today)
+    print(f"one more day closed (incremental) + refit: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # مقارنة: حل منفصل لكل موظف (np.linalg.lstsq) على نفس المصفوفة
+    ids, dates, first_in, _ = history
+    day_numbers = _day_numbers(np.asarray(dates))
+    order = np.argsort(ids.astype(np.int64), kind='stable')
+    sorted_ids = ids.astype(np.int64)[order]
+    bounds = np.searchsorted(sorted_ids, np.arange(employees + 1))
+    started = time.perf_counter()
+    loop_beta = np.zeros((employees, FEATURES))
+    for employee in range(employees):
+        rows = order[bounds[employee]:bounds[employee + 1]]
+        design = _design(day_numbers[rows], forecaster._origin)
+        loop_beta[employee] = np.linalg.lstsq(design, first_in[rows], rcond=None)[0]
+    print(f"per-employee lstsq loop (arrival only): {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # ridge شبه صفري: السبت والأحد بلا بيانات فمعاملاتهما 0 في الحلين
+    exact = AttendanceForecaster(aggregator)
+    exact._accumulate(*history, working_days[:-1])
+    beta = _solve(exact._stats['arrival'], 1e-8)[0][[exact._index[employee] for employee in range(employees)]]
+    print("closed form == lstsq:", bool(np.allclose(beta, loop_beta, atol=1e-4)),
+          f"(max difference {np.abs(beta - loop_beta).max():.2e})")
+    sample = result.records(limit=1)[0]
+    print("employee", sample['employee'], sample['days'][0])
+
+
+def synthetic_day(punches: int, employees: int, rng):
+    """يوم صناعي: حضور/انصراف لكل موظف، مع حالات مزروعة من كل نوع"""
+    from app.core.attendance_anomalies import DayPunches, LocationTable, PunchBaseline
+
+    locations = LocationTable(np.arange(1, 21, dtype=np.int64), 30.0 + rng.uniform(0, 1.0, 20),
+                              31.0 + rng.uniform(0, 1.0, 20), np.full(20, 150.0))
+    home = rng.integers(1, 21, employees)
+    arrive = rng.normal(8 * 60 + 30, 15, employees)
+    employee_id = np.repeat(np.arange(employees, dtype=np.int64), 2)[:punches]
+    punch_type = np.tile(np.array([0, 1]), employees)[:punches]
+    minutes = np.where(punch_type == 0, arrive[employee_id], arrive[employee_id] + 8.5 * 60)
+    minutes = minutes + rng.normal(0, 10, punches)
+    location_id = home[employee_id].copy()
+    device = employee_id.copy()
+    ip = rng.integers(0, max(punches // 5, 1), punches)
+
+    planted = rng.choice(punches // 2, 40, replace=False) * 2
+    location_id[planted[:10] + 1] = (location_id[planted[:10] + 1] % 20) + 1      # انصراف من موقع بعيد
+    minutes[planted[:10] + 1] = minutes[planted[:10]] + 5
+    minutes[planted[10:20]] = 3 * 60                                              # حضور الساعة 3 فجراً
+    device[planted[20:30]] = device[planted[20:30] - 2]                           # جهاز زميل
+    ip[planted[30:40]] = 0
+    minutes[np.nonzero(ip == 0)[0]] = 8 * 60                                      # دفعة من IP واحد
+
+    day = DayPunches('2024-05-01', np.arange(punches, dtype=np.int64), employee_id, minutes * 60.0, punch_type,
+                     location_id, device, ip, tuple(f"tok-{i}" for i in range(employees)),
+                     tuple(f"10.0.{i // 250}.{i % 250}" for i in range(punches // 5 + 1)))
+    baseline = PunchBaseline(np.arange(employees, dtype=np.int64), np.full((employees, 2), 60.0),
+                             np.stack((arrive, arrive + 8.5 * 60), axis=1), np.full((employees, 2), 12.0))
+    return day, baseline, locations
+
+
+def bench_anomalies(args):
+    """تقييم يوم كامل دفعة واحدة مقارنة بفحص verify_attendance_authenticity سجلاً سجلاً"""
+    import pandas as pd
+
+    from app.core.attendance_anomalies import FEATURES, AnomalyConfig, score_day
+
+    punches = args.punches
+    rng = np.random.default_rng(5)
+    employees = punches // 2
+    day, baseline, locations = synthetic_day(punches, employees, rng)
+    config = AnomalyConfig(burst_threshold=8)
+    started = time.perf_counter()
+    anomalies = score_day(day, baseline, locations, config)
+    elapsed = (time.perf_counter() - started) * 1000
+    counts = {name: sum(1 for item in anomalies if any(r['feature'] == name for r in item['reasons']))
+              for name in FEATURES}
+    print(f"scored {punches:,} punches ({employees:,} employees) in {elapsed:.0f} ms -> {len(anomalies)} anomalies")
+    print(f"by feature: {counts}")
+    print(f"top: {anomalies[0] if anomalies else None}")
+
+    # للمقارنة: تحليل التاريخ والوقت فقط لكل سجل
+    records = [{'date': day.day, 'time': f"{int(s // 3600):02d}:{int(s % 3600 // 60):02d}"} for s in day.seconds]
+    started = time.perf_counter()
+    for record in records[:5000]:
+        pd.to_datetime(record['date'])
+        pd.to_datetime(record['time'])
+    print(f"per-record checks (5,000 of {punches:,}): {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def bench_assistant(args):
+    """أسئلة الأزرار السريعة مكررة بنموذج محلي بطيء (0.2 ث) - قبل/بعد إعادة التشغيل وتغيير البيانات"""
+    from app.core.assistant_backend import AssistantBackend, ResponseCache, StubModel
+
+    path = os.path.join(args.workdir, 'assistant.db')
+    cache_path = os.path.join(args.workdir, 'assistant_cache.db')
+    conn = sqlite3.connect(path)
+    conn.execute(ATTENDANCE_TABLE)
+    conn.executemany("INSERT INTO attendance (employee_id, check_time, date, type) VALUES (?, ?, ?, ?)",
+                     [(i % 300, f"{7 + i % 11:02d}:{i % 60:02d}:00", f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                       'Check-In') for i in range(100_000)])
+    conn.commit()
+    conn.close()
+
+    model = StubModel(latency=0.2)
+    backend = AssistantBackend(model, AttendanceAggregator(path), ResponseCache(cache_path))
+    questions = ["How can I improve attendance rate?", "What are the prevailing patterns?",
+                 "Are there any system issues?", "How can I increase efficiency?"]
+    context, _hash = backend.context()
+    print(f"context: {len(context)} chars for 100,000 records")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(backend.ask, questions * 10 + ["what are the PREVAILING patterns ?"] * 5))
+    print(f"45 questions (4 distinct): {(time.perf_counter() - started) * 1000:.0f} ms, model calls {model.calls}")
+
+    restarted = AssistantBackend(model, AttendanceAggregator(path), ResponseCache(cache_path))
+    started = time.perf_counter()
+    reply = restarted.ask(questions[0])
+    print(f"after restart: {reply.source} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO attendance (employee_id, check_time, date, type) VALUES (1, '09:00:00', '2024-12-29', 'Check-In')")
+    conn.commit()
+    conn.close()
+    print(f"after new data: {restarted.ask(questions[0]).source}, model calls {model.calls}")
+    print(f"metrics: {backend.metrics()}")
+
+
+def bench_charts(args):
+    """رسم المخططات الثلاثة لإصدار واحد ثم إعادة استخدامها (تبويب آخر / شاشة المساعد)"""
+    from app.gui.analytics_charts import CHART_KINDS, render_chart
+
+    rows = [{'employee_id': i % 300, 'date': f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+             'check_time': f"{6 + i % 13:02d}:{i % 60:02d}:00"} for i in range(50_000)]
+    aggregates = aggregate_rows(rows, version=1)
+    for kind in CHART_KINDS:
+        started = time.perf_counter()
+        image = render_chart(aggregates, kind, 800, 360)
+        first = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        render_chart(aggregates, kind, 800, 360)
+        print(f"{kind}: render {first:.0f} ms, reuse {(time.perf_counter() - started) * 1000:.3f} ms "
+              f"({image.width()}x{image.height()})")
+
+
+BENCHMARKS = {
+    'aggregates': bench_aggregates,
+    'forecaster': bench_forecaster,
+    'anomalies': bench_anomalies,
+    'assistant': bench_assistant,
+    'charts': bench_charts,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analytics benchmarks')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--punches', type=int, default=50_000, help='Synthetic punches for the anomalies benchmark')
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        for name in args.benchmarks or BENCHMARKS:
+            print(f"\n== {name} ==")
+            BENCHMARKS[name](args)
+
+
+if __name__ == '__main__':
+    main()
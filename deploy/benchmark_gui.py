@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the desktop models (offscreen Qt, synthetic data, no Supabase traffic):
+  dashboard      refreshing a 2,000-record day: full build vs. a 10-change diff through model + proxy
+  feed           5,000 notifications: refresh diff, filter toggles and frame time while scrolling
+  notifications  requests/min and bytes/min of one open client against an in-memory PostgREST stand-in
+
+Usage:
+    python deploy/benchmark_gui.py
+    python deploy/benchmark_gui.py feed notifications
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtCore import Qt  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QListView, QTableView  # noqa: E402
+
+
+def bench_dashboard(app):
+    """تحديث يوم من 2000 سجل: بناء الصفوف ثم تطبيق فرق بعشرة تغييرات عبر النموذج والبروكسي"""
+    from app.gui.dashboard_models import AttendanceTableModel, DashboardFilterProxy, build_dashboard_rows
+
+    rng = random.Random(7)
+    locations = {i: {'id': i, 'latitude': 30.0 + i, 'longitude': 31.0 + i} for i in range(1, 6)}
+    records = []
+    for i in range(2000):
+        kind = 'Check-In' if i % 2 == 0 else 'Check-Out'
+        records.append({
+            'id': i + 1, 'employee_id': i // 2, 'employee_name': f"Employee {i // 2}",
+            'check_time': f"{rng.randint(7, 17):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+            'type': kind, 'notes': '', 'location_id': rng.choice([None, 1, 2, 3, 4, 5]),
+            'location_name': 'Main', 'work_duration_hours': round(rng.uniform(4, 9), 2) if kind == 'Check-Out' else None,
+        })
+
+    model = AttendanceTableModel(["Employee", "Check-in Time", "Status", "Notes", "Approved Location", "Map View"],
+                                 late_columns=(1, 2), map_column=5)
+    proxy = DashboardFilterProxy()
+    proxy.setSourceModel(model)
+    view = QTableView()
+    view.setModel(proxy)
+    view.setSortingEnabled(True)
+    view.sortByColumn(1, Qt.SortOrder.AscendingOrder)
+    view.resize(1000, 700)
+    view.show()
+
+    started = time.perf_counter()
+    checkin_rows, _ = build_dashboard_rows(records, locations, {}, {})
+    built_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    model.reset_rows(checkin_rows)
+    app.processEvents()
+    reset_ms = (time.perf_counter() - started) * 1000
+
+    for record in rng.sample(records, 10):
+        record['notes'] = 'edited'
+    records.append({'id': 5000, 'employee_id': 1, 'employee_name': 'New', 'check_time': '09:00:00',
+                    'type': 'Check-In', 'location_id': 1})
+    started = time.perf_counter()
+    checkin_rows, _ = build_dashboard_rows(records, locations, {}, {})
+    stats = model.apply_rows(checkin_rows)
+    app.processEvents()
+    diff_ms = (time.perf_counter() - started) * 1000
+
+    print(f"rows={model.rowCount()} build={built_ms:.1f}ms reset={reset_ms:.1f}ms "
+          f"diff_refresh={diff_ms:.1f}ms stats={stats}")
+    view.close()
+
+
+def bench_feed(app):
+    """5,000 تنبيه: الفرق عند التحديث الدوري وزمن الإطار أثناء التمرير (ميزانية 60 إطاراً = 16.7 ms)"""
+    from app.gui.notification_feed import (PRIORITIES, NotificationFilterProxy, NotificationsModel,
+                                           configure_feed_view)
+
+    rng = random.Random(5)
+    types = ["📢 General Announcement", "🔄 System Update", "⚠️ Important Notice", "🔗 Website Link"]
+    notifications = [{
+        'id': i, 'title': f"Notification {i}", 'notification_type': rng.choice(types),
+        'priority': rng.choice(PRIORITIES), 'is_read': rng.random() < 0.5,
+        'created_at': f"2025-01-{1 + i % 28:02d}T10:{i % 60:02d}:00",
+        'message': " ".join(rng.choice(["system", "update", "الحضور", "meeting", "please", "review"])
+                            for _ in range(rng.randrange(8, 80))),
+        'links': [f"https://example.com/file{i}.pdf"] if i % 3 == 0 else [],
+    } for i in range(5000, 0, -1)]
+
+    model = NotificationsModel()
+    started = time.perf_counter()
+    model.apply_notifications(notifications)
+    print(f"initial load: {(time.perf_counter() - started) * 1000:.0f} ms for {model.rowCount()} notifications")
+
+    refreshed = [dict(n) for n in notifications[:-20]]
+    refreshed[10]['is_read'] = not refreshed[10]['is_read']
+    refreshed = [{**notifications[0], 'id': 5001 + k, 'title': f"New {k}"} for k in range(3)] + refreshed
+    started = time.perf_counter()
+    stats = model.apply_notifications(refreshed)
+    print(f"refresh diff: {(time.perf_counter() - started) * 1000:.1f} ms {stats}")
+
+    proxy = NotificationFilterProxy()
+    proxy.setSourceModel(model)
+    view = QListView()
+    configure_feed_view(view)
+    view.setModel(proxy)
+    view.resize(900, 800)
+    view.show()
+    app.processEvents()
+
+    started = time.perf_counter()
+    proxy.set_filters(True, True, {'urgent', 'high'}, None)
+    app.processEvents()
+    print(f"filter toggle: {(time.perf_counter() - started) * 1000:.1f} ms -> {proxy.rowCount()} rows")
+    started = time.perf_counter()
+    proxy.set_filters(True, True, None, None)
+    app.processEvents()
+    print(f"filter reset: {(time.perf_counter() - started) * 1000:.1f} ms -> {proxy.rowCount()} rows")
+
+    bar = view.verticalScrollBar()
+    frames = []
+    for value in range(0, bar.maximum(), max(1, bar.maximum() // 600)):
+        started = time.perf_counter()
+        bar.setValue(value)
+        view.viewport().repaint()
+        frames.append((time.perf_counter() - started) * 1000)
+    frames.sort()
+    print(f"scroll: {len(frames)} frames, median {frames[len(frames) // 2]:.2f} ms, "
+          f"p95 {frames[int(len(frames) * 0.95)]:.2f} ms, max {frames[-1]:.2f} ms")
+    view.close()
+
+
+class _Query:
+    """جدول في الذاكرة بدلاً من PostgREST (select/eq/or_/order/range/limit فقط)"""
+
+    def __init__(self, rows):
+        self.rows, self.filters, self.columns = rows, [], '*'
+        self.count, self.head, self.sort, self.window = None, False, None, None
+
+    def select(self, *columns, count=None, head=None):
+        self.columns, self.count, self.head = columns, count, bool(head)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def or_(self, expression):
+        clauses = []
+        for clause in expression.split(','):
+            column, op, value = clause.split('.', 2)
+            value = value.strip('"')
+            clauses.append((column, op, value))
+        self.filters.append(lambda r: any(
+            (str(r.get(c) or '') >= v) if op == 'gte' else (str(r.get(c)) == v) for c, op, v in clauses))
+        return self
+
+    def order(self, column, desc=False):
+        self.sort = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def limit(self, n):
+        self.window = (0, n)
+        return self
+
+    def execute(self):
+        rows = [r for r in self.rows if all(f(r) for f in self.filters)]
+        if self.sort:
+            rows.sort(key=lambda r: str(r.get(self.sort[0]) or ''), reverse=self.sort[1])
+        total = len(rows)
+        if self.window:
+            rows = rows[self.window[0]:self.window[1]]
+        if self.columns and self.columns != ('*',):
+            rows = [{c: r.get(c) for c in self.columns} for r in rows]
+        return SimpleNamespace(data=[] if self.head else [dict(r) for r in rows],
+                               count=total if self.count else None)
+
+
+class _Client:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        return _Query(self.rows)
+
+
+def bench_notifications(app):
+    """عميل مفتوح واحد (النافذة الرئيسية + تبويب التنبيهات): 500 تنبيه نشط، إضافة وتعديل كل دقيقة.
+    "before" يعيد نمط الاستدعاءات السابق لكل نبضة 10 ث: مديرا النافذة والتبويب يعيدان تحميل كل الصفوف
+    النشطة وقائمة غير المقروءة، والتحديث التلقائي للتبويب يجلب أول 100 وغير المقروءة مرة أخرى"""
+    from app.core.notifications_manager import NotificationsManager
+
+    def stamp(minute, second=0):
+        return f"2025-01-01T{8 + minute // 60:02d}:{minute % 60:02d}:{second:02d}+00:00"
+
+    rows = [{
+        'id': i, 'title': f"Notification {i}", 'message': "Monthly review meeting tomorrow at 9 AM. " * 4,
+        'notification_type': "📢 General Announcement", 'priority': 'medium', 'status': 'active',
+        'is_read': i % 3 == 0, 'target_users': 'all', 'links': [], 'read_by_users': [],
+        'created_at': stamp(0, i % 60), 'updated_at': stamp(0, i % 60),
+    } for i in range(1, 501)]
+    client = _Client(rows)
+    minutes = 5
+    ticks = minutes * 6
+
+    def change(tick):
+        if tick % 6 == 2:
+            new_id = len(rows) + 1
+            rows.append({**rows[0], 'id': new_id, 'title': f"New {new_id}", 'is_read': False,
+                         'created_at': stamp(1 + tick), 'updated_at': stamp(1 + tick)})
+        if tick % 6 == 4:
+            rows[tick].update(is_read=True, updated_at=stamp(1 + tick))
+
+    def measure(response, totals):
+        totals[0] += 1
+        totals[1] += len(json.dumps(response.data, default=str)) if response.data else 0
+
+    before = [0, 0]
+    for tick in range(ticks):
+        change(tick)
+        for _manager in range(2):
+            measure(client.table('notifications').select('*').eq('status', 'active')
+                    .order('created_at', desc=True).execute(), before)
+            measure(client.table('notifications').select('id').eq('is_read', False).execute(), before)
+        measure(client.table('notifications').select('*').eq('status', 'active')
+                .order('created_at', desc=True).range(0, 99).execute(), before)
+        measure(client.table('notifications').select('id').eq('is_read', False).execute(), before)
+
+    del rows[500:]
+    for i, row in enumerate(rows):
+        row.update(is_read=(i + 1) % 3 == 0, updated_at=row['created_at'])
+
+    manager = NotificationsManager()
+    manager.cleanup()
+    manager.supabase, manager.supabase_available = client, True
+    manager._load_notifications_from_supabase()
+    manager.traffic.update(requests=0, bytes=0)
+    events = []
+    manager.notification_received.connect(lambda n: events.append('received'))
+    manager.notification_updated.connect(lambda n: events.append('updated'))
+    for tick in range(ticks):
+        change(tick)
+        manager._poll_for_updates()
+    after = [manager.traffic['requests'], manager.traffic['bytes']]
+
+    print(f"before: {before[0] / minutes:6.1f} requests/min  {before[1] / minutes / 1024:8.1f} KiB/min")
+    print(f"after:  {after[0] / minutes:6.1f} requests/min  {after[1] / minutes / 1024:8.1f} KiB/min")
+    print(f"signals: {events.count('received')} received, {events.count('updated')} updated; "
+          f"cache {len(manager.local_notifications)} rows, unread {manager.local_unread_count}")
+
+
+BENCHMARKS = {
+    'dashboard': bench_dashboard,
+    'feed': bench_feed,
+    'notifications': bench_notifications,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Desktop model benchmarks')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    logging.disable(logging.CRITICAL)
+    app = QApplication(sys.argv)
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name](app)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for employee search (synthetic Arabic/Latin names, temporary SQLite file):
+  fts        100,000 employees: FTS5 index vs. LIKE '%term%' (limited and unlimited)
+  directory  20,000 employees: in-memory prefix index of the desktop directory vs. the old linear scan
+
+Usage:
+    python deploy/benchmark_search.py
+    python deploy/benchmark_search.py directory
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+FIRST_NAMES = ['أحمد', 'محمد', 'مُحَمَّد', 'علي', 'فاطمة', 'إيمان', 'Omar', 'Sara', 'Youssef', 'Mona']
+LAST_NAMES = ['حسن', 'إبراهيم', 'السيد', 'عبد الله', 'Khalil', 'Nasser', 'Farouk']
+DEPARTMENTS = ['المبيعات', 'الموارد البشرية', 'IT', 'Finance', 'الإنتاج']
+TITLES = ['مهندس', 'محاسب', 'Manager', 'Technician']
+PAGE = 200
+
+
+def like_search_employees(cursor, term, limit=None):
+    """البحث القديم (LIKE على الاسم والهاتف والكود) - خط الأساس للمقارنة"""
+    pattern = f'%{term}%'
+    sql = 'SELECT * FROM employees WHERE name LIKE ? OR phone_number LIKE ? OR employee_code LIKE ?'
+    params = (pattern, pattern, pattern)
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params = (*params, limit)
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def bench_fts(workdir):
+    """100,000 موظف - FTS5 مقارنة بـ LIKE '%term%'"""
+    from app.database.full_text_search import FullTextSearch
+
+    rng = random.Random(7)
+    first = FIRST_NAMES + ['Éric']
+    path = os.path.join(workdir, 'fts_bench.db')
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, employee_code TEXT UNIQUE NOT NULL, name TEXT NOT NULL,
+            job_title TEXT, department TEXT, phone_number TEXT UNIQUE
+        )
+    ''')
+    cursor.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE NOT NULL, password TEXT, role TEXT)')
+    rows = [(f"EMP{i:06d}", f"{rng.choice(first)} {rng.choice(LAST_NAMES)} {i}", rng.choice(TITLES),
+             rng.choice(DEPARTMENTS), f"01{i:09d}") for i in range(100_000)]
+    cursor.executemany('INSERT INTO employees (employee_code, name, job_title, department, phone_number) '
+                       'VALUES (?, ?, ?, ?, ?)', rows)
+    conn.commit()
+
+    started = time.perf_counter()
+    print(f"FTS5 available: {FullTextSearch.ensure_schema(cursor)}")
+    conn.commit()
+    print(f"initial index build: {(time.perf_counter() - started) * 1000:.0f} ms for {len(rows)} rows")
+
+    started = time.perf_counter()
+    for i in range(1000):
+        cursor.execute('UPDATE employees SET name = ? WHERE id = ?', (f"Updated {i}", i + 1))
+    conn.commit()
+    print(f"1000 updates through triggers: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    search = FullTextSearch(path)
+    print(f"\n{'query':14} {'fts hits':>8} {'fts ms':>7} {'like/200':>9} {'ms':>6} {'like (old, all)':>16} {'ms':>6}")
+    for term in ['احمد', 'أحمد', 'محم', 'eric', 'EMP0123', '0100001', 'Finance', 'محمد حسن', 'Updated 99']:
+        started = time.perf_counter()
+        hits = search.search_employees(term, limit=PAGE)
+        fts_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        limited_hits = like_search_employees(cursor, term, limit=PAGE)
+        limited_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        like_hits = like_search_employees(cursor, term)
+        like_ms = (time.perf_counter() - started) * 1000
+        print(f"{term!r:14} {len(hits):8} {fts_ms:7.2f} {len(limited_hits):9} {limited_ms:6.2f} "
+              f"{len(like_hits):16} {like_ms:6.2f}")
+        if term == 'احمد' and hits:
+            print(f"{'':14} top: {hits[0]['name']} -> {hits[0]['search_highlight']}")
+    conn.close()
+
+
+def bench_directory(workdir):
+    """20,000 موظف - بناء الفهرس ثم زمن البحث لكل ضغطة مقارنة بالمسح الخطي السابق"""
+    from app.gui.employee_directory import EmployeeColumns, SearchIndex
+
+    rng = random.Random(3)
+    employees = [{
+        'id': i, 'employee_code': f"EMP{i:05d}", 'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+        'job_title': rng.choice(TITLES),
+        'department': rng.choice(DEPARTMENTS), 'phone_number': f"01{rng.randrange(10**9):09d}",
+    } for i in range(20000)]
+
+    started = time.perf_counter()
+    columns = EmployeeColumns.from_employees(employees, False)
+    index = SearchIndex(columns.search_rows())
+    print(f"build: {(time.perf_counter() - started) * 1000:.0f} ms for {len(columns)} employees")
+
+    def linear(query):
+        query = query.lower().strip()
+        return [e for e in employees if query in str(e.get('name', '')).lower() or query in e['employee_code'].lower()
+                or query in e['department'].lower() or query in e['phone_number'] or query in e['job_title'].lower()]
+
+    for typed in ['E', 'EM', 'EMP1', 'EMP123', 'EMP1234', 'احمد', 'محمد حسن', 'Sales', '0101']:
+        started = time.perf_counter()
+        hits = index.search(typed)
+        indexed_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        linear_hits = linear(typed)
+        linear_ms = (time.perf_counter() - started) * 1000
+        print(f"{typed!r:12} hits={len(hits):6} (linear {len(linear_hits):6})  index={indexed_ms:6.2f} ms  linear={linear_ms:6.2f} ms")
+
+
+BENCHMARKS = {
+    'fts': bench_fts,
+    'directory': bench_directory,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Employee search benchmarks')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.benchmarks or BENCHMARKS:
+            print(f"\n== {name} ==")
+            BENCHMARKS[name](workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the security stores (SQLite, synthetic data):
+  audit      fill the audit index with N events, then time the common report queries (first page + 10 pages)
+  biometric  challenge + verification throughput of BiometricSecurityManager, with a share of wrong responses
+
+Usage:
+    python deploy/benchmark_security.py
+    python deploy/benchmark_security.py audit --events 1000000 --audit-db audit_bench.db
+    python deploy/benchmark_security.py biometric --iterations 20000 --fail-ratio 0.1
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def run_audit_benchmark(total_events: int = 1_000_000, employees: int = 2000, days: int = 365,
+                        db_path: str = 'audit_bench.db') -> Dict:
+    """ملء الفهرس بأحداث اصطناعية ثم قياس استعلامات التقرير الشائعة"""
+    from app.utils.audit_logger import AuditLogger
+    from app.utils.audit_store import AuditStore
+
+    store = AuditStore(db_path, retention_days=days + 30)
+    existing = store.count()
+    if existing < total_events:
+        rng = random.Random(42)
+        start = datetime.now() - timedelta(days=days)
+        sub_types = ['check_in', 'check_out', 'device_verification_success', 'time_restriction_violation',
+                     'biometric_face_recognition_failure']
+        severities = ['low', 'low', 'low', 'medium', 'high']
+
+        def generate():
+            for i in range(existing, total_events):
+                moment = start + timedelta(seconds=rng.randrange(days * 86400))
+                kind = rng.randrange(len(sub_types))
+                yield {
+                    'event_id': f"BENCH_{i}",
+                    'timestamp': moment.isoformat(),
+                    'event_type': 'attendance' if kind < 2 else 'security',
+                    'sub_type': sub_types[kind],
+                    'employee_id': rng.randrange(1, employees + 1),
+                    'severity': severities[kind],
+                    'details': {'n': i},
+                }
+
+        loaded_at = time.perf_counter()
+        store.append_many(generate())
+        print(f"📥 تم إدخال {total_events - existing} حدث في {time.perf_counter() - loaded_at:.1f} ث")
+
+    manager = AuditLogger.__new__(AuditLogger)
+    manager.lock = threading.Lock()
+    manager.store = store
+    today = datetime.now().date()
+    queries = {
+        'latest_page': {},
+        'last_7_days': {'start_date': (today - timedelta(days=7)).isoformat()},
+        'year_by_employee': {'start_date': (today - timedelta(days=365)).isoformat(), 'include_employees': True},
+        'month_range': {'start_date': (today - timedelta(days=60)).isoformat() + 'T08:30:00',
+                        'end_date': (today - timedelta(days=30)).isoformat() + 'T17:00:00'},
+        'employee_all_time': {'employee_id': 17},
+        'employee_month': {'employee_id': 17, 'start_date': (today - timedelta(days=30)).isoformat()},
+        'security_week': {'event_type': 'security', 'start_date': (today - timedelta(days=7)).isoformat()},
+    }
+    results = {}
+    for name, filters in queries.items():
+        started = time.perf_counter()
+        report = manager.get_audit_report(limit=100, **filters)
+        first_page_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        page = report
+        for _ in range(10):
+            if not page['next_cursor']:
+                break
+            page = manager.get_audit_report(limit=100, cursor=page['next_cursor'], **filters)
+        results[name] = {
+            'total_events': report['total_events'],
+            'first_page_ms': round(first_page_ms, 2),
+            'next_10_pages_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+    return results
+
+
+def run_biometric_benchmark(iterations: int = 20000, fail_ratio: float = 0.1, db_path: str = ':memory:') -> Dict:
+    """قياس معدل (إنشاء تحدي + تحقق) - نسبة fail_ratio من الاستجابات خاطئة"""
+    from app.utils.biometric_security import BiometricSecurityManager
+
+    manager = BiometricSecurityManager(db_path=db_path)
+    manager.max_failed_attempts = iterations + 1  # قياس المسار لا الحظر
+    fingerprint, token = 'device-fp', 'device-token'
+    fail_every = int(1 / fail_ratio) if fail_ratio else 0
+
+    started = time.perf_counter()
+    successes = 0
+    for i in range(iterations):
+        employee_id = i % 500
+        challenge = manager.generate_verification_challenge(employee_id)
+        response = manager.calculate_expected_response(challenge['challenge'], fingerprint, token)
+        if fail_every and i % fail_every == 0:
+            response = 'wrong'
+        result = manager.verify_biometric_response(challenge['session_id'], response, fingerprint, token)
+        successes += int(result['success'])
+    elapsed = time.perf_counter() - started
+
+    return {
+        'iterations': iterations,
+        'successes': successes,
+        'seconds': round(elapsed, 3),
+        'per_second': round(iterations / elapsed),
+        'us_per_op': round(1e6 * elapsed / iterations, 1),
+        'active_sessions': manager.sessions.size(),
+    }
+
+
+def bench_audit(args):
+    print(json.dumps(run_audit_benchmark(args.events, args.employees, db_path=args.audit_db), indent=2))
+
+
+def bench_biometric(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.biometric_db or os.path.join(tmp, 'biometric_bench.db')
+        print(json.dumps(run_biometric_benchmark(args.iterations, args.fail_ratio, db_path), indent=2))
+
+
+BENCHMARKS = {
+    'audit': bench_audit,
+    'biometric': bench_biometric,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Security store benchmarks')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--employees', type=int, default=2000)
+    parser.add_argument('--audit-db', default='audit_bench.db', help="ملف قياس التدقيق (يُعاد استخدامه بين التشغيلات)")
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--fail-ratio', type=float, default=0.1)
+    parser.add_argument('--biometric-db', default=None, help="ملف SQLite للتحقق البيومتري (الافتراضي: ملف مؤقت)")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    logging.basicConfig(level=logging.ERROR)  # لا نطبع سطراً لكل محاولة فاشلة
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark for incremental ZK log ingestion against a fake in-process device.
+
+Steps (fresh temporary SQLite database, no Supabase traffic):
+  1. per-record baseline: add_attendance_record for a sample, extrapolated to the full log
+  2. first ingestion of the full log (bulk transaction + one bulk sync enqueue)
+  3. re-ingestion of the unchanged log (watermark filtering, nothing new)
+  4. incremental ingestion after new punches arrive
+  5. ingestion with clear_after_commit (device cleared only after verification)
+
+Usage:
+    python deploy/benchmark_zk_ingestion.py
+    python deploy/benchmark_zk_ingestion.py --records 100000 --employees 300
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from app.database.simple_hybrid_manager import SimpleHybridManager  # noqa: E402
+from app.fingerprint.fake_zk import FakeZKDevice  # noqa: E402
+from app.fingerprint.zk_ingestion import ZKIngestionPipeline  # noqa: E402
+from app.fingerprint.zk_manager import ZKManager  # noqa: E402
+
+
+def build_database(path: str, employees: int) -> SimpleHybridManager:
+    db = SimpleHybridManager(load_from_supabase=False, start_sync_threads=False, local_db_path=path)
+    db.instant_sync = False  # القياس للمسار المحلي فقط
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO employees (employee_code, name, phone_number) VALUES (?, ?, ?)",
+        [(f"{1000 + i}", f"Employee {i}", f"0100000{i:04d}") for i in range(employees)]
+    )
+    conn.commit()
+    conn.close()
+    return db
+
+
+def timed(label: str, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<42} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ZK incremental ingestion benchmark')
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--employees', type=int, default=300)
+    parser.add_argument('--baseline-sample', type=int, default=2_000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    user_ids = [str(1000 + i) for i in range(args.employees)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # 1. خط الأساس: إدخال سجل بسجل (كما يفعل add_attendance_record)
+        baseline_db = build_database(os.path.join(workdir, 'baseline.db'), args.employees)
+        sample_device = FakeZKDevice()
+        sample_device.generate_log(user_ids, args.baseline_sample)
+        index = baseline_db.get_employee_code_index()
+
+        def per_record():
+            for record in sample_device.attendance:
+                baseline_db.add_attendance_record({
+                    'employee_id': index[record.user_id],
+                    'check_time': record.timestamp.strftime('%H:%M:%S'),
+                    'date': record.timestamp.strftime('%Y-%m-%d'),
+                    'type': 'Check-In' if record.punch == 0 else 'Check-Out',
+                    'location_id': None,
+                    'notes': 'baseline'
+                })
+        _, baseline_elapsed = timed(f"per-record insert ({args.baseline_sample} records)", per_record)
+        print(f"{'  -> extrapolated to ' + str(args.records):<42} {baseline_elapsed * args.records / args.baseline_sample:8.3f} s")
+
+        # 2-5. الاستيراد التزايدي
+        db = build_database(os.path.join(workdir, 'attendance.db'), args.employees)
+        device = FakeZKDevice()
+        device.generate_log(user_ids, args.records)
+        manager = ZKManager('10.0.0.50', zk=device)
+        manager.connect(disable_device=False)
+        pipeline = ZKIngestionPipeline(db, manager.device_key)
+
+        result, _ = timed(f"first ingestion ({args.records} records)", lambda: pipeline.ingest(manager))
+        print(f"  created={result['created']} duplicates={result['duplicates']} rejected={result['rejected']}")
+
+        result, _ = timed("re-ingestion, unchanged log", lambda: pipeline.ingest(manager))
+        print(f"  skipped_by_watermark={result['skipped_by_watermark']} created={result['created']} duplicates={result['duplicates']}")
+
+        last = device.attendance[-1].timestamp
+        for i, user_id in enumerate(user_ids):
+            device.punch(user_id, last.replace(hour=8) + timedelta(days=1, seconds=i), punch=0)
+        result, _ = timed(f"incremental ingestion (+{len(user_ids)} punches)", lambda: pipeline.ingest(manager))
+        print(f"  skipped_by_watermark={result['skipped_by_watermark']} created={result['created']}")
+
+        result, _ = timed("ingestion with clear_after_commit", lambda: pipeline.ingest(manager, clear_after_commit=True))
+        print(f"  cleared={result['cleared']} device log size={len(device.attendance)}")
+
+        pending = db.get_sync_queue_lag().get('pending')
+        print(f"\nsync queue entries for all ingestions: {pending}")
+        manager.disconnect()
+        for manager_db in (baseline_db, db):
+            manager_db.clear_sync_queue()  # لا مزامنة أخيرة مع Supabase عند الإيقاف
+            manager_db.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for the serverless entry point (api/index.py).
+
+Runs `python -X importtime -c "import api.index"` in a fresh interpreter in
+serverless mode and fails (exit code 1) when:
+  - the cumulative import time of api.index exceeds the budget, or
+  - a heavy optional module (dlib/cv2/numpy/PIL/supabase...) was imported eagerly.
+
+Usage:
+    python deploy/check_cold_start.py
+    python deploy/check_cold_start.py --budget-ms 300 --runs 5
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# وحدات يجب ألا تُستورد عند البدء البارد (تُستورد عند أول استخدام فقط)
+LAZY_MODULES = ('face_recognition', 'dlib', 'cv2', 'numpy', 'PIL', 'supabase',
+                'app.utils.face_recognition', 'app.utils.biometric_security',
+                'app.utils.time_restrictions', 'app.utils.audit_logger')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def measure_once(entry_module: str) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env['ATTENDANCE_SERVING_MODE'] = 'serverless'
+        env['SQLITE_FILE'] = os.path.join(workdir, 'attendance.db')
+        env['PYTHONPATH'] = PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {entry_module}'],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {entry_module} failed:\n{completed.stderr[-2000:]}")
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+
+    if entry_module not in modules:
+        raise RuntimeError(f"{entry_module} not found in -X importtime output")
+
+    return {
+        'total_ms': modules[entry_module][1] / 1000.0,
+        'modules': modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serverless cold-start import budget')
+    parser.add_argument('--entry', default='api.index')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('COLD_START_BUDGET_MS', '400')))
+    parser.add_argument('--runs', type=int, default=3, help='Best of N runs (filters out disk cache noise)')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    results = [measure_once(args.entry) for _ in range(max(1, args.runs))]
+    best = min(results, key=lambda r: r['total_ms'])
+
+    heaviest = sorted(best['modules'].items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    print(f"Heaviest imports (cumulative) for {args.entry}:")
+    for name, (_, cumulative_us) in heaviest:
+        print(f"  {cumulative_us / 1000.0:8.1f} ms  {name}")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in best['modules']]
+    if eager:
+        failures.append(f"modules imported eagerly: {', '.join(eager)}")
+    if best['total_ms'] > args.budget_ms:
+        failures.append(f"cold import {best['total_ms']:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+
+    print(f"\ncold import of {args.entry}: {best['total_ms']:.1f} ms (budget {args.budget_ms:.0f} ms, best of {len(results)})")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
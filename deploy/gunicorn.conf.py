@@ -0,0 +1,26 @@
+# Gunicorn configuration for the attendance web app
+#   gunicorn -c deploy/gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 9)))
+# gthread: SQLite والتحقق من الوجه عمليات حاجبة، لذلك الخيوط أنسب من gevent
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+
+# تحميل التطبيق مرة واحدة في العملية الأم (تنزيل Supabase + تسخين الكاش) قبل fork
+preload_app = True
+
+# ميزانية الاتصالات لكل عامل أقل من عدد الخيوط: تبقى خيوط لـ /health و /metrics والصفحات حين تنشغل قاعدة البيانات
+os.environ.setdefault('WEB_DB_CONNECTIONS_PER_WORKER', str(max(1, threads // 2)))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.on_worker_start()
@@ -94,7 +94,7 @@ Group=attendance
 WorkingDirectory=/opt/attendance
 Environment="PATH=/opt/attendance/.venv/bin"
 EnvironmentFile=/opt/attendance/.env
-ExecStart=/opt/attendance/.venv/bin/gunicorn --workers 3 --bind 127.0.0.1:8000 --timeout 120 --keep-alive 5 web_app:app
+ExecStart=/opt/attendance/.venv/bin/gunicorn -c deploy/gunicorn.conf.py wsgi:app
 Restart=always
 RestartSec=10
 
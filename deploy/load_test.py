@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Simple closed-loop HTTP load test for the attendance web app.
+Reports requests/sec and latency percentiles (p50/p95/p99).
+
+Usage:
+    python deploy/load_test.py --url http://127.0.0.1:8000/healthz --concurrency 32 --duration 20
+    python deploy/load_test.py --url "http://127.0.0.1:8000/api/employee-status?identifier=EMP001" --p99-target 50
+"""
+
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(url: str, concurrency: int, duration: float, timeout: float) -> dict:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    response.read()
+                    if response.status >= 500:
+                        local_errors += 1
+            except urllib.error.HTTPError as e:
+                if e.code >= 500:
+                    local_errors += 1
+            except Exception:
+                local_errors += 1
+            local_latencies.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Attendance web app load test')
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--p99-target', type=float, default=None,
+                        help='Step concurrency up until p99 exceeds this many ms')
+    args = parser.parse_args()
+
+    if args.p99_target is None:
+        result = run_load(args.url, args.concurrency, args.duration, args.timeout)
+        print(f"concurrency={args.concurrency} requests={result['requests']} errors={result['errors']} "
+              f"rps={result['rps']:.1f} p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+              f"p99={result['p99_ms']:.1f}ms")
+        return
+
+    # أعلى معدل طلبات مع بقاء p99 تحت الهدف
+    best = None
+    concurrency = 1
+    while concurrency <= 512:
+        result = run_load(args.url, concurrency, args.duration, args.timeout)
+        print(f"concurrency={concurrency} rps={result['rps']:.1f} p99={result['p99_ms']:.1f}ms errors={result['errors']}")
+        if result['p99_ms'] > args.p99_target or result['errors']:
+            break
+        best = (concurrency, result)
+        concurrency *= 2
+
+    if best:
+        print(f"\nbest: {best[1]['rps']:.1f} req/s at p99 <= {args.p99_target:.0f}ms (concurrency={best[0]})")
+    else:
+        print(f"\np99 target of {args.p99_target:.0f}ms not reachable even at concurrency=1")
+
+
+if __name__ == '__main__':
+    main()
@@ -12,4 +12,7 @@ os.environ['RUN_FROM_ROOT'] = '1'
 from app.main import main
 
 if __name__ == "__main__":
+    # مطلوب لعمليات رسم QR (spawn) في النسخة المجمّعة PyInstaller
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,16 @@
+"""
+إعداد مشترك للاختبارات: جذر المشروع في sys.path، وملفات SQLite الافتراضية
+(سجل التدقيق، الأمان البيومتري، ذاكرة المساعد) في مجلد مؤقت لا في مجلد العمل
+"""
+
+import os
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+_STATE_DIR = tempfile.mkdtemp(prefix='attendance-tests-')
+for _variable, _name in (('AUDIT_DB_PATH', 'audit_log.db'), ('BIOMETRIC_SECURITY_DB', 'biometric_security.db'),
+                         ('ASSISTANT_CACHE_DB', 'assistant_cache.db')):
+    os.environ.setdefault(_variable, os.path.join(_STATE_DIR, _name))
@@ -0,0 +1,109 @@
+"""جداول الـ rollup (تحدّثها المشغلات) تعطي نفس التجميعات المحسوبة مباشرة من السجلات الخام"""
+
+import random
+import sqlite3
+
+import pytest
+
+from app.database.attendance_aggregates import AttendanceAggregator, aggregate_rows
+
+COLUMNS = ('id', 'employee_id', 'check_time', 'date', 'type')
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'attendance.db')
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE attendance (id INTEGER PRIMARY KEY AUTOINCREMENT, employee_id INTEGER,
+                    check_time TIMESTAMP, date DATE, type TEXT, notes TEXT, location_id INTEGER)""")
+    AttendanceAggregator.ensure_schema(conn.cursor())
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _raw_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM attendance").fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def _assert_rollup_matches(aggregator, path):
+    rolled = aggregator.aggregates()
+    raw = aggregate_rows(_raw_rows(path))
+    assert (rolled.total_records, rolled.unique_employees, rolled.first_date, rolled.last_date) == \
+        (raw.total_records, raw.unique_employees, raw.first_date, raw.last_date)
+    assert rolled.daily == raw.daily
+    assert rolled.weekday == raw.weekday
+    assert rolled.hourly == raw.hourly
+    return rolled
+
+
+def test_rollup_matches_raw_aggregation_after_inserts_updates_and_deletes(db_path):
+    rng = random.Random(3)
+    conn = sqlite3.connect(db_path)
+    rows = []
+    for i in range(3000):
+        day = f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}"
+        clock = f"{rng.randrange(0, 24):02d}:{rng.randrange(60):02d}:00"
+        # السجلات المحلية 'HH:MM:SS' وسجلات Supabase طابع كامل
+        check_time = clock if i % 3 else f"{day} {clock}"
+        rows.append((rng.randrange(1, 120), check_time, day, rng.choice(['Check-In', 'Check-Out'])))
+    conn.executemany("INSERT INTO attendance (employee_id, check_time, date, type) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+
+    aggregator = AttendanceAggregator(db_path)
+    first = _assert_rollup_matches(aggregator, db_path)
+
+    conn.execute("UPDATE attendance SET date = '2025-02-03', check_time = '23:59:00' WHERE id % 7 = 0")
+    conn.execute("UPDATE attendance SET employee_id = 500 WHERE id % 11 = 0")
+    conn.execute("DELETE FROM attendance WHERE id % 5 = 0")
+    conn.commit()
+    conn.close()
+
+    second = _assert_rollup_matches(aggregator, db_path)
+    assert second.version != first.version
+
+
+def test_rollup_is_empty_after_all_rows_are_deleted(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO attendance (employee_id, check_time, date, type) "
+                 "VALUES (1, '08:00:00', '2024-05-01', 'Check-In')")
+    conn.execute("DELETE FROM attendance")
+    conn.commit()
+    conn.close()
+
+    aggregates = _assert_rollup_matches(AttendanceAggregator(db_path), db_path)
+    assert aggregates.total_records == 0
+    assert aggregates.daily == ()
+
+
+class _RemoteAttendance:
+    """مدير بدون SQLite: get_attendance_version رخيص وget_all_attendance يُعدّ"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.loads = 0
+
+    def get_attendance_version(self):
+        return (len(self.rows), max((row['id'] for row in self.rows), default=0))
+
+    def get_all_attendance(self):
+        self.loads += 1
+        return list(self.rows)
+
+
+def test_manager_path_reloads_rows_only_when_version_probe_changes():
+    manager = _RemoteAttendance([{'id': 1, 'employee_id': 1, 'check_time': '2024-05-01T08:00:00', 'date': '2024-05-01'}])
+    aggregator = AttendanceAggregator(db_manager=manager)
+
+    assert aggregator.aggregates().total_records == 1
+    assert aggregator.aggregates().total_records == 1
+    assert manager.loads == 1
+
+    manager.rows.append({'id': 2, 'employee_id': 2, 'check_time': '2024-05-02T09:00:00', 'date': '2024-05-02'})
+    assert aggregator.aggregates().total_records == 2
+    assert manager.loads == 2
@@ -0,0 +1,72 @@
+"""الحل المغلق دفعة واحدة (إحصاءات كافية + np.linalg.solve) = np.linalg.lstsq لكل موظف على حدة"""
+
+from datetime import date as date_type, timedelta
+
+import numpy as np
+
+from app.core.attendance_forecaster import FEATURES, AttendanceForecaster, _day_numbers, _design, _solve
+from app.database.attendance_aggregates import AttendanceAggregator
+
+
+def _history(employees: int, days: int, seed: int = 11):
+    rng = np.random.default_rng(seed)
+    start = date_type(2024, 1, 1)
+    working_days = [day.isoformat() for day in (start + timedelta(days=offset) for offset in range(days * 2))
+                    if day.weekday() < 5][:days]
+    base_arrival = rng.normal(8 * 60 + 30, 20, employees)
+    weekday_shift = rng.normal(0, 6, (employees, 7))
+    absence_rate = rng.uniform(0.02, 0.3, employees)
+
+    ids, dates, first_in, last_out = [], [], [], []
+    for day in working_days:
+        weekday = date_type.fromisoformat(day).weekday()
+        present = rng.random(employees) > absence_rate
+        count = int(present.sum())
+        arrival = base_arrival[present] + weekday_shift[present, weekday] + rng.normal(0, 8, count)
+        ids.append(np.nonzero(present)[0])
+        dates.extend([day] * count)
+        first_in.append(arrival)
+        last_out.append(arrival + rng.normal(8.5 * 60, 30, count))
+    history = (np.concatenate(ids).astype(object), dates, np.concatenate(first_in), np.concatenate(last_out))
+    return history, working_days
+
+
+def _lstsq_per_employee(forecaster, history, employees):
+    ids, dates, first_in, _ = history
+    day_numbers = _day_numbers(np.asarray(dates))
+    employee_ids = ids.astype(np.int64)
+    beta = np.zeros((employees, FEATURES))
+    for employee in range(employees):
+        rows = np.nonzero(employee_ids == employee)[0]
+        design = _design(day_numbers[rows], forecaster._origin)
+        beta[employee] = np.linalg.lstsq(design, first_in[rows], rcond=None)[0]
+    return beta
+
+
+def test_closed_form_matches_lstsq():
+    employees = 60
+    history, working_days = _history(employees, 120)
+    forecaster = AttendanceForecaster(AttendanceAggregator())
+    forecaster._accumulate(*history, working_days)
+
+    # ridge شبه صفري: السبت والأحد بلا بيانات فمعاملاتهما 0 في الحلين
+    closed = _solve(forecaster._stats['arrival'], 1e-8)[0][[forecaster._index[e] for e in range(employees)]]
+    expected = _lstsq_per_employee(forecaster, history, employees)
+    np.testing.assert_allclose(closed, expected, atol=1e-4)
+
+
+def test_incremental_accumulation_matches_single_pass():
+    employees = 30
+    history, working_days = _history(employees, 60, seed=5)
+    ids, dates, first_in, last_out = history
+    split = dates.index(working_days[40])
+
+    once = AttendanceForecaster(AttendanceAggregator())
+    once._accumulate(*history, working_days)
+    incremental = AttendanceForecaster(AttendanceAggregator())
+    incremental._accumulate(ids[:split], dates[:split], first_in[:split], last_out[:split], working_days[:40])
+    incremental._accumulate(ids[split:], dates[split:], first_in[split:], last_out[split:], working_days[40:])
+
+    order = [incremental._index[once._keys[row]] for row in range(len(once._keys))]
+    for target in ('arrival', 'absence', 'overtime'):
+        np.testing.assert_allclose(incremental._stats[target][order], once._stats[target], atol=1e-6)
@@ -0,0 +1,115 @@
+"""ملخص تقرير التدقيق (العدادات اليومية + أجزاء اليومين الطرفيين) = العد المباشر للأحداث المطابقة"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils.audit_logger import AuditLogger
+
+SUB_TYPES = ('check_in', 'check_out', 'device_verification_success', 'time_restriction_violation',
+             'biometric_face_recognition_failure')
+SEVERITIES = ('low', 'low', 'low', 'medium', 'high')
+# قبل 90 يوماً: داخل مدة الاحتفاظ (365 يوماً) مهما كان تاريخ التشغيل
+START = (datetime.now() - timedelta(days=90)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _at(days: int, clock: str = '') -> str:
+    day = (START + timedelta(days=days)).date().isoformat()
+    return f"{day}T{clock}" if clock else day
+
+
+@pytest.fixture(scope='module')
+def audit(tmp_path_factory):
+    rng = random.Random(42)
+    events = []
+    for i in range(4000):
+        kind = rng.randrange(len(SUB_TYPES))
+        events.append({
+            'event_id': f"TEST_{i}",
+            'timestamp': (START + timedelta(seconds=rng.randrange(60 * 86400))).isoformat(),
+            'event_type': 'attendance' if kind < 2 else 'security',
+            'sub_type': SUB_TYPES[kind],
+            'employee_id': rng.randrange(1, 40) if i % 9 else None,
+            'severity': SEVERITIES[kind],
+            'details': {'n': i},
+        })
+    manager = AuditLogger(db_path=str(tmp_path_factory.mktemp('audit') / 'audit_log.db'))
+    manager.store.append_many(events)
+    return manager, events
+
+
+def _brute_force(events, start_date=None, end_date=None, event_type=None, employee_id=None,
+                 sub_type=None, severity=None):
+    summary = {'total_events': 0, 'by_type': {}, 'by_severity': {'high': 0, 'medium': 0, 'low': 0},
+               'by_employee': {}}
+    for event in events:
+        if start_date and event['timestamp'] < start_date:
+            continue
+        if end_date and event['timestamp'] > end_date:
+            continue
+        if event_type and event['event_type'] != event_type:
+            continue
+        if employee_id and event['employee_id'] != employee_id:
+            continue
+        if sub_type and event['sub_type'] != sub_type:
+            continue
+        if severity and event['severity'] != severity:
+            continue
+        summary['total_events'] += 1
+        summary['by_type'][event['event_type']] = summary['by_type'].get(event['event_type'], 0) + 1
+        summary['by_severity'][event['severity']] += 1
+        if event['employee_id']:
+            summary['by_employee'][event['employee_id']] = summary['by_employee'].get(event['employee_id'], 0) + 1
+    return summary
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'start_date': _at(9)},
+    {'end_date': _at(31)},
+    {'start_date': _at(4, '08:30:00'), 'end_date': _at(19, '17:00:00')},
+    {'start_date': _at(14), 'end_date': _at(14, '23:59:59')},
+    {'event_type': 'security', 'start_date': _at(31, '12:00:00')},
+    {'employee_id': 17},
+    {'employee_id': 17, 'start_date': _at(2, '10:00:00'), 'end_date': _at(40)},
+    {'severity': 'low', 'start_date': _at(4, '08:30:00'), 'end_date': _at(19, '17:00:00')},
+    {'severity': 'high', 'employee_id': 17},
+    {'sub_type': 'check_out', 'start_date': _at(19, '06:00:00')},
+    {'sub_type': 'time_restriction_violation', 'severity': 'medium', 'end_date': _at(50)},
+], ids=lambda filters: ','.join(f"{key}={value}" for key, value in filters.items()) or 'all')
+def test_report_summary_matches_brute_force_count(audit, filters):
+    manager, events = audit
+    report = manager.get_audit_report(limit=50, include_employees=True, **filters)
+    expected = _brute_force(events, **filters)
+
+    summary = report['summary']
+    assert report['total_events'] == expected['total_events']
+    assert summary['total_events'] == expected['total_events']
+    assert summary['by_type'] == expected['by_type']
+    assert summary['by_severity'] == expected['by_severity']
+    assert summary['by_employee'] == expected['by_employee']
+
+
+def test_sub_type_total_matches_brute_force_count(audit):
+    manager, events = audit
+    start_date = _at(19, '06:00:00')
+    report = manager.get_audit_report(sub_type='check_out', start_date=start_date, limit=10)
+    assert report['total_events'] == sum(1 for event in events if event['sub_type'] == 'check_out'
+                                         and event['timestamp'] >= start_date)
+
+
+def test_pages_cover_every_matching_event_once(audit):
+    manager, events = audit
+    filters = {'event_type': 'attendance', 'start_date': _at(24, '12:00:00'), 'end_date': _at(35)}
+    seen, cursor = [], None
+    while True:
+        page = manager.get_audit_report(limit=100, cursor=cursor, **filters)
+        seen.extend(event['event_id'] for event in page['events'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    expected = {event['event_id'] for event in events if event['event_type'] == 'attendance'
+                and filters['start_date'] <= event['timestamp'] <= filters['end_date']}
+    assert len(seen) == len(set(seen))
+    assert set(seen) == expected
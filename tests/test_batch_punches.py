@@ -0,0 +1,38 @@
+"""موقع البصمة في الدفعة: مدخلات غير صالحة تُرفض للعنصر وحده، ونصف القطر المفقود يأخذ الافتراضي"""
+
+import pytest
+
+from app.core.attendance_manager import DEFAULT_RADIUS_METERS, BatchPunchProcessor
+
+OFFICE = {'id': 7, 'name': 'Office', 'latitude': 30.0444, 'longitude': 31.2357, 'radius_meters': 150}
+
+
+@pytest.fixture
+def processor():
+    return BatchPunchProcessor(db_manager=None)
+
+
+@pytest.mark.parametrize('location', ['30.0,31.2', [30.0, 31.2], 5,
+                                      {'lat': 'north', 'lon': 31.2}, {'lat': True, 'lon': 31.2},
+                                      {'lat': float('nan'), 'lon': 31.2}, {'lat': 30.0, 'lon': 500}])
+def test_invalid_location_is_rejected_per_item(processor, location):
+    assert processor._resolve_location({'location': location}, [OFFICE]) == (None, 'invalid_location')
+
+
+def test_numeric_strings_are_accepted(processor):
+    punch = {'location': {'lat': '30.0444', 'lon': '31.2357'}}
+    assert processor._resolve_location(punch, [OFFICE]) == (7, None)
+
+
+def test_missing_coordinates_fall_back_to_device_location(processor):
+    assert processor._resolve_location({'location': None, 'location_id': 3}, [OFFICE]) == (3, None)
+    assert processor._resolve_location({'location': {}, 'location_id': 3}, []) == (3, None)
+
+
+def test_null_radius_uses_default(processor):
+    office = dict(OFFICE, radius_meters=None)
+    # ~0.0005 درجة عرض ≈ 55 متراً: داخل النطاق الافتراضي
+    near = {'location': {'lat': OFFICE['latitude'] + 0.0005, 'lon': OFFICE['longitude']}}
+    assert processor._resolve_location(near, [office]) == (7, None)
+    far = {'location': {'lat': OFFICE['latitude'] + 2 * DEFAULT_RADIUS_METERS / 111_000, 'lon': OFFICE['longitude']}}
+    assert processor._resolve_location(far, [office]) == (None, 'out_of_range')
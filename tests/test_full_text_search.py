@@ -0,0 +1,70 @@
+"""فهرس FTS يطبّع مثل الاستعلام (الأرقام العربية الهندية)، بلا حد ضمني للنتائج، والخطأ يُرجع []"""
+
+import sqlite3
+
+import pytest
+
+from app.database.database_manager import DatabaseManager
+from app.database.full_text_search import FullTextSearch
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'search.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE employees (id INTEGER PRIMARY KEY AUTOINCREMENT, employee_code TEXT, name TEXT,
+                    job_title TEXT, department TEXT, phone_number TEXT)''')
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, password TEXT, role TEXT)')
+    if not FullTextSearch.ensure_schema(conn.cursor()):
+        pytest.skip('SQLite without FTS5')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _insert(path, rows):
+    conn = sqlite3.connect(path)
+    conn.executemany('INSERT INTO employees (employee_code, name, phone_number) VALUES (?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def _names(path, term):
+    return sorted(row['name'] for row in FullTextSearch(path).search_employees(term))
+
+
+def test_arabic_indic_digits_are_folded_when_indexing(db_path):
+    _insert(db_path, [('EMP١٢٣', 'أحمد', '٠١٠٠٠٠'), ('EMP۴۵۶', 'إيمان', '۰۱۲۰۰۰')])
+    assert _names(db_path, 'EMP123') == ['أحمد']
+    assert _names(db_path, '٠١٠') == ['أحمد']
+    assert _names(db_path, '012') == ['إيمان']
+    assert _names(db_path, 'emp۴۵') == ['إيمان']
+
+
+def test_outdated_triggers_are_replaced_and_index_rebuilt(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('DROP TRIGGER employees_fts_ai')
+    conn.execute('''CREATE TRIGGER employees_fts_ai AFTER INSERT ON employees BEGIN
+                    INSERT INTO employees_fts(rowid, name, employee_code, phone_number, department, job_title)
+                    VALUES (new.id, new.name, new.employee_code, new.phone_number, '', '');
+                    END''')
+    conn.commit()
+    conn.close()
+    _insert(db_path, [('EMP١٢٣', 'مُحمد', '٠١٠٠٠٠')])
+
+    assert _names(db_path, 'EMP123') == ['مُحمد']
+    assert _names(db_path, 'محمد') == ['مُحمد']
+
+
+def test_no_implicit_result_cap(db_path):
+    _insert(db_path, [(f'EMP{i:04d}', f'Sara {i}', f'01{i:09d}') for i in range(450)])
+    search = FullTextSearch(db_path)
+    assert len(search.search_employees('sara')) == 450
+    assert len(search.search_employees('sara', limit=25)) == 25
+
+
+def test_database_manager_search_error_returns_empty_list(tmp_path):
+    manager = DatabaseManager.__new__(DatabaseManager)
+    manager.db_type = 'sqlite'
+    manager.full_text_search = FullTextSearch(str(tmp_path))  # مجلد وليس ملف قاعدة بيانات
+    assert manager.search_employees('sara') == []
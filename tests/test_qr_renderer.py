@@ -0,0 +1,43 @@
+"""كاش صور QR محدود: الأقدم عمراً ثم الأقدم استخداماً يُحذف، ونتائج الدفعة الحالية تبقى"""
+
+import os
+import time
+
+from app.utils.qr_renderer import QRImageCache
+
+
+def _put(cache, key, size, used_at):
+    path = cache.path_for(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    os.utime(path, (used_at, used_at))
+    return path
+
+
+def test_prune_removes_expired_then_least_recently_used(tmp_path):
+    now = time.time()
+    cache = QRImageCache(str(tmp_path), max_bytes=250, max_age_seconds=3600)
+    _put(cache, 'aa01', 100, now - 7200)        # منتهي العمر
+    _put(cache, 'bb02', 100, now - 600)         # الأقدم استخداماً
+    _put(cache, 'cc03', 100, now - 300)
+    _put(cache, 'dd04', 100, now - 60)
+    assert cache.get('cc03')                    # الإصابة تحدّث وقت الاستخدام
+
+    assert cache.prune() == 2
+    assert [key for key in ('aa01', 'bb02', 'cc03', 'dd04') if os.path.exists(cache.path_for(key))] == ['cc03', 'dd04']
+
+
+def test_prune_keeps_current_batch_and_cleans_orphan_temp_files(tmp_path):
+    now = time.time()
+    cache = QRImageCache(str(tmp_path), max_bytes=50, max_age_seconds=3600)
+    _put(cache, 'aa01', 100, now - 600)
+    _put(cache, 'bb02', 100, now)
+    orphan = os.path.join(str(tmp_path), 'aa', 'half-written.tmp')
+    with open(orphan, 'wb') as f:
+        f.write(b'\0')
+    os.utime(orphan, (now - 7200, now - 7200))
+
+    assert cache.prune(keep_newer_than=now - 1) == 1
+    assert cache.get('aa01') is None
+    assert cache.get('bb02') and not os.path.exists(orphan)
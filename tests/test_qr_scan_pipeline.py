@@ -0,0 +1,110 @@
+"""خط مسح QR بدون Qt: الإطارات القديمة تُسقط بدل التراكم، والرمز نفسه يُرسل مرة واحدة خلال نافذة التجاهل"""
+
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from app.utils.qr_scan_pipeline import Debouncer, LatestFrameBuffer, QRScanPipeline  # noqa: E402
+
+
+def _frame(value):
+    """إطار رمادي صغير (لا تحويل ولا تصغير في QRFrameDecoder) يحمل رقمه في أول بكسل"""
+    frame = np.zeros((48, 64), dtype=np.uint8)
+    frame[0, 0] = value
+    return frame
+
+
+class _FakeCamera:
+    """كاميرا تسلّم الإطارات 1..count بلا انتظار ثم تفشل"""
+
+    def __init__(self, count):
+        self.count = count
+        self.delivered = 0
+        self.done = threading.Event()
+
+    def read(self):
+        if self.delivered >= self.count:
+            self.done.set()
+            return False, None
+        self.delivered += 1
+        return True, _frame(self.delivered)
+
+
+def _symbol(data, polygon=((10, 10), (30, 10), (30, 30), (10, 30))):
+    return SimpleNamespace(data=data.encode('utf-8'), polygon=list(polygon))
+
+
+def test_buffer_keeps_only_latest_frame_and_counts_drops():
+    buffer = LatestFrameBuffer()
+    for value in (1, 2, 3):
+        buffer.put(_frame(value))
+
+    frame, _ = buffer.take(timeout=0.1)
+    assert frame[0, 0] == 3
+    assert (buffer.sequence, buffer.dropped) == (3, 2)
+    assert buffer.take(timeout=0.01) is None
+
+
+def test_slow_consumer_gets_newest_frame_and_stale_frames_are_dropped():
+    camera = _FakeCamera(count=200)
+    pipeline = QRScanPipeline(camera, decode_fn=lambda image: [])
+    pipeline.start()
+    try:
+        assert camera.done.wait(5.0)
+        frame, detections, new_payloads = pipeline.process_next(timeout=1.0)
+    finally:
+        pipeline.stop()
+
+    assert frame[0, 0] == 200
+    assert (detections, new_payloads) == ([], [])
+    assert pipeline.buffer.dropped == 199
+    stats = pipeline.snapshot_stats()
+    assert (stats['captured'], stats['dropped']) == (200, 199)
+
+
+def test_new_payloads_are_debounced_and_skipped_frames_reuse_last_detections():
+    decoded = []
+
+    def decode(image):
+        decoded.append(image)
+        return [_symbol('EMP-1')]
+
+    pipeline = QRScanPipeline(_FakeCamera(count=0), debounce_seconds=60, decode_fn=decode, budget_seconds=1.0)
+    results = []
+    for value in range(3):
+        pipeline.buffer.put(_frame(value))
+        results.append(pipeline.process_next(timeout=0.1))
+
+    assert [new_payloads for _, _, new_payloads in results] == [['EMP-1'], [], []]
+    assert all([d.data for d in detections] == ['EMP-1'] for _, detections, _ in results)
+
+    # فك الترميز أبطأ من ميزانية الإطار: الإطارات المتخطاة تعرض آخر مضلع دون استدعاء decode
+    pipeline.skipper.budget = 1e-9
+    pipeline.skipper.record(1.0)
+    calls = len(decoded)
+    pipeline.buffer.put(_frame(9))
+    _, detections, new_payloads = pipeline.process_next(timeout=0.1)
+    assert len(decoded) == calls
+    assert [d.data for d in detections] == ['EMP-1'] and new_payloads == []
+
+
+def test_debouncer_accepts_again_after_window():
+    debouncer = Debouncer(window_seconds=3.0)
+    assert debouncer.accept('EMP-1', now=100.0)
+    assert not debouncer.accept('EMP-1', now=102.9)
+    assert debouncer.accept('EMP-2', now=102.9)
+    assert debouncer.accept('EMP-1', now=103.0)
+
+
+def test_decode_errors_do_not_stop_the_pipeline():
+    def decode(image):
+        raise RuntimeError('zbar failure')
+
+    pipeline = QRScanPipeline(_FakeCamera(count=0), decode_fn=decode)
+    pipeline.buffer.put(_frame(1))
+    frame, detections, new_payloads = pipeline.process_next(timeout=0.1)
+    assert frame[0, 0] == 1 and detections == [] and new_payloads == []
@@ -0,0 +1,66 @@
+"""عملية المزامنة تُكتب في نفس معاملة السجل: لا سجل محلي بلا صف في sync_queue، ولا إسقاط صامت عند القفل"""
+
+import sqlite3
+
+import pytest
+
+from app.database.simple_hybrid_manager import SimpleHybridManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = SimpleHybridManager(load_from_supabase=False, start_sync_threads=False,
+                                  local_db_path=str(tmp_path / 'attendance.db'))
+    manager.instant_sync = False
+    conn = sqlite3.connect(manager.local_db_path)
+    conn.execute("INSERT INTO employees (employee_code, name, phone_number) VALUES ('1001', 'Employee 1', '01000000001')")
+    conn.commit()
+    conn.close()
+    yield manager
+    manager.clear_sync_queue()  # لا مزامنة مع Supabase عند الإيقاف
+    manager.shutdown()
+
+
+def _count(manager, table):
+    conn = sqlite3.connect(manager.local_db_path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _punch(hour):
+    return {'employee_id': 1, 'type': 'Check-In', 'check_time': f"{hour:02d}:00:00", 'date': '2024-05-01'}
+
+
+def test_reader_worker_queues_attendance_with_the_record(db):
+    assert not db.is_sync_owner
+    record_id = db.record_attendance(_punch(8))
+    assert record_id is not None
+    assert _count(db, 'attendance') == 1
+    assert _count(db, 'sync_queue') == 1
+
+
+def test_failed_queue_insert_rolls_back_the_record(db):
+    conn = sqlite3.connect(db.local_db_path)
+    conn.execute("CREATE TRIGGER reject_sync BEFORE INSERT ON sync_queue BEGIN SELECT RAISE(ABORT, 'full'); END")
+    conn.commit()
+    conn.close()
+
+    assert db.record_attendance(_punch(8)) is None
+    with pytest.raises(sqlite3.IntegrityError):
+        db.record_attendance_batch([dict(_punch(9), idempotency_key='k9')])
+    assert _count(db, 'attendance') == 0
+
+
+def test_locked_queue_raises_instead_of_dropping(db):
+    blocker = sqlite3.connect(db.local_db_path)
+    blocker.execute('BEGIN IMMEDIATE')
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            db._add_to_sync_queue_table("employees", 1, "UPDATE", {'name': 'x'}, attempts=2)
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert db._add_to_sync_queue("employees", 1, "UPDATE", {'name': 'x'})
+    assert _count(db, 'sync_queue') == 1
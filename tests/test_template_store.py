@@ -0,0 +1,117 @@
+"""بصمة محتوى القالب نفسها محلياً وفي ترحيل Supabase 0002، وحذف القالب يصل للتثبيتات الأخرى كعلامة"""
+
+import base64
+import json
+import os
+import re
+import sqlite3
+
+import pytest
+
+from app.database.simple_hybrid_manager import SimpleHybridManager
+from app.database.supabase_migrations import LEGACY_TEMPLATE_BYTES_SQL
+from app.fingerprint.template_store import FingerprintTemplateStore, content_hash, to_template_bytes
+
+LEGACY_VALUES = [base64.b64encode(os.urandom(size)).decode('ascii') for size in (1, 2, 3, 4, 5, 512, 1024)] + [
+    'QUJD', 'QUI=', 'QQ==',                      # base64 قانوني
+    'QUJ', 'QU=', 'Q===', 'QUJD====', 'QUJDRA',  # حشو ناقص أو زائد
+    'QUJD\n', ' QUJD', 'QU JD', 'QUJD\nRA==',    # مسافات وأسطر
+    'QU-_', 'not base64!', 'قالب نصي', '{"fid": 0}',
+]
+
+
+def _sql_rule(value):
+    """تقييم LEGACY_TEMPLATE_BYTES_SQL كما تنفذه PostgreSQL: ~ ثم decode(base64) أو convert_to(UTF8)"""
+    pattern = re.search(r"~ '(.*?)' THEN decode\(zk_template, 'base64'\) ELSE convert_to\(zk_template, 'UTF8'\)",
+                        LEGACY_TEMPLATE_BYTES_SQL).group(1)
+    return base64.b64decode(value) if re.search(pattern, value) else value.encode('utf-8')
+
+
+@pytest.mark.parametrize('value', LEGACY_VALUES)
+def test_migration_rule_matches_to_template_bytes(value):
+    assert content_hash(_sql_rule(value)) == content_hash(to_template_bytes(value))
+
+
+def test_local_migration_hashes_match_migration_rule(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'legacy.db'))
+    cursor = conn.cursor()
+    cursor.execute('CREATE TABLE employees (id INTEGER PRIMARY KEY, zk_template TEXT)')
+    cursor.executemany('INSERT INTO employees (id, zk_template) VALUES (?, ?)', enumerate(LEGACY_VALUES, 1))
+    FingerprintTemplateStore.ensure_schema(cursor)
+    assert FingerprintTemplateStore.migrate_from_employees_column(cursor) == len(LEGACY_VALUES)
+    stored = dict(cursor.execute('SELECT employee_id, content_hash FROM fingerprint_templates').fetchall())
+    conn.close()
+    assert stored == {i: content_hash(_sql_rule(value)) for i, value in enumerate(LEGACY_VALUES, 1)}
+
+
+@pytest.mark.skipif(not os.getenv('DATABASE_URL', '').startswith('postgres'),
+                    reason='needs DATABASE_URL pointing at PostgreSQL')
+def test_postgres_migration_rule_matches_to_template_bytes():
+    psycopg2 = pytest.importorskip('psycopg2')
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        cursor = conn.cursor()
+        cursor.execute('CREATE TEMP TABLE legacy (id INTEGER, zk_template TEXT)')
+        cursor.executemany('INSERT INTO legacy VALUES (%s, %s)', list(enumerate(LEGACY_VALUES)))
+        cursor.execute(f"""
+            SELECT id, encode(sha256(template), 'hex'), replace(encode(template, 'base64'), E'\\n', '')
+            FROM (SELECT id, {LEGACY_TEMPLATE_BYTES_SQL} AS template FROM legacy) AS converted
+        """)
+        for index, digest, template_b64 in cursor.fetchall():
+            expected = to_template_bytes(LEGACY_VALUES[index])
+            assert (digest, template_b64) == (content_hash(expected), base64.b64encode(expected).decode('ascii'))
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+class _RemoteTemplates:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_fingerprint_template_hashes(self, device_type='zk'):
+        return [{key: row[key] for key in ('employee_id', 'finger_index', 'content_hash', 'deleted_at')}
+                for row in self.rows]
+
+    def get_fingerprint_templates(self, employee_ids, device_type='zk'):
+        return [row for row in self.rows if row['employee_id'] in employee_ids]
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = SimpleHybridManager(load_from_supabase=False, start_sync_threads=False,
+                                  local_db_path=str(tmp_path / 'attendance.db'))
+    manager.instant_sync = False
+    yield manager
+    manager.clear_sync_queue()  # لا مزامنة مع Supabase عند الإيقاف
+    manager.shutdown()
+
+
+def test_delete_is_queued_as_tombstone(db):
+    assert db.save_fingerprint_template(1, b'template-1')
+    assert db.update_employee_zk_template(1, None)
+    assert db.template_store.get(1) is None
+
+    conn = sqlite3.connect(db.local_db_path)
+    operation, payload = conn.execute("SELECT operation, local_data FROM sync_queue ORDER BY id DESC LIMIT 1").fetchone()
+    conn.close()
+    payload = json.loads(payload)
+    assert operation == 'DELETE'
+    assert payload['deleted_at'] and payload['template_b64'] == ''
+
+
+def test_remote_tombstone_removes_local_template(db):
+    db.template_store.save(1, b'template-1')
+    db.template_store.save(2, b'template-2')
+    new_template = b'template-3'
+    db.supabase_manager = _RemoteTemplates([
+        {'employee_id': 1, 'finger_index': 0, 'content_hash': '', 'template_b64': '', 'deleted_at': '2024-05-01T08:00:00Z'},
+        {'employee_id': 2, 'finger_index': 0, 'content_hash': content_hash(b'template-2'),
+         'template_b64': base64.b64encode(b'template-2').decode('ascii'), 'deleted_at': None},
+        {'employee_id': 3, 'finger_index': 0, 'content_hash': content_hash(new_template),
+         'template_b64': base64.b64encode(new_template).decode('ascii'), 'deleted_at': None},
+    ])
+
+    assert db.sync_fingerprint_templates_from_supabase() == 2
+    assert set(db.template_store.get_hashes()) == {(2, 0), (3, 0)}
+    assert db.template_store.get(3) == new_template
@@ -0,0 +1,119 @@
+"""مسح سجل جهاز ZK بعد الحفظ فقط: لا يُمسح ما دامت بصمة واحدة لم تُحفظ (مستخدم مجهول أو بصمة مرفوضة)"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database.simple_hybrid_manager import SimpleHybridManager
+from app.fingerprint.fake_zk import FakeZKDevice
+from app.fingerprint.zk_ingestion import ZKIngestionPipeline
+from app.fingerprint.zk_manager import ZKManager
+
+DAY = datetime(2024, 5, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = SimpleHybridManager(load_from_supabase=False, start_sync_threads=False,
+                                  local_db_path=str(tmp_path / 'attendance.db'))
+    manager.instant_sync = False
+    conn = sqlite3.connect(manager.local_db_path)
+    conn.executemany("INSERT INTO employees (employee_code, name, phone_number) VALUES (?, ?, ?)",
+                     [('1001', 'Employee 1', '01000000001'), ('1002', 'Employee 2', '01000000002')])
+    conn.commit()
+    conn.close()
+    yield manager
+    manager.clear_sync_queue()  # لا مزامنة مع Supabase عند الإيقاف
+    manager.shutdown()
+
+
+@pytest.fixture
+def device():
+    device = FakeZKDevice()
+    # يوم كامل: حضور، خروج للاستراحة، عودة، انصراف - كلها تُحفظ كما سجلها الجهاز
+    for user_id in ('1001', '1002'):
+        for hour, punch in ((8, 0), (12, 2), (13, 3), (17, 1)):
+            device.punch(user_id, DAY.replace(hour=hour), punch=punch)
+    return device
+
+
+def _connect(device):
+    manager = ZKManager('10.0.0.50', zk=device)
+    manager.connect(disable_device=False)
+    return manager
+
+
+def _stored_keys(db, pipeline):
+    return set(db.get_attendance_ids_by_idempotency_keys(pipeline.last_keys))
+
+
+def test_device_cleared_only_after_every_punch_is_stored(db, device):
+    manager = _connect(device)
+    pipeline = ZKIngestionPipeline(db, manager.device_key)
+
+    result = pipeline.ingest(manager, clear_after_commit=True)
+
+    assert result['created'] == 8
+    assert result['rejected'] == {}
+    assert result['cleared'] is True
+    assert device.attendance == []
+    assert _stored_keys(db, pipeline) == set(pipeline.last_keys)
+
+
+def test_unknown_user_keeps_device_log(db, device):
+    device.punch('2001', DAY.replace(hour=9), punch=0)
+    manager = _connect(device)
+    pipeline = ZKIngestionPipeline(db, manager.device_key)
+
+    result = pipeline.ingest(manager, clear_after_commit=True)
+
+    assert result['unknown_users'] == {'2001': 1}
+    assert result['cleared'] is False
+    assert len(device.attendance) == 9
+
+    # بعد إضافة الموظف: إعادة الاستيراد الكاملة تحفظ بصمته ثم يُمسح الجهاز
+    conn = sqlite3.connect(db.local_db_path)
+    conn.execute("INSERT INTO employees (employee_code, name, phone_number) VALUES ('2001', 'New', '01000002001')")
+    conn.commit()
+    conn.close()
+    result = pipeline.ingest(manager, clear_after_commit=True, full_rescan=True)
+
+    assert result['created'] == 1
+    assert result['duplicates'] == 8
+    assert result['cleared'] is True
+    assert device.attendance == []
+
+
+def test_rejected_punch_keeps_device_log(db, device):
+    manager = _connect(device)
+    pipeline = ZKIngestionPipeline(db, manager.device_key)
+    pipeline.employee_index()
+
+    # الموظف حُذف بعد تحميل الفهرس: بصماته تُرفض (employee_not_found) ولا يجوز مسحها من الجهاز
+    conn = sqlite3.connect(db.local_db_path)
+    conn.execute("DELETE FROM employees WHERE employee_code = '1002'")
+    conn.commit()
+    conn.close()
+    result = pipeline.ingest(manager, clear_after_commit=True)
+
+    assert result['created'] == 4
+    assert result['rejected'] == {'employee_not_found': 4}
+    assert result['cleared'] is False
+    assert len(device.attendance) == 8
+
+
+def test_reingesting_stored_punches_clears_device(db, device):
+    manager = _connect(device)
+    pipeline = ZKIngestionPipeline(db, manager.device_key)
+    assert pipeline.ingest(manager)['created'] == 8
+    assert len(device.attendance) == 8
+
+    # المكرر محفوظ مسبقاً: لا يمنع المسح
+    device.punch('1001', DAY.replace(hour=18) + timedelta(days=1), punch=0)
+    result = pipeline.ingest(manager, clear_after_commit=True, full_rescan=True)
+
+    assert result['created'] == 1
+    assert result['duplicates'] == 8
+    assert result['cleared'] is True
+    assert device.attendance == []
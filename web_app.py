@@ -1,48 +1,34 @@
 import os
 import datetime
-import requests
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, Response
+from functools import wraps
+import json
+import math
+import time
 import uuid
 
 # استيراد الوحدات اللازمة
 import sys
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 from app.database.database_manager import DatabaseManager
-from app.database.database_setup import setup_database
 from app.database.simple_hybrid_manager import SimpleHybridManager
-
-# استيراد أنظمة الأمان المتقدمة
-try:
-    from app.utils.face_recognition import face_security
-    FACE_RECOGNITION_AVAILABLE = True
-except ImportError:
-    print("⚠️ Face recognition not available - install face-recognition library")
-    FACE_RECOGNITION_AVAILABLE = False
-    face_security = None
-
-try:
-    from app.utils.biometric_security import biometric_security
-    BIOMETRIC_SECURITY_AVAILABLE = True
-except ImportError:
-    print("⚠️ Biometric security not available")
-    BIOMETRIC_SECURITY_AVAILABLE = False
-    biometric_security = None
-
-try:
-    from app.utils.time_restrictions import time_restrictions
-    TIME_RESTRICTIONS_AVAILABLE = True
-except ImportError:
-    print("⚠️ Time restrictions not available")
-    TIME_RESTRICTIONS_AVAILABLE = False
-    time_restrictions = None
-
-try:
-    from app.utils.audit_logger import audit_logger
-    AUDIT_LOGGER_AVAILABLE = True
-except ImportError:
-    print("⚠️ Audit logger not available")
-    AUDIT_LOGGER_AVAILABLE = False
-    audit_logger = None
+from app.utils.web_serving import ReadCache, ConnectionBudget, LazyFeature
+from app.core.attendance_manager import BatchPunchProcessor
+from app.utils.rate_limiter import RateLimiter
+from app.utils.metrics import metrics
+from app.utils.qr_manager import get_qr_manager
+
+# أنظمة الأمان المتقدمة تُستورد عند أول استخدام: face_recognition يحمّل dlib/cv2،
+# والباقي يقرأ ملفات JSON عند الاستيراد - مهم لزمن البدء البارد في serverless
+face_security = LazyFeature('app.utils.face_recognition', 'face_security',
+                            "⚠️ Face recognition not available - install face-recognition library")
+biometric_security = LazyFeature('app.utils.biometric_security', 'biometric_security',
+                                 "⚠️ Biometric security not available")
+time_restrictions = LazyFeature('app.utils.time_restrictions', 'time_restrictions',
+                                "⚠️ Time restrictions not available",
+                                on_load=lambda manager: manager.attach_database(db_manager))
+audit_logger = LazyFeature('app.utils.audit_logger', 'audit_logger',
+                           "⚠️ Audit logger not available")
 
 from app.version import APP_VERSION
 
@@ -105,22 +91,7 @@ def get_message(key, lang='ar', **kwargs):
     return message_template.format(**kwargs)
 # --- نهاية الAdd ---
 
-from math import radians, cos, sin, asin, sqrt
-
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """
-    تحسب المسافة بالأمتار بين نقطتين باستخدام صيغة Haversine.
-    """
-    # تحويل الدرجات إلى راديان
-    lon1, lat1, lon2, lat2 = map(radians, [float(lon1), float(lat1), float(lon2), float(lat2)])
-
-    # صيغة Haversine
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a)) 
-    r = 6371 # نصف قطر الأرض بالكيلومترات
-    return c * r * 1000 # التحويل إلى أمتار
+from app.utils.location_parser import calculate_distance
 
 # --- ========================================================= ---
 # ---                       نهاية الAdd                        ---
@@ -134,9 +105,29 @@ def calculate_distance(lat1, lon1, lat2, lon2):
 
 app = Flask(__name__, template_folder='templates')
 app.config['JSON_AS_ASCII'] = False
+
+# وضع التشغيل: dev (خادم Flask)، production (gunicorn عبر wsgi.py) أو serverless (Vercel عبر api/index.py)
+SERVING_MODE = os.getenv('ATTENDANCE_SERVING_MODE', 'dev').lower()
+PRODUCTION_MODE = SERVING_MODE == 'production'
+SERVERLESS_MODE = SERVING_MODE == 'serverless'
+
 # استخدام النظام الهجين إذا كان متاحاً
 try:
-    db_manager = SimpleHybridManager()
+    if PRODUCTION_MODE:
+        # التحميل من Supabase يتم مرة واحدة في العملية الأم قبل fork،
+        # وخيوط المزامنة يشغّلها عامل واحد فقط (انظر wsgi.on_worker_start)
+        db_manager = SimpleHybridManager(start_sync_threads=False)
+        db_manager.control_settings['delete_local_on_exit'] = False
+    elif SERVERLESS_MODE:
+        # بدون تنزيل كامل ولا خيوط خلفية: القراءة عند الطلب والمزامنة داخل الطلب
+        db_manager = SimpleHybridManager(
+            load_from_supabase=False,
+            start_sync_threads=False,
+            local_db_path=os.getenv('SQLITE_FILE', '/tmp/attendance.db')
+        )
+        db_manager.enable_read_through()
+    else:
+        db_manager = SimpleHybridManager()
     print("[WEB_APP] Using SimpleHybridManager for database operations")
 except Exception as e:
     print(f"[WEB_APP] Failed to initialize SimpleHybridManager: {e}")
@@ -144,6 +135,107 @@ except Exception as e:
     db_manager = DatabaseManager()
 DEBUG_MODE = os.getenv('FLASK_DEBUG', '0') == '1'
 
+# كاش القراءة للمواقع والإعدادات (معطّل افتراضياً في وضع التطوير)
+read_cache = ReadCache(float(os.getenv('WEB_READ_CACHE_TTL', '30' if PRODUCTION_MODE else '0')))
+# ميزانية اتصالات قاعدة البيانات لكل عامل (0 = بدون حد) - أقل من خيوط العامل (8 افتراضياً) حتى ترفض فعلاً
+connection_budget = ConnectionBudget(
+    int(os.getenv('WEB_DB_CONNECTIONS_PER_WORKER', '4' if PRODUCTION_MODE else '0')),
+    float(os.getenv('WEB_DB_ACQUIRE_TIMEOUT', '2.0'))
+)
+
+# الحد الأقصى لعدد البصمات في طلب دفعة واحد
+ATTENDANCE_BATCH_MAX = int(os.getenv('ATTENDANCE_BATCH_MAX', '5000'))
+
+# تحديد معدل الطلبات لنقاط الحضور والوجه وQR (في الذاكرة لكل عامل)
+qr_manager = get_qr_manager()  # مشترك للعملية، يعيد قراءة qr_settings.json عند تغيره
+rate_limiter = RateLimiter(enabled=os.getenv('RATE_LIMIT_ENABLED', '1') == '1')
+RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', '0') == '1'
+
+def get_client_ip():
+    """عنوان العميل - يُعتمد X-Forwarded-For فقط خلف nginx (RATE_LIMIT_TRUST_PROXY=1)"""
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+        return request.headers.get('X-Real-IP') or request.remote_addr
+    return request.remote_addr
+
+def check_rate_limit(endpoint_class, employee_key=None, include_ip=True):
+    """يُرجع استجابة 429 عند تجاوز المعدل، وإلا None"""
+    if employee_key is not None:
+        employee_key = str(employee_key)[:128]
+    allowed, retry_after, scope = rate_limiter.check(endpoint_class, get_client_ip(), employee_key, include_ip)
+    if allowed:
+        return None
+    response = jsonify({'status': 'error', 'success': False,
+                        'message': 'Too many requests, please retry later.', 'limit_scope': scope})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def rate_limited(endpoint_class, key_field=None):
+    """مزخرف لتطبيق حد المعدل بحسب IP وحقل معرف الموظف في جسم الطلب"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            employee_key = None
+            if key_field:
+                payload = request.get_json(silent=True) or {}
+                employee_key = payload.get(key_field) if isinstance(payload, dict) else None
+            limited = check_rate_limit(endpoint_class, employee_key)
+            if limited is not None:
+                return limited
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_approved_locations():
+    """المواقع المعتمدة عبر كاش القراءة"""
+    return read_cache.get('locations', db_manager.get_all_locations)
+
+def get_cached_settings():
+    """إعدادات التطبيق عبر كاش القراءة"""
+    return read_cache.get('settings', db_manager.get_all_settings)
+
+def warm_read_caches():
+    """تحميل مسبق للكاش - يُستدعى في العملية الأم قبل fork"""
+    read_cache.warm({
+        'locations': db_manager.get_all_locations,
+        'settings': db_manager.get_all_settings
+    })
+
+@app.before_request
+def start_request_timer():
+    # يُسجَّل قبل ميزانية الاتصالات حتى تُقاس استجابات 503 أيضاً
+    if metrics.enabled:
+        g.request_started_at = time.perf_counter()
+
+@app.after_request
+def observe_request_duration(response):
+    started = g.pop('request_started_at', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.request_duration.observe((request.method, route, str(response.status_code)),
+                                         time.perf_counter() - started)
+    return response
+
+@app.before_request
+def acquire_connection_budget():
+    if not connection_budget.enabled or not request.path.startswith('/api/'):
+        return None
+    if not connection_budget.acquire():
+        response = jsonify({'status': 'error', 'message': 'Server busy, please retry.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    g.holds_connection_budget = True
+    return None
+
+@app.teardown_request
+def release_connection_budget(exc=None):
+    if g.pop('holds_connection_budget', False):
+        connection_budget.release()
+
 PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL')  # مثال: https://example.com
 GITHUB_OWNER = os.getenv('GITHUB_OWNER')
 GITHUB_REPO = os.getenv('GITHUB_REPO')
@@ -296,7 +388,7 @@ def employee_status():
     # --- بداية الكود الذي كان ناقصًا ---
     is_late = False
     if next_action == 'Check-In':
-        settings = db_manager.get_all_settings()
+        settings = get_cached_settings()
         work_start_time_str = settings.get('work_start_time', '08:30:00')
         late_allowance_minutes = int(settings.get('late_allowance_minutes', '15'))
         work_start_time = datetime.datetime.strptime(work_start_time_str, "%H:%M:%S").time()
@@ -319,6 +411,7 @@ def employee_status():
 
 
 @app.route('/api/check-in', methods=['POST'])
+@rate_limited('checkin', key_field='identifier')
 def check_in():
     """
     API لتسجيل الحضور مع الأمان المتقدم - التحقق من الوجه، البيومتري، والقيود الزمنية.
@@ -334,10 +427,12 @@ def check_in():
     if not all([identifier, fingerprint, token, location, check_type]):
         return jsonify({'status': 'error', 'message': get_message('incomplete_data', lang)}), 400
 
+    stages = metrics.stage_timer('check_in')
     employee_to_check_in = find_employee_by_identifier(identifier)
+    stages.mark('identity_lookup')
     if not employee_to_check_in:
         # تسجيل محاولة وصول غير مصرح
-        if AUDIT_LOGGER_AVAILABLE:
+        if audit_logger.available:
             audit_logger.log_security_event(
                 'unauthorized_access_attempt',
                 {'identifier': identifier, 'ip_address': request.remote_addr},
@@ -347,11 +442,19 @@ def check_in():
 
     employee_id = employee_to_check_in['id']
     
+    # تشفير الوجه مكلف للمعالج: ميزانية أشد من تسجيل الحضور العادي، تُفحص قبل أي كتابة في قاعدة البيانات
+    if face_image and face_security.available:
+        limited = check_rate_limit('face', employee_id)
+        if limited is not None:
+            return limited
+    
     # 🔒 1. التحقق من القيود الزمنية
-    if TIME_RESTRICTIONS_AVAILABLE:
-        time_check = time_restrictions.is_checkin_allowed(employee_id)
+    if time_restrictions.available:
+        time_check = time_restrictions.is_checkin_allowed(
+            employee_id, department=employee_to_check_in.get('department')
+        )
         if not time_check['allowed']:
-            if AUDIT_LOGGER_AVAILABLE:
+            if audit_logger.available:
                 audit_logger.log_time_restriction_violation(
                     employee_id, 
                     time_check.get('restriction_type', 'unknown'),
@@ -360,9 +463,10 @@ def check_in():
             return jsonify({'status': 'error', 'message': time_check['message']}), 403
     else:
         time_check = {'allowed': True, 'message': 'Time restrictions disabled'}
+    stages.mark('time_restrictions')
 
     # --- منطق التحقق من الموقع الجغرافي (Geofencing) ---
-    approved_locations = db_manager.get_all_locations()
+    approved_locations = get_approved_locations()
     if not approved_locations:
         return jsonify({'status': 'error', 'message': get_message('no_approved_locations', lang)}), 403
 
@@ -384,13 +488,14 @@ def check_in():
 
     location_id_to_save = closest_location['id']
     location_name = closest_location['name']
+    stages.mark('geofence')
 
     # --- بداية الكود الذي كان ناقصًا ---
 
     # 🔒 2. التحقق من الجهاز والأمان المتقدم
     owner_by_token = db_manager.get_employee_by_token(token)
     if owner_by_token and owner_by_token['id'] != employee_to_check_in['id']:
-        if AUDIT_LOGGER_AVAILABLE:
+        if audit_logger.available:
             audit_logger.log_security_event(
                 'device_token_conflict',
                 {'employee_id': employee_id, 'token_owner': owner_by_token['id']},
@@ -405,17 +510,17 @@ def check_in():
     if employee_token:
         if employee_token == token:
             device_verified = True
-            if AUDIT_LOGGER_AVAILABLE:
+            if audit_logger.available:
                 audit_logger.log_device_verification(employee_id, fingerprint, token, True)
             print(f"[AUTH] Success: Token matched for employee {employee_id}.")
         elif employee_fingerprint == fingerprint:
             print(f"[AUTH] Token mismatch, but Canvas Fingerprint matched. Updating token...")
             db_manager.execute_query("UPDATE employees SET device_token = ? WHERE id = ?", (token, employee_id), commit=True)
             device_verified = True
-            if AUDIT_LOGGER_AVAILABLE:
+            if audit_logger.available:
                 audit_logger.log_device_verification(employee_id, fingerprint, token, True)
         else:
-            if AUDIT_LOGGER_AVAILABLE:
+            if audit_logger.available:
                 audit_logger.log_device_verification(employee_id, fingerprint, token, False)
             print(f"[AUTH] FAILED: Token and Fingerprint mismatch for employee {employee_id}.")
             return jsonify({'status': 'error', 'message': get_message('use_registered_device', lang, name=employee_to_check_in['name'])}), 403
@@ -423,29 +528,31 @@ def check_in():
         print(f"[AUTH] First-time registration for employee {employee_id}.")
         db_manager.update_employee_device_info(employee_id, fingerprint, token)
         device_verified = True
-        if AUDIT_LOGGER_AVAILABLE:
+        if audit_logger.available:
             audit_logger.log_device_verification(employee_id, fingerprint, token, True)
         success_message = get_message('browser_linked_success', lang, name=employee_to_check_in['name'])
+    stages.mark('device_check')
 
     # 🔒 3. التحقق من الوجه (إذا كان متاحاً)
     face_verified = True  # افتراضياً صحيح إذا لم يكن مطلوباً
-    if face_image and FACE_RECOGNITION_AVAILABLE:
+    if face_image and face_security.available:
         face_verified = face_security.verify_employee_face(employee_id, face_image)
-        if AUDIT_LOGGER_AVAILABLE:
+        if audit_logger.available:
             audit_logger.log_face_recognition(employee_id, face_verified)
         
         if not face_verified:
-            if AUDIT_LOGGER_AVAILABLE:
+            if audit_logger.available:
                 audit_logger.log_security_event(
                     'face_verification_failed',
                     {'employee_id': employee_id, 'ip_address': request.remote_addr},
                     employee_id=employee_id
                 )
             return jsonify({'status': 'error', 'message': 'Face verification failed'}), 403
+        stages.mark('face')
 
     # 🔒 4. التحقق البيومتري المتقدم (إذا كان متاحاً)
     biometric_verified = True  # افتراضياً صحيح إذا لم يكن مطلوباً
-    if biometric_response and BIOMETRIC_SECURITY_AVAILABLE:
+    if biometric_response and biometric_security.available:
         # إنشاء تحدي التحقق
         challenge = biometric_security.generate_verification_challenge(employee_id)
         if challenge:
@@ -458,13 +565,14 @@ def check_in():
             biometric_verified = verification_result['success']
             
             if not biometric_verified:
-                if AUDIT_LOGGER_AVAILABLE:
+                if audit_logger.available:
                     audit_logger.log_security_event(
                         'biometric_verification_failed',
                         {'employee_id': employee_id, 'error': verification_result.get('error')},
                         employee_id=employee_id
                     )
                 return jsonify({'status': 'error', 'message': 'Biometric verification failed'}), 403
+        stages.mark('biometric')
 
     # --- منطق تسلسل الإجراءات ---
     today_str = datetime.date.today().strftime("%Y-%m-%d")
@@ -473,6 +581,7 @@ def check_in():
         return jsonify({'status': 'error', 'message': get_message('checkin_twice', lang)}), 403
     if (check_type == 'Check-Out' and last_action != 'Check-In'):
         return jsonify({'status': 'error', 'message': get_message('checkout_before_checkin', lang)}), 403
+    stages.mark('sequence_check')
 
     # --- إعداد رسالة النجاح وSave البيانات ---
     if 'success_message' not in locals():
@@ -497,10 +606,11 @@ def check_in():
     
     if record_id and duration_hours is not None:
         db_manager.update_checkout_with_duration(record_id, duration_hours)
+    stages.mark('insert')
 
     if record_id:
         # تسجيل نجاح تسجيل الحضور
-        if AUDIT_LOGGER_AVAILABLE:
+        if audit_logger.available:
             audit_logger.log_attendance_event(
                 employee_id=employee_id,
                 event_type='checkin_success',
@@ -511,11 +621,13 @@ def check_in():
                     'device_verified': device_verified,
                     'face_verified': face_verified,
                     'biometric_verified': biometric_verified,
-                    'duration_hours': duration_hours
+                    'duration_hours': duration_hours,
+                    'device_token': token[:8] + '...'
                 },
                 ip_address=request.remote_addr,
                 user_agent=request.headers.get('User-Agent')
             )
+        stages.mark('audit')
         
         return jsonify({
             'status': 'success', 
@@ -531,7 +643,7 @@ def check_in():
         })
     else:
         # تسجيل فشل تسجيل الحضور
-        if AUDIT_LOGGER_AVAILABLE:
+        if audit_logger.available:
             audit_logger.log_attendance_event(
                 employee_id=employee_id,
                 event_type='checkin_failed',
@@ -546,12 +658,53 @@ def check_in():
     
     # --- نهاية الكود الذي كان ناقصًا ---
 
+@app.route('/api/attendance/batch', methods=['POST'])
+def attendance_batch_api():
+    """
+    API لإدخال دفعة بصمات من الأكشاك وجسر أجهزة ZK بعد انقطاع الشبكة.
+    كل عنصر: identifier أو employee_id، type، timestamp (وقت العميل)، idempotency_key، و location اختياري.
+    """
+    lang = request.headers.get('Accept-Language', 'ar').split(',')[0].split('-')[0]
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return jsonify({'success': False, 'error': get_message('unauthorized', lang)}), 401
+    admin_user = db_manager.validate_admin_session(auth_header.split(' ')[1])
+    if not admin_user:
+        return jsonify({'success': False, 'error': get_message('unauthorized', lang)}), 401
+
+    if not hasattr(db_manager, 'record_attendance_batch'):
+        return jsonify({'success': False, 'error': 'Batch punches are not supported by the current database manager'}), 503
+
+    data = request.get_json(silent=True) or {}
+    punches = data.get('punches')
+    if not isinstance(punches, list) or not punches:
+        return jsonify({'success': False, 'error': get_message('incomplete_data', lang)}), 400
+
+    processor = BatchPunchProcessor(db_manager, max_batch_size=ATTENDANCE_BATCH_MAX)
+    if len(punches) > processor.max_batch_size:
+        return jsonify({'success': False, 'error': f'Batch too large (max {processor.max_batch_size} punches)'}), 413
+
+    try:
+        outcome = processor.process(punches, source=data.get('source') or admin_user['username'])
+    except Exception as e:
+        return jsonify({'success': False, 'error': get_message('server_error', lang), 'details': str(e)}), 500
+
+    if audit_logger.available and outcome['summary']['created']:
+        audit_logger.log_security_event(
+            'attendance_batch_ingested',
+            {'summary': outcome['summary'], 'source': data.get('source'), 'user': admin_user['username']},
+            ip_address=request.remote_addr
+        )
+
+    return jsonify({'success': True, **outcome}), 200
+
 @app.route('/qr-scanner')
 def qr_scanner():
     """صفحة مسح رموز QR للموظفين"""
     return render_template('qr_scanner.html')
 
 @app.route('/api/scan-qr', methods=['POST'])
+@rate_limited('qr')
 def scan_qr_api():
     """API لمعالجة رموز QR المسحوبة"""
     try:
@@ -571,16 +724,17 @@ def scan_qr_api():
         if not qr_code:
             return jsonify({'success': False, 'error': 'رمز QR فارغ'}), 400
         
-        # التحقق من صحة الرمز
-        from app.utils.qr_manager import QRCodeManager
-        qr_manager = QRCodeManager()
-        
+        # التحقق من صحة الرمز (الرموز الموقعة تُتحقق في الذاكرة بدون قاعدة البيانات)
         result = qr_manager.verify_qr_code(qr_code)
         if not result or not result.get('is_valid'):
             return jsonify({'success': False, 'error': 'رمز QR غير صالح أو منتهي الصلاحية'}), 400
         
         # الSearch عن الموظف
         employee_id = result.get('employee_id')
+        # دلو الموظف بعد حل الرمز: تغيير نص الرمز لا يتجاوز الحد، ورمز مشترك لا يحجب بقية الموظفين
+        limited = check_rate_limit('qr', employee_id, include_ip=False)
+        if limited is not None:
+            return limited
         employee = db_manager.get_employee_by_id(employee_id)
         
         if not employee:
@@ -634,10 +788,11 @@ def scan_qr_api():
 # === APIs للأمان المتقدم ===
 
 @app.route('/api/security/register-face', methods=['POST'])
+@rate_limited('face', key_field='employee_id')
 def register_face():
     """تسجيل وجه الموظف"""
     try:
-        if not FACE_RECOGNITION_AVAILABLE:
+        if not face_security.available:
             return jsonify({'success': False, 'error': 'Face recognition not available'}), 503
             
         data = request.get_json()
@@ -650,7 +805,7 @@ def register_face():
         success = face_security.register_employee_face(employee_id, face_image)
         
         if success:
-            if AUDIT_LOGGER_AVAILABLE:
+            if audit_logger.available:
                 audit_logger.log_face_recognition(employee_id, True, details={'action': 'registration'})
             return jsonify({'success': True, 'message': 'تم تسجيل الوجه بنجاح'})
         else:
@@ -660,6 +815,7 @@ def register_face():
         return jsonify({'success': False, 'error': f'خطأ في تسجيل الوجه: {str(e)}'}), 500
 
 @app.route('/api/security/verify-face', methods=['POST'])
+@rate_limited('face', key_field='employee_id')
 def verify_face():
     """التحقق من وجه الموظف"""
     try:
@@ -707,18 +863,39 @@ def get_biometric_challenge():
 
 @app.route('/api/security/audit-report', methods=['GET'])
 def get_audit_report():
-    """الحصول على تقرير التدقيق"""
+    """
+    الحصول على تقرير التدقيق (صفحة من الأحدث للأقدم + ملخص)
+    - limit (حتى 1000) و cursor = next_cursor من الصفحة السابقة
+    - by_employee=1: توزيع الأحداث على كل الموظفين في الملخص (أبطأ على المدى الواسع)
+    - stream=1: كل الأحداث المطابقة كـ NDJSON (سطر لكل حدث) دون تحميلها في الذاكرة
+    """
     try:
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        event_type = request.args.get('event_type')
-        employee_id = request.args.get('employee_id', type=int)
+        filters = {
+            'start_date': request.args.get('start_date'),
+            'end_date': request.args.get('end_date'),
+            'event_type': request.args.get('event_type'),
+            'employee_id': request.args.get('employee_id', type=int),
+            'sub_type': request.args.get('sub_type'),
+            'severity': request.args.get('severity'),
+        }
+        for name in ('start_date', 'end_date'):
+            if filters[name]:
+                try:
+                    datetime.datetime.fromisoformat(filters[name])
+                except ValueError:
+                    return jsonify({'success': False, 'error': f'تاريخ غير صالح في {name} (الصيغة YYYY-MM-DD)'}), 400
+        
+        if request.args.get('stream') == '1':
+            def generate():
+                for event in audit_logger.iter_audit_events(**filters):
+                    yield json.dumps(event, ensure_ascii=False) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
         
         report = audit_logger.get_audit_report(
-            start_date=start_date,
-            end_date=end_date,
-            event_type=event_type,
-            employee_id=employee_id
+            limit=request.args.get('limit', 100, type=int),
+            cursor=request.args.get('cursor'),
+            include_employees=request.args.get('by_employee') == '1',
+            **filters
         )
         
         return jsonify({
@@ -726,6 +903,8 @@ def get_audit_report():
             'report': report
         })
         
+    except ValueError:
+        return jsonify({'success': False, 'error': 'مؤشر الصفحة غير صالح'}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': f'خطأ في إنشاء التقرير: {str(e)}'}), 500
 
@@ -758,6 +937,55 @@ def get_employee_security_status():
     except Exception as e:
         return jsonify({'success': False, 'error': f'خطأ في الحصول على حالة الأمان: {str(e)}'}), 500
 
+@app.route('/api/rate-limit/stats', methods=['GET'])
+def rate_limit_stats():
+    """عدادات تحديد المعدل للمراقبة (للمسؤولين فقط)"""
+    lang = request.headers.get('Accept-Language', 'ar').split(',')[0].split('-')[0]
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return jsonify({'success': False, 'error': get_message('unauthorized', lang)}), 401
+    if not db_manager.validate_admin_session(auth_header.split(' ')[1]):
+        return jsonify({'success': False, 'error': get_message('unauthorized', lang)}), 401
+    return jsonify({'success': True, 'rate_limits': rate_limiter.get_stats()})
+
+def _register_metrics_gauges():
+    """مقاييس تُحسب عند القراءة: قائمة المزامنة، تحديد المعدل، ميزانية الاتصالات"""
+    def sync_queue_values(field):
+        def collect():
+            if not hasattr(db_manager, 'get_sync_queue_lag'):
+                return {}
+            lag = db_manager.get_sync_queue_lag()
+            return {(): lag[field]} if field in lag else {}
+        return collect
+
+    metrics.register_gauge('sync_queue_pending', 'Pending operations in the local sync queue',
+                           sync_queue_values('pending'))
+    metrics.register_gauge('sync_queue_failed', 'Failed operations in the local sync queue',
+                           sync_queue_values('failed'))
+    metrics.register_gauge('sync_queue_oldest_pending_age_seconds', 'Age of the oldest pending sync operation',
+                           sync_queue_values('oldest_pending_age_seconds'))
+    metrics.register_gauge('rate_limit_decisions_total', 'Rate limiter decisions by endpoint class',
+                           lambda: {(endpoint, decision): count
+                                    for endpoint, counters in rate_limiter.get_stats()['endpoints'].items()
+                                    for decision, count in counters.items()},
+                           ('endpoint', 'decision'), metric_type='counter')
+    metrics.register_gauge('connection_budget_in_use', 'API requests holding the per-worker connection budget',
+                           lambda: {(): connection_budget.get_status()['in_use']})
+    metrics.register_gauge('connection_budget_rejected_total', 'Requests rejected with 503 by the connection budget',
+                           lambda: {(): connection_budget.get_status()['rejected']}, metric_type='counter')
+
+_register_metrics_gauges()
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """مقاييس Prometheus (METRICS_ENABLED=1)، مع رمز Bearer اختياري عبر METRICS_TOKEN"""
+    if not metrics.enabled:
+        return jsonify({'status': 'error', 'message': 'Metrics are disabled'}), 404
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # --- بدء تشغيل الخادم ---
 if __name__ == '__main__':
     print("--- Starting Web App Server with Advanced Security ---")
@@ -0,0 +1,29 @@
+"""
+Production WSGI entry point (gunicorn)
+
+    gunicorn -c deploy/gunicorn.conf.py wsgi:app
+
+With preload_app the master process imports this module once: the local store
+is filled from Supabase and the read caches are warmed before workers fork.
+Each worker then calls on_worker_start(); exactly one of them takes the sync
+lock and runs the sync threads, the others only read/write the shared SQLite
+file and leave pushing the sync_queue to the owner.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('ATTENDANCE_SERVING_MODE', 'production')
+
+from web_app import app, db_manager, warm_read_caches
+
+# قاعدة SQLite مشتركة بين عدة عمليات: WAL يسمح بالقراءة أثناء الكتابة
+db_manager.execute_query('PRAGMA journal_mode=WAL')
+warm_read_caches()
+
+
+def on_worker_start():
+    """يُستدعى من post_fork في كل عامل"""
+    if hasattr(db_manager, 'claim_sync_ownership'):
+        db_manager.claim_sync_ownership()